@@ -40,6 +40,7 @@ setup(
     license=about["__license__"],
     packages=find_packages(),
     install_requires=install_requires(),
+    python_requires=">=3.7",
     zip_safe=False,
     keywords='development registration',
     classifiers=[
@@ -53,14 +54,17 @@ setup(
         'Topic :: Scientific/Engineering :: Medical Science Apps.',
 
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
     ],
     entry_points={
         'console_scripts': [
             'simplereg_transform = simplereg.application.transform:main',
             'simplereg_resample = simplereg.application.resample:main',
             'simplereg_register_landmarks = simplereg.application.register_landmarks:main',
+            'simplereg_augment = simplereg.application.augment:main',
+            'simplereg_register_batch = simplereg.application.register_batch:main',
+            'simplereg_benchmark_wrappers = simplereg.application.benchmark_wrappers:main',
         ],
     },
 )
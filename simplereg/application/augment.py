@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+import argparse
+
+import pysitk.python_helper as ph
+
+import simplereg.data_writer as dw
+import simplereg.augmenter
+from simplereg.definitions import ALLOWED_INTERPOLATORS
+from simplereg.augmenter import ALLOWED_DISTRIBUTIONS
+
+
+##
+# Generate randomly transformed samples of an image
+# \date       2026-10-19 09:40:12+0000
+#
+# \return     exit code
+#
+def main():
+
+    time_start = ph.start_timing()
+
+    # Read input
+    parser = argparse.ArgumentParser(
+        description="Generate randomly transformed samples of an image, "
+        "e.g. for data augmentation. "
+        "The image is read only once and samples are resampled in parallel.",
+        prog=None,
+        epilog="Author: Michael Ebner (michael.ebner.14@ucl.ac.uk)",
+    )
+    parser.add_argument(
+        "-m", "--moving",
+        help="Path to image to be augmented",
+        type=str,
+        required=1,
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Path to output directory",
+        type=str,
+        required=1,
+    )
+    parser.add_argument(
+        "-n", "--n-samples",
+        help="Number of random samples",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--seed",
+        help="Seed for reproducible sample generation",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-d", "--distribution",
+        help="Distribution to draw transform parameters from. "
+        "Parameters are understood as standard deviations ('normal') or "
+        "half-widths ('uniform'). Allowed options are: %s" % (
+            ", ".join(ALLOWED_DISTRIBUTIONS)),
+        type=str,
+        default="normal",
+    )
+    parser.add_argument(
+        "-rot", "--rotation",
+        help="Rotation in degrees",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "-trans", "--translation",
+        help="Translation in millimetre",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "-scale", "--scaling",
+        help="Relative scaling, e.g. 0.1 for 10%%",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "-shear", "--shearing",
+        help="Shearing factor",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "-disp", "--displacement",
+        help="Displacement of B-spline control points in millimetre",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "-grid", "--displacement-grid",
+        help="Number of B-spline control point mesh elements per axis",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "-i", "--interpolator",
+        help="Interpolator for image resampling. Can be either name (%s) "
+        "or order (0, 1)" % (
+            ", ".join(ALLOWED_INTERPOLATORS)),
+        type=str,
+        default="Linear",
+    )
+    parser.add_argument(
+        "-p", "--padding",
+        help="Padding value",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-j", "--n-jobs",
+        help="Number of parallel resampling workers",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "-cl", "--compression-level",
+        help="Compression level (0-9, 1 being the fastest) of .nii.gz "
+        "output. If not given, the default of the image writer is used",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "-ct", "--compression-threads",
+        help="Number of threads for parallel compression of .nii.gz output",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "-ci", "--compression-index",
+        help="Write a seek-point index next to .nii.gz output for fast "
+        "partial reads. Blocks are compressed independently in this case",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-iot", "--io-threads",
+        help="Number of threads writing samples in the background",
+        type=int,
+        default=2,
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        help="Turn on/off verbose output",
+        type=int,
+        default=0,
+    )
+    args = parser.parse_args()
+
+    dw.DataWriter.set_compression(
+        level=args.compression_level,
+        n_threads=args.compression_threads,
+        index=args.compression_index)
+
+    augmenter = simplereg.augmenter.Augmenter(
+        path_to_image=args.moving,
+        n_samples=args.n_samples,
+        seed=args.seed,
+        distribution=args.distribution,
+        rotation=args.rotation,
+        translation=args.translation,
+        scaling=args.scaling,
+        shearing=args.shearing,
+        displacement=args.displacement,
+        displacement_grid=args.displacement_grid,
+        interpolator=args.interpolator,
+        padding=args.padding,
+        n_jobs=args.n_jobs,
+        verbose=args.verbose,
+    )
+    augmenter.write_samples(args.output, io_threads=args.io_threads)
+
+    if args.verbose:
+        ph.print_info("Computational Time: %s" % ph.stop_timing(time_start))
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
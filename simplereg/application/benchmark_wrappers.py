@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+import json
+import argparse
+
+import pysitk.python_helper as ph
+
+import simplereg.wrapper_benchmark as wb
+
+
+##
+# Benchmark the overhead of the wrapped registration tools using stubs
+# \date       2026-10-19 23:16:02+0000
+#
+# \return     exit code; 1 if the overhead regressed against the baseline
+#
+def main():
+
+    time_start = ph.start_timing()
+
+    # Read input
+    parser = argparse.ArgumentParser(
+        description="Benchmark the overhead of simplereg's wrappers of "
+        "NiftyReg and FSL FLIRT, e.g. staging of inputs and reading of "
+        "outputs. Stub executables which honour the file contracts of the "
+        "tools but perform no registration are used instead of installed "
+        "tools. The median time of each stage is reported as JSON.",
+        prog=None,
+        epilog="Author: Michael Ebner (michael.ebner.14@ucl.ac.uk)",
+    )
+    parser.add_argument(
+        "-m", "--methods",
+        help="Registration methods",
+        type=str,
+        nargs="+",
+        choices=wb.METHODS,
+        default=wb.METHODS,
+    )
+    parser.add_argument(
+        "-s", "--sizes",
+        help="Edge lengths of cubic images in voxels",
+        type=int,
+        nargs="+",
+        default=wb.SIZES,
+    )
+    parser.add_argument(
+        "-r", "--repetitions",
+        help="Number of runs per method and size",
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Path to JSON report",
+        type=str,
+        required=1,
+    )
+    parser.add_argument(
+        "-b", "--baseline",
+        help="Path to JSON report of a previous benchmark to compare the "
+        "overhead against",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "-t", "--tolerance",
+        help="Factor by which the overhead may exceed the baseline",
+        type=float,
+        default=1.5,
+    )
+    parser.add_argument(
+        "-dir-tmp", "--dir-tmp",
+        help="Directory for stubs and working directories, e.g. a tmpfs "
+        "mount. Default: system temporary directory",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        help="Turn on/off verbose output",
+        type=int,
+        required=0,
+        default=0,
+    )
+
+    args = parser.parse_args()
+
+    benchmark = wb.WrapperBenchmark(
+        methods=args.methods,
+        sizes=args.sizes,
+        repetitions=args.repetitions,
+        dir_tmp=args.dir_tmp,
+        verbose=args.verbose,
+    )
+    report = benchmark.run()
+
+    with open(args.output, "w") as fileobj:
+        json.dump(report, fileobj, indent=2)
+    ph.print_info("Report written to '%s'" % args.output)
+
+    exit_code = 0
+    if args.baseline is not None:
+        with open(args.baseline) as fileobj:
+            baseline = json.load(fileobj)
+        regressions = wb.get_regressions(
+            report, baseline, tolerance=args.tolerance)
+        for regression in regressions:
+            ph.print_warning(regression)
+        if len(regressions) > 0:
+            exit_code = 1
+
+    if args.verbose:
+        elapsed_time_total = ph.stop_timing(time_start)
+        ph.print_info("Computational Time: %s" % elapsed_time_total)
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+import os
+import argparse
+
+import pysitk.python_helper as ph
+
+import simplereg.flirt
+import simplereg.niftyreg
+import simplereg.batch_registration as br
+from simplereg.definitions import DIR_TMP
+
+METHODS = ["RegAladin", "RegF3D", "FLIRT"]
+
+
+##
+# Register many image pairs in parallel using NiftyReg or FSL FLIRT
+# \date       2026-10-19 21:40:12+0000
+#
+# \return     exit code; 1 if any registration failed
+#
+def main():
+
+    time_start = ph.start_timing()
+
+    # Read input
+    parser = argparse.ArgumentParser(
+        description="Register many image pairs in parallel using NiftyReg "
+        "or FSL FLIRT. The available cores are split into concurrent "
+        "registrations times threads per registration. Image pairs are given "
+        "by a CSV manifest with header and columns 'fixed', 'moving' and "
+        "optionally 'fixed_mask', 'moving_mask', 'output_transform' "
+        "(.txt, or displacement field .nii.gz for RegF3D) and "
+        "'output_warped'. Relative paths are relative to the manifest.",
+        prog=None,
+        epilog="Author: Michael Ebner (michael.ebner.14@ucl.ac.uk)",
+    )
+    parser.add_argument(
+        "-manifest", "--manifest",
+        help="Path to CSV manifest of image pairs",
+        type=str,
+        required=1,
+    )
+    parser.add_argument(
+        "-m", "--method",
+        help="Registration method",
+        type=str,
+        choices=METHODS,
+        default="RegAladin",
+    )
+    parser.add_argument(
+        "-opt", "--options",
+        help="Options passed to the registration tool, e.g. '-rigOnly'",
+        type=str,
+        default="",
+    )
+    parser.add_argument(
+        "-c", "--cores",
+        help="Total number of cores to use. Default: all cores",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "-t", "--threads-per-job",
+        help="Number of (OpenMP) threads per registration. Default: %d for "
+        "NiftyReg with remaining cores distributed among the registrations, "
+        "1 for FLIRT" % br.THREADS_PER_JOB,
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "-r", "--retries",
+        help="Number of times a failed registration is repeated",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "-timeout", "--timeout",
+        help="Timeout in seconds per registration",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "-dir-tmp", "--dir-tmp",
+        help="Directory for temporary working directories of registrations",
+        type=str,
+        default=DIR_TMP,
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        help="Turn on/off verbose output",
+        type=int,
+        required=0,
+        default=0,
+    )
+
+    args = parser.parse_args()
+
+    jobs = br.read_manifest(args.manifest)
+
+    threads_per_job = args.threads_per_job
+    if args.method == "FLIRT":
+        if threads_per_job is None:
+            threads_per_job = 1
+
+        def create_registration(n_threads):
+            return simplereg.flirt.FLIRT(
+                fixed_sitk=None,
+                moving_sitk=None,
+                options=args.options,
+                verbose=args.verbose,
+                dir_tmp=args.dir_tmp,
+                timeout=args.timeout,
+            )
+    else:
+        registration_method = getattr(simplereg.niftyreg, args.method)
+
+        def create_registration(n_threads):
+            return registration_method(
+                options=args.options,
+                omp=n_threads,
+                verbose=args.verbose,
+                dir_tmp=args.dir_tmp,
+                timeout=args.timeout,
+            )
+
+    batch = br.BatchRegistration(
+        create_registration=create_registration,
+        jobs=jobs,
+        n_cores=args.cores,
+        threads_per_job=threads_per_job,
+        max_retries=args.retries,
+        verbose=args.verbose,
+    )
+    ph.print_info(
+        "%d registrations: %d concurrent with %d thread(s) each" % (
+            len(jobs),
+            batch.get_number_of_concurrent_jobs(),
+            batch.get_threads_per_job()))
+
+    n_failed = 0
+    for i, result in enumerate(batch.run()):
+        label = "[%d/%d] %s -> %s" % (
+            i + 1, len(jobs),
+            os.path.basename(result.job.moving),
+            os.path.basename(result.job.fixed))
+        if result.error is None:
+            ph.print_info("%s: done (%s)" % (
+                label, result.computational_time))
+        else:
+            n_failed += 1
+            ph.print_warning("%s: failed after %d attempt(s): %s" % (
+                label, result.attempts, result.error))
+
+    elapsed_time_total = ph.stop_timing(time_start)
+    ph.print_info("Computational Time: %s" % elapsed_time_total)
+
+    if n_failed > 0:
+        ph.print_warning("%d of %d registrations failed" % (
+            n_failed, len(jobs)))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,15 @@
 #!/usr/bin/env python
 
+import os
 import argparse
+import nibabel as nib
 
 import pysitk.python_helper as ph
 
+import simplereg.data_writer as dw
 import simplereg.resampler
-from simplereg.definitions import ALLOWED_INTERPOLATORS
+import simplereg.multi_component_resampler
+from simplereg.definitions import ALLOWED_IMAGES, ALLOWED_INTERPOLATORS
 
 
 ##
@@ -45,10 +49,23 @@ def main():
     parser.add_argument(
         "-t", "--transform",
         help="Path to (SimpleITK) transformation (.txt) or displacement "
-        "field (.nii.gz) to be applied",
+        "field (.nii.gz) to be applied. "
+        "If several transforms T_1 ... T_n are given, the result equals "
+        "resampling with T_1, ..., T_n one after another but the image is "
+        "interpolated only once",
+        nargs="+",
         type=str,
         required=0,
     )
+    parser.add_argument(
+        "-tv", "--transforms-per-volume",
+        help="Paths to (SimpleITK) transformations, one for each "
+        "volume (component or timepoint) of a multi-component or 4D moving "
+        "image",
+        nargs="+",
+        type=str,
+        default=None,
+    )
     parser.add_argument(
         "-i", "--interpolator",
         help="Interpolator for image resampling. Can be either name (%s) "
@@ -81,6 +98,50 @@ def main():
         type=float,
         default=None,
     )
+    parser.add_argument(
+        "-mask", "--mask",
+        help="Path to mask in fixed image space. If given, the resampling "
+        "grid is cropped to the bounding box of the mask",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "-roi", "--roi",
+        help="Region of interest to crop the resampling grid to, given by "
+        "the physical lower and upper corner points, "
+        "e.g. 'x1 y1 z1 x2 y2 z2'",
+        nargs="+",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "-margin", "--margin",
+        help="Margin in millimeter added to each side of the mask/ROI "
+        "bounding box. If scalar, it is applied uniformly to all axes",
+        nargs="+",
+        type=float,
+        default=[0],
+    )
+    parser.add_argument(
+        "-cl", "--compression-level",
+        help="Compression level (0-9, 1 being the fastest) of .nii.gz "
+        "output. If not given, the default of the image writer is used",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "-ct", "--compression-threads",
+        help="Number of threads for parallel compression of .nii.gz output",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "-ci", "--compression-index",
+        help="Write a seek-point index next to .nii.gz output for fast "
+        "partial reads. Blocks are compressed independently in this case",
+        type=int,
+        default=0,
+    )
     parser.add_argument(
         "-v", "--verbose",
         help="Turn on/off verbose output",
@@ -90,21 +151,58 @@ def main():
     )
     args = parser.parse_args()
 
+    dw.DataWriter.set_compression(
+        level=args.compression_level,
+        n_threads=args.compression_threads,
+        index=args.compression_index)
+
     if args.fixed == "same":
         args.fixed = args.moving
 
-    resampler = simplereg.resampler.Resampler(
-        path_to_fixed=args.fixed,
-        path_to_moving=args.moving,
-        path_to_transform=args.transform,
-        interpolator=args.interpolator,
-        spacing=args.spacing,
-        padding=args.padding,
-        add_to_grid=args.add_to_grid,
-        verbose=args.verbose,
-    )
-    resampler.run()
-    resampler.write_image(args.output)
+    # Multi-component and 4D NIfTI images are resampled volume by volume.
+    # Other inputs, e.g. chunked image stores or DICOM series directories,
+    # are read by the Resampler
+    is_nifti = not os.path.isdir(args.moving) and \
+        ph.strip_filename_extension(args.moving)[1] in ALLOWED_IMAGES
+    if (is_nifti and len(nib.load(args.moving).shape) > 3) or \
+            args.transforms_per_volume is not None:
+        if args.fixed == args.moving:
+            raise IOError(
+                "Fixed image must be a 3D image for multi-component "
+                "resampling")
+        resampler = \
+            simplereg.multi_component_resampler.MultiComponentResampler(
+                path_to_fixed=args.fixed,
+                path_to_moving=args.moving,
+                path_to_transform=args.transform,
+                paths_to_transforms=args.transforms_per_volume,
+                interpolator=args.interpolator,
+                spacing=args.spacing,
+                padding=args.padding,
+                add_to_grid=args.add_to_grid,
+                path_to_mask=args.mask,
+                roi=args.roi,
+                margin=args.margin,
+                verbose=args.verbose,
+            )
+        resampler.run(args.output)
+
+    else:
+        resampler = simplereg.resampler.Resampler(
+            path_to_fixed=args.fixed,
+            path_to_moving=args.moving,
+            path_to_transform=args.transform,
+            interpolator=args.interpolator,
+            spacing=args.spacing,
+            padding=args.padding,
+            add_to_grid=args.add_to_grid,
+            path_to_mask=args.mask,
+            roi=args.roi,
+            margin=args.margin,
+            verbose=args.verbose,
+        )
+        resampler.run()
+        resampler.write_image(args.output)
 
     if args.verbose:
         ph.show_niftis([
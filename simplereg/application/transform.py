@@ -15,6 +15,7 @@ import simplereg.resampler as res
 import simplereg.data_reader as dr
 import simplereg.data_writer as dw
 import simplereg.utilities as utils
+import simplereg.io_pipeline as iop
 import simplereg.landmark_estimator as le
 import simplereg.landmark_visualizer as lv
 from simplereg.niftyreg_to_simpleitk_converter import \
@@ -73,7 +74,9 @@ def main():
         help="Apply (Simple)ITK transform (or displacement field) to landmarks. "
         "Landmarks are encoded in a text file with one landmark position in "
         "mm per line j: "
-        "<key_j_x> <key_j_y> (<key_j_z>)",
+        "<key_j_x> <key_j_y> (<key_j_z>). "
+        "Alternatively, landmarks can be given as (N x dim) numpy array (.npy) "
+        "or compact binary file (.lmk) whose labels and ids are preserved.",
         nargs=3,
         metavar=("LANDMARKS", "TRANSFORM", "OUTPUT_LANDMARKS"),
         default=None,
@@ -151,6 +154,25 @@ def main():
         nargs="+",
         default=None,
     )
+    parser.add_argument(
+        "-nii2zarr", "--nifti-to-zarr",
+        help="Convert NIfTI image to chunked, compressed, multi-resolution "
+        "image store (Zarr layout) for fast region reads. See also "
+        "--chunk-size, --levels and --is-label",
+        metavar=("IMAGE", "OUTPUT_ZARR"),
+        type=str,
+        nargs=2,
+        default=None,
+    )
+    parser.add_argument(
+        "-zarr2nii", "--zarr-to-nifti",
+        help="Convert resolution level of chunked image store to NIfTI "
+        "image. See also --level",
+        metavar=("ZARR", "OUTPUT_IMAGE"),
+        type=str,
+        nargs=2,
+        default=None,
+    )
     parser.add_argument(
         "-split", "--split-labels",
         help="Split multi-label mask into 4D (or 5D) image where each "
@@ -173,7 +195,7 @@ def main():
     parser.add_argument(
         "-label2points", "--label-to-points",
         help="Export point coordinates of labelled voxels of binary mask "
-        "to text file. ",
+        "to landmark file (.txt, .npy or .lmk). ",
         metavar=("LABEL", "OUTPUT_POINTS"),
         type=str,
         nargs=2,
@@ -221,6 +243,69 @@ def main():
         type=int,
         default=2,
     )
+    parser.add_argument(
+        "-chunk", "--chunk-size",
+        help="Chunk size in voxels of chunked image stores",
+        type=int,
+        default=64,
+    )
+    parser.add_argument(
+        "-levels", "--levels",
+        help="Number of resolution levels of chunked image stores, each one "
+        "downsampled by factor 2 from the previous one",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "-level", "--level",
+        help="Resolution level read from chunked image stores",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-is-label", "--is-label",
+        help="Turn on/off label image handling, i.e. lower resolution "
+        "levels of chunked image stores are computed by the most frequent "
+        "label of each block instead of averaging",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-cl", "--compression-level",
+        help="Compression level (0-9, 1 being the fastest) of .nii.gz "
+        "output. If not given, the default of the image writer is used",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "-ct", "--compression-threads",
+        help="Number of threads for parallel compression of .nii.gz output",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "-ci", "--compression-index",
+        help="Write a seek-point index next to .nii.gz output for fast "
+        "partial reads. Blocks are compressed independently in this case",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "-prec", "--precision",
+        help="Precision of displacement fields written by -c, -nreg2sitk "
+        "and -sitk2nreg. If not given, the precision of the input is "
+        "preserved",
+        type=str,
+        choices=["float32", "float64"],
+        default=None,
+    )
+    parser.add_argument(
+        "-iot", "--io-threads",
+        help="Number of threads for reading and writing images in the "
+        "background of batch conversions (-mc2sc, -sc2mc)",
+        type=int,
+        default=2,
+    )
     parser.add_argument(
         "-v", "--verbose",
         help="Turn on/off verbose output",
@@ -229,6 +314,11 @@ def main():
     )
     args = parser.parse_args()
 
+    dw.DataWriter.set_compression(
+        level=args.compression_level,
+        n_threads=args.compression_threads,
+        index=args.compression_index)
+
     if args.image_header is not None:
         image_sitk = dr.DataReader.read_image(args.image_header[0])
         transform_sitk = dr.DataReader.read_transform(args.image_header[1])
@@ -243,7 +333,8 @@ def main():
         transform_sitk = utils.compose_transforms(
             transform2_sitk, transform1_sitk)
         dw.DataWriter.write_transform(
-            transform_sitk, args.compose[2], args.verbose)
+            transform_sitk, args.compose[2], args.verbose,
+            dtype=args.precision)
 
     if args.datatype is not None:
         image_nib = dr.DataReader.read_transform(
@@ -258,19 +349,23 @@ def main():
             transform_inv_sitk, args.invert_transform[1], args.verbose)
 
     if args.landmark is not None:
-        landmarks_nda = dr.DataReader.read_landmarks(args.landmark[0])
+        landmarks_nda = np.array(
+            dr.DataReader.read_landmarks(args.landmark[0]), dtype=np.float64)
+        labels, ids = dr.DataReader.read_landmark_attributes(args.landmark[0])
         transform_sitk = dr.DataReader.read_transform(args.landmark[1])
         for i in range(landmarks_nda.shape[0]):
             landmarks_nda[i, :] = transform_sitk.TransformPoint(
                 landmarks_nda[i, :])
         dw.DataWriter.write_landmarks(
-            landmarks_nda, args.landmark[2], args.verbose)
+            landmarks_nda, args.landmark[2], args.verbose,
+            labels=labels, ids=ids)
 
     if args.sitk_to_nreg is not None:
         nreg2sitk.convert_sitk_to_nreg_transform(
             args.sitk_to_nreg[0],
             args.sitk_to_nreg[1],
             args.verbose,
+            dtype=args.precision,
         )
 
     if args.nreg_to_sitk is not None:
@@ -278,6 +373,7 @@ def main():
             args.nreg_to_sitk[0],
             args.nreg_to_sitk[1],
             args.verbose,
+            dtype=args.precision,
         )
 
     if args.flirt_to_sitk is not None:
@@ -298,26 +394,55 @@ def main():
 
     if args.swap_sitk_nii is not None:
         landmarks_nda = dr.DataReader.read_landmarks(args.swap_sitk_nii[0])
+        labels, ids = dr.DataReader.read_landmark_attributes(
+            args.swap_sitk_nii[0])
         landmarks_nda[:, 0:2] *= -1
         dw.DataWriter.write_landmarks(
-            landmarks_nda, args.swap_sitk_nii[1], args.verbose)
+            landmarks_nda, args.swap_sitk_nii[1], args.verbose,
+            labels=labels, ids=ids)
 
     if args.multicomp_to_singlecomp:
-        vector_image_sitk = sitkh.read_sitk_vector_image(
-            args.multicomp_to_singlecomp[0])
+        # Read one component at a time; compressed images are only
+        # decompressed from the closest seek point onwards
+        shape = dr.DataReader.read_image_header(
+            args.multicomp_to_singlecomp[0]).get_data_shape()
         fname = ph.strip_filename_extension(
             os.path.basename(args.multicomp_to_singlecomp[0]))[0]
-        for i in range(vector_image_sitk.GetNumberOfComponentsPerPixel()):
-            image_sitk = sitk.VectorIndexSelectionCast(vector_image_sitk, i)
-            path_to_output = os.path.join(
-                args.multicomp_to_singlecomp[1], "%s_%d.nii.gz" % (fname, i))
-            dw.DataWriter.write_image(image_sitk, path_to_output, args.verbose)
+
+        def read_component(i):
+            index = (0, 0, 0) + np.unravel_index(i, shape[3:], order="F")
+            return dr.DataReader.read_image_region(
+                args.multicomp_to_singlecomp[0],
+                index=index,
+                size=shape[0:3] + (1,) * len(shape[3:]))
+
+        # Overlap reading of next and writing of previous components
+        failed = []
+        with iop.IOPipeline(
+                n_threads=args.io_threads, verbose=args.verbose) as pipeline:
+            for i, image_sitk, error in pipeline.iterate(
+                    range(int(np.prod(shape[3:]))), read=read_component):
+                if error is not None:
+                    failed.append(i)
+                    continue
+                path_to_output = os.path.join(
+                    args.multicomp_to_singlecomp[1],
+                    "%s_%d.nii.gz" % (fname, i))
+                pipeline.write(image_sitk, path_to_output)
+        if len(failed) > 0:
+            raise RuntimeError("Reading component(s) %s failed" % (
+                ", ".join(str(i) for i in failed)))
 
     if args.singlecomp_to_multicomp:
-        images_sitk = [None] * (len(args.singlecomp_to_multicomp) - 1)
-        for i in range(len(images_sitk)):
-            images_sitk[i] = dr.DataReader.read_image(
-                args.singlecomp_to_multicomp[i])
+        # Read (and decompress) components in parallel
+        with iop.IOPipeline(
+                n_threads=args.io_threads, verbose=args.verbose) as pipeline:
+            results = list(pipeline.iterate(
+                args.singlecomp_to_multicomp[0:-1]))
+        for result in results:
+            if result.error is not None:
+                raise result.error
+        images_sitk = [result.data for result in results]
         vector_image_sitk = sitkh.get_sitk_vector_image_from_components(
             images_sitk)
         dw.DataWriter.write_vector_image(
@@ -325,6 +450,21 @@ def main():
             args.singlecomp_to_multicomp[-1],
             verbose=args.verbose)
 
+    if args.nifti_to_zarr is not None:
+        utils.convert_nifti_to_chunked_image(
+            args.nifti_to_zarr[0],
+            args.nifti_to_zarr[1],
+            chunk_size=args.chunk_size,
+            n_levels=args.levels,
+            is_label=args.is_label,
+            compression_level=1 if args.compression_level is None
+            else args.compression_level,
+        )
+
+    if args.zarr_to_nifti is not None:
+        utils.convert_chunked_image_to_nifti(
+            args.zarr_to_nifti[0], args.zarr_to_nifti[1], level=args.level)
+
     if args.split_labels is not None:
         dim = int(args.split_labels[1])
         if dim != 4 and dim != 5:
@@ -343,18 +483,21 @@ def main():
 
     if args.label_to_points is not None:
         label_sitk = dr.DataReader.read_image(args.label_to_points[0])
-        label_mesh_nda = sitk.GetArrayFromImage(label_sitk)
+        label_mesh_nda = sitk.GetArrayViewFromImage(label_sitk)
 
         # [z, y, x] x n_landmarks to [x, y, z] x n_landmarks
-        indices = np.array(np.where(label_mesh_nda == 1))[::-1, :]
-        n_landmarks = len(indices[0])
-        for i in range(n_landmarks):
-            indices[:, i] = label_sitk.TransformIndexToPhysicalPoint(
-                [int(j) for j in indices[:, i]])
+        indices = np.array(np.nonzero(label_mesh_nda == 1))[::-1, :]
+
+        # Physical points of all voxel indices at once
+        dim = label_sitk.GetDimension()
+        A = np.array(label_sitk.GetDirection()).reshape(dim, dim).dot(
+            np.diag(label_sitk.GetSpacing()))
+        points = A.dot(indices) + \
+            np.array(label_sitk.GetOrigin())[:, np.newaxis]
 
         # write as n_landmarks x n_dim
         dw.DataWriter.write_landmarks(
-            indices.transpose(), args.label_to_points[1])
+            points.transpose(), args.label_to_points[1])
 
     if args.landmark_to_label:
         landmarks_nda = dr.DataReader.read_landmarks(args.landmark_to_label[0])
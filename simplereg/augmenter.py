@@ -0,0 +1,284 @@
+##
+# \file augmenter.py
+# \brief      Class to generate randomly transformed image samples, e.g. for
+#             data augmentation
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import numpy as np
+import SimpleITK as sitk
+import concurrent.futures
+
+import pysitk.python_helper as ph
+
+import simplereg.data_reader as dr
+import simplereg.data_writer as dw
+import simplereg.io_pipeline as iop
+from simplereg.resampler import Resampler
+
+ALLOWED_DISTRIBUTIONS = ["normal", "uniform"]
+
+
+##
+# Class to generate randomly transformed image samples. The input image is
+# read only once, transforms are drawn from configurable distributions and
+# samples are resampled in parallel workers.
+#
+# Each sample i is generated from its own random state seeded by get_seeds()[i]
+# so that any sample can be regenerated individually given the initial seed.
+# \date       2026-10-19 09:12:31+0000
+#
+class Augmenter(object):
+
+    ##
+    # Store augmentation settings
+    # \date       2026-10-19 09:13:02+0000
+    #
+    # \param      self                The object
+    # \param      path_to_image       Path to image to be augmented
+    # \param      n_samples           Number of random samples to draw
+    # \param      seed                Seed for reproducible sample generation
+    # \param      distribution        Distribution to draw parameters from.
+    #                                 Either 'normal' (values below are
+    #                                 standard deviations) or 'uniform'
+    #                                 (values below are half-widths)
+    # \param      rotation            Rotation in degrees
+    # \param      translation         Translation in millimetre
+    # \param      scaling             Relative scaling, e.g. 0.1 for 10%
+    # \param      shearing            Shearing factor
+    # \param      displacement        Displacement in millimetre of the
+    #                                 control points of a cubic B-spline
+    #                                 transform
+    # \param      displacement_grid   Number of B-spline control point mesh
+    #                                 elements per axis
+    # \param      interpolator        Interpolator for image resampling
+    # \param      padding             Padding value
+    # \param      n_jobs              Number of parallel resampling workers
+    # \param      verbose             Turn on/off verbose output
+    #
+    def __init__(self,
+                 path_to_image,
+                 n_samples=10,
+                 seed=0,
+                 distribution="normal",
+                 rotation=0,
+                 translation=0,
+                 scaling=0,
+                 shearing=0,
+                 displacement=0,
+                 displacement_grid=4,
+                 interpolator="Linear",
+                 padding=0,
+                 n_jobs=1,
+                 verbose=0,
+                 ):
+
+        if distribution not in ALLOWED_DISTRIBUTIONS:
+            raise ValueError(
+                "Distribution not known. Allowed options are: %s" % (
+                    ", ".join(ALLOWED_DISTRIBUTIONS)))
+
+        self._path_to_image = path_to_image
+        self._n_samples = n_samples
+        self._seed = seed
+        self._distribution = distribution
+        self._rotation = rotation
+        self._translation = translation
+        self._scaling = scaling
+        self._shearing = shearing
+        self._displacement = displacement
+        self._displacement_grid = displacement_grid
+        self._interpolator = interpolator
+        self._padding = padding
+        self._n_jobs = n_jobs
+        self._verbose = verbose
+
+        self._image_sitk = None
+        self._seeds = np.random.RandomState(seed).randint(
+            0, np.iinfo(np.int32).max, size=n_samples)
+
+    def get_seeds(self):
+        return np.array(self._seeds)
+
+    def get_image_sitk(self):
+        if self._image_sitk is None:
+            self._image_sitk = dr.DataReader.read_image(self._path_to_image)
+        return self._image_sitk
+
+    ##
+    # Gets the random transform associated with a sample.
+    # \date       2026-10-19 09:20:44+0000
+    #
+    # \param      self   The object
+    # \param      index  Sample index
+    #
+    # \return     Transform as sitk.AffineTransform or, if displacements are
+    #             drawn, sitk.CompositeTransform (affine after B-spline)
+    #
+    def get_transform_sitk(self, index):
+        random_state = np.random.RandomState(self._seeds[index])
+        image_sitk = self.get_image_sitk()
+        dim = image_sitk.GetDimension()
+
+        affine_sitk = self._get_random_affine_transform_sitk(
+            image_sitk, random_state)
+
+        if self._displacement == 0:
+            return affine_sitk
+
+        bspline_sitk = sitk.BSplineTransformInitializer(
+            image_sitk, [int(self._displacement_grid)] * dim)
+        parameters = self._draw(
+            random_state,
+            self._displacement,
+            len(bspline_sitk.GetParameters()))
+        bspline_sitk.SetParameters(parameters)
+
+        return sitk.CompositeTransform([affine_sitk, bspline_sitk])
+
+    ##
+    # Gets a single sample; can be used to regenerate any sample individually
+    # \date       2026-10-19 09:24:13+0000
+    #
+    # \param      self   The object
+    # \param      index  Sample index
+    #
+    # \return     Tuple of warped image (sitk.Image) and transform
+    #
+    def get_sample(self, index):
+        image_sitk = self.get_image_sitk()
+        transform_sitk = self.get_transform_sitk(index)
+        warped_image_sitk = sitk.Resample(
+            image_sitk,
+            image_sitk,
+            transform_sitk,
+            Resampler._convert_interpolator_sitk(self._interpolator),
+            float(self._padding),
+            image_sitk.GetPixelIDValue(),
+        )
+        return warped_image_sitk, transform_sitk
+
+    ##
+    # Stream samples in order while resampling up to n_jobs of them in
+    # parallel. Only a bounded number of samples is kept in memory.
+    # \date       2026-10-19 09:27:51+0000
+    #
+    # \param      self  The object
+    #
+    # \return     generator of (index, warped image, transform) tuples
+    #
+    def iterate_samples(self):
+
+        # Read input only once before distributing work to the workers
+        self.get_image_sitk()
+
+        n_jobs = max(1, int(self._n_jobs))
+        with concurrent.futures.ThreadPoolExecutor(n_jobs) as executor:
+            futures = {}
+            for index in range(min(2 * n_jobs, self._n_samples)):
+                futures[index] = executor.submit(self.get_sample, index)
+            for index in range(self._n_samples):
+                warped_image_sitk, transform_sitk = futures.pop(index).result()
+                index_next = index + 2 * n_jobs
+                if index_next < self._n_samples:
+                    futures[index_next] = executor.submit(
+                        self.get_sample, index_next)
+                if self._verbose:
+                    ph.print_info("Sample %d/%d generated" % (
+                        index + 1, self._n_samples))
+                yield index, warped_image_sitk, transform_sitk
+
+    ##
+    # Writes all samples, their transforms and the augmentation settings
+    # required for regeneration to a directory.
+    # \date       2026-10-19 09:31:06+0000
+    #
+    # \param      self             The object
+    # \param      directory        Output directory
+    # \param      filename         Filename prefix of samples
+    # \param      write_transform  Turn on/off writing of sample transforms
+    # \param      io_threads       Number of threads writing samples in the
+    #                              background while the next ones are
+    #                              resampled
+    #
+    def write_samples(self,
+                      directory,
+                      filename="sample",
+                      write_transform=1,
+                      io_threads=2,
+                      ):
+        ph.create_directory(directory)
+
+        with iop.IOPipeline(
+                n_threads=io_threads, verbose=self._verbose) as pipeline:
+            for index, warped_image_sitk, transform_sitk in \
+                    self.iterate_samples():
+                path_to_image = os.path.join(
+                    directory, "%s_%04d.nii.gz" % (filename, index))
+                pipeline.write(warped_image_sitk, path_to_image)
+                if write_transform:
+                    path_to_transform = os.path.join(
+                        directory, "%s_%04d.txt" % (filename, index))
+                    pipeline.write(
+                        transform_sitk, path_to_transform,
+                        write=dw.DataWriter.write_transform)
+
+        ph.write_dictionary_to_json(
+            self.get_settings(),
+            os.path.join(directory, "%s_settings.json" % filename),
+            verbose=self._verbose)
+
+    def get_settings(self):
+        return {
+            "path_to_image": self._path_to_image,
+            "n_samples": int(self._n_samples),
+            "seed": int(self._seed),
+            "distribution": self._distribution,
+            "rotation": self._rotation,
+            "translation": self._translation,
+            "scaling": self._scaling,
+            "shearing": self._shearing,
+            "displacement": self._displacement,
+            "displacement_grid": self._displacement_grid,
+            "interpolator": self._interpolator,
+            "padding": self._padding,
+        }
+
+    def _draw(self, random_state, value, size):
+        if self._distribution == "normal":
+            return random_state.normal(0, value, size)
+        return random_state.uniform(-value, value, size)
+
+    def _get_random_affine_transform_sitk(self, image_sitk, random_state):
+        dim = image_sitk.GetDimension()
+
+        # Rotation about image center
+        angles = np.deg2rad(self._draw(
+            random_state, self._rotation, 1 if dim == 2 else 3))
+        rotation_sitk = getattr(sitk, "Euler%dDTransform" % dim)()
+        if dim == 2:
+            rotation_sitk.SetAngle(angles[0])
+        else:
+            rotation_sitk.SetRotation(*angles)
+        R = np.array(rotation_sitk.GetMatrix()).reshape(dim, dim)
+
+        S = np.diag(1. + self._draw(random_state, self._scaling, dim))
+
+        H = np.eye(dim)
+        H[np.triu_indices(dim, 1)] = self._draw(
+            random_state, self._shearing, dim * (dim - 1) // 2)
+
+        translation = self._draw(random_state, self._translation, dim)
+
+        center = image_sitk.TransformContinuousIndexToPhysicalPoint(
+            (np.array(image_sitk.GetSize()) - 1) / 2.)
+
+        affine_sitk = sitk.AffineTransform(dim)
+        affine_sitk.SetMatrix(R.dot(H).dot(S).flatten())
+        affine_sitk.SetTranslation(translation)
+        affine_sitk.SetCenter(center)
+
+        return affine_sitk
@@ -0,0 +1,273 @@
+##
+# \file batch_registration.py
+# \brief      Parallel registration of many image pairs with wrapped
+#             registration tools
+#
+# A total core budget is split into a number of concurrent jobs times a
+# number of (OpenMP) threads per job since tools like reg_aladin scale poorly
+# beyond a few threads. Jobs are scheduled largest images first and results
+# are reported as soon as they are available.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import csv
+import collections
+import concurrent.futures
+import numpy as np
+import SimpleITK as sitk
+
+import pysitk.python_helper as ph
+
+import simplereg.data_writer as dw
+
+# Number of threads per job if not specified otherwise
+THREADS_PER_JOB = 4
+
+##
+# Registration job given by paths to images and optional outputs
+# \date       2026-10-19 21:20:02+0000
+#
+RegistrationJob = collections.namedtuple(
+    "RegistrationJob",
+    ["fixed", "moving", "fixed_mask", "moving_mask",
+     "output_transform", "output_warped"],
+    defaults=(None, None, None, None),
+)
+
+##
+# Result of a registration job. Either registration or error is set.
+# \date       2026-10-19 21:20:40+0000
+#
+BatchResult = collections.namedtuple(
+    "BatchResult",
+    ["index", "job", "registration", "error", "attempts",
+     "computational_time"])
+
+
+##
+# Split a core budget into concurrent jobs and threads per job.
+# \date       2026-10-19 21:21:31+0000
+#
+# \param      n_cores          Total number of cores
+# \param      n_jobs           Number of jobs
+# \param      threads_per_job  Number of threads per job; if None, cores not
+#                              needed for THREADS_PER_JOB threads per job are
+#                              distributed among the jobs
+#
+# \return     Tuple of number of concurrent jobs and threads per job
+#
+def get_thread_split(n_cores, n_jobs, threads_per_job=None):
+    n_cores = max(1, int(n_cores))
+    n_threads = THREADS_PER_JOB if threads_per_job is None \
+        else int(threads_per_job)
+    n_threads = max(1, min(n_threads, n_cores))
+    n_concurrent = max(1, min(n_jobs, n_cores // n_threads))
+
+    if threads_per_job is None:
+        n_threads = n_cores // n_concurrent
+
+    return n_concurrent, n_threads
+
+
+##
+# Reads a manifest of registration jobs. The manifest is a CSV file with a
+# header naming the columns fixed and moving as well as optionally
+# fixed_mask, moving_mask, output_transform and output_warped. Relative paths
+# are relative to the directory of the manifest.
+# \date       2026-10-19 21:23:50+0000
+#
+# \param      path_to_file  Path to manifest (.csv)
+#
+# \return     List of RegistrationJob objects
+#
+def read_manifest(path_to_file):
+    if not ph.file_exists(path_to_file):
+        raise IOError("Manifest '%s' not found" % path_to_file)
+
+    directory = os.path.dirname(os.path.abspath(path_to_file))
+    with open(path_to_file, newline="") as fileobj:
+        reader = csv.DictReader(fileobj)
+        columns = [c.strip() for c in reader.fieldnames or []]
+        for column in ["fixed", "moving"]:
+            if column not in columns:
+                raise IOError(
+                    "Manifest '%s' requires a column '%s'" % (
+                        path_to_file, column))
+        unknown = set(columns) - set(RegistrationJob._fields)
+        if len(unknown) > 0:
+            raise IOError("Unknown column(s) %s in manifest '%s'" % (
+                ", ".join(sorted(unknown)), path_to_file))
+
+        jobs = []
+        for row in reader:
+            paths = {}
+            for key, value in row.items():
+                value = (value or "").strip()
+                if value:
+                    paths[key.strip()] = os.path.join(directory, value)
+            jobs.append(RegistrationJob(**paths))
+
+    return jobs
+
+
+##
+# Run registrations of many image pairs concurrently.
+# \date       2026-10-19 21:26:12+0000
+#
+class BatchRegistration(object):
+
+    ##
+    # Store jobs and thread budget
+    # \date       2026-10-19 21:26:40+0000
+    #
+    # \param      self                 The object
+    # \param      create_registration  Function creating a registration
+    #                                  method (WrapperRegistration object)
+    #                                  given the number of threads per job,
+    #                                  e.g. lambda n: RegAladin(omp=n)
+    # \param      jobs                 List of RegistrationJob objects
+    # \param      n_cores              Total number of cores; all cores if
+    #                                  None
+    # \param      threads_per_job      Number of threads per job; see
+    #                                  get_thread_split
+    # \param      max_retries          Number of times a failed job is
+    #                                  repeated
+    # \param      verbose              Turn on/off verbose output
+    #
+    def __init__(self,
+                 create_registration,
+                 jobs,
+                 n_cores=None,
+                 threads_per_job=None,
+                 max_retries=1,
+                 verbose=0,
+                 ):
+        if n_cores is None:
+            n_cores = os.cpu_count() or 1
+
+        self._create_registration = create_registration
+        self._jobs = list(jobs)
+        self._max_retries = max(0, int(max_retries))
+        self._verbose = verbose
+
+        self._n_concurrent, self._threads_per_job = get_thread_split(
+            n_cores, len(self._jobs), threads_per_job)
+
+    def get_number_of_concurrent_jobs(self):
+        return self._n_concurrent
+
+    def get_threads_per_job(self):
+        return self._threads_per_job
+
+    ##
+    # Run all jobs, largest images first.
+    # \date       2026-10-19 21:29:02+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Generator of BatchResult objects in order of completion
+    #
+    def run(self):
+        sizes = [self._get_job_size(job) for job in self._jobs]
+        order = sorted(range(len(self._jobs)), key=lambda i: -sizes[i])
+
+        with concurrent.futures.ThreadPoolExecutor(
+                self._n_concurrent) as executor:
+            pending = {}
+            for index in order:
+                future = executor.submit(self._run_job, self._jobs[index])
+                pending[future] = (index, 1)
+
+            while len(pending) > 0:
+                done, not_done = concurrent.futures.wait(
+                    pending.keys(),
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    index, attempts = pending.pop(future)
+                    job = self._jobs[index]
+                    error = future.exception()
+                    if error is not None and attempts <= self._max_retries:
+                        if self._verbose:
+                            ph.print_warning(
+                                "Registration of '%s' and '%s' failed "
+                                "(attempt %d): %s. Retry." % (
+                                    job.fixed, job.moving, attempts, error))
+                        future = executor.submit(self._run_job, job)
+                        pending[future] = (index, attempts + 1)
+                        continue
+
+                    registration, computational_time = (None, None) \
+                        if error is not None else future.result()
+                    yield BatchResult(
+                        index=index,
+                        job=job,
+                        registration=registration,
+                        error=error,
+                        attempts=attempts,
+                        computational_time=computational_time,
+                    )
+
+    ##
+    # Run a single job and write its outputs.
+    # \date       2026-10-19 21:33:14+0000
+    #
+    # \param      self  The object
+    # \param      job   RegistrationJob object
+    #
+    # \return     Tuple of registration method and computational time
+    #
+    def _run_job(self, job):
+        time_start = ph.start_timing()
+
+        registration = self._create_registration(self._threads_per_job)
+
+        # Files are passed to the tools as-is
+        registration.set_fixed_sitk(None, path_to_file=job.fixed)
+        registration.set_moving_sitk(None, path_to_file=job.moving)
+        if job.fixed_mask is not None:
+            registration.set_fixed_sitk_mask(
+                None, path_to_file=job.fixed_mask)
+        if job.moving_mask is not None:
+            registration.set_moving_sitk_mask(
+                None, path_to_file=job.moving_mask)
+        registration.run()
+
+        if job.output_transform is not None:
+            if hasattr(registration, "get_displacement_field_transform_sitk"):
+                transform_sitk = \
+                    registration.get_displacement_field_transform_sitk()
+            else:
+                transform_sitk = registration.get_registration_transform_sitk()
+            dw.DataWriter.write_transform(
+                transform_sitk, job.output_transform)
+
+        if job.output_warped is not None:
+            dw.DataWriter.write_image(
+                registration.get_warped_moving_sitk(), job.output_warped)
+
+        return registration, ph.stop_timing(time_start)
+
+    ##
+    # Gets the number of voxels of fixed and moving image from their
+    # headers.
+    # \date       2026-10-19 21:35:01+0000
+    #
+    # \param      job   RegistrationJob object
+    #
+    # \return     Number of voxels; 0 if headers cannot be read
+    #
+    @staticmethod
+    def _get_job_size(job):
+        size = 0
+        for path in [job.fixed, job.moving]:
+            try:
+                reader = sitk.ImageFileReader()
+                reader.SetFileName(path)
+                reader.ReadImageInformation()
+            except RuntimeError:
+                continue
+            size += int(np.prod(reader.GetSize()))
+        return size
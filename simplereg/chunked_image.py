@@ -0,0 +1,464 @@
+##
+# \file chunked_image.py
+# \brief      Chunked, compressed, multi-resolution image store
+#
+# Images are stored as directory following the Zarr (v2) layout so that stores
+# can also be accessed by other Zarr readers:
+#
+#   image.zarr/.zgroup
+#   image.zarr/.zattrs          image geometry of each resolution level
+#   image.zarr/0/.zarray        array metadata of full resolution level
+#   image.zarr/0/<i>.<j>.<k>    zlib-compressed chunks in [z,] y, x order
+#   image.zarr/1/...            level downsampled by factor 2, and so on
+#
+# Vector images hold the components in an additional, last array dimension.
+# Regions are read by decompressing only the chunks overlapping the region.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import json
+import zlib
+import itertools
+import numpy as np
+import SimpleITK as sitk
+
+import pysitk.python_helper as ph
+
+# Default (isotropic) chunk size in voxels
+CHUNK_SIZE = 64
+
+# Default zlib compression level of chunks
+COMPRESSION_LEVEL = 1
+
+
+##
+# Chunked image store providing region reads at several resolution levels.
+# Geometry accessors follow the sitk.Image interface and refer to the full
+# resolution level unless a level is given.
+# \date       2026-10-19 15:40:12+0000
+#
+class ChunkedImage(object):
+
+    ##
+    # Open an existing chunked image store
+    # \date       2026-10-19 15:41:30+0000
+    #
+    # \param      self               The object
+    # \param      path_to_directory  Path to store directory (.zarr)
+    #
+    def __init__(self, path_to_directory):
+        self._path_to_directory = path_to_directory
+
+        path_to_attributes = os.path.join(path_to_directory, ".zattrs")
+        if not os.path.isfile(path_to_attributes):
+            raise IOError(
+                "Chunked image '%s' not found" % path_to_directory)
+        with open(path_to_attributes, "r") as fileobj:
+            attributes = json.load(fileobj)
+        if "simplereg" not in attributes:
+            raise IOError(
+                "Store '%s' does not hold image geometry" % path_to_directory)
+
+        geometry = attributes["simplereg"]
+        self._dimension = geometry["dimension"]
+        self._components = geometry["components"]
+        self._direction = np.array(geometry["direction"], dtype=np.float64)
+        self._levels = geometry["levels"]
+
+        self._arrays = []
+        for level in range(len(self._levels)):
+            with open(self._get_path_to_array(level, ".zarray"), "r") as f:
+                self._arrays.append(json.load(f))
+        self._dtype = np.dtype(self._arrays[0]["dtype"])
+
+    ##
+    # Create an empty chunked image store. Data is added via WriteRegion.
+    # \date       2026-10-19 15:45:02+0000
+    #
+    # \param      path_to_directory  Path to store directory (.zarr)
+    # \param      size               Image size, e.g. (x, y, z)
+    # \param      spacing            Image spacing
+    # \param      origin             Image origin
+    # \param      direction          Image direction (flattened)
+    # \param      dtype              Numpy data type of voxels
+    # \param      components         Number of components per voxel
+    # \param      chunk_size         Chunk size in voxels; scalar or (x, y, z)
+    # \param      n_levels           Number of resolution levels, each one
+    #                                downsampled by factor 2 from the previous
+    # \param      compression_level  zlib compression level of chunks (0-9)
+    #
+    # \return     ChunkedImage object
+    #
+    @staticmethod
+    def create(path_to_directory,
+               size,
+               spacing,
+               origin,
+               direction,
+               dtype,
+               components=1,
+               chunk_size=CHUNK_SIZE,
+               n_levels=1,
+               compression_level=COMPRESSION_LEVEL,
+               ):
+        dimension = len(size)
+        size = np.array(size, dtype=np.int64)
+        spacing = np.array(spacing, dtype=np.float64)
+        origin = np.array(origin, dtype=np.float64)
+        direction = np.array(direction, dtype=np.float64).reshape(
+            dimension, dimension)
+        chunk_size = np.ones(dimension, dtype=np.int64) * chunk_size
+        if n_levels < 1:
+            raise ValueError("Number of levels must be at least 1")
+        if compression_level not in range(10):
+            raise ValueError("Compression level must be between 0 and 9")
+
+        # Geometry of each level
+        levels = []
+        for level in range(n_levels):
+            if level > 0:
+                factor = np.where(size > 1, 2, 1)
+                size = size // factor
+                origin = origin + direction.dot(spacing * (factor - 1) / 2.)
+                spacing = spacing * factor
+            levels.append({
+                "size": size.tolist(),
+                "spacing": spacing.tolist(),
+                "origin": origin.tolist(),
+            })
+
+        ph.create_directory(path_to_directory)
+        ChunkedImage._write_json(
+            os.path.join(path_to_directory, ".zgroup"), {"zarr_format": 2})
+        ChunkedImage._write_json(
+            os.path.join(path_to_directory, ".zattrs"), {
+                "multiscales": [{
+                    "version": "0.4",
+                    "datasets": [{"path": str(level)}
+                                 for level in range(n_levels)],
+                }],
+                "simplereg": {
+                    "dimension": dimension,
+                    "components": int(components),
+                    "direction": direction.flatten().tolist(),
+                    "levels": levels,
+                },
+            })
+
+        for level in range(n_levels):
+            shape = levels[level]["size"][::-1]
+            chunks = np.minimum(chunk_size, levels[level]["size"])[::-1]
+            chunks = [int(c) for c in chunks]
+            if components > 1:
+                shape = shape + [int(components)]
+                chunks = chunks + [int(components)]
+            path_to_array = os.path.join(path_to_directory, str(level))
+            ph.create_directory(path_to_array, delete_files=True)
+            ChunkedImage._write_json(
+                os.path.join(path_to_array, ".zarray"), {
+                    "zarr_format": 2,
+                    "shape": shape,
+                    "chunks": chunks,
+                    "dtype": np.dtype(dtype).newbyteorder("<").str,
+                    "compressor": {"id": "zlib", "level": compression_level},
+                    "fill_value": 0,
+                    "filters": None,
+                    "order": "C",
+                    "dimension_separator": ".",
+                })
+
+        return ChunkedImage(path_to_directory)
+
+    ##
+    # Write an image to a chunked image store including all resolution
+    # levels.
+    # \date       2026-10-19 15:52:20+0000
+    #
+    # \param      image_sitk         Image as sitk.Image object
+    # \param      path_to_directory  Path to store directory (.zarr)
+    # \param      chunk_size         Chunk size in voxels; scalar or (x, y, z)
+    # \param      n_levels           Number of resolution levels
+    # \param      is_label           If true, levels are downsampled by the
+    #                                most frequent label of each block instead
+    #                                of averaging
+    # \param      compression_level  zlib compression level of chunks (0-9)
+    #
+    # \return     ChunkedImage object
+    #
+    @staticmethod
+    def write(image_sitk,
+              path_to_directory,
+              chunk_size=CHUNK_SIZE,
+              n_levels=1,
+              is_label=False,
+              compression_level=COMPRESSION_LEVEL,
+              ):
+        nda = sitk.GetArrayViewFromImage(image_sitk)
+        image = ChunkedImage.create(
+            path_to_directory,
+            size=image_sitk.GetSize(),
+            spacing=image_sitk.GetSpacing(),
+            origin=image_sitk.GetOrigin(),
+            direction=image_sitk.GetDirection(),
+            dtype=nda.dtype,
+            components=image_sitk.GetNumberOfComponentsPerPixel(),
+            chunk_size=chunk_size,
+            n_levels=n_levels,
+            compression_level=compression_level,
+        )
+        image.WriteRegion(nda, [0] * image_sitk.GetDimension())
+        image.UpdateLevels(is_label=is_label)
+        return image
+
+    def GetPathToDirectory(self):
+        return self._path_to_directory
+
+    def GetNumberOfLevels(self):
+        return len(self._levels)
+
+    def GetDimension(self):
+        return self._dimension
+
+    def GetNumberOfComponentsPerPixel(self):
+        return self._components
+
+    def GetDataType(self):
+        return self._dtype
+
+    def GetSize(self, level=0):
+        return tuple(int(i) for i in self._levels[level]["size"])
+
+    def GetSpacing(self, level=0):
+        return tuple(self._levels[level]["spacing"])
+
+    def GetOrigin(self, level=0):
+        return tuple(self._levels[level]["origin"])
+
+    def GetDirection(self):
+        return tuple(self._direction)
+
+    def GetChunkSize(self, level=0):
+        return tuple(self._arrays[level]["chunks"][0:self._dimension][::-1])
+
+    ##
+    # Read image region. Only chunks overlapping the region are read.
+    # \date       2026-10-19 15:55:41+0000
+    #
+    # \param      self   The object
+    # \param      index  Lower voxel index of region, e.g. (x, y, z)
+    # \param      size   Size of region, e.g. (x, y, z)
+    # \param      level  Resolution level
+    #
+    # \return     Region as sitk.Image object
+    #
+    def ReadRegion(self, index, size, level=0):
+        index = np.array(index, dtype=np.int64)
+        size = np.array(size, dtype=np.int64)
+        nda = self.ReadRegionArray(index, size, level)
+
+        image_sitk = sitk.GetImageFromArray(nda, isVector=self._components > 1)
+        direction = self._direction.reshape(self._dimension, self._dimension)
+        spacing = np.array(self.GetSpacing(level))
+        image_sitk.SetSpacing(spacing)
+        image_sitk.SetDirection(self._direction)
+        image_sitk.SetOrigin(
+            np.array(self.GetOrigin(level)) + direction.dot(spacing * index))
+        return image_sitk
+
+    ##
+    # Read image region as numpy array in [z,] y, x[, component] order.
+    # \date       2026-10-19 15:58:12+0000
+    #
+    # \param      self   The object
+    # \param      index  Lower voxel index of region, e.g. (x, y, z)
+    # \param      size   Size of region, e.g. (x, y, z)
+    # \param      level  Resolution level
+    #
+    # \return     Region as numpy array
+    #
+    def ReadRegionArray(self, index, size, level=0):
+        start, stop = self._get_bounds(index, size, level)
+        array = self._arrays[level]
+        chunks = np.array(array["chunks"])
+
+        nda = np.empty(stop - start, dtype=self._dtype.newbyteorder("="))
+        for chunk_index in self._get_chunk_indices(start, stop, chunks):
+            chunk_start = chunk_index * chunks
+            lower = np.maximum(start, chunk_start)
+            upper = np.minimum(stop, chunk_start + chunks)
+            nda[self._get_slices(lower - start, upper - start)] = \
+                self._read_chunk(level, chunk_index)[
+                    self._get_slices(lower - chunk_start, upper - chunk_start)]
+        return nda
+
+    ##
+    # Gets the image of a resolution level.
+    # \date       2026-10-19 16:00:30+0000
+    #
+    # \param      self   The object
+    # \param      level  Resolution level
+    #
+    # \return     Image as sitk.Image object
+    #
+    def GetImageSitk(self, level=0):
+        return self.ReadRegion(
+            [0] * self._dimension, self.GetSize(level), level)
+
+    ##
+    # Write numpy array into store. The region must be aligned with the chunk
+    # grid, i.e. each chunk touched is written entirely (or up to the image
+    # boundary).
+    # \date       2026-10-19 16:02:11+0000
+    #
+    # \param      self   The object
+    # \param      nda    Numpy array in [z,] y, x[, component] order
+    # \param      index  Lower voxel index of region, e.g. (x, y, z)
+    # \param      level  Resolution level
+    #
+    def WriteRegion(self, nda, index, level=0):
+        size = np.array(nda.shape[0:self._dimension][::-1], dtype=np.int64)
+        start, stop = self._get_bounds(index, size, level)
+        array = self._arrays[level]
+        chunks = np.array(array["chunks"])
+        shape = np.array(array["shape"])
+        if np.any(start % chunks != 0) or \
+                np.any((stop % chunks != 0) & (stop != shape)):
+            raise ValueError("Region must be aligned with chunk grid")
+
+        nda = np.asarray(nda).reshape(stop - start)
+        for chunk_index in self._get_chunk_indices(start, stop, chunks):
+            chunk_start = chunk_index * chunks
+            upper = np.minimum(stop, chunk_start + chunks)
+            chunk = np.zeros(chunks, dtype=self._dtype)
+            chunk[self._get_slices(0 * chunks, upper - chunk_start)] = \
+                nda[self._get_slices(chunk_start - start, upper - start)]
+            self._write_chunk(level, chunk_index, chunk)
+
+    ##
+    # Compute all lower resolution levels from the full resolution level.
+    # Levels are processed in slabs so that only a few chunks are kept in
+    # memory.
+    # \date       2026-10-19 16:05:40+0000
+    #
+    # \param      self      The object
+    # \param      is_label  If true, levels are downsampled by the most
+    #                       frequent label of each block instead of averaging
+    #
+    def UpdateLevels(self, is_label=False):
+        for level in range(1, self.GetNumberOfLevels()):
+            size = np.array(self.GetSize(level))
+            size_prev = np.array(self.GetSize(level - 1))
+            factor = np.where(size_prev > 1, 2, 1)
+
+            # Slabs along the last (slowest varying) dimension
+            thickness = self.GetChunkSize(level)[-1]
+            for z in range(0, size[-1], thickness):
+                index = np.zeros_like(size)
+                index[-1] = z
+                slab_size = size.copy()
+                slab_size[-1] = min(thickness, size[-1] - z)
+
+                nda = self.ReadRegionArray(
+                    index * factor, slab_size * factor, level - 1)
+                nda = self._downsample(nda, factor[::-1], is_label)
+                self.WriteRegion(nda, index, level)
+
+    def _downsample(self, nda, factor, is_label):
+
+        # Blocks of size factor as last axis, i.e. [z,] y, x[, component], block
+        shape = []
+        for n, f in zip(nda.shape, factor):
+            shape.extend([n // f, f])
+        shape.extend(nda.shape[len(factor):])
+        axes = tuple(range(1, 2 * len(factor), 2))
+        blocks = np.moveaxis(
+            nda.reshape(shape), axes, tuple(range(-len(axes), 0)))
+        blocks = blocks.reshape(blocks.shape[0:-len(axes)] + (-1,))
+
+        # Most frequent label of each block (first one in case of ties). As
+        # for averaging, each voxel represents its block, i.e. both share the
+        # level geometry with its origin shifted to the first block center
+        if is_label:
+            counts = np.stack([
+                np.sum(blocks == blocks[..., i:i + 1], axis=-1)
+                for i in range(blocks.shape[-1])], axis=-1)
+            index = np.argmax(counts, axis=-1)[..., np.newaxis]
+            return np.take_along_axis(blocks, index, axis=-1)[..., 0]
+
+        # Average over blocks
+        nda_mean = blocks.mean(axis=-1)
+        if np.issubdtype(nda.dtype, np.integer):
+            nda_mean = np.round(nda_mean)
+        return nda_mean.astype(nda.dtype)
+
+    def _get_bounds(self, index, size, level):
+        index = np.array(index, dtype=np.int64)
+        size = np.array(size, dtype=np.int64)
+        if len(index) != self._dimension or len(size) != self._dimension:
+            raise ValueError(
+                "Region must be given in %d dimensions" % self._dimension)
+        image_size = np.array(self.GetSize(level))
+        if np.any(index < 0) or np.any(size < 1) or \
+                np.any(index + size > image_size):
+            raise ValueError("Region exceeds image of size %s" % (
+                tuple(int(i) for i in image_size),))
+
+        # [z,] y, x[, component] array bounds
+        start = list(index[::-1])
+        stop = list((index + size)[::-1])
+        if self._components > 1:
+            start.append(0)
+            stop.append(self._components)
+        return np.array(start), np.array(stop)
+
+    @staticmethod
+    def _get_chunk_indices(start, stop, chunks):
+        ranges = [range(a // c, (b - 1) // c + 1)
+                  for a, b, c in zip(start, stop, chunks)]
+        return (np.array(i) for i in itertools.product(*ranges))
+
+    @staticmethod
+    def _get_slices(lower, upper):
+        return tuple(slice(int(a), int(b)) for a, b in zip(lower, upper))
+
+    def _get_path_to_array(self, level, name):
+        return os.path.join(self._path_to_directory, str(level), name)
+
+    def _get_path_to_chunk(self, level, chunk_index):
+        return self._get_path_to_array(
+            level, ".".join(str(int(i)) for i in chunk_index))
+
+    def _read_chunk(self, level, chunk_index):
+        array = self._arrays[level]
+        path_to_chunk = self._get_path_to_chunk(level, chunk_index)
+
+        # Missing chunks hold the fill value only
+        if not os.path.isfile(path_to_chunk):
+            return np.full(array["chunks"], array["fill_value"],
+                           dtype=self._dtype)
+
+        with open(path_to_chunk, "rb") as fileobj:
+            data = fileobj.read()
+        if array["compressor"] is not None:
+            data = zlib.decompress(data)
+        return np.frombuffer(data, dtype=self._dtype).reshape(array["chunks"])
+
+    def _write_chunk(self, level, chunk_index, chunk):
+        array = self._arrays[level]
+        data = np.ascontiguousarray(chunk, dtype=self._dtype).tobytes()
+        if array["compressor"] is not None:
+            data = zlib.compress(data, array["compressor"]["level"])
+
+        # Atomic replacement to not expose partially written chunks
+        path_to_chunk = self._get_path_to_chunk(level, chunk_index)
+        with open(path_to_chunk + ".tmp", "wb") as fileobj:
+            fileobj.write(data)
+        os.replace(path_to_chunk + ".tmp", path_to_chunk)
+
+    @staticmethod
+    def _write_json(path_to_file, data):
+        with open(path_to_file, "w") as fileobj:
+            json.dump(data, fileobj, indent=2)
@@ -0,0 +1,151 @@
+##
+# \file data_cache.py
+# \brief      Least-recently-used cache for data read from file
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import threading
+import collections
+import numpy as np
+import SimpleITK as sitk
+
+
+##
+# Thread-safe least-recently-used cache for images, transforms and landmarks
+# read from file.
+#
+# Entries are keyed on the real path, modification time and file size of the
+# read file together with the read options. Hence, entries of files changed
+# on disk are never returned. Cached objects are never handed out directly;
+# callers obtain (copy-on-write) copies so that they cannot modify the cache
+# by accident.
+# \date       2026-10-19 12:05:41+0000
+#
+class DataCache(object):
+
+    ##
+    # Store cache settings
+    # \date       2026-10-19 12:06:10+0000
+    #
+    # \param      self       The object
+    # \param      max_bytes  Memory budget in bytes. Least recently used
+    #                        entries are evicted if budget is exceeded
+    #
+    def __init__(self, max_bytes=2**30):
+        self._max_bytes = int(max_bytes)
+        self._entries = collections.OrderedDict()
+        self._n_bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    ##
+    # Gets cached object associated with a file or reads it using the given
+    # function if not available.
+    # \date       2026-10-19 12:08:22+0000
+    #
+    # \param      self          The object
+    # \param      path_to_file  Path to file
+    # \param      options       Hashable read options, e.g. tuple
+    # \param      read          Function to read the object (no arguments)
+    #
+    # \return     Copy of cached object
+    #
+    def get(self, path_to_file, options, read):
+        key = self._get_key(path_to_file, options)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self.copy(self._entries[key][0])
+            self._misses += 1
+
+        # Read outside the lock so that other files can be read concurrently
+        data = read()
+        n_bytes = self.get_size(data)
+
+        with self._lock:
+            if n_bytes <= self._max_bytes and key not in self._entries:
+                self._entries[key] = (data, n_bytes)
+                self._n_bytes += n_bytes
+                while self._n_bytes > self._max_bytes:
+                    self._n_bytes -= self._entries.popitem(last=False)[1][1]
+                    self._evictions += 1
+
+        return self.copy(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._n_bytes = 0
+
+    ##
+    # Gets the cache statistics.
+    # \date       2026-10-19 12:10:37+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Dictionary with number of hits, misses, evictions, entries
+    #             and bytes in use
+    #
+    def get_statistics(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._n_bytes,
+                "max_bytes": self._max_bytes,
+            }
+
+    ##
+    # Gets a copy of a cached object. Copies of SimpleITK images and
+    # transforms are copy-on-write, i.e. data is only duplicated once
+    # modified.
+    # \date       2026-10-19 12:12:02+0000
+    #
+    # \param      data  sitk.Image, sitk.Transform or np.ndarray object
+    #
+    # \return     Copy of object
+    #
+    @staticmethod
+    def copy(data):
+        if isinstance(data, sitk.Image):
+            return sitk.Image(data)
+        if isinstance(data, sitk.Transform):
+            return type(data)(data)
+        if isinstance(data, np.ndarray):
+            return np.array(data)
+        raise ValueError(
+            "Data type '%s' cannot be cached" % type(data).__name__)
+
+    ##
+    # Gets the (approximate) memory size of an object in bytes.
+    # \date       2026-10-19 12:13:45+0000
+    #
+    @staticmethod
+    def get_size(data):
+        if isinstance(data, sitk.Image):
+            return int(data.GetNumberOfPixels() *
+                       data.GetNumberOfComponentsPerPixel() *
+                       data.GetSizeOfPixelComponent())
+        if isinstance(data, sitk.Transform):
+            return 8 * (data.GetNumberOfParameters() +
+                        data.GetNumberOfFixedParameters())
+        if isinstance(data, np.ndarray):
+            return int(data.nbytes)
+        raise ValueError(
+            "Data type '%s' cannot be cached" % type(data).__name__)
+
+    @staticmethod
+    def _get_key(path_to_file, options):
+        path = os.path.realpath(path_to_file)
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size, options)
@@ -5,6 +5,7 @@
 #  \date June 2018
 
 
+import io
 import os
 import sys
 import itk
@@ -15,19 +16,73 @@ import SimpleITK as sitk
 import pysitk.python_helper as ph
 import pysitk.simple_itk_helper as sitkh
 
-from simplereg.definitions import ALLOWED_IMAGES
+from simplereg.definitions import ALLOWED_IMAGES, ALLOWED_IMAGES_CHUNKED
 from simplereg.definitions import ALLOWED_LANDMARKS
 from simplereg.definitions import ALLOWED_TRANSFORMS, ALLOWED_TRANSFORMS_NREG
 from simplereg.definitions import ALLOWED_TRANSFORMS_DISPLACEMENTS
+from simplereg.definitions import ALLOWED_TRANSFORM_STORES
+from simplereg.data_cache import DataCache
+from simplereg.memmap_image import MemmapImage
+from simplereg.chunked_image import ChunkedImage
+from simplereg.transform_store import TransformStore
+from simplereg.dicom_series import DicomSeries
+from simplereg.gzip_index import GzipIndex
+import simplereg.landmark_file as lmk
+
+# SimpleITK pixel types of supported displacement field data types
+DISPLACEMENT_PIXEL_TYPES = {
+    np.dtype(np.float32): sitk.sitkVectorFloat32,
+    np.dtype(np.float64): sitk.sitkVectorFloat64,
+}
 
 
 class DataReader(object):
 
+    # Process-wide cache for read images, transforms and landmarks. Disabled
+    # by default; see enable_cache
+    _cache = None
+
+    ##
+    # Enable the process-wide least-recently-used cache for images,
+    # transforms and landmarks read via DataReader. Files are identified by
+    # path, modification time and size, i.e. changed files are read again.
+    # Read objects are (copy-on-write) copies of the cached ones.
+    # \date       2026-10-19 12:20:14+0000
+    #
+    # \param      max_bytes  Memory budget of cache in bytes
+    #
+    @staticmethod
+    def enable_cache(max_bytes=2**30):
+        DataReader._cache = DataCache(max_bytes=max_bytes)
+
+    @staticmethod
+    def disable_cache():
+        DataReader._cache = None
+
+    @staticmethod
+    def clear_cache():
+        if DataReader._cache is not None:
+            DataReader._cache.clear()
+
+    ##
+    # Gets the cache statistics, i.e. number of hits, misses, evictions,
+    # entries and bytes in use.
+    # \date       2026-10-19 12:22:51+0000
+    #
+    # \return     Dictionary of statistics; None if cache is disabled
+    #
+    @staticmethod
+    def get_cache_statistics():
+        if DataReader._cache is None:
+            return None
+        return DataReader._cache.get_statistics()
+
     ##
     # Reads an image and returns either an sitk.Image or itk.Image object.
     # \date       2018-06-23 16:25:53-0600
     #
-    # \param      path_to_file  The path to file
+    # \param      path_to_file  The path to file; or path to directory
+    #                           holding a (single) DICOM series
     # \param      itk           Select between sitk.Image or itk.Image object; bool
     #
     # \return     Image as sitk.Image or itk.Image object
@@ -35,13 +90,26 @@ class DataReader(object):
     @staticmethod
     def read_image(path_to_file, as_itk=0):
 
+        extension = ph.strip_filename_extension(path_to_file)[1]
+        if extension in ALLOWED_IMAGES_CHUNKED:
+            if as_itk:
+                raise ValueError("Only implemented for SimpleITK images")
+            return DataReader.read_image_chunked(path_to_file).GetImageSitk()
+
+        if os.path.isdir(path_to_file):
+            if as_itk:
+                raise ValueError("Only implemented for SimpleITK images")
+            series = DataReader.read_dicom_series(path_to_file)
+            return DataReader._read_cached(
+                path_to_file, ("dicom", series.GetFingerprint()),
+                series.GetImageSitk)
+
         if not ph.file_exists(path_to_file):
             raise IOError("Image file '%s' not found" % path_to_file)
 
-        extension = ph.strip_filename_extension(path_to_file)[1]
         if extension not in ALLOWED_IMAGES:
             raise IOError("Image file extension must be of type %s " %
-                          ", or ".join(ALLOWED_IMAGES))
+                          ", or ".join(ALLOWED_IMAGES + ALLOWED_IMAGES_CHUNKED))
 
         # Read as itk.Image object
         if as_itk:
@@ -49,38 +117,258 @@ class DataReader(object):
 
         # Read as sitk.Image object
         else:
-            image = sitk.ReadImage(path_to_file)
+            image = DataReader._read_cached(
+                path_to_file, ("image",),
+                lambda: sitk.ReadImage(path_to_file))
 
         return image
 
     ##
-    # Reads landmarks and return as numpy data array.
-    # \date       2019-02-18 14:50:17+0000
+    # Reads an uncompressed NIfTI image via memory-mapping, i.e. without
+    # copying voxel data into memory.
+    # \date       2026-10-19 12:55:40+0000
+    #
+    # \param      path_to_file  The path to file (.nii)
+    #
+    # \return     Image as MemmapImage object
+    #
+    @staticmethod
+    def read_image_memmap(path_to_file):
+
+        if not ph.file_exists(path_to_file):
+            raise IOError("Image file '%s' not found" % path_to_file)
+
+        extension = ph.strip_filename_extension(path_to_file)[1]
+        if extension != "nii":
+            raise IOError(
+                "Memory-mapping requires uncompressed NIfTI images (.nii)")
+
+        return MemmapImage(path_to_file)
+
+    ##
+    # Reads the slice headers of a DICOM series, i.e. its geometry, without
+    # decoding pixel data. Headers are cached so that subsequent reads of the
+    # series skip header parsing. See dicom_series.DicomSeries.
+    # \date       2026-10-19 18:48:20+0000
+    #
+    # \param      path_to_directory  The path to directory holding the series
+    # \param      series_id          Series instance UID; required if the
+    #                                directory holds several series
+    # \param      n_threads          Number of threads to read and decode
+    #                                slices; number of cores if None
+    #
+    # \return     Series as DicomSeries object
+    #
+    @staticmethod
+    def read_dicom_series(path_to_directory, series_id=None, n_threads=None):
+        return DicomSeries(
+            path_to_directory, series_id=series_id, n_threads=n_threads)
+
+    ##
+    # Opens a chunked, multi-resolution image store for region reads, see
+    # chunked_image.ChunkedImage.
+    # \date       2026-10-19 16:12:30+0000
+    #
+    # \param      path_to_directory  The path to store directory (.zarr)
+    #
+    # \return     Image as ChunkedImage object
+    #
+    @staticmethod
+    def read_image_chunked(path_to_directory):
+
+        extension = ph.strip_filename_extension(path_to_directory)[1]
+        if extension not in ALLOWED_IMAGES_CHUNKED:
+            raise IOError("Chunked image extension must be of type %s " %
+                          ", or ".join(ALLOWED_IMAGES_CHUNKED))
+        if not os.path.isdir(path_to_directory):
+            raise IOError("Image directory '%s' not found" % path_to_directory)
+
+        return ChunkedImage(path_to_directory)
+
+    ##
+    # Reads the header of a NIfTI image without reading voxel data.
+    # \date       2026-10-19 14:31:20+0000
+    #
+    # \param      path_to_file  The path to file (.nii or .nii.gz)
+    #
+    # \return     Header as nib.Nifti1Header object
+    #
+    @staticmethod
+    def read_image_header(path_to_file):
+        return DataReader._read_nifti_header(path_to_file)[0]
+
+    ##
+    # Reads a region of a NIfTI image. Only the data covering the region is
+    # read from file. For compressed images, decompression starts at the
+    # closest seek point of the gzip index (see gzip_index.GzipIndex). For
+    # chunked image stores, only the chunks overlapping the region are read.
+    # \date       2026-10-19 14:33:02+0000
+    #
+    # \param      path_to_file  The path to file (.nii, .nii.gz or .zarr)
+    # \param      index         Lower voxel index of region in NIfTI dimension
+    #                           order, e.g. (x, y, z[, t])
+    # \param      size          Size of region, e.g. (x, y, z[, t]). Missing
+    #                           (trailing) dimensions are read entirely
+    # \param      level         Resolution level of chunked image stores
+    #
+    # \return     Region as sitk.Image object. Region extents in dimensions
+    #             beyond the spatial ones are stored as vector components
+    #
+    @staticmethod
+    def read_image_region(path_to_file, index, size, level=0):
+
+        extension = ph.strip_filename_extension(path_to_file)[1]
+        if extension in ALLOWED_IMAGES_CHUNKED:
+            return DataReader.read_image_chunked(path_to_file).ReadRegion(
+                index, size, level)
+
+        header, read = DataReader._read_nifti_header(path_to_file)
+
+        shape = np.array(header.get_data_shape(), dtype=np.int64)
+        if len(index) > len(shape) or len(size) > len(shape):
+            raise ValueError("Region exceeds image dimension %d" % len(shape))
+        index = np.concatenate(
+            [index, np.zeros(len(shape) - len(index))]).astype(np.int64)
+        size = np.concatenate(
+            [size, shape[len(size):]]).astype(np.int64)
+        if np.any(index < 0) or \
+                np.any(size < 1) or np.any(index + size > shape):
+            raise ValueError("Region exceeds image of shape %s" % (
+                tuple(int(i) for i in shape),))
+
+        # Read contiguous range of voxels (x varies fastest) covering region
+        dtype = header.get_data_dtype()
+        strides = np.cumprod(np.concatenate([[1], shape[:-1]]))
+        start = int(np.sum(index * strides))
+        stop = int(np.sum((index + size - 1) * strides)) + 1
+        data = read(
+            int(header.get_data_offset()) + start * dtype.itemsize,
+            (stop - start) * dtype.itemsize)
+        nda = np.frombuffer(data, dtype=dtype)
+        nda = np.lib.stride_tricks.as_strided(
+            nda, shape=size, strides=strides * dtype.itemsize, writeable=False)
+
+        # Apply intensity scaling if given
+        slope, inter = header.get_slope_inter()
+        if slope is not None and (slope != 1 or inter != 0):
+            nda = nda * slope + (inter or 0)
+
+        # x, y, z[, ...] array to sitk image array [..., z], y, x
+        dim = min(3, len(shape))
+        nda = np.ascontiguousarray(np.transpose(
+            nda.reshape(tuple(size[0:dim]) + (-1,), order="F"),
+            list(range(dim - 1, -1, -1)) + [dim]))
+        nda = nda.astype(nda.dtype.newbyteorder("="))
+        if nda.shape[-1] == 1:
+            image_sitk = sitk.GetImageFromArray(nda[..., 0])
+        else:
+            image_sitk = sitk.GetImageFromArray(nda, isVector=True)
+
+        # Geometry in LPS convention (x maps_to -x, and y maps_to -y)
+        affine = header.get_best_affine()
+        R = np.diag([-1, -1, 1])[0:dim, 0:dim]
+        A = R.dot(affine[0:dim, 0:dim])
+        spacing = np.linalg.norm(A, axis=0)
+        image_sitk.SetSpacing(spacing)
+        image_sitk.SetDirection((A / spacing).flatten())
+        image_sitk.SetOrigin(R.dot(
+            affine[0:dim, 0:dim].dot(index[0:dim]) + affine[0:dim, 3]))
+
+        return image_sitk
+
+    ##
+    # Reads the NIfTI header and gets a function to read data ranges
+    # \date       2026-10-19 14:38:40+0000
     #
     # \param      path_to_file  The path to file
     #
-    # \return     Numpy data array of shape (N x dim), dim either 2 or 3
+    # \return     Header as nib.Nifti1Header and function read(offset,
+    #             length) returning (uncompressed) bytes of file
     #
     @staticmethod
-    def read_landmarks(path_to_file):
+    def _read_nifti_header(path_to_file):
 
         if not ph.file_exists(path_to_file):
-            raise IOError("Landmark file '%s' not found" % path_to_file)
+            raise IOError("Image file '%s' not found" % path_to_file)
 
         extension = ph.strip_filename_extension(path_to_file)[1]
-        if extension not in ALLOWED_LANDMARKS:
-            raise IOError("Landmark file extension must be of type %s " %
-                          ", or ".join(ALLOWED_LANDMARKS))
+        if extension not in ALLOWED_IMAGES:
+            raise IOError("Image file extension must be of type %s " %
+                          ", or ".join(ALLOWED_IMAGES))
+
+        if extension == "nii.gz":
+            read = GzipIndex.get_index(path_to_file).read
+        else:
+            def read(offset, length):
+                with open(path_to_file, "rb") as fileobj:
+                    fileobj.seek(offset)
+                    return fileobj.read(length)
 
-        nda = np.loadtxt(path_to_file)
+        header = nib.Nifti1Header.from_fileobj(
+            io.BytesIO(read(0, 348)), check=False)
+        return header, read
+
+    ##
+    # Reads landmarks and return as numpy data array.
+    # \date       2019-02-18 14:50:17+0000
+    #
+    # \param      path_to_file  The path to file (.txt, .npy or .lmk)
+    # \param      mmap          Turn on/off memory-mapping of binary (.npy,
+    #                           .lmk) files. Arrays are copy-on-write, i.e.
+    #                           changes are not written back to file
+    #
+    # \return     Numpy data array of shape (N x dim), dim either 2 or 3
+    #
+    @staticmethod
+    def read_landmarks(path_to_file, mmap=1):
 
-        if nda.shape[1] not in [2, 3]:
+        extension = DataReader._check_landmark_file(path_to_file)
+
+        if extension == "npy":
+            nda = np.load(path_to_file, mmap_mode="c" if mmap else None)
+        elif extension == "lmk":
+            nda = lmk.read_lmk(path_to_file, mmap=mmap)[0]
+        else:
+            nda = DataReader._read_cached(
+                path_to_file, ("landmarks",),
+                lambda: np.loadtxt(path_to_file))
+
+        if nda.ndim != 2 or nda.shape[1] not in [2, 3]:
             raise IOError(
                 "Landmark array file must be of shape N x dim, "
                 "with dim either 2 or 3.")
 
         return nda
 
+    ##
+    # Reads the optional per-point labels and ids of landmarks. These are
+    # only stored in .lmk files.
+    # \date       2026-10-19 15:08:27+0000
+    #
+    # \param      path_to_file  The path to file (.txt, .npy or .lmk)
+    #
+    # \return     Tuple of labels and ids as numpy arrays (None if not given)
+    #
+    @staticmethod
+    def read_landmark_attributes(path_to_file):
+
+        extension = DataReader._check_landmark_file(path_to_file)
+        if extension != "lmk":
+            return None, None
+
+        return lmk.read_lmk(path_to_file)[1:]
+
+    @staticmethod
+    def _check_landmark_file(path_to_file):
+        if not ph.file_exists(path_to_file):
+            raise IOError("Landmark file '%s' not found" % path_to_file)
+
+        extension = ph.strip_filename_extension(path_to_file)[1]
+        if extension not in ALLOWED_LANDMARKS:
+            raise IOError("Landmark file extension must be of type %s " %
+                          ", or ".join(ALLOWED_LANDMARKS))
+        return extension
+
     ##
     # Reads a transform.
     # \date       2018-06-12 23:59:38-0600
@@ -112,24 +400,100 @@ class DataReader(object):
                 tranform_sitk = sitk.read_transform_itk(
                     path_to_file, inverse=inverse)
             else:
-                transform_sitk = sitkh.read_transform_sitk(
-                    path_to_file, inverse=inverse)
+                transform_sitk = DataReader._read_cached(
+                    path_to_file, ("transform", inverse),
+                    lambda: sitkh.read_transform_sitk(
+                        path_to_file, inverse=inverse))
         else:
             # Used for sitk_to_nreg conversion only
             if nii_as_nib:
                 displacement_sitk = nib.load(path_to_file)
                 return displacement_sitk
             else:
-                displacement_sitk = sitk.ReadImage(
-                    path_to_file, sitk.sitkVectorFloat64)
-                transform_sitk = sitk.DisplacementFieldTransform(
-                    sitk.Image(displacement_sitk))
-                if inverse:
-                    # May throw RuntimeError
-                    transform_sitk = transform_sitk.GetInverse()
+                transform_sitk = DataReader._read_cached(
+                    path_to_file, ("displacement", inverse),
+                    lambda: DataReader._read_displacement_field_transform(
+                        path_to_file, inverse=inverse))
 
         return transform_sitk
 
+    ##
+    # Reads a store of named transforms, see transform_store.TransformStore.
+    # \date       2026-10-19 18:15:30+0000
+    #
+    # \param      path_to_file  The path to store (.npz)
+    #
+    # \return     Transforms as TransformStore object
+    #
+    @staticmethod
+    def read_transform_store(path_to_file):
+
+        extension = ph.strip_filename_extension(path_to_file)[1]
+        if extension not in ALLOWED_TRANSFORM_STORES:
+            raise IOError("Transform store extension must be of type %s" %
+                          ", or ".join(ALLOWED_TRANSFORM_STORES))
+
+        return TransformStore(path_to_file)
+
+    ##
+    # Reads a displacement field as image in the requested precision.
+    # Float32 halves memory usage compared to sitk.DisplacementFieldTransform
+    # objects which require float64.
+    # \date       2026-10-19 17:16:40+0000
+    #
+    # \param      path_to_file  The path to file (.nii or .nii.gz)
+    # \param      dtype         Data type, either np.float32 or np.float64
+    #
+    # \return     Displacement field as sitk.Image object
+    #
+    @staticmethod
+    def read_displacement_field(path_to_file, dtype=np.float32):
+
+        if not ph.file_exists(path_to_file):
+            raise IOError("Displacement field '%s' not found" % path_to_file)
+
+        extension = ph.strip_filename_extension(path_to_file)[1]
+        if extension not in ALLOWED_TRANSFORMS_DISPLACEMENTS:
+            raise IOError("Displacement field extension must be of type %s" %
+                          ", or ".join(ALLOWED_TRANSFORMS_DISPLACEMENTS))
+
+        pixel_type = DISPLACEMENT_PIXEL_TYPES.get(np.dtype(dtype))
+        if pixel_type is None:
+            raise ValueError(
+                "Displacement field data type must be float32 or float64")
+
+        return DataReader._read_cached(
+            path_to_file, ("displacement_field", np.dtype(dtype).str),
+            lambda: sitk.ReadImage(path_to_file, pixel_type))
+
+    @staticmethod
+    def _read_displacement_field_transform(path_to_file, inverse=0):
+        displacement_sitk = sitk.ReadImage(
+            path_to_file, sitk.sitkVectorFloat64)
+        transform_sitk = sitk.DisplacementFieldTransform(
+            sitk.Image(displacement_sitk))
+        if inverse:
+            # May throw RuntimeError
+            transform_sitk = transform_sitk.GetInverse()
+        return transform_sitk
+
+    ##
+    # Read data via the process-wide cache if enabled.
+    # \date       2026-10-19 12:25:03+0000
+    #
+    # \param      path_to_file  The path to file
+    # \param      options       Read options as tuple
+    # \param      read          Function to read data from file
+    #
+    # \return     Read data (copy of cached object if cache is enabled)
+    #
+    @staticmethod
+    def _read_cached(path_to_file, options, read):
+        cache = DataReader._cache
+        if cache is None:
+            return read()
+        return cache.get(path_to_file, options, read)
+
     @staticmethod
     def read_transform_nreg(path_to_file):
 
@@ -150,7 +514,7 @@ class DataReader(object):
             transform_nreg = nib.load(path_to_file)
 
             # check that image is a NiftyReg displacement field
-            header = transform_nreg.get_header()
+            header = transform_nreg.header
             if int(header['intent_p1']) != 1 or \
                     int(header['intent_p2']) != 0 or \
                     int(header['intent_p3']) != 0 or \
@@ -7,6 +7,8 @@
 
 import os
 import sys
+import gzip
+import tempfile
 import numpy as np
 import nibabel as nib
 import SimpleITK as sitk
@@ -14,62 +16,201 @@ import SimpleITK as sitk
 import pysitk.python_helper as ph
 import pysitk.simple_itk_helper as sitkh
 
-from simplereg.definitions import ALLOWED_IMAGES
+from simplereg.definitions import ALLOWED_IMAGES, ALLOWED_IMAGES_CHUNKED
 from simplereg.definitions import ALLOWED_LANDMARKS
 from simplereg.definitions import ALLOWED_TRANSFORMS
 from simplereg.definitions import ALLOWED_TRANSFORMS_DISPLACEMENTS
+from simplereg.definitions import ALLOWED_TRANSFORM_STORES
+from simplereg.data_reader import DISPLACEMENT_PIXEL_TYPES
+import simplereg.parallel_gzip as pgz
+from simplereg.gzip_index import INDEX_EXTENSION
+import simplereg.landmark_file as lmk
+import simplereg.chunked_image as chk
+from simplereg.chunked_image import ChunkedImage
+from simplereg.transform_store import TransformStore, TransformStoreWriter
 
 
 class DataWriter(object):
 
+    # Compression settings for .nii.gz output. If None, images are compressed
+    # by the (single-threaded) image writers at their default level
+    _compression_level = None
+    _compression_threads = 1
+    _compression_index = False
+
+    ##
+    # Set compression of .nii.gz output files. If a level or several threads
+    # are given, images are written uncompressed first and compressed in
+    # parallel blocks to a standard gzip file.
+    # \date       2026-10-19 13:35:02+0000
+    #
+    # \param      level      Compression level between 0 and 9, 1 being the
+    #                        fastest. If None, level 6 is used for
+    #                        multi-threaded compression
+    # \param      n_threads  Number of compression threads. If None, the
+    #                        number of available cores is used
+    # \param      index      Turn on/off writing of a seek-point index next to
+    #                        .nii.gz files for fast partial reads (see
+    #                        DataReader.read_image_region). Blocks are
+    #                        compressed independently in this case
+    #
+    @staticmethod
+    def set_compression(level=None, n_threads=1, index=False):
+        if level is not None and level not in range(10):
+            raise ValueError("Compression level must be between 0 and 9")
+        DataWriter._compression_level = level
+        DataWriter._compression_threads = n_threads
+        DataWriter._compression_index = index
+
     @staticmethod
     def write_image(image_sitk, path_to_file, verbose=0):
 
         extension = ph.strip_filename_extension(path_to_file)[1]
+        if extension in ALLOWED_IMAGES_CHUNKED:
+            DataWriter.write_image_chunked(
+                image_sitk, path_to_file, verbose=verbose)
+            return
         if extension not in ALLOWED_IMAGES:
             raise IOError("Image file extension must be of type %s " %
-                          ", or ".join(ALLOWED_IMAGES))
+                          ", or ".join(ALLOWED_IMAGES + ALLOWED_IMAGES_CHUNKED))
         if isinstance(image_sitk, sitk.Image):
-            sitkh.write_nifti_image_sitk(
-                image_sitk=image_sitk,
-                path_to_file=path_to_file,
-                verbose=verbose)
+            DataWriter._write_compressed(
+                lambda path: sitkh.write_nifti_image_sitk(
+                    image_sitk=image_sitk,
+                    path_to_file=path,
+                    verbose=0),
+                path_to_file, verbose)
         else:
-            sitkh.write_nifti_image_itk(
-                image_itk=image_sitk,
-                path_to_file=path_to_file,
-                verbose=verbose)
-    
+            DataWriter._write_compressed(
+                lambda path: sitkh.write_nifti_image_itk(
+                    image_itk=image_sitk,
+                    path_to_file=path,
+                    verbose=0),
+                path_to_file, verbose)
+
     @staticmethod
     def write_vector_image(vector_image_sitk, path_to_file, verbose=0):
 
         extension = ph.strip_filename_extension(path_to_file)[1]
+        if extension in ALLOWED_IMAGES_CHUNKED:
+            DataWriter.write_image_chunked(
+                vector_image_sitk, path_to_file, verbose=verbose)
+            return
         if extension not in ALLOWED_IMAGES:
             raise IOError("Image file extension must be of type %s " %
                           ", or ".join(ALLOWED_IMAGES))
         if isinstance(vector_image_sitk, sitk.Image):
-            sitkh.write_sitk_vector_image(
-                vector_image_sitk,
-                path_to_file,
-                verbose=verbose,
-            )
+            DataWriter._write_compressed(
+                lambda path: sitkh.write_sitk_vector_image(
+                    vector_image_sitk,
+                    path,
+                    verbose=0,
+                ),
+                path_to_file, verbose)
         else:
             raise ValueError("Only implemented for SimpleITK images")
 
+    ##
+    # Writes an image to a chunked, compressed, multi-resolution image store,
+    # see chunked_image.ChunkedImage.
+    # \date       2026-10-19 16:18:47+0000
+    #
+    # \param      image_sitk         Image as sitk.Image object
+    # \param      path_to_directory  Path to store directory (.zarr)
+    # \param      chunk_size         Chunk size in voxels; scalar or (x, y, z)
+    # \param      n_levels           Number of resolution levels, each one
+    #                                downsampled by factor 2 from the previous
+    # \param      is_label           If true, levels are downsampled by the
+    #                                most frequent label of each block instead
+    #                                of averaging
+    # \param      verbose            Turn on/off verbose output
+    #
     @staticmethod
-    def write_landmarks(landmarks_nda, path_to_file, verbose=0):
+    def write_image_chunked(image_sitk,
+                            path_to_directory,
+                            chunk_size=chk.CHUNK_SIZE,
+                            n_levels=1,
+                            is_label=False,
+                            verbose=0,
+                            ):
+
+        extension = ph.strip_filename_extension(path_to_directory)[1]
+        if extension not in ALLOWED_IMAGES_CHUNKED:
+            raise IOError("Chunked image extension must be of type %s " %
+                          ", or ".join(ALLOWED_IMAGES_CHUNKED))
+        if not isinstance(image_sitk, sitk.Image):
+            raise ValueError("Only implemented for SimpleITK images")
+
+        level = DataWriter._compression_level
+        ChunkedImage.write(
+            image_sitk, path_to_directory,
+            chunk_size=chunk_size,
+            n_levels=n_levels,
+            is_label=is_label,
+            compression_level=chk.COMPRESSION_LEVEL if level is None
+            else level,
+        )
+        if verbose:
+            ph.print_info("Image written to '%s'" % path_to_directory)
+
+    ##
+    # Writes landmarks.
+    # \date       2026-10-19 15:12:10+0000
+    #
+    # \param      landmarks_nda  Landmarks as (N x dim) numpy array
+    # \param      path_to_file   Path to file. Either text (.txt), numpy
+    #                            (.npy) or compact float32 binary (.lmk) file
+    # \param      verbose        Turn on/off verbose output
+    # \param      labels         Optional per-point labels (.lmk only)
+    # \param      ids            Optional per-point ids (.lmk only)
+    #
+    @staticmethod
+    def write_landmarks(landmarks_nda,
+                        path_to_file,
+                        verbose=0,
+                        labels=None,
+                        ids=None,
+                        ):
 
         extension = ph.strip_filename_extension(path_to_file)[1]
         if extension not in ALLOWED_LANDMARKS:
             raise IOError("Landmark file extension must be of type %s " %
                           ", or ".join(ALLOWED_LANDMARKS))
 
-        ph.write_array_to_file(
-            path_to_file, landmarks_nda, delimiter=" ", access_mode="w",
-            verbose=verbose)
+        if extension != "lmk" and (labels is not None or ids is not None):
+            ph.print_warning(
+                "Landmark labels and ids are only stored in .lmk files")
+
+        if extension == "txt":
+            ph.write_array_to_file(
+                path_to_file, landmarks_nda, delimiter=" ", access_mode="w",
+                verbose=verbose)
+            return
+
+        ph.create_directory(os.path.dirname(path_to_file))
+        if extension == "npy":
+            np.save(path_to_file, np.asarray(landmarks_nda))
+        else:
+            lmk.write_lmk(path_to_file, landmarks_nda, labels=labels, ids=ids)
+        if verbose:
+            ph.print_info("Landmarks written to '%s'" % path_to_file)
 
+    ##
+    # Writes a transform or displacement field.
+    # \date       2026-10-19 17:20:12+0000
+    #
+    # \param      transform_sitk  Transform as sitk.Transform or np.ndarray
+    #                             (.txt, .tfm); displacement field as
+    #                             sitk.Image, sitk.DisplacementFieldTransform
+    #                             or nib.Nifti1Image (.nii, .nii.gz)
+    # \param      path_to_file    Path to file
+    # \param      verbose         Turn on/off verbose output
+    # \param      dtype           Data type of written displacement field,
+    #                             e.g. np.float32. If None, the data type is
+    #                             preserved
+    #
     @staticmethod
-    def write_transform(transform_sitk, path_to_file, verbose=0):
+    def write_transform(transform_sitk, path_to_file, verbose=0, dtype=None):
 
         extension = ph.strip_filename_extension(path_to_file)[1]
         if extension not in ALLOWED_TRANSFORMS and \
@@ -103,6 +244,8 @@ class DataWriter(object):
                 raise IOError("Transform must be of type "
                               "sitk.Transform or np.ndarray")
         else:
+            if isinstance(transform_sitk, sitk.DisplacementFieldTransform):
+                transform_sitk = transform_sitk.GetDisplacementField()
             if isinstance(transform_sitk, sitk.Transform):
                 raise IOError("Cannot convert transform (%s) to "
                               "displacement field (%s)" % (
@@ -110,13 +253,143 @@ class DataWriter(object):
                                   ", ".join(ALLOWED_TRANSFORMS_DISPLACEMENTS),
                               ))
             elif isinstance(transform_sitk, sitk.Image):
-                sitkh.write_nifti_image_sitk(
-                    image_sitk=transform_sitk,
-                    path_to_file=path_to_file,
-                    verbose=verbose)
+                if dtype is not None:
+                    transform_sitk = sitk.Cast(
+                        transform_sitk, DISPLACEMENT_PIXEL_TYPES[
+                            np.dtype(dtype)])
+                DataWriter._write_compressed(
+                    lambda path: sitkh.write_nifti_image_sitk(
+                        image_sitk=transform_sitk,
+                        path_to_file=path,
+                        verbose=0),
+                    path_to_file, verbose)
             elif isinstance(transform_sitk, nib.nifti1.Nifti1Image):
+                if dtype is not None:
+                    header = transform_sitk.header.copy()
+                    header.set_data_dtype(dtype)
+                    transform_sitk = nib.Nifti1Image(
+                        transform_sitk.dataobj, transform_sitk.affine, header)
                 ph.create_directory(os.path.dirname(path_to_file))
-                nib.save(transform_sitk, path_to_file)
+                DataWriter._write_compressed(
+                    lambda path: nib.save(transform_sitk, path),
+                    path_to_file, verbose)
             else:
                 raise IOError("Transform must be of type "
                               "sitk.Image or nibabel.nifti1.Nifti1Image")
+
+    ##
+    # Writes named transforms to a single store file, see
+    # transform_store.TransformStore.
+    # \date       2026-10-19 18:17:02+0000
+    #
+    # \param      transforms_sitk  Dictionary of keys and sitk.Transform
+    #                              objects
+    # \param      path_to_file     Path to store (.npz)
+    # \param      verbose          Turn on/off verbose output
+    #
+    @staticmethod
+    def write_transform_store(transforms_sitk, path_to_file, verbose=0):
+        DataWriter._check_transform_store(path_to_file)
+        TransformStore.write(transforms_sitk, path_to_file)
+        if verbose:
+            ph.print_info("%d transforms written to '%s'" % (
+                len(transforms_sitk), path_to_file))
+
+    ##
+    # Open a store for appending transforms. Each concurrent writer obtains
+    # a writer of its own which writes to separate shard files.
+    # \date       2026-10-19 18:18:40+0000
+    #
+    # \param      path_to_file  Path to store (.npz)
+    # \param      worker        Name of writer; process and thread id if None
+    #
+    # \return     TransformStoreWriter object
+    #
+    @staticmethod
+    def open_transform_store(path_to_file, worker=None):
+        DataWriter._check_transform_store(path_to_file)
+        return TransformStoreWriter(path_to_file, worker=worker)
+
+    @staticmethod
+    def _check_transform_store(path_to_file):
+        extension = ph.strip_filename_extension(path_to_file)[1]
+        if extension not in ALLOWED_TRANSFORM_STORES:
+            raise IOError("Transform store extension must be of type %s" %
+                          ", or ".join(ALLOWED_TRANSFORM_STORES))
+
+    ##
+    # Open a gzip file for (streamed) writing using the chosen compression
+    # settings.
+    # \date       2026-10-19 13:46:52+0000
+    #
+    # \param      path_to_file  Path to output file
+    #
+    # \return     Writable binary file object
+    #
+    @staticmethod
+    def open_gzip(path_to_file):
+        DataWriter._remove_stale_index(path_to_file)
+        if not DataWriter._use_parallel_gzip():
+            return gzip.open(path_to_file, "wb")
+
+        return pgz.GzipWriter(
+            path_to_file,
+            level=DataWriter._get_compression_level(),
+            n_threads=DataWriter._compression_threads,
+            index=DataWriter._compression_index)
+
+    ##
+    # Write a NIfTI file using the given write function and the chosen
+    # compression settings.
+    # \date       2026-10-19 13:41:26+0000
+    #
+    # \param      write         Function writing NIfTI file to given path
+    # \param      path_to_file  Path to output file
+    # \param      verbose       Turn on/off verbose output
+    #
+    @staticmethod
+    def _write_compressed(write, path_to_file, verbose=0):
+        extension = ph.strip_filename_extension(path_to_file)[1]
+        ph.create_directory(os.path.dirname(path_to_file))
+
+        if extension == "nii.gz":
+            DataWriter._remove_stale_index(path_to_file)
+
+        if extension != "nii.gz" or not DataWriter._use_parallel_gzip():
+            write(path_to_file)
+
+        else:
+            # Write uncompressed file next to output file first
+            fd, path_to_tmp = tempfile.mkstemp(
+                suffix=".nii", dir=os.path.dirname(path_to_file) or None)
+            os.close(fd)
+            try:
+                write(path_to_tmp)
+                pgz.compress_file(
+                    path_to_tmp, path_to_file,
+                    level=DataWriter._get_compression_level(),
+                    n_threads=DataWriter._compression_threads,
+                    index=DataWriter._compression_index)
+            finally:
+                os.remove(path_to_tmp)
+
+        if verbose:
+            ph.print_info("Image written to '%s'" % path_to_file)
+
+    @staticmethod
+    def _use_parallel_gzip():
+        return DataWriter._compression_level is not None or \
+            DataWriter._compression_threads != 1 or \
+            DataWriter._compression_index
+
+    @staticmethod
+    def _get_compression_level():
+        if DataWriter._compression_level is None:
+            return 6
+        return DataWriter._compression_level
+
+    @staticmethod
+    def _remove_stale_index(path_to_file):
+        path_to_index = path_to_file + INDEX_EXTENSION
+        if os.path.isfile(path_to_index):
+            os.remove(path_to_index)
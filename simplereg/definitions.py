@@ -11,13 +11,22 @@ DIR_TEST = os.path.join(DIR_DATA, "tests")
 OMP = 8
 
 ALLOWED_IMAGES = ["nii.gz", "nii"]
+ALLOWED_IMAGES_CHUNKED = ["zarr"]
 ALLOWED_TRANSFORMS = ["txt", "tfm"]
 ALLOWED_TRANSFORMS_NREG = ["txt"]
 ALLOWED_TRANSFORMS_DISPLACEMENTS = ["nii.gz", "nii"]
-ALLOWED_LANDMARKS = ["txt"]
+ALLOWED_TRANSFORM_STORES = ["npz"]
+ALLOWED_LANDMARKS = ["txt", "npy", "lmk"]
 ALLOWED_INTERPOLATORS = [
     "Linear",
     "NearestNeighbor",
     "BSpline",
     "OrientedGaussian",
 ]
+
+# Spline order used by scipy.ndimage.map_coordinates for each interpolator
+INTERPOLATOR_ORDERS = {
+    "NearestNeighbor": 0,
+    "Linear": 1,
+    "BSpline": 3,
+}
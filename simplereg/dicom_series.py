@@ -0,0 +1,220 @@
+##
+# \file dicom_series.py
+# \brief      Reading of DICOM series with parallel slice decoding
+#
+# Slice headers are read without decoding pixel data and kept in a
+# process-wide cache (keyed on path, modification time and size), so that
+# geometry queries and repeated reads of a series do not parse headers again.
+# Pixel data of slices is decoded in a thread pool (GDCM releases the GIL).
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import threading
+import collections
+import concurrent.futures
+import numpy as np
+import SimpleITK as sitk
+
+# Maximum number of slice headers kept in memory
+CACHE_SIZE = 100000
+
+# Relative deviation of slice distances tolerated for uniform spacing
+SPACING_TOLERANCE = 1e-3
+
+##
+# Header information of a single slice
+# \date       2026-10-19 18:31:02+0000
+#
+SliceHeader = collections.namedtuple(
+    "SliceHeader", ["size", "origin", "spacing", "direction", "pixel_id"])
+
+
+##
+# DICOM series of a directory. Geometry is available without decoding pixel
+# data.
+# \date       2026-10-19 18:32:40+0000
+#
+class DicomSeries(object):
+
+    # Cached slice headers
+    _cache = collections.OrderedDict()
+    _cache_lock = threading.Lock()
+
+    ##
+    # Discover series and read slice headers
+    # \date       2026-10-19 18:33:12+0000
+    #
+    # \param      self               The object
+    # \param      path_to_directory  Path to directory holding the series
+    # \param      series_id          Series instance UID; if None, the
+    #                                directory must hold a single series
+    # \param      n_threads          Number of threads to read headers and
+    #                                decode slices; number of cores if None
+    #
+    def __init__(self, path_to_directory, series_id=None, n_threads=None):
+        if not os.path.isdir(path_to_directory):
+            raise IOError(
+                "DICOM directory '%s' not found" % path_to_directory)
+
+        series_ids = DicomSeries.get_series_ids(path_to_directory)
+        if series_id is None:
+            if len(series_ids) != 1:
+                raise IOError(
+                    "Directory '%s' holds %d DICOM series; series id "
+                    "required" % (path_to_directory, len(series_ids)))
+            series_id = series_ids[0]
+        elif series_id not in series_ids:
+            raise IOError("DICOM series '%s' not found in '%s'" % (
+                series_id, path_to_directory))
+
+        if n_threads is None:
+            n_threads = os.cpu_count() or 1
+        self._n_threads = max(1, int(n_threads))
+        self._series_id = series_id
+
+        paths = sitk.ImageSeriesReader.GetGDCMSeriesFileNames(
+            path_to_directory, series_id)
+        headers = self._map(DicomSeries._read_header, paths)
+
+        # Sort slices along slice normal
+        normal = np.array(headers[0].direction).reshape(3, 3)[:, 2]
+        positions = np.array([np.dot(h.origin, normal) for h in headers])
+        order = np.argsort(positions, kind="stable")
+        self._paths = [paths[i] for i in order]
+        self._headers = [headers[i] for i in order]
+        positions = positions[order]
+
+        header = self._headers[0]
+        if any(h.size[0:2] != header.size[0:2] for h in self._headers):
+            raise IOError("Slices of DICOM series differ in size")
+
+        distances = np.diff(positions)
+        if len(distances) > 0:
+            spacing_z = float(np.median(distances))
+            if spacing_z <= 0 or np.any(
+                    np.abs(distances - spacing_z) >
+                    SPACING_TOLERANCE * spacing_z):
+                raise IOError(
+                    "Slices of DICOM series are not uniformly spaced")
+        else:
+            spacing_z = header.spacing[2]
+
+        self._size = (header.size[0], header.size[1], len(self._headers))
+        self._origin = header.origin
+        self._spacing = (header.spacing[0], header.spacing[1], spacing_z)
+        self._direction = header.direction
+
+    ##
+    # Gets the series instance UIDs of a directory.
+    # \date       2026-10-19 18:38:02+0000
+    #
+    # \param      path_to_directory  Path to directory
+    #
+    # \return     Tuple of series ids
+    #
+    @staticmethod
+    def get_series_ids(path_to_directory):
+        return tuple(sitk.ImageSeriesReader.GetGDCMSeriesIDs(
+            path_to_directory))
+
+    @staticmethod
+    def clear_cache():
+        with DicomSeries._cache_lock:
+            DicomSeries._cache.clear()
+
+    def GetSeriesId(self):
+        return self._series_id
+
+    def GetFileNames(self):
+        return list(self._paths)
+
+    def GetDimension(self):
+        return 3
+
+    def GetSize(self):
+        return self._size
+
+    def GetOrigin(self):
+        return self._origin
+
+    def GetSpacing(self):
+        return self._spacing
+
+    def GetDirection(self):
+        return self._direction
+
+    ##
+    # Gets a fingerprint of the slice files, e.g. for cache keys.
+    # \date       2026-10-19 18:39:30+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Tuple of (path, modification time, size) tuples
+    #
+    def GetFingerprint(self):
+        return tuple(DicomSeries._get_key(path) for path in self._paths)
+
+    ##
+    # Decode slices in parallel and assemble image.
+    # \date       2026-10-19 18:41:12+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Image as sitk.Image object
+    #
+    def GetImageSitk(self):
+        ndas = self._map(
+            lambda path: sitk.GetArrayFromImage(sitk.ReadImage(path)),
+            self._paths)
+
+        # Slices may differ in pixel type, e.g. due to rescaling
+        dtype = np.result_type(*[nda.dtype for nda in ndas])
+        nda = np.empty((len(ndas),) + ndas[0].shape[-2:], dtype=dtype)
+        for i, nda_slice in enumerate(ndas):
+            nda[i] = nda_slice.reshape(nda.shape[1:])
+
+        image_sitk = sitk.GetImageFromArray(nda)
+        image_sitk.SetOrigin(self._origin)
+        image_sitk.SetSpacing(self._spacing)
+        image_sitk.SetDirection(self._direction)
+        return image_sitk
+
+    def _map(self, function, paths):
+        if self._n_threads == 1 or len(paths) < 2:
+            return [function(path) for path in paths]
+        with concurrent.futures.ThreadPoolExecutor(self._n_threads) as pool:
+            return list(pool.map(function, paths))
+
+    @staticmethod
+    def _read_header(path_to_file):
+        key = DicomSeries._get_key(path_to_file)
+        with DicomSeries._cache_lock:
+            if key in DicomSeries._cache:
+                DicomSeries._cache.move_to_end(key)
+                return DicomSeries._cache[key]
+
+        reader = sitk.ImageFileReader()
+        reader.SetFileName(path_to_file)
+        reader.ReadImageInformation()
+        header = SliceHeader(
+            size=reader.GetSize(),
+            origin=reader.GetOrigin(),
+            spacing=reader.GetSpacing(),
+            direction=reader.GetDirection(),
+            pixel_id=reader.GetPixelID(),
+        )
+
+        with DicomSeries._cache_lock:
+            DicomSeries._cache[key] = header
+            while len(DicomSeries._cache) > CACHE_SIZE:
+                DicomSeries._cache.popitem(last=False)
+        return header
+
+    @staticmethod
+    def _get_key(path_to_file):
+        path = os.path.realpath(path_to_file)
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,356 @@
+##
+# \file executable.py
+# \brief      Lightweight building and execution of external command lines
+#
+# Used to run the registration tools of NiftyReg and FSL without the overhead
+# of nipype interfaces.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import time
+import shlex
+import asyncio
+import numbers
+import shutil
+import subprocess
+import collections
+
+import pysitk.python_helper as ph
+
+# Number of lines of the error output reported for failed commands
+ERROR_LINES = 20
+
+##
+# Result of an executed command
+# \date       2026-10-19 19:52:10+0000
+#
+CommandResult = collections.namedtuple(
+    "CommandResult",
+    ["cmdline", "returncode", "stdout", "stderr", "computational_time"])
+
+
+##
+# Find an executable. Directories given by environment variables, e.g.
+# NIFTYREGDIR or FSLDIR, take precedence over PATH.
+# \date       2026-10-19 19:53:02+0000
+#
+# \param      name      Name of executable, e.g. reg_aladin
+# \param      env_dirs  Names of environment variables holding directories
+#                       containing the executable (or its bin subdirectory)
+#
+# \return     Path to executable as string
+#
+def find_executable(name, env_dirs=()):
+    for env_dir in env_dirs:
+        directory = os.environ.get(env_dir)
+        if not directory:
+            continue
+        for path in [os.path.join(directory, name),
+                     os.path.join(directory, "bin", name)]:
+            if os.path.isfile(path) and os.access(path, os.X_OK):
+                return path
+
+    path = shutil.which(name)
+    if path is None:
+        raise IOError("Executable '%s' not found. Add it to PATH%s" % (
+            name,
+            "".join(" or %s" % env_dir for env_dir in env_dirs)))
+    return path
+
+
+##
+# Identify an executable by its resolved path, size and modification time.
+# Changes, e.g. after updating the tool, are detected without running it.
+# \date       2026-10-19 22:42:12+0000
+#
+# \param      name      Name of executable, e.g. reg_aladin
+# \param      env_dirs  Names of environment variables holding directories
+#                       containing the executable
+#
+# \return     List of path as string, size and modification time in ns
+#
+def get_executable_id(name, env_dirs=()):
+    path = os.path.realpath(find_executable(name, env_dirs))
+    stat = os.stat(path)
+    return [path, stat.st_size, stat.st_mtime_ns]
+
+
+##
+# Command line of an external executable with validated arguments
+# \date       2026-10-19 19:55:31+0000
+#
+class Command(object):
+
+    ##
+    # Create command
+    # \date       2026-10-19 19:56:02+0000
+    #
+    # \param      self      The object
+    # \param      name      Name of executable, e.g. reg_aladin
+    # \param      env_dirs  Names of environment variables holding directories
+    #                       containing the executable
+    #
+    def __init__(self, name, env_dirs=()):
+        self._name = name
+        self._env_dirs = env_dirs
+        self._args = []
+        self._outputs = []
+        self._environ = {}
+
+    ##
+    # Add input file argument. The file must exist.
+    # \date       2026-10-19 19:57:12+0000
+    #
+    # \param      self          The object
+    # \param      flag          Flag, e.g. -ref
+    # \param      path_to_file  Path to input file
+    #
+    def add_input(self, flag, path_to_file):
+        if not ph.file_exists(path_to_file):
+            raise IOError("Input file '%s' for %s %s not found" % (
+                path_to_file, self._name, flag))
+        self._args.extend([flag, path_to_file])
+
+    ##
+    # Add output file argument. The file is expected to exist after
+    # execution.
+    # \date       2026-10-19 19:58:40+0000
+    #
+    # \param      self          The object
+    # \param      flag          Flag, e.g. -res
+    # \param      path_to_file  Path to output file
+    #
+    def add_output(self, flag, path_to_file):
+        directory = os.path.dirname(os.path.abspath(path_to_file))
+        if not os.path.isdir(directory):
+            raise IOError("Output directory '%s' for %s %s not found" % (
+                directory, self._name, flag))
+        self._args.extend([flag, path_to_file])
+        self._outputs.append(path_to_file)
+
+    ##
+    # Add numeric value argument.
+    # \date       2026-10-19 19:59:51+0000
+    #
+    # \param      self   The object
+    # \param      flag   Flag, e.g. -omp
+    # \param      value  Value as int or float
+    #
+    def add_value(self, flag, value):
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            raise ValueError("Value of %s %s must be numeric, not '%s'" % (
+                self._name, flag, value))
+        self._args.extend([flag, str(value)])
+
+    def add_flag(self, flag):
+        self._args.append(flag)
+
+    ##
+    # Add further options given as single string, e.g. "-rigOnly -ln 2".
+    # \date       2026-10-19 20:01:10+0000
+    #
+    # \param      self     The object
+    # \param      options  The options as string
+    #
+    def add_options(self, options):
+        if options:
+            self._args.extend(shlex.split(options))
+
+    def get_name(self):
+        return self._name
+
+    def set_environ(self, key, value):
+        self._environ[key] = str(value)
+
+    def get_cmdline(self):
+        return " ".join(shlex.quote(arg) for arg in [self._name] + self._args)
+
+    ##
+    # Execute command.
+    # \date       2026-10-19 20:02:33+0000
+    #
+    # \param      self         The object
+    # \param      timeout      Timeout in seconds; None for no timeout
+    # \param      path_to_log  Optional path to file to write command line and
+    #                          captured output to
+    # \param      verbose      Turn on/off verbose output
+    #
+    # \return     CommandResult
+    #
+    def run(self, timeout=None, path_to_log=None, verbose=0):
+        args, environ = self._get_args_and_environ()
+
+        if verbose:
+            ph.print_execution(self.get_cmdline())
+
+        time_start = time.time()
+        try:
+            process = subprocess.run(
+                args,
+                env=environ,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired as e:
+            self._write_log(path_to_log, e.stdout, e.stderr)
+            raise RuntimeError("Command '%s' timed out after %s s" % (
+                self.get_cmdline(), timeout))
+
+        result = CommandResult(
+            cmdline=self.get_cmdline(),
+            returncode=process.returncode,
+            stdout=process.stdout,
+            stderr=process.stderr,
+            computational_time=time.time() - time_start,
+        )
+        self._write_log(path_to_log, result.stdout, result.stderr)
+        if verbose and result.stdout:
+            print(result.stdout)
+
+        self._check_result(result)
+
+        return result
+
+    ##
+    # Execute command as asyncio subprocess. Its output is streamed line by
+    # line to the log file and callback. The process is killed on timeout and
+    # if the awaiting task gets cancelled.
+    # \date       2026-10-19 21:52:40+0000
+    #
+    # \param      self          The object
+    # \param      timeout       Timeout in seconds; None for no timeout
+    # \param      path_to_log   Optional path to file to write command line
+    #                           and output to while running
+    # \param      verbose       Turn on/off verbose output
+    # \param      log_callback  Optional function called with each line of
+    #                           output (stdout and stderr)
+    #
+    # \return     CommandResult
+    #
+    async def run_async(self,
+                        timeout=None,
+                        path_to_log=None,
+                        verbose=0,
+                        log_callback=None,
+                        ):
+        args, environ = self._get_args_and_environ()
+
+        if verbose:
+            ph.print_execution(self.get_cmdline())
+
+        time_start = time.time()
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            env=environ,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+        fileobj = None
+        if path_to_log is not None:
+            fileobj = open(path_to_log, "w")
+            fileobj.write("%s\n\n" % self.get_cmdline())
+
+        async def read(stream, lines, echo):
+            while True:
+                line = await stream.readline()
+                if not line:
+                    break
+                line = line.decode(errors="replace")
+                lines.append(line)
+                if fileobj is not None:
+                    fileobj.write(line)
+                    fileobj.flush()
+                if echo:
+                    print(line, end="")
+                if log_callback is not None:
+                    log_callback(line)
+
+        stdout = []
+        stderr = []
+        try:
+            await asyncio.wait_for(asyncio.gather(
+                read(process.stdout, stdout, verbose),
+                read(process.stderr, stderr, False),
+                process.wait(),
+            ), timeout)
+        except asyncio.TimeoutError:
+            await Command._kill(process)
+            raise RuntimeError("Command '%s' timed out after %s s" % (
+                self.get_cmdline(), timeout))
+        except BaseException:
+            # E.g. cancellation
+            await Command._kill(process)
+            raise
+        finally:
+            if fileobj is not None:
+                fileobj.close()
+
+        result = CommandResult(
+            cmdline=self.get_cmdline(),
+            returncode=process.returncode,
+            stdout="".join(stdout),
+            stderr="".join(stderr),
+            computational_time=time.time() - time_start,
+        )
+        self._check_result(result)
+
+        return result
+
+    def _get_args_and_environ(self):
+        args = [find_executable(self._name, self._env_dirs)] + self._args
+        environ = dict(os.environ)
+        environ.update(self._environ)
+        return args, environ
+
+    ##
+    # Raise an error if the command failed or did not create its outputs.
+    # \date       2026-10-19 21:55:02+0000
+    #
+    # \param      self    The object
+    # \param      result  CommandResult
+    #
+    def _check_result(self, result):
+        if result.returncode != 0:
+            lines = (result.stderr or result.stdout).strip().splitlines()
+            raise RuntimeError(
+                "Command '%s' failed with return code %d:\n%s" % (
+                    result.cmdline, result.returncode,
+                    "\n".join(lines[-ERROR_LINES:])))
+
+        missing = [p for p in self._outputs if not os.path.exists(p)]
+        if len(missing) > 0:
+            raise RuntimeError(
+                "Command '%s' did not create output file(s) %s" % (
+                    result.cmdline, ", ".join(missing)))
+
+    ##
+    # Kill a running asyncio subprocess and wait for it to terminate.
+    # \date       2026-10-19 21:56:31+0000
+    #
+    # \param      process  asyncio.subprocess.Process object
+    #
+    @staticmethod
+    async def _kill(process):
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    def _write_log(self, path_to_log, stdout, stderr):
+        if path_to_log is None:
+            return
+        if isinstance(stdout, bytes):
+            stdout = stdout.decode(errors="replace")
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode(errors="replace")
+        with open(path_to_log, "w") as fileobj:
+            fileobj.write("%s\n\n%s\n%s" % (
+                self.get_cmdline(), stdout or "", stderr or ""))
@@ -2,8 +2,6 @@
 # \file FLIRT.py
 # \brief      This class makes FLIRT accessible via Python
 #
-# This class requires Convert3D Medical Image Processing Tool to be installed
-# (https://sourceforge.net/projects/c3d/files/c3d/Nightly/)
 # \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
 # \date       May 2017
 
@@ -11,18 +9,20 @@
 import os
 import numpy as np
 import SimpleITK as sitk
-import nipype.interfaces.fsl
-import nipype.interfaces.c3
 
-import pysitk.python_helper as ph
 import pysitk.simple_itk_helper as sitkh
 
 import simplereg.utilities as utils
 from simplereg.definitions import DIR_TMP
+from simplereg.executable import Command, get_executable_id
 from simplereg.wrapper_registration import WrapperRegistration
 from simplereg.flirt_to_simpleitk_converter import \
     FlirtToSimpleItkConverter as flirt2sitk
 
+# Environment variables which may point to the FSL executables
+FSL_ENV_DIRS = ("FSLDIR",)
+
+
 class FLIRT(WrapperRegistration):
 
     def __init__(self,
@@ -33,6 +33,9 @@ class FLIRT(WrapperRegistration):
                  options="",
                  subfolder="FLIRT",
                  verbose=False,
+                 dir_tmp=DIR_TMP,
+                 keep_files=False,
+                 timeout=None,
                  ):
 
         WrapperRegistration.__init__(self,
@@ -42,63 +45,78 @@ class FLIRT(WrapperRegistration):
                                      moving_sitk_mask=moving_sitk_mask,
                                      options=options,
                                      verbose=verbose,
+                                     subfolder=subfolder,
+                                     dir_tmp=dir_tmp,
+                                     keep_files=keep_files,
+                                     timeout=timeout,
                                      )
-        # Subfolder within DIR_TMP where results will be stored temporarily
-        self._dir_tmp = os.path.join(DIR_TMP, subfolder)
 
-        self._fixed_str = os.path.join(self._dir_tmp, "fixed.nii.gz")
-        self._moving_str = os.path.join(self._dir_tmp, "moving.nii.gz")
+    ##
+    # Sets the paths of the exchange files within the working directory of
+    # the current run.
+    # \date       2026-10-19 19:18:02+0000
+    #
+    # \param      self  The object
+    #
+    def _set_paths(self):
+        self._fixed_str = os.path.join(self._dir_tmp, "fixed.nii")
+        self._moving_str = os.path.join(self._dir_tmp, "moving.nii")
         self._warped_moving_str = os.path.join(
-            self._dir_tmp, "warped_moving.nii.gz")
+            self._dir_tmp, "warped_moving.nii")
 
         self._fixed_mask_str = os.path.join(
-            self._dir_tmp, "fixed_mask.nii.gz")
+            self._dir_tmp, "fixed_mask.nii")
         self._moving_mask_str = os.path.join(
-            self._dir_tmp, "moving_mask.nii.gz")
+            self._dir_tmp, "moving_mask.nii")
 
         self._registration_transform_str = os.path.join(
             self._dir_tmp, "registration_transform.txt")
-        self._registration_transform_sitk_str = os.path.join(
-            self._dir_tmp, "registration_transform_sitk.txt")
 
-    def _run(self):
+    def _prepare(self):
+        self._set_paths()
 
-        # Create and delete all possibly existing files in the directory
-        ph.create_directory(self._dir_tmp, delete_files=True)
+        # Uncompressed NIfTI avoids costly gzip round-trips
+        self._fixed_str = self._get_input_file(
+            "fixed", self._fixed_sitk, self._fixed_str)
+        self._moving_str = self._get_input_file(
+            "moving", self._moving_sitk, self._moving_str)
 
-        sitkh.write_nifti_image_sitk(self._fixed_sitk, self._fixed_str)
-        sitkh.write_nifti_image_sitk(self._moving_sitk, self._moving_str)
-
-        flt = nipype.interfaces.fsl.FLIRT()
-        flt.inputs.in_file = self._moving_str
-        flt.inputs.reference = self._fixed_str
-        flt.inputs.out_file = self._warped_moving_str
-        flt.inputs.out_matrix_file = self._registration_transform_str
-        flt.inputs.output_type = "NIFTI_GZ"
+        flt = Command("flirt", env_dirs=FSL_ENV_DIRS)
+        flt.add_input("-in", self._moving_str)
+        flt.add_input("-ref", self._fixed_str)
+        flt.add_output("-out", self._warped_moving_str)
+        flt.add_output("-omat", self._registration_transform_str)
+        flt.set_environ("FSLOUTPUTTYPE", "NIFTI")
 
         if self._fixed_sitk_mask is not None:
-            sitkh.write_nifti_image_sitk(
-                self._fixed_sitk_mask, self._fixed_mask_str)
-            flt.inputs.ref_weight = self._fixed_mask_str
+            self._fixed_mask_str = self._get_input_file(
+                "fixed_mask", self._fixed_sitk_mask, self._fixed_mask_str)
+            flt.add_input("-refweight", self._fixed_mask_str)
 
         if self._moving_sitk_mask is not None:
-            sitkh.write_nifti_image_sitk(
-                self._moving_sitk_mask, self._moving_mask_str)
-            flt.inputs.in_weight = self._moving_mask_str
+            self._moving_mask_str = self._get_input_file(
+                "moving_mask", self._moving_sitk_mask,
+                self._moving_mask_str)
+            flt.add_input("-inweight", self._moving_mask_str)
+
+        flt.add_options(self._options)
 
-        flt.inputs.args = self._options
+        return flt
 
-        # Execute registration
-        if self._verbose:
-            ph.print_execution(flt.cmdline)
-        flt.run()
+    def _get_cache_options(self):
+        options = super(FLIRT, self)._get_cache_options()
+        options["executable"] = get_executable_id("flirt", FSL_ENV_DIRS)
+        return options
+
+    def _read_results(self):
 
         # Read warped image
         self._warped_moving_sitk = sitkh.read_nifti_image_sitk(
             self._warped_moving_str)
 
         # Convert to sitk affine transform
-        self._registration_transform_sitk = self._convert_to_sitk_transform()
+        self._registration_transform_sitk = \
+            self._convert_to_sitk_transform()
 
     ##
     # Convert FSL to ITK transform and return it as sitk object
@@ -112,17 +130,13 @@ class FLIRT(WrapperRegistration):
     #
     def _convert_to_sitk_transform(self):
 
-        flirt2sitk.convert_flirt_to_sitk_transform(
-            self._registration_transform_str,
+        # Use headers of the images FLIRT has been run on
+        trafo_sitk = flirt2sitk.get_sitk_from_flirt_matrix(
+            np.loadtxt(self._registration_transform_str),
             self._fixed_str,
             self._moving_str,
-            self._registration_transform_sitk_str,
-            verbose=self._verbose,
         )
 
-        # Read transform and convert to affine registration
-        trafo_sitk = sitk.ReadTransform(self._registration_transform_sitk_str)
-
         parameters = trafo_sitk.GetParameters()
 
         if self._fixed_sitk.GetDimension() == 2:
@@ -3,13 +3,17 @@
 #
 #  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
 #  \date June 2018
+#
+#  FLIRT matrices map between the scaled voxel coordinates of the source
+#  (moving) and reference (fixed) images, where the first voxel axis is
+#  flipped for images with positive voxel-to-world determinant. Conversion
+#  only requires the image headers.
 
 
 import os
 import sys
 import numpy as np
 import SimpleITK as sitk
-import nipype.interfaces.c3
 
 import pysitk.python_helper as ph
 import pysitk.simple_itk_helper as sitkh
@@ -40,23 +44,17 @@ class FlirtToSimpleItkConverter(object):
             verbose=0,
     ):
 
-        ph.create_directory(os.path.dirname(path_to_sitk_transform))
-
-        c3d = nipype.interfaces.c3.C3dAffineTool()
-        c3d.inputs.reference_file = path_to_fixed
-        c3d.inputs.source_file = path_to_moving
-        c3d.inputs.transform_file = path_to_flirt_mat
-        c3d.inputs.fsl2ras = True
-        c3d.inputs.itk_transform = path_to_sitk_transform
+        transform_sitk = FlirtToSimpleItkConverter.get_sitk_from_flirt_matrix(
+            np.loadtxt(path_to_flirt_mat), path_to_fixed, path_to_moving)
 
+        ph.create_directory(os.path.dirname(path_to_sitk_transform))
+        sitk.WriteTransform(transform_sitk, path_to_sitk_transform)
         if verbose:
-            ph.print_execution(c3d.cmdline)
-        c3d.run()
+            ph.print_info("FLIRT transform converted and written to '%s'" %
+                          path_to_sitk_transform)
 
     ##
     # Convert SimpleITK to FLIRT transform
-    #
-    # Remark: Conversion to FLIRT only provides 4 decimal places
     # \date       2018-06-10 16:09:56-0600
     #
     # \param      path_to_sitk_transform  Path to SimpleITK transform
@@ -74,15 +72,127 @@ class FlirtToSimpleItkConverter(object):
             verbose=0,
     ):
 
+        matrix = FlirtToSimpleItkConverter.get_flirt_matrix_from_sitk(
+            sitkh.read_transform_sitk(path_to_sitk_transform),
+            path_to_fixed, path_to_moving)
+
         ph.create_directory(os.path.dirname(path_to_flirt_mat))
+        np.savetxt(path_to_flirt_mat, matrix, fmt="%.17g")
+        if verbose:
+            ph.print_info("SimpleITK transform converted and written to '%s'" %
+                          path_to_flirt_mat)
 
-        c3d = nipype.interfaces.c3.C3dAffineTool()
-        c3d.inputs.reference_file = path_to_fixed
-        c3d.inputs.source_file = path_to_moving
+    ##
+    # Gets the SimpleITK transform from a FLIRT matrix.
+    # \date       2026-10-19 19:31:20+0000
+    #
+    # \param      matrix  FLIRT matrix as 4 x 4 numpy array
+    # \param      fixed   Fixed image (-ref); path to image or sitk.Image
+    # \param      moving  Moving image (-src); path to image or sitk.Image
+    #
+    # \return     3D transform as sitk.AffineTransform object
+    #
+    @staticmethod
+    def get_sitk_from_flirt_matrix(matrix, fixed, moving):
+        fixed_vox2fsl, fixed_vox2world = \
+            FlirtToSimpleItkConverter._get_header_matrices(fixed)
+        moving_vox2fsl, moving_vox2world = \
+            FlirtToSimpleItkConverter._get_header_matrices(moving)
 
-        # position of -ras2fsl matters!!
-        c3d.inputs.args = "-itk %s -ras2fsl -o %s" % (
-            path_to_sitk_transform, path_to_flirt_mat)
-        if verbose:
-            ph.print_execution(c3d.cmdline)
-        c3d.run()
+        # FLIRT maps moving to fixed, ITK maps fixed to moving points
+        affine = moving_vox2world.dot(np.linalg.solve(
+            np.asarray(matrix, dtype=np.float64).dot(moving_vox2fsl),
+            fixed_vox2fsl.dot(np.linalg.inv(fixed_vox2world))))
+
+        transform_sitk = sitk.AffineTransform(3)
+        transform_sitk.SetMatrix(affine[0:3, 0:3].flatten())
+        transform_sitk.SetTranslation(affine[0:3, 3])
+        return transform_sitk
+
+    ##
+    # Gets the FLIRT matrix from a SimpleITK transform.
+    # \date       2026-10-19 19:34:02+0000
+    #
+    # \param      transform_sitk  Affine 2D or 3D transform as sitk.Transform
+    # \param      fixed           Fixed image (-ref); path to image or
+    #                             sitk.Image
+    # \param      moving          Moving image (-src); path to image or
+    #                             sitk.Image
+    #
+    # \return     FLIRT matrix as 4 x 4 numpy array
+    #
+    @staticmethod
+    def get_flirt_matrix_from_sitk(transform_sitk, fixed, moving):
+        fixed_vox2fsl, fixed_vox2world = \
+            FlirtToSimpleItkConverter._get_header_matrices(fixed)
+        moving_vox2fsl, moving_vox2world = \
+            FlirtToSimpleItkConverter._get_header_matrices(moving)
+
+        affine = FlirtToSimpleItkConverter._get_affine_matrix(transform_sitk)
+
+        # Inverse of the mapping in get_sitk_from_flirt_matrix
+        return fixed_vox2fsl.dot(np.linalg.solve(
+            fixed_vox2world, np.linalg.solve(affine, moving_vox2world))).dot(
+            np.linalg.inv(moving_vox2fsl))
+
+    ##
+    # Gets the homogeneous 3D matrix of an affine SimpleITK transform
+    # \date       2026-10-19 19:36:45+0000
+    #
+    # \param      transform_sitk  Affine 2D or 3D transform as sitk.Transform
+    #
+    # \return     4 x 4 numpy array
+    #
+    @staticmethod
+    def _get_affine_matrix(transform_sitk):
+        dim = transform_sitk.GetDimension()
+        affine = np.eye(4)
+        if hasattr(transform_sitk, "GetMatrix"):
+            matrix = np.array(transform_sitk.GetMatrix()).reshape(dim, dim)
+            center = np.array(transform_sitk.GetCenter())
+            translation = np.array(transform_sitk.GetTranslation())
+            affine[0:dim, 0:dim] = matrix
+            affine[0:dim, 3] = translation + center - matrix.dot(center)
+        elif hasattr(transform_sitk, "GetOffset"):
+            affine[0:dim, 3] = transform_sitk.GetOffset()
+        else:
+            raise ValueError(
+                "Transform of type '%s' is not affine" %
+                transform_sitk.GetName())
+        return affine
+
+    ##
+    # Gets the voxel-to-FSL and voxel-to-world (LPS) matrices of an image.
+    # Only the header is read for images given by path. 2D images are
+    # treated as 3D images consisting of a single slice.
+    # \date       2026-10-19 19:38:30+0000
+    #
+    # \param      image  Path to image or sitk.Image
+    #
+    # \return     Tuple of 4 x 4 numpy arrays
+    #
+    @staticmethod
+    def _get_header_matrices(image):
+        if not isinstance(image, sitk.Image):
+            reader = sitk.ImageFileReader()
+            reader.SetFileName(image)
+            reader.ReadImageInformation()
+            image = reader
+
+        dim = image.GetDimension()
+        size = np.ones(3)
+        spacing = np.ones(3)
+        vox2world = np.eye(4)
+        size[0:dim] = image.GetSize()
+        spacing[0:dim] = image.GetSpacing()
+        vox2world[0:dim, 0:dim] = np.array(
+            image.GetDirection()).reshape(dim, dim) * spacing[0:dim]
+        vox2world[0:dim, 3] = image.GetOrigin()
+
+        # FSL flips the first voxel axis for neurological orientation
+        vox2fsl = np.diag(np.append(spacing, 1))
+        if np.linalg.det(vox2world[0:3, 0:3]) > 0:
+            vox2fsl[0, 0] *= -1
+            vox2fsl[0, 3] = (size[0] - 1) * spacing[0]
+
+        return vox2fsl, vox2world
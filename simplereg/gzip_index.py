@@ -0,0 +1,269 @@
+##
+# \file gzip_index.py
+# \brief      Seek-point index for random access into gzip files
+#
+# Two kinds of seek points are supported:
+#
+# - Persistent seek points stored in an index file next to the gzip file.
+#   These are written by parallel_gzip.GzipWriter when blocks are compressed
+#   independently (similar to 'pigz -i'), i.e. decompression can start at any
+#   block boundary without knowledge of previously decompressed data.
+# - In-process seek points for any other gzip file. The file is decompressed
+#   once and snapshots of the decompressor state are kept in memory. Python's
+#   zlib does not allow to resume inflation at arbitrary bit positions, hence
+#   these seek points cannot be stored on disk.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import zlib
+import struct
+import threading
+import collections
+import numpy as np
+
+# Extension of index files stored next to gzip files
+INDEX_EXTENSION = ".gzidx"
+
+# Identifier of index file format
+INDEX_MAGIC = b"SRGZIDX1"
+
+# Distance of in-process seek points in uncompressed bytes
+SPACING = 2**22
+
+# Size of compressed chunks read at a time
+CHUNK_SIZE = 2**16
+
+# Maximum number of in-process indices kept in memory
+CACHE_SIZE = 16
+
+
+##
+# Seek-point index of a gzip file providing random access to its
+# uncompressed data.
+# \date       2026-10-19 14:02:11+0000
+#
+class GzipIndex(object):
+
+    # In-process indices of recently accessed files
+    _cache = collections.OrderedDict()
+    _cache_lock = threading.Lock()
+
+    ##
+    # Create index from seek points
+    # \date       2026-10-19 14:03:40+0000
+    #
+    # \param      self          The object
+    # \param      path_to_file  Path to gzip file
+    # \param      points        List of (uncompressed offset, compressed
+    #                           offset, decompressor) tuples in increasing
+    #                           order. Decompressor is None for persistent seek
+    #                           points at independently compressed blocks
+    # \param      length        Uncompressed length of file
+    #
+    def __init__(self, path_to_file, points, length):
+        self._path_to_file = path_to_file
+        self._points = points
+        self._offsets = np.array([p[0] for p in points], dtype=np.int64)
+        self._length = length
+
+    def get_length(self):
+        return self._length
+
+    def get_number_of_seek_points(self):
+        return len(self._points)
+
+    def is_persistent(self):
+        return all(p[2] is None for p in self._points)
+
+    ##
+    # Gets the index associated with a gzip file. A persistent index file next
+    # to the gzip file is used if available and valid; otherwise, an
+    # in-process index is built (and kept in memory for subsequent calls).
+    # \date       2026-10-19 14:05:27+0000
+    #
+    # \param      path_to_file  Path to gzip file
+    #
+    # \return     GzipIndex object
+    #
+    @staticmethod
+    def get_index(path_to_file):
+        path = os.path.realpath(path_to_file)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+
+        with GzipIndex._cache_lock:
+            if key in GzipIndex._cache:
+                GzipIndex._cache.move_to_end(key)
+                return GzipIndex._cache[key]
+
+        index = GzipIndex.read_index(path_to_file)
+        if index is None:
+            index = GzipIndex.build_index(path_to_file)
+
+        with GzipIndex._cache_lock:
+            GzipIndex._cache[key] = index
+            while len(GzipIndex._cache) > CACHE_SIZE:
+                GzipIndex._cache.popitem(last=False)
+
+        return index
+
+    ##
+    # Read persistent index stored next to gzip file.
+    # \date       2026-10-19 14:08:02+0000
+    #
+    # \param      path_to_file  Path to gzip file
+    #
+    # \return     GzipIndex object; None if index file does not exist or does
+    #             not match the gzip file
+    #
+    @staticmethod
+    def read_index(path_to_file):
+        path_to_index = path_to_file + INDEX_EXTENSION
+        if not os.path.isfile(path_to_index):
+            return None
+
+        with open(path_to_index, "rb") as fileobj:
+            data = fileobj.read()
+        if data[0:8] != INDEX_MAGIC:
+            return None
+        size, length, trailer, n_points = struct.unpack(
+            "<QQ8sQ", data[8:40])
+        offsets = np.frombuffer(
+            data, dtype="<u8", count=2 * n_points, offset=40).reshape(-1, 2)
+
+        # Index is stale if gzip file was overwritten
+        if os.path.getsize(path_to_file) != size or \
+                GzipIndex._get_trailer(path_to_file) != trailer:
+            return None
+
+        points = [(int(u), int(c), None) for u, c in offsets]
+        return GzipIndex(path_to_file, points, int(length))
+
+    ##
+    # Write persistent index for gzip file consisting of independently
+    # compressed blocks.
+    # \date       2026-10-19 14:10:45+0000
+    #
+    # \param      path_to_file  Path to gzip file
+    # \param      offsets       List of (uncompressed offset, compressed
+    #                           offset) tuples of block boundaries
+    # \param      length        Uncompressed length of file
+    #
+    @staticmethod
+    def write_index(path_to_file, offsets, length):
+        data = INDEX_MAGIC
+        data += struct.pack(
+            "<QQ8sQ",
+            os.path.getsize(path_to_file),
+            length,
+            GzipIndex._get_trailer(path_to_file),
+            len(offsets))
+        data += np.array(offsets, dtype="<u8").reshape(-1, 2).tobytes()
+
+        path_to_index = path_to_file + INDEX_EXTENSION
+        path_to_tmp = path_to_index + ".tmp"
+        with open(path_to_tmp, "wb") as fileobj:
+            fileobj.write(data)
+        os.replace(path_to_tmp, path_to_index)
+
+    ##
+    # Build in-process index by decompressing the file once and keeping
+    # snapshots of the decompressor state.
+    # \date       2026-10-19 14:12:31+0000
+    #
+    # \param      path_to_file  Path to gzip file
+    # \param      spacing       Distance of seek points in uncompressed bytes
+    #
+    # \return     GzipIndex object
+    #
+    @staticmethod
+    def build_index(path_to_file, spacing=SPACING):
+        decompressor = GzipIndex._get_decompressor()
+        points = [(0, 0, decompressor.copy())]
+        length = 0
+
+        with open(path_to_file, "rb") as fileobj:
+            offset = 0
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if len(chunk) == 0:
+                    break
+                offset += len(chunk)
+
+                # Data may consist of several gzip members
+                while len(chunk) > 0:
+                    length += len(decompressor.decompress(chunk))
+                    chunk = b""
+                    if decompressor.eof:
+                        chunk = decompressor.unused_data
+                        decompressor = GzipIndex._get_decompressor()
+
+                if length - points[-1][0] >= spacing:
+                    points.append((length, offset, decompressor.copy()))
+
+        return GzipIndex(path_to_file, points, length)
+
+    ##
+    # Read uncompressed data. Only the data between the closest preceding
+    # seek point and the requested range is decompressed.
+    # \date       2026-10-19 14:16:02+0000
+    #
+    # \param      self    The object
+    # \param      offset  Uncompressed offset
+    # \param      length  Number of bytes to read
+    #
+    # \return     Uncompressed data as bytes
+    #
+    def read(self, offset, length):
+        if offset < 0 or length < 0 or offset + length > self._length:
+            raise ValueError("Requested data exceeds uncompressed file size")
+
+        i = int(np.searchsorted(self._offsets, offset, side="right")) - 1
+        offset_point, offset_compressed, decompressor = self._points[i]
+        if decompressor is None:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            is_raw = True
+        else:
+            decompressor = decompressor.copy()
+            is_raw = False
+
+        skip = offset - offset_point
+        data = bytearray()
+        with open(self._path_to_file, "rb") as fileobj:
+            fileobj.seek(offset_compressed)
+            while len(data) < skip + length:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if len(chunk) == 0 or is_raw and decompressor.eof:
+                    break
+
+                # Data may consist of several gzip members
+                while len(chunk) > 0:
+                    data += decompressor.decompress(chunk)
+                    chunk = b""
+                    if decompressor.eof and not is_raw:
+                        chunk = decompressor.unused_data
+                        decompressor = GzipIndex._get_decompressor()
+
+                # Discard data preceding the requested range early
+                if 0 < skip <= len(data):
+                    del data[0:skip]
+                    skip = 0
+
+        if len(data) < skip + length:
+            raise IOError("Unexpected end of gzip file '%s'" %
+                          self._path_to_file)
+        return bytes(data[skip:skip + length])
+
+    @staticmethod
+    def _get_decompressor():
+        # Automatic header detection for gzip format
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    @staticmethod
+    def _get_trailer(path_to_file):
+        with open(path_to_file, "rb") as fileobj:
+            fileobj.seek(-8, os.SEEK_END)
+            return fileobj.read(8)
@@ -0,0 +1,191 @@
+##
+# \file io_pipeline.py
+# \brief      Asynchronous reading and writing of data for batch processing
+#
+# Reading (decompression) and writing (compression) of images is performed in
+# a bounded pool of background threads so that it overlaps with computations
+# on the calling thread. SimpleITK, nibabel and zlib release the GIL for most
+# of their work.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import threading
+import collections
+import concurrent.futures
+
+import pysitk.python_helper as ph
+
+import simplereg.data_reader as dr
+import simplereg.data_writer as dw
+
+
+##
+# Result of a prefetched read. Either data or error is set.
+# \date       2026-10-19 16:45:02+0000
+#
+PrefetchResult = collections.namedtuple(
+    "PrefetchResult", ["item", "data", "error"])
+
+
+##
+# Bounded thread pool prefetching inputs and deferring writes.
+#
+# Objects handed to write are written at a later point in time and must not
+# be modified by the caller afterwards. Errors are reported per item, i.e. a
+# failing read or write does not affect any other item.
+# \date       2026-10-19 16:46:30+0000
+#
+class IOPipeline(object):
+
+    ##
+    # Create thread pool
+    # \date       2026-10-19 16:47:11+0000
+    #
+    # \param      self         The object
+    # \param      n_threads    Number of I/O threads
+    # \param      max_pending  Maximum number of prefetched reads and pending
+    #                          writes, respectively, to bound memory usage
+    # \param      verbose      Turn on/off verbose output
+    #
+    def __init__(self, n_threads=2, max_pending=4, verbose=0):
+        if n_threads < 1 or max_pending < 1:
+            raise ValueError(
+                "Number of threads and pending items must be at least 1")
+        self._executor = concurrent.futures.ThreadPoolExecutor(n_threads)
+        self._max_pending = max_pending
+        self._verbose = verbose
+
+        self._writes = collections.OrderedDict()
+        self._write_slots = threading.BoundedSemaphore(max_pending)
+        self._errors = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Do not mask exceptions raised within the context
+        self.close(raise_errors=exc_type is None)
+
+    ##
+    # Submit read in background.
+    # \date       2026-10-19 16:49:20+0000
+    #
+    # \param      self  The object
+    # \param      item  Item passed to read function, e.g. path to file
+    # \param      read  Read function, e.g. DataReader.read_image
+    #
+    # \return     concurrent.futures.Future object
+    #
+    def read(self, item, read=dr.DataReader.read_image):
+        return self._executor.submit(read, item)
+
+    ##
+    # Iterate over read data in order of the given items while prefetching
+    # the next ones in the background.
+    # \date       2026-10-19 16:51:02+0000
+    #
+    # \param      self   The object
+    # \param      items  Iterable of items, e.g. paths to files
+    # \param      read   Read function, e.g. DataReader.read_image
+    #
+    # \return     Generator of PrefetchResult tuples (item, data, error)
+    #
+    def iterate(self, items, read=dr.DataReader.read_image):
+        items = iter(items)
+        futures = collections.deque()
+        try:
+            while True:
+                while len(futures) < self._max_pending:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        break
+                    futures.append((item, self.read(item, read)))
+                if len(futures) == 0:
+                    break
+
+                item, future = futures.popleft()
+                try:
+                    yield PrefetchResult(item, future.result(), None)
+                except Exception as e:
+                    if self._verbose:
+                        ph.print_warning("Reading '%s' failed: %s" % (item, e))
+                    yield PrefetchResult(item, None, e)
+        finally:
+            # Generator closed early
+            for item, future in futures:
+                future.cancel()
+
+    ##
+    # Submit write in background. Blocks if the maximum number of pending
+    # writes is reached.
+    # \date       2026-10-19 16:55:40+0000
+    #
+    # \param      self          The object
+    # \param      data          Data to write; must not be modified afterwards
+    # \param      path_to_file  Path to output file
+    # \param      write         Write function with signature
+    #                           write(data, path_to_file), e.g.
+    #                           DataWriter.write_image
+    #
+    # \return     concurrent.futures.Future object
+    #
+    def write(self, data, path_to_file, write=dw.DataWriter.write_image):
+        self._write_slots.acquire()
+        try:
+            future = self._executor.submit(write, data, path_to_file)
+        except Exception:
+            self._write_slots.release()
+            raise
+        with self._lock:
+            self._writes[future] = path_to_file
+        future.add_done_callback(self._finish_write)
+        return future
+
+    ##
+    # Wait for all pending writes.
+    # \date       2026-10-19 16:58:12+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Dictionary of paths of failed writes and their errors
+    #
+    def wait(self):
+        with self._lock:
+            writes = list(self._writes.items())
+        concurrent.futures.wait([future for future, path in writes])
+
+        # Done callbacks may still be running at this point
+        with self._lock:
+            for future, path_to_file in writes:
+                if future.exception() is not None:
+                    self._errors[path_to_file] = future.exception()
+            return collections.OrderedDict(self._errors)
+
+    ##
+    # Wait for pending writes and shut down thread pool.
+    # \date       2026-10-19 16:59:30+0000
+    #
+    # \param      self          The object
+    # \param      raise_errors  Raise RuntimeError if any write failed
+    #
+    def close(self, raise_errors=True):
+        errors = self.wait()
+        self._executor.shutdown()
+        if raise_errors and len(errors) > 0:
+            raise RuntimeError("Writing failed for %d file(s): %s" % (
+                len(errors),
+                "; ".join("'%s' (%s)" % (p, e) for p, e in errors.items())))
+
+    def _finish_write(self, future):
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            path_to_file = self._writes.pop(future)
+            if error is not None:
+                self._errors[path_to_file] = error
+        self._write_slots.release()
+        if self._verbose and error is not None:
+            ph.print_warning("Writing '%s' failed: %s" % (path_to_file, error))
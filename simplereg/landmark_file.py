@@ -0,0 +1,113 @@
+##
+# \file landmark_file.py
+# \brief      Compact binary landmark/point-cloud file format (.lmk)
+#
+# A .lmk file consists of a 32-byte header followed by the data arrays in
+# little-endian byte order:
+#
+#   magic (8 bytes), number of points N (uint64), dimension (uint32),
+#   flags (uint32; bit 0: labels, bit 1: ids), reserved (8 bytes),
+#   coordinates (N x dim float32), [labels (N int32)], [ids (N int64)]
+#
+# All arrays can be memory-mapped.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import struct
+import numpy as np
+
+LMK_MAGIC = b"SRLMK\x00\x01\x00"
+LMK_HEADER = "<8sQII8x"
+LMK_HEADER_SIZE = struct.calcsize(LMK_HEADER)
+
+FLAG_LABELS = 1
+FLAG_IDS = 2
+
+
+##
+# Reads a .lmk file.
+# \date       2026-10-19 14:58:03+0000
+#
+# \param      path_to_file  The path to file
+# \param      mmap          Turn on/off memory-mapping (copy-on-write)
+#
+# \return     Tuple of coordinates (N x dim float32 array), labels (N int32
+#             array or None) and ids (N int64 array or None)
+#
+def read_lmk(path_to_file, mmap=True):
+    with open(path_to_file, "rb") as fileobj:
+        header = fileobj.read(LMK_HEADER_SIZE)
+    if len(header) < LMK_HEADER_SIZE or header[0:8] != LMK_MAGIC:
+        raise IOError("File '%s' is not a valid .lmk file" % path_to_file)
+    n_points, dim, flags = struct.unpack(LMK_HEADER, header)[1:]
+
+    arrays = [("<f4", (n_points, dim))]
+    if flags & FLAG_LABELS:
+        arrays.append(("<i4", (n_points,)))
+    if flags & FLAG_IDS:
+        arrays.append(("<i8", (n_points,)))
+
+    size = LMK_HEADER_SIZE + sum(
+        int(np.prod(shape)) * np.dtype(dtype).itemsize
+        for dtype, shape in arrays)
+    if size != os.path.getsize(path_to_file):
+        raise IOError("File '%s' is not a valid .lmk file" % path_to_file)
+
+    offset = LMK_HEADER_SIZE
+    ndas = []
+    for dtype, shape in arrays:
+        count = int(np.prod(shape))
+        if count == 0:
+            ndas.append(np.zeros(shape, dtype=dtype))
+        elif mmap:
+            ndas.append(np.memmap(
+                path_to_file, dtype=dtype, mode="c", offset=offset,
+                shape=shape))
+        else:
+            ndas.append(np.fromfile(
+                path_to_file, dtype=dtype, count=count,
+                offset=offset).reshape(shape))
+        offset += count * np.dtype(dtype).itemsize
+
+    coordinates = ndas.pop(0)
+    labels = ndas.pop(0) if flags & FLAG_LABELS else None
+    ids = ndas.pop(0) if flags & FLAG_IDS else None
+
+    return coordinates, labels, ids
+
+
+##
+# Writes a .lmk file.
+# \date       2026-10-19 15:01:44+0000
+#
+# \param      path_to_file  The path to file
+# \param      coordinates   Coordinates as (N x dim) array
+# \param      labels        Optional labels as N array
+# \param      ids           Optional ids as N array
+#
+def write_lmk(path_to_file, coordinates, labels=None, ids=None):
+    coordinates = np.asarray(coordinates)
+    n_points, dim = coordinates.shape
+
+    flags = 0
+    arrays = [coordinates.astype("<f4")]
+    if labels is not None:
+        flags |= FLAG_LABELS
+        arrays.append(np.asarray(labels).astype("<i4"))
+    if ids is not None:
+        flags |= FLAG_IDS
+        arrays.append(np.asarray(ids).astype("<i8"))
+    for nda in arrays[1:]:
+        if nda.shape != (n_points,):
+            raise ValueError(
+                "Labels and ids must be given for each of the %d points" %
+                n_points)
+
+    with open(path_to_file, "wb") as fileobj:
+        fileobj.write(struct.pack(
+            LMK_HEADER, LMK_MAGIC, n_points, dim, flags))
+        for nda in arrays:
+            fileobj.write(np.ascontiguousarray(nda).tobytes())
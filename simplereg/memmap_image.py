@@ -0,0 +1,147 @@
+##
+# \file memmap_image.py
+# \brief      Class to access uncompressed NIfTI images via memory-mapping
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import numpy as np
+import nibabel as nib
+import SimpleITK as sitk
+
+# SimpleITK pixel types of supported (scalar) data types
+PIXEL_IDS = {
+    np.dtype(np.uint8): sitk.sitkUInt8,
+    np.dtype(np.int8): sitk.sitkInt8,
+    np.dtype(np.uint16): sitk.sitkUInt16,
+    np.dtype(np.int16): sitk.sitkInt16,
+    np.dtype(np.uint32): sitk.sitkUInt32,
+    np.dtype(np.int32): sitk.sitkInt32,
+    np.dtype(np.uint64): sitk.sitkUInt64,
+    np.dtype(np.int64): sitk.sitkInt64,
+    np.dtype(np.float32): sitk.sitkFloat32,
+    np.dtype(np.float64): sitk.sitkFloat64,
+}
+
+
+##
+# Memory-mapped (scalar 2D or 3D) image of an uncompressed NIfTI file.
+#
+# Voxel data is exposed as a read-only numpy view in [z,] y, x order, i.e.
+# meeting the ITK<->Numpy convention, without copying data into memory. Only
+# pages accessed are read from disk. The image geometry is provided in ITK
+# (LPS) convention via the same accessors as sitk.Image so that objects can be
+# used in place of sitk.Image objects wherever only geometry and voxel data
+# are needed.
+# \date       2026-10-19 12:41:05+0000
+#
+class MemmapImage(object):
+
+    def __init__(self, path_to_file):
+        self._path_to_file = path_to_file
+
+        image_nib = nib.load(path_to_file, mmap="r")
+        if isinstance(image_nib.dataobj, np.ndarray) or \
+                not image_nib.dataobj.is_proxy:
+            raise IOError("Image data cannot be memory-mapped")
+        if image_nib.dataobj.slope != 1 or image_nib.dataobj.inter != 0:
+            raise IOError(
+                "Memory-mapping not supported for NIfTI images with "
+                "intensity scaling")
+
+        # Drop trailing singleton dimensions, e.g. (x, y, z, 1)
+        shape = image_nib.shape
+        while len(shape) > 3 and shape[-1] == 1:
+            shape = shape[:-1]
+        if len(shape) not in [2, 3]:
+            raise IOError("Only scalar 2D or 3D images can be memory-mapped")
+
+        nda = image_nib.dataobj.get_unscaled()
+        if not isinstance(nda, np.memmap):
+            raise IOError("Image data cannot be memory-mapped")
+
+        # Fortran-ordered x, y, z array on disk corresponds to C-ordered
+        # z, y, x view
+        self._nda = nda.reshape(shape, order="F").T
+        self._nda.flags.writeable = False
+
+        # Geometry in LPS convention (x maps_to -x, and y maps_to -y)
+        dim = len(shape)
+        affine = image_nib.affine
+        R = np.diag([-1, -1, 1])[0:dim, 0:dim]
+        A = R.dot(affine[0:dim, 0:dim])
+        self._spacing = np.linalg.norm(A, axis=0)
+        self._direction = A / self._spacing
+        self._origin = R.dot(affine[0:dim, 3])
+        self._size = np.array(shape, dtype=int)
+
+    def GetDimension(self):
+        return int(self._size.size)
+
+    def GetSize(self):
+        return tuple(int(i) for i in self._size)
+
+    def GetSpacing(self):
+        return tuple(float(i) for i in self._spacing)
+
+    def GetOrigin(self):
+        return tuple(float(i) for i in self._origin)
+
+    def GetDirection(self):
+        return tuple(float(i) for i in self._direction.flatten())
+
+    def GetNumberOfPixels(self):
+        return int(np.prod(self._size))
+
+    def GetNumberOfComponentsPerPixel(self):
+        return 1
+
+    def GetPixelIDValue(self):
+        dtype = self._nda.dtype.newbyteorder("=")
+        if dtype not in PIXEL_IDS:
+            raise ValueError("Data type '%s' not supported" % dtype)
+        return PIXEL_IDS[dtype]
+
+    def GetPathToFile(self):
+        return self._path_to_file
+
+    ##
+    # Gets the voxel data as read-only view into the memory-mapped file.
+    # \date       2026-10-19 12:47:31+0000
+    #
+    # \param      self  The object
+    #
+    # \return     numpy view of shape [Nz x] Ny x Nx
+    #
+    def GetArrayView(self):
+        return self._nda
+
+    def TransformContinuousIndexToPhysicalPoint(self, index):
+        A = self._direction.dot(np.diag(self._spacing))
+        return tuple(A.dot(np.array(index, dtype=np.float64)) + self._origin)
+
+    def TransformIndexToPhysicalPoint(self, index):
+        return self.TransformContinuousIndexToPhysicalPoint(index)
+
+    def TransformPhysicalPointToContinuousIndex(self, point):
+        A = self._direction.dot(np.diag(self._spacing))
+        return tuple(np.linalg.solve(
+            A, np.array(point, dtype=np.float64) - self._origin))
+
+    ##
+    # Gets the image as sitk.Image object; this copies the voxel data into
+    # memory.
+    # \date       2026-10-19 12:49:02+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Image as sitk.Image object
+    #
+    def GetImageSitk(self):
+        image_sitk = sitk.GetImageFromArray(
+            self._nda.astype(self._nda.dtype.newbyteorder("=")))
+        image_sitk.SetOrigin(self.GetOrigin())
+        image_sitk.SetSpacing(self.GetSpacing())
+        image_sitk.SetDirection(self.GetDirection())
+        return image_sitk
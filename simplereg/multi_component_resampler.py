@@ -0,0 +1,281 @@
+##
+# \file multi_component_resampler.py
+# \brief      Class to resample multi-component (vector) and 4D time-series
+#             images volume by volume using one shared coordinate mapping
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import numpy as np
+import nibabel as nib
+import scipy.ndimage
+import SimpleITK as sitk
+
+import pysitk.python_helper as ph
+
+import simplereg.data_reader as dr
+import simplereg.data_writer as dw
+from simplereg.resampler import Resampler
+from simplereg.definitions import ALLOWED_IMAGES, INTERPOLATOR_ORDERS
+
+##
+# Class to resample multi-component (vector) and 4D time-series images.
+#
+# All components/timepoints are stored as separate 3D volumes in the NIfTI
+# file. The coordinate mapping from the fixed grid into the moving voxel space
+# is computed once and applied to each volume in turn. Volumes are read and
+# written one at a time so that memory stays proportional to one volume.
+# Optionally, a separate transform for each volume can be provided.
+# \date       2026-10-19 10:31:12+0000
+#
+class MultiComponentResampler(object):
+
+    def __init__(self,
+                 path_to_fixed,
+                 path_to_moving,
+                 path_to_transform=None,
+                 paths_to_transforms=None,
+                 interpolator="Linear",
+                 spacing=None,
+                 padding=0,
+                 add_to_grid=0,
+                 path_to_mask=None,
+                 roi=None,
+                 margin=0,
+                 dtype=None,
+                 verbose=0,
+                 ):
+
+        if path_to_transform is not None and paths_to_transforms is not None:
+            raise ValueError(
+                "Either a single transform or a transform per volume "
+                "can be provided")
+
+        self._path_to_fixed = path_to_fixed
+        self._path_to_moving = path_to_moving
+        self._path_to_transform = path_to_transform
+        self._paths_to_transforms = paths_to_transforms
+        self._interpolator = interpolator
+        self._spacing = spacing
+        self._padding = padding
+        self._add_to_grid = add_to_grid
+        self._path_to_mask = path_to_mask
+        self._roi = roi
+        self._margin = margin
+        self._dtype = dtype
+        self._verbose = verbose
+
+    ##
+    # Resample all volumes of the moving image and stream them to file
+    # \date       2026-10-19 10:34:40+0000
+    #
+    # \param      self            The object
+    # \param      path_to_output  Path to output image (nii or nii.gz)
+    #
+    def run(self, path_to_output):
+
+        extension = ph.strip_filename_extension(path_to_output)[1]
+        if extension not in ALLOWED_IMAGES:
+            raise IOError("Image file extension must be of type %s " %
+                          ", or ".join(ALLOWED_IMAGES))
+
+        order = self._get_interpolation_order(self._interpolator)
+
+        # get image resampling information of 3D fixed grid
+        fixed_sitk = dr.DataReader.read_image(self._path_to_fixed)
+        if fixed_sitk.GetDimension() != 3:
+            raise IOError("Fixed image must be 3D")
+        size, origin, spacing, direction = \
+            Resampler.get_space_resampling_properties(
+                image_sitk=fixed_sitk,
+                spacing=self._spacing,
+                add_to_grid=self._add_to_grid,
+                add_to_grid_unit="mm",
+                mask_sitk=None if self._path_to_mask is None
+                else dr.DataReader.read_image(self._path_to_mask),
+                roi=self._roi,
+                margin=self._margin)
+
+        moving_nib = nib.load(self._path_to_moving)
+        shape_moving = moving_nib.shape
+        if len(shape_moving) < 3:
+            raise IOError("Moving image must be at least 3D")
+        shape_volumes = shape_moving[3:]
+        n_volumes = int(np.prod(shape_volumes))
+
+        transforms = self._get_transform_paths(n_volumes)
+
+        # Output header with volume dimensions of the moving image
+        nda = self._read_volume(moving_nib, shape_volumes, 0)
+        if self._dtype is not None:
+            dtype = np.dtype(self._dtype)
+        elif order == 0:
+            dtype = nda.dtype
+        else:
+            dtype = np.dtype(np.float32)
+        header = self._get_output_header(
+            moving_nib.header, size, origin, spacing, direction, dtype)
+
+        ph.create_directory(os.path.dirname(path_to_output))
+        if extension == "nii.gz":
+            fileobj = dw.DataWriter.open_gzip(path_to_output)
+        else:
+            fileobj = open(path_to_output, "wb")
+
+        try:
+            header.write_to(fileobj)
+            fileobj.write(
+                b"\x00" * (int(header.get_data_offset()) - fileobj.tell()))
+
+            indices_moving = None
+            for i in range(n_volumes):
+                if i > 0:
+                    nda = self._read_volume(moving_nib, shape_volumes, i)
+
+                # Shared coordinate mapping; only recomputed if the transform
+                # changes between volumes
+                if indices_moving is None or \
+                        transforms[i] != transforms[i - 1]:
+                    indices_moving = self.get_moving_voxel_indices(
+                        moving_nib.affine,
+                        size, origin, spacing, direction,
+                        transforms[i])
+
+                # Output as z, y, x array. In C-order this corresponds to the
+                # x-fastest NIfTI layout on disk
+                nda_warped = scipy.ndimage.map_coordinates(
+                    nda,
+                    indices_moving,
+                    output=np.float64 if order else nda.dtype,
+                    order=order,
+                    mode="constant",
+                    cval=self._padding,
+                )
+                fileobj.write(nda_warped.astype(dtype).tobytes())
+
+                if self._verbose:
+                    ph.print_info("Volume %d/%d resampled" % (
+                        i + 1, n_volumes))
+        finally:
+            fileobj.close()
+
+        if self._verbose:
+            ph.print_info("Image written to '%s'" % path_to_output)
+
+    ##
+    # Gets the continuous voxel indices in the moving (NIfTI) voxel space for
+    # all voxels of the output grid.
+    # \date       2026-10-19 10:40:05+0000
+    #
+    # \param      affine_nib         Affine voxel-to-RAS matrix of moving image
+    # \param      size               Output size
+    # \param      origin             Output origin
+    # \param      spacing            Output spacing
+    # \param      direction          Output direction
+    # \param      path_to_transform  Path to transform, ordered list of paths
+    #                                or None for identity
+    #
+    # \return     Indices as float32 array of shape (3 x Nz x Ny x Nx)
+    #
+    @staticmethod
+    def get_moving_voxel_indices(
+            affine_nib, size, origin, spacing, direction,
+            path_to_transform=None):
+
+        dim = len(size)
+        shape = tuple(size[::-1])
+
+        # Physical (LPS) points of output grid in z, y, x order
+        index = np.array(
+            np.meshgrid(*[np.arange(n) for n in shape], indexing="ij"),
+            dtype=np.float32)[::-1].reshape(dim, -1)
+        A = np.array(direction).reshape(dim, dim).dot(np.diag(spacing))
+        points = A.dot(index) + np.array(origin)[:, np.newaxis]
+        del index
+
+        if path_to_transform is not None:
+            transform_sitk = Resampler.read_transform_sitk(path_to_transform)
+            displacement_sitk = sitk.TransformToDisplacementField(
+                transform_sitk,
+                sitk.sitkVectorFloat64,
+                [int(i) for i in size],
+                [float(i) for i in origin],
+                [float(i) for i in spacing],
+                [float(i) for i in direction],
+            )
+            displacement_nda = sitk.GetArrayViewFromImage(displacement_sitk)
+            points += displacement_nda.reshape(-1, dim).transpose()
+
+        # LPS to RAS and into (continuous) moving voxel space
+        points[0:2, :] *= -1
+        affine_inv = np.linalg.inv(affine_nib)
+        indices = affine_inv[0:dim, 0:dim].dot(points) + \
+            affine_inv[0:dim, dim][:, np.newaxis]
+
+        return indices.astype(np.float32).reshape((dim,) + shape)
+
+    @staticmethod
+    def _get_interpolation_order(interpolator):
+        if interpolator.isdigit():
+            if int(interpolator) == 0:
+                interpolator = "NearestNeighbor"
+            elif int(interpolator) == 1:
+                interpolator = "Linear"
+            else:
+                raise ValueError(
+                    "Interpolator order not known. Allowed options are: 0, 1")
+        if interpolator not in INTERPOLATOR_ORDERS:
+            raise ValueError(
+                "Interpolator not known for multi-component resampling. "
+                "Allowed options are: %s" % (
+                    ", ".join(INTERPOLATOR_ORDERS.keys())))
+        return INTERPOLATOR_ORDERS[interpolator]
+
+    def _get_transform_paths(self, n_volumes):
+        if self._paths_to_transforms is None:
+            return [self._path_to_transform] * n_volumes
+
+        if len(self._paths_to_transforms) != n_volumes:
+            raise IOError(
+                "Number of transforms (%d) must match the number of "
+                "volumes (%d)" % (len(self._paths_to_transforms), n_volumes))
+        return list(self._paths_to_transforms)
+
+    ##
+    # Reads a single volume. Volumes are enumerated in the order they are
+    # stored on disk (first volume dimension varies fastest).
+    # \date       2026-10-19 10:45:31+0000
+    #
+    @staticmethod
+    def _read_volume(image_nib, shape_volumes, i):
+        index = np.unravel_index(i, shape_volumes, order="F") \
+            if len(shape_volumes) else ()
+        slicer = (slice(None),) * 3 + tuple(int(j) for j in index)
+        return np.asanyarray(image_nib.dataobj[slicer])
+
+    @staticmethod
+    def _get_output_header(
+            header_moving, size, origin, spacing, direction, dtype):
+
+        # Affine for orientation (x maps_to -x, and y maps_to -y)
+        R = np.diag([-1, -1, 1])
+        affine = np.eye(4)
+        affine[0:3, 0:3] = R.dot(
+            np.array(direction).reshape(3, 3)).dot(np.diag(spacing))
+        affine[0:3, 3] = R.dot(origin)
+
+        shape = tuple(size) + tuple(header_moving.get_data_shape()[3:])
+        header = nib.Nifti1Header()
+        header.set_data_shape(shape)
+        header.set_data_dtype(dtype)
+        header.set_xyzt_units(*header_moving.get_xyzt_units())
+        zooms = tuple(spacing) + tuple(header_moving.get_zooms()[3:])
+        header.set_zooms(zooms)
+        header.set_qform(affine, code=1)
+        header.set_sform(affine, code=1)
+        header.set_intent(*header_moving.get_intent())
+        header["vox_offset"] = 352
+
+        return header
@@ -7,18 +7,30 @@
 # Import libraries
 import os
 import numpy as np
+import nibabel as nib
 import SimpleITK as sitk
 from abc import ABCMeta, abstractmethod
-import nipype.interfaces.niftyreg
 
 import pysitk.python_helper as ph
 import pysitk.simple_itk_helper as sitkh
 
 from simplereg.definitions import DIR_TMP, OMP
+from simplereg.executable import Command, get_executable_id
 from simplereg.wrapper_registration import WrapperRegistration
 from simplereg.niftyreg_to_simpleitk_converter import \
     NiftyRegToSimpleItkConverter as nreg2sitk
 
+# Environment variables which may point to the NiftyReg executables
+NIFTYREG_ENV_DIRS = ("NIFTYREGDIR",)
+
+# NiftyReg interpolation orders and corresponding sitk interpolators
+INTERPOLATORS = {
+    0: sitk.sitkNearestNeighbor,
+    1: sitk.sitkLinear,
+    3: sitk.sitkBSpline,
+    4: sitk.sitkWelchWindowedSinc,
+}
+
 
 class NiftyReg(WrapperRegistration):
     __metaclass__ = ABCMeta
@@ -33,6 +45,9 @@ class NiftyReg(WrapperRegistration):
                  omp,
                  subfolder,
                  verbose,
+                 dir_tmp=DIR_TMP,
+                 keep_files=False,
+                 timeout=None,
                  ):
 
         WrapperRegistration.__init__(self,
@@ -42,43 +57,61 @@ class NiftyReg(WrapperRegistration):
                                      moving_sitk_mask=moving_sitk_mask,
                                      options=options,
                                      verbose=verbose,
+                                     subfolder=subfolder,
+                                     dir_tmp=dir_tmp,
+                                     keep_files=keep_files,
+                                     timeout=timeout,
                                      )
 
-        # Subfolder within DIR_TMP where results will be stored temporarily
-        self._dir_tmp = os.path.join(DIR_TMP, subfolder)
+        self._transform_init = transform_init
+        self._omp = omp
 
-        self._fixed_str = os.path.join(self._dir_tmp, "fixed.nii.gz")
-        self._moving_str = os.path.join(self._dir_tmp, "moving.nii.gz")
+    ##
+    # Sets the paths of the exchange files within the working directory of
+    # the current run.
+    # \date       2026-10-19 19:10:12+0000
+    #
+    # \param      self  The object
+    #
+    def _set_paths(self):
+        self._fixed_str = os.path.join(self._dir_tmp, "fixed.nii")
+        self._moving_str = os.path.join(self._dir_tmp, "moving.nii")
         self._warped_moving_str = os.path.join(
-            self._dir_tmp, "warped_moving.nii.gz")
+            self._dir_tmp, "warped_moving.nii")
 
         self._fixed_mask_str = os.path.join(
-            self._dir_tmp, "fixed_mask.nii.gz")
+            self._dir_tmp, "fixed_mask.nii")
         self._moving_mask_str = os.path.join(
-            self._dir_tmp, "moving_mask.nii.gz")
+            self._dir_tmp, "moving_mask.nii")
         self._warped_moving_mask_str = os.path.join(
-            self._dir_tmp, "warped_mask.nii.gz")
+            self._dir_tmp, "warped_mask.nii")
         self._transform_init_str = os.path.join(
             self._dir_tmp, "initial_transform.txt")
 
-        self._transform_init = transform_init
-        self._omp = omp
-
-    def _run(self):
-
-        # Create and delete all possibly existing files in the directory
-        ph.create_directory(self._dir_tmp, delete_files=True)
+    ##
+    # Writes the input files to the working directory of the run.
+    # Subclasses add the command of the NiftyReg executable.
+    # \date       2026-10-19 19:12:40+0000
+    #
+    # \param      self  The object
+    #
+    def _prepare(self):
+        self._set_paths()
 
-        sitkh.write_nifti_image_sitk(self._fixed_sitk, self._fixed_str)
-        sitkh.write_nifti_image_sitk(self._moving_sitk, self._moving_str)
+        # Uncompressed NIfTI avoids costly gzip round-trips
+        self._fixed_str = self._get_input_file(
+            "fixed", self._fixed_sitk, self._fixed_str)
+        self._moving_str = self._get_input_file(
+            "moving", self._moving_sitk, self._moving_str)
 
         if self._fixed_sitk_mask is not None:
-            sitkh.write_nifti_image_sitk(
-                self._fixed_sitk_mask, self._fixed_mask_str)
+            self._fixed_mask_str = self._get_input_file(
+                "fixed_mask", self._fixed_sitk_mask, self._fixed_mask_str)
 
         if self._moving_sitk_mask is not None:
-            sitkh.write_nifti_image_sitk(
-                self._moving_sitk_mask, self._moving_mask_str)
+            self._moving_mask_str = self._get_input_file(
+                "moving_mask", self._moving_sitk_mask,
+                self._moving_mask_str)
 
         if self._transform_init is not None:
             ph.write_array_to_file(
@@ -87,6 +120,27 @@ class NiftyReg(WrapperRegistration):
                 access_mode="a",
                 verbose=0)
 
+    def _get_cache_options(self):
+        options = super(NiftyReg, self)._get_cache_options()
+        options["transform_init"] = self._transform_init
+        return options
+
+    ##
+    # Gets the command of a NiftyReg executable using the set number of
+    # OpenMP threads.
+    # \date       2026-10-19 20:12:30+0000
+    #
+    # \param      self  The object
+    # \param      name  Name of executable, e.g. reg_aladin
+    #
+    # \return     executable.Command object
+    #
+    def _get_command(self, name):
+        command = Command(name, env_dirs=NIFTYREG_ENV_DIRS)
+        command.add_value("-omp", self._omp)
+        command.set_environ("OMP_NUM_THREADS", self._omp)
+        return command
+
 
 class RegAladin(NiftyReg):
 
@@ -100,6 +154,9 @@ class RegAladin(NiftyReg):
                  subfolder="RegAladin",
                  omp=OMP,
                  verbose=False,
+                 dir_tmp=DIR_TMP,
+                 keep_files=False,
+                 timeout=None,
                  ):
 
         NiftyReg.__init__(self,
@@ -112,43 +169,54 @@ class RegAladin(NiftyReg):
                           subfolder=subfolder,
                           omp=omp,
                           verbose=verbose,
+                          dir_tmp=dir_tmp,
+                          keep_files=keep_files,
+                          timeout=timeout,
                           )
 
+    def _set_paths(self):
+        super(RegAladin, self)._set_paths()
         self._registration_transform_str = os.path.join(
             self._dir_tmp, "registration_transform.txt")
 
-    def _run(self):
+    def _prepare(self):
 
-        super(RegAladin, self)._run()
+        super(RegAladin, self)._prepare()
 
-        nreg = nipype.interfaces.niftyreg.RegAladin()
-        nreg.inputs.ref_file = self._fixed_str
-        nreg.inputs.flo_file = self._moving_str
-        nreg.inputs.res_file = self._warped_moving_str
-        nreg.inputs.aff_file = self._registration_transform_str
-        nreg.inputs.omp_core_val = self._omp
-        nreg.inputs.args = self._options
+        nreg = self._get_command("reg_aladin")
+        nreg.add_input("-ref", self._fixed_str)
+        nreg.add_input("-flo", self._moving_str)
+        nreg.add_output("-res", self._warped_moving_str)
+        nreg.add_output("-aff", self._registration_transform_str)
 
         if self._fixed_sitk_mask is not None:
-            nreg.inputs.rmask_file = self._fixed_mask_str
+            nreg.add_input("-rmask", self._fixed_mask_str)
 
         if self._moving_sitk_mask is not None:
-            nreg.inputs.fmask_file = self._moving_mask_str
+            nreg.add_input("-fmask", self._moving_mask_str)
 
         if self._transform_init is not None:
-            nreg.inputs.in_aff_file = self._transform_init_str
+            nreg.add_input("-inaff", self._transform_init_str)
+
+        nreg.add_options(self._options)
 
-        # Execute registration
-        if self._verbose:
-            ph.print_execution(nreg.cmdline)
-        nreg.run()
+        return nreg
+
+    def _get_cache_options(self):
+        options = super(RegAladin, self)._get_cache_options()
+        options["executable"] = get_executable_id(
+            "reg_aladin", NIFTYREG_ENV_DIRS)
+        return options
+
+    def _read_results(self):
 
         # Read warped image
         self._warped_moving_sitk = sitkh.read_nifti_image_sitk(
             self._warped_moving_str, sitk.sitkFloat64)
 
         # Convert to sitk affine transform
-        self._registration_transform_sitk = self._convert_to_sitk_transform()
+        self._registration_transform_sitk = \
+            self._convert_to_sitk_transform()
 
     ##
     # Convert RegAladin transform to sitk object
@@ -205,6 +273,9 @@ class RegF3D(NiftyReg):
                  subfolder="RegF3D",
                  omp=OMP,
                  verbose=False,
+                 dir_tmp=DIR_TMP,
+                 keep_files=False,
+                 timeout=None,
                  ):
 
         NiftyReg.__init__(self,
@@ -217,44 +288,91 @@ class RegF3D(NiftyReg):
                           subfolder=subfolder,
                           omp=omp,
                           verbose=verbose,
+                          dir_tmp=dir_tmp,
+                          keep_files=keep_files,
+                          timeout=timeout,
                           )
 
+        self._registration_control_point_grid_nib = None
+        self._displacement_field_sitk = None
+        self._displacement_field_transform_sitk = None
+
+    def _set_paths(self):
+        super(RegF3D, self)._set_paths()
         self._registration_control_point_grid_str = os.path.join(
-            self._dir_tmp, "registration_cpp.nii.gz")
+            self._dir_tmp, "registration_cpp.nii")
 
-    def _run(self):
+    def _prepare(self):
 
-        super(RegF3D, self)._run()
+        super(RegF3D, self)._prepare()
 
-        nreg = nipype.interfaces.niftyreg.RegF3D()
-        nreg.inputs.ref_file = self._fixed_str
-        nreg.inputs.flo_file = self._moving_str
-        nreg.inputs.res_file = self._warped_moving_str
-        nreg.inputs.cpp_file = self._registration_control_point_grid_str
-        nreg.inputs.omp_core_val = self._omp
-        nreg.inputs.args = self._options
+        nreg = self._get_command("reg_f3d")
+        nreg.add_input("-ref", self._fixed_str)
+        nreg.add_input("-flo", self._moving_str)
+        nreg.add_output("-res", self._warped_moving_str)
+        nreg.add_output("-cpp", self._registration_control_point_grid_str)
 
         if self._fixed_sitk_mask is not None:
-            nreg.inputs.rmask_file = self._fixed_mask_str
+            nreg.add_input("-rmask", self._fixed_mask_str)
 
         if self._moving_sitk_mask is not None:
-            nreg.inputs.fmask_file = self._moving_mask_str
+            nreg.add_input("-fmask", self._moving_mask_str)
 
         if self._transform_init is not None:
-            nreg.inputs.aff_file = self._transform_init_str
+            nreg.add_input("-aff", self._transform_init_str)
 
-        # Execute registration
-        if self._verbose:
-            ph.print_execution(nreg.cmdline)
-        nreg.run()
+        nreg.add_options(self._options)
+
+        return nreg
+
+    def _get_cache_options(self):
+        options = super(RegF3D, self)._get_cache_options()
+        options["executable"] = get_executable_id(
+            "reg_f3d", NIFTYREG_ENV_DIRS)
+        return options
+
+    def _read_results(self):
 
         # Read warped image
         self._warped_moving_sitk = sitkh.read_nifti_image_sitk(
             self._warped_moving_str)
 
+        self._read_control_point_grid(
+            self._registration_control_point_grid_str)
+
+    ##
+    # Reads the obtained control point grid.
+    # \date       2026-10-19 22:47:02+0000
+    #
+    # \param      self          The object
+    # \param      path_to_file  Path to control point grid (.nii)
+    #
+    def _read_control_point_grid(self, path_to_file):
+
         # Has not been used. Thus, not tested!
         self._registration_transform_sitk = sitkh.read_nifti_image_sitk(
-            self._registration_control_point_grid_str)
+            path_to_file)
+
+        # Keep the control point grid with its NIfTI header since some
+        # header information gets lost when reading it via sitk
+        with open(path_to_file, "rb") as f:
+            self._registration_control_point_grid_nib = \
+                nib.Nifti1Image.from_bytes(f.read())
+        self._displacement_field_sitk = None
+        self._displacement_field_transform_sitk = None
+
+    # The control point grid is cached instead of a parametric transform
+    def _write_cache_entry(self, directory):
+        nib.save(self._registration_control_point_grid_nib,
+                 os.path.join(directory, "registration_cpp.nii"))
+        sitk.WriteImage(self._warped_moving_sitk,
+                        os.path.join(directory, "warped_moving.nii"))
+
+    def _read_cache_entry(self, directory):
+        self._read_control_point_grid(
+            os.path.join(directory, "registration_cpp.nii"))
+        self._warped_moving_sitk = sitk.ReadImage(
+            os.path.join(directory, "warped_moving.nii"))
 
     def _get_transformed_fixed_sitk(self):
         raise UnboundLocalError("Not implemented for RegF3D")
@@ -277,49 +395,73 @@ class RegF3D(NiftyReg):
 
         return warped_moving_sitk_mask
 
+    ##
+    # Gets the dense displacement field of the obtained control point grid on
+    # the fixed image grid. It is evaluated in-process once and cached.
+    # \date       2026-10-19 21:08:31+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Displacement field as float32 sitk.Image object
+    #
+    def get_displacement_field_sitk(self):
+        if self._displacement_field_sitk is None:
+            if self._registration_control_point_grid_nib is None:
+                raise RuntimeError("Registration has not been run")
+            self._displacement_field_sitk = \
+                nreg2sitk.convert_regf3d_cpp_to_sitk_displacement(
+                    self._registration_control_point_grid_nib,
+                    self._fixed_sitk,
+                    dtype=np.float32)
+        return self._displacement_field_sitk
+
+    ##
+    # Gets the obtained registration transform as displacement field
+    # transform. It is created once and cached.
+    # \date       2026-10-19 21:10:02+0000
+    #
+    # \param      self  The object
+    #
+    # \return     sitk.DisplacementFieldTransform object
+    #
+    def get_displacement_field_transform_sitk(self):
+        if self._displacement_field_transform_sitk is None:
+            # sitk.DisplacementFieldTransform requires float64 fields
+            self._displacement_field_transform_sitk = \
+                sitk.DisplacementFieldTransform(sitk.Cast(
+                    self.get_displacement_field_sitk(),
+                    sitk.sitkVectorFloat64))
+        return self._displacement_field_transform_sitk
+
     ##
     # Gets the deformed image given the obtained deformable registration
-    # transform.
+    # transform. Resampling is performed in memory.
     # \date       2017-08-09 16:57:39+0100
     #
     # \param      self                 The object
     # \param      fixed_sitk           Fixed image as sitk.Image
     # \param      moving_sitk          Moving image as sitk.Image
-    # \param      interpolation_order  Interpolation order, integer
+    # \param      interpolation_order  Interpolation order as used by
+    #                                  reg_resample, i.e. 0, 1, 3 or 4
     #
     # \return     The deformed image sitk.
     #
     def get_deformed_image_sitk(self, fixed_sitk, moving_sitk,
                                 interpolation_order):
 
-        # REMARK:
-        # Not possible to write registration transform that way since
-        # some header information gets lost! Therefore, read again the one
-        # which was the output of NiftyReg (and hope that file is not been
-        # deleted)
-        # Create and delete all possibly existing files in the directory
-        # ph.create_directory(self._dir_tmp, delete_files=True)
-        # sitkh.write_nifti_image_sitk(self.get_registration_transform_sitk(),
-        #                 self._registration_control_point_grid_str)
-
-        sitkh.write_nifti_image_sitk(fixed_sitk, self._fixed_str)
-        sitkh.write_nifti_image_sitk(moving_sitk, self._moving_str)
-
-        nreg = nipype.interfaces.niftyreg.RegResample()
-        nreg.inputs.ref_file = self._fixed_str
-        nreg.inputs.flo_file = self._moving_str
-        nreg.inputs.trans_file = self._registration_control_point_grid_str
-        nreg.inputs.out_file = self._warped_moving_str
-        nreg.inputs.omp_core_val = self._omp
-        nreg.inputs.args = "-inter " + str(interpolation_order)
-
-        # Execute registration
-        if self._verbose:
-            ph.print_execution(nreg.cmdline)
-        nreg.run()
-
-        return sitkh.read_nifti_image_sitk(self._warped_moving_str,
-                                           moving_sitk.GetPixelIDValue())
+        if interpolation_order not in INTERPOLATORS:
+            raise ValueError(
+                "Interpolation order must be one of %s" %
+                ", ".join(str(k) for k in sorted(INTERPOLATORS.keys())))
+
+        return sitk.Resample(
+            moving_sitk,
+            fixed_sitk,
+            self.get_displacement_field_transform_sitk(),
+            INTERPOLATORS[interpolation_order],
+            0,
+            moving_sitk.GetPixelIDValue(),
+        )
 
     # def _get_inverted_transform(self,
     #                             input_def_field_sitk,
@@ -16,6 +16,11 @@ import pysitk.simple_itk_helper as sitkh
 
 import simplereg.data_reader as dr
 import simplereg.data_writer as dw
+import simplereg.utilities as utils
+
+# RegF3D transformation types (NIfTI header intent_p1)
+CUB_SPLINE_GRID = 5
+SPLINE_VEL_GRID = 6
 
 
 ##
@@ -28,7 +33,8 @@ class NiftyRegToSimpleItkConverter(object):
     def convert_nreg_to_sitk_transform(
             path_to_transform_nreg,
             path_to_output,
-            verbose=0
+            verbose=0,
+            dtype=None,
     ):
 
         transform_nreg = dr.DataReader.read_transform_nreg(
@@ -42,7 +48,8 @@ class NiftyRegToSimpleItkConverter(object):
 
         else:
             transform_sitk = NiftyRegToSimpleItkConverter.\
-                convert_regf3d_to_sitk_displacement(transform_nreg)
+                convert_regf3d_to_sitk_displacement(
+                    transform_nreg, dtype=dtype)
             dw.DataWriter.write_transform(
                 transform_sitk, path_to_output, verbose)
 
@@ -53,6 +60,7 @@ class NiftyRegToSimpleItkConverter(object):
             path_to_transform_sitk,
             path_to_output,
             verbose=0,
+            dtype=None,
     ):
 
         transform_sitk = dr.DataReader.read_transform(
@@ -66,7 +74,8 @@ class NiftyRegToSimpleItkConverter(object):
 
         else:
             transform_nreg = NiftyRegToSimpleItkConverter.\
-                convert_sitk_to_regf3d_displacement(transform_sitk)
+                convert_sitk_to_regf3d_displacement(
+                    transform_sitk, dtype=dtype)
             dw.DataWriter.write_transform(
                 transform_nreg, path_to_output, verbose)
 
@@ -124,15 +133,30 @@ class NiftyRegToSimpleItkConverter(object):
 
         return transform_sitk
 
+    ##
+    # Convert a NiftyReg (RegF3D) displacement field to (Simple)ITK one
+    # \date       2026-10-19 17:10:31+0000
+    #
+    # \param      displacement_nreg_nib  Displacement field image as
+    #                                    nib.Nifti1Image object
+    # \param      dtype                  Data type of output, e.g. np.float32.
+    #                                    If None, the data type of the input is
+    #                                    preserved
+    #
+    # \return     Displacement field as nib.Nifti1Image object
+    #
     @staticmethod
-    def convert_regf3d_to_sitk_displacement(displacement_nreg_nib):
+    def convert_regf3d_to_sitk_displacement(displacement_nreg_nib, dtype=None):
 
         # Account for x maps_to -x and y maps_to -y in ITK
-        nda = displacement_nreg_nib.get_data()
+        nda = NiftyRegToSimpleItkConverter._get_displacement_array(
+            displacement_nreg_nib, dtype)
         nda[..., 0:2] *= -1
 
+        header = displacement_nreg_nib.header.copy()
+        header.set_data_dtype(nda.dtype)
         displacement_sitk_nib = nib.Nifti1Image(
-            nda, displacement_nreg_nib.affine, displacement_nreg_nib.header)
+            nda, displacement_nreg_nib.affine, header)
 
         return displacement_sitk_nib
 
@@ -147,18 +171,24 @@ class NiftyRegToSimpleItkConverter(object):
     #
     # \param      displacement_sitk_nib  Displacement field image as
     #                                    nib.Nifti1Image object
+    # \param      dtype                  Data type of output, e.g. np.float32.
+    #                                    If None, the data type of the input is
+    #                                    preserved
     #
     # \return     Displacement field as nib.Nifti1Image object
     #
     @staticmethod
-    def convert_sitk_to_regf3d_displacement(displacement_sitk_nib):
+    def convert_sitk_to_regf3d_displacement(displacement_sitk_nib, dtype=None):
 
         # Account for x maps_to -x and y maps_to -y in ITK
-        nda = displacement_sitk_nib.get_data()
+        nda = NiftyRegToSimpleItkConverter._get_displacement_array(
+            displacement_sitk_nib, dtype)
         nda[..., 0:2] *= -1
 
+        header = displacement_sitk_nib.header.copy()
+        header.set_data_dtype(nda.dtype)
         displacement_nreg_nib = nib.Nifti1Image(
-            nda, displacement_sitk_nib.affine, displacement_sitk_nib.header)
+            nda, displacement_sitk_nib.affine, header)
 
         # Update NIfTI header to indicate a displacement field
         displacement_nreg_nib.header['intent_p1'] = 1
@@ -166,3 +196,187 @@ class NiftyRegToSimpleItkConverter(object):
         displacement_nreg_nib.header['intent_p3'] = 0
 
         return displacement_nreg_nib
+
+    ##
+    # Evaluate a RegF3D cubic B-spline control point grid as dense (Simple)ITK
+    # displacement field on the reference image grid.
+    #
+    # Control points hold deformed positions in NIfTI world coordinates. The
+    # grid is aligned with the reference image and starts one control point
+    # spacing before its first voxel. Evaluation is separable and performed
+    # slab-wise to bound memory. Velocity grids are exponentiated by scaling
+    # and squaring.
+    # \date       2026-10-19 20:52:30+0000
+    #
+    # \param      cpp_nib         Control point grid as nib.Nifti1Image object
+    # \param      reference_sitk  Reference (fixed) image used by RegF3D as
+    #                             sitk.Image object
+    # \param      dtype           Data type of output, i.e. np.float32 or
+    #                             np.float64
+    # \param      slab_size       Approximate number of voxels evaluated at
+    #                             once
+    #
+    # \return     Displacement field as sitk.Image object
+    #
+    @staticmethod
+    def convert_regf3d_cpp_to_sitk_displacement(
+            cpp_nib,
+            reference_sitk,
+            dtype=np.float32,
+            slab_size=2**22,
+    ):
+        pixel_type = dr.DISPLACEMENT_PIXEL_TYPES.get(np.dtype(dtype))
+        if pixel_type is None:
+            raise ValueError(
+                "Displacement field data type must be float32 or float64")
+
+        header = cpp_nib.header
+        intent = int(header["intent_p1"]) \
+            if header.get_intent()[2] == "NREG_TRANS" else CUB_SPLINE_GRID
+        if intent not in [CUB_SPLINE_GRID, SPLINE_VEL_GRID]:
+            raise ValueError(
+                "Control point grid type %d not supported" % intent)
+
+        dim = reference_sitk.GetDimension()
+        size = np.array(reference_sitk.GetSize())
+        spacing = np.array(reference_sitk.GetSpacing())
+
+        # Grid positions as x, y[, z] grid x components array
+        nda_cpp = np.asanyarray(cpp_nib.dataobj)
+        if nda_cpp.shape[-1] != dim:
+            raise ValueError(
+                "Control point grid and reference image dimensions differ")
+        nda_cpp = nda_cpp.reshape(nda_cpp.shape[0:dim] + (dim,))
+        nda_cpp = nda_cpp.astype(np.float64)
+
+        # B-spline weights for each axis as (size x grid size) matrices
+        grid_spacing = np.array(header.get_zooms()[0:dim])
+        weights = [
+            NiftyRegToSimpleItkConverter._get_bspline_weights(
+                size[i], grid_spacing[i] / spacing[i], nda_cpp.shape[i])
+            for i in range(dim)]
+
+        # Index to physical (ITK) space of reference
+        A = utils._get_index_to_physical_matrix(reference_sitk)
+        origin = np.array(reference_sitk.GetOrigin())
+
+        # Account for x maps_to -x and y maps_to -y in ITK
+        flip = np.ones(dim)
+        flip[0:2] = -1
+
+        shape = tuple(size[::-1])
+        n_rows = max(1, slab_size // int(np.prod(shape[1:])))
+        nda = np.empty(shape + (dim,), dtype=dtype)
+        for start in range(0, shape[0], n_rows):
+            stop = min(shape[0], start + n_rows)
+
+            # Contract grid along the slowest axis first for the slab
+            if dim == 3:
+                positions = np.einsum(
+                    "zk,ijkc->zijc", weights[2][start:stop], nda_cpp)
+                positions = np.einsum("yj,zijc->zyic", weights[1], positions)
+                positions = np.einsum("xi,zyic->zyxc", weights[0], positions)
+            else:
+                positions = np.einsum(
+                    "yj,ijc->yic", weights[1][start:stop], nda_cpp)
+                positions = np.einsum("xi,yic->yxc", weights[0], positions)
+
+            # [z,] y, x indices to physical points
+            indices = np.indices((stop - start,) + shape[1:])
+            indices[0] += start
+            points = np.tensordot(
+                indices[::-1], A, axes=([0], [1])) + origin
+
+            nda[start:stop] = positions * flip - points
+
+        displacement_sitk = sitk.GetImageFromArray(nda, isVector=True)
+        displacement_sitk.CopyInformation(reference_sitk)
+
+        if intent == SPLINE_VEL_GRID:
+            displacement_sitk = NiftyRegToSimpleItkConverter._exponentiate(
+                displacement_sitk, int(header["intent_p2"]), dtype, slab_size)
+
+        return displacement_sitk
+
+    ##
+    # Gets the cubic B-spline weights mapping control points to voxels along
+    # one axis.
+    # \date       2026-10-19 20:58:12+0000
+    #
+    # \param      size           Number of voxels
+    # \param      grid_spacing   Control point spacing in voxels
+    # \param      grid_size      Number of control points
+    #
+    # \return     (size x grid_size) numpy array
+    #
+    @staticmethod
+    def _get_bspline_weights(size, grid_spacing, grid_size):
+        position = np.arange(size) / grid_spacing
+        first = np.floor(position).astype(int)
+        if first[-1] + 4 > grid_size:
+            raise ValueError(
+                "Control point grid does not cover the reference image")
+        u = np.clip(position - first, 0, 1)
+        basis = np.stack([
+            (1 - u) ** 3 / 6.,
+            (3 * u ** 3 - 6 * u ** 2 + 4) / 6.,
+            (-3 * u ** 3 + 3 * u ** 2 + 3 * u + 1) / 6.,
+            u ** 3 / 6.,
+        ], axis=1)
+
+        weights = np.zeros((size, grid_size))
+        rows = np.arange(size)
+        for i in range(4):
+            weights[rows, first + i] = basis[:, i]
+        return weights
+
+    ##
+    # Exponentiate a stationary velocity field by scaling and squaring.
+    # NiftyReg marks backward (inverse) velocity grids by a negative number of
+    # steps for which the negated velocity field is exponentiated.
+    # \date       2026-10-19 21:01:40+0000
+    #
+    # \param      velocity_sitk  Velocity field as sitk.Image object
+    # \param      n_steps        Number of squaring steps; negative for
+    #                            backward velocity fields
+    # \param      dtype          Data type of output
+    # \param      slab_size      Approximate number of voxels processed at
+    #                            once
+    #
+    # \return     Displacement field as sitk.Image object
+    #
+    @staticmethod
+    def _exponentiate(velocity_sitk, n_steps, dtype, slab_size):
+        nda = sitk.GetArrayFromImage(velocity_sitk) / float(2 ** abs(n_steps))
+        if n_steps < 0:
+            nda = -nda
+            n_steps = -n_steps
+        displacement_sitk = sitk.GetImageFromArray(
+            nda.astype(dtype), isVector=True)
+        displacement_sitk.CopyInformation(velocity_sitk)
+        for _ in range(n_steps):
+            displacement_sitk = utils.compose_displacement_fields(
+                displacement_sitk, displacement_sitk,
+                dtype=dtype, slab_size=slab_size)
+        return displacement_sitk
+
+    ##
+    # Gets a (writeable) copy of the displacement field data in the requested
+    # precision without an intermediate float64 array.
+    # \date       2026-10-19 17:12:02+0000
+    #
+    # \param      displacement_nib  Displacement field as nib.Nifti1Image
+    # \param      dtype             Data type; None preserves the data type
+    #
+    # \return     Numpy array
+    #
+    @staticmethod
+    def _get_displacement_array(displacement_nib, dtype):
+        nda = np.asanyarray(displacement_nib.dataobj)
+        if dtype is None:
+            dtype = nda.dtype
+
+        # Only freshly read data is modified in place
+        is_shared = nda is displacement_nib.dataobj or \
+            isinstance(nda, np.memmap) or not nda.flags.writeable
+        return np.asarray(nda).astype(dtype, copy=is_shared)
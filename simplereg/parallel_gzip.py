@@ -0,0 +1,242 @@
+##
+# \file parallel_gzip.py
+# \brief      Multi-threaded gzip compression producing standard gzip files
+#
+# Similar to pigz, the input is split into blocks which are deflated in
+# parallel threads (zlib releases the GIL during compression). Each block is
+# primed with the last 32 KiB of its predecessor as dictionary and flushed to
+# a byte boundary so that the concatenated blocks form a single deflate
+# stream which can be decompressed by any gzip reader. Optionally, blocks are
+# compressed independently (similar to 'pigz -i') and a seek-point index is
+# written next to the file to allow for random access.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import time
+import zlib
+import struct
+import concurrent.futures
+
+from simplereg.gzip_index import GzipIndex
+
+# Size of deflate history window
+WINDOW_SIZE = 32768
+
+# Default block size of data compressed per thread
+BLOCK_SIZE = 2**20
+
+
+##
+# Writable binary file object compressing written data in parallel blocks to
+# a standard gzip file. Only a bounded number of blocks is kept in memory.
+# \date       2026-10-19 13:20:44+0000
+#
+class GzipWriter(object):
+
+    ##
+    # Open gzip file for writing
+    # \date       2026-10-19 13:21:30+0000
+    #
+    # \param      self        The object
+    # \param      fileobj     Path to output file or binary file object
+    # \param      level       Compression level between 0 and 9, 1 being the
+    #                         fastest
+    # \param      n_threads   Number of compression threads. If None, the
+    #                         number of available cores is used
+    # \param      block_size  Size of blocks to be compressed in parallel
+    # \param      mtime       Modification time stored in the gzip header
+    # \param      index       Turn on/off independent compression of blocks
+    #                         and writing of a persistent seek-point index
+    #                         next to the gzip file (requires a path); see
+    #                         gzip_index.GzipIndex
+    #
+    def __init__(self,
+                 fileobj,
+                 level=6,
+                 n_threads=None,
+                 block_size=BLOCK_SIZE,
+                 mtime=None,
+                 index=False,
+                 ):
+
+        if level not in range(10):
+            raise ValueError("Compression level must be between 0 and 9")
+        if block_size < WINDOW_SIZE:
+            raise ValueError(
+                "Block size must be at least %d bytes" % WINDOW_SIZE)
+        if n_threads is None:
+            n_threads = os.cpu_count() or 1
+
+        if isinstance(fileobj, str):
+            self._path_to_file = fileobj
+            self._fileobj = open(fileobj, "wb")
+            self._close_fileobj = True
+        else:
+            if index:
+                raise ValueError("Seek-point index requires a path")
+            self._path_to_file = None
+            self._fileobj = fileobj
+            self._close_fileobj = False
+
+        self._level = level
+        self._n_threads = max(1, int(n_threads))
+        self._block_size = block_size
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            self._n_threads)
+        self._futures = []
+        self._buffer = bytearray()
+        self._dictionary = None
+        self._crc = 0
+        self._length = 0
+        self._closed = False
+
+        # Uncompressed offsets of submitted blocks and (uncompressed,
+        # compressed) offset pairs of written blocks
+        self._index = index
+        self._offsets_submitted = []
+        self._offsets = []
+        self._length_submitted = 0
+
+        header = self._get_header(level, mtime)
+        self._fileobj.write(header)
+        self._length_compressed = len(header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def tell(self):
+        return self._length
+
+    def write(self, data):
+        if self._closed:
+            raise ValueError("I/O operation on closed file")
+        data = memoryview(data).cast("B")
+        self._crc = zlib.crc32(data, self._crc)
+        self._length += len(data)
+        self._buffer += data
+
+        # Keep last block in buffer; it may turn out to be the final one
+        while len(self._buffer) > self._block_size:
+            block = bytes(self._buffer[:self._block_size])
+            del self._buffer[:self._block_size]
+            self._submit(block, is_last=False)
+        return len(data)
+
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self._submit(bytes(self._buffer), is_last=True)
+            self._buffer = bytearray()
+            while len(self._futures) > 0:
+                self._write_block()
+            self._fileobj.write(struct.pack(
+                "<II", self._crc & 0xffffffff, self._length & 0xffffffff))
+        finally:
+            self._closed = True
+            self._executor.shutdown()
+            if self._close_fileobj:
+                self._fileobj.close()
+
+        if self._index:
+            GzipIndex.write_index(
+                self._path_to_file, self._offsets, self._length)
+
+    def _submit(self, block, is_last):
+        self._futures.append(self._executor.submit(
+            self._compress_block, block, self._dictionary, self._level,
+            is_last))
+        self._offsets_submitted.append(self._length_submitted)
+        self._length_submitted += len(block)
+
+        # Independent blocks can be decompressed without preceding data
+        if not self._index:
+            self._dictionary = block[-WINDOW_SIZE:]
+
+        # Write compressed blocks in order while keeping a bounded number of
+        # blocks in flight
+        while len(self._futures) > 2 * self._n_threads:
+            self._write_block()
+
+    def _write_block(self):
+        data = self._futures.pop(0).result()
+        self._offsets.append(
+            (self._offsets_submitted.pop(0), self._length_compressed))
+        self._fileobj.write(data)
+        self._length_compressed += len(data)
+
+    @staticmethod
+    def _compress_block(block, dictionary, level, is_last):
+        if dictionary:
+            compressor = zlib.compressobj(
+                level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+        else:
+            compressor = zlib.compressobj(
+                level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        data = compressor.compress(block)
+        if is_last:
+            data += compressor.flush(zlib.Z_FINISH)
+        else:
+            # Byte-align output without marking the last deflate block
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data
+
+    @staticmethod
+    def _get_header(level, mtime):
+        if mtime is None:
+            mtime = int(time.time())
+
+        # Extra flags indicate maximum (2) or fastest (4) compression
+        if level == 9:
+            xfl = 2
+        elif level == 1:
+            xfl = 4
+        else:
+            xfl = 0
+
+        # Magic number, deflate method, no flags, mtime, xfl and unknown OS
+        return struct.pack(
+            "<BBBBIBB", 0x1f, 0x8b, 8, 0, mtime & 0xffffffff, xfl, 255)
+
+
+##
+# Compress a file to a (standard) gzip file using several threads.
+# \date       2026-10-19 13:27:10+0000
+#
+# \param      path_to_input   Path to input file
+# \param      path_to_output  Path to gzip output file
+# \param      level           Compression level between 0 and 9, 1 being the
+#                             fastest
+# \param      n_threads       Number of compression threads. If None, the
+#                             number of available cores is used
+# \param      block_size      Size of blocks to be compressed in parallel
+# \param      index           Turn on/off independent compression of blocks
+#                             and writing of a seek-point index
+#
+def compress_file(path_to_input,
+                  path_to_output,
+                  level=6,
+                  n_threads=None,
+                  block_size=BLOCK_SIZE,
+                  index=False,
+                  ):
+    with open(path_to_input, "rb") as fileobj_in:
+        with GzipWriter(
+                path_to_output,
+                level=level,
+                n_threads=n_threads,
+                block_size=block_size,
+                mtime=int(os.stat(path_to_input).st_mtime),
+                index=index) as writer:
+            while True:
+                block = fileobj_in.read(block_size)
+                if len(block) == 0:
+                    break
+                writer.write(block)
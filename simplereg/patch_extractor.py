@@ -0,0 +1,228 @@
+##
+# \file patch_extractor.py
+# \brief      Class to extract (oriented) image patches around landmarks in a
+#             single vectorized interpolation pass
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import numpy as np
+import scipy.ndimage
+import SimpleITK as sitk
+
+from simplereg.definitions import INTERPOLATOR_ORDERS
+
+
+##
+# Class to extract (oriented) image patches around landmarks.
+#
+# Sampling grids of all patches are built as one coordinate tensor and
+# interpolated in a single scipy.ndimage.map_coordinates pass. If a path to
+# the image is given, only the bounding region of all patches is read from
+# file.
+# \date       2026-10-19 10:02:47+0000
+#
+class PatchExtractor(object):
+
+    ##
+    # Store patch extraction settings
+    # \date       2026-10-19 10:03:31+0000
+    #
+    # \param      self           The object
+    # \param      image          Image as sitk.Image object or path to image
+    # \param      landmarks_nda  Landmarks as (L x dim) numpy array, e.g. as
+    #                            obtained by DataReader.read_landmarks
+    # \param      size           Patch size (x, y[, z]) in voxels. If scalar,
+    #                            isotropic patches are assumed
+    # \param      spacing        Patch spacing in mm. If None, image spacing
+    #                            is used
+    # \param      rotations      Optional rotation matrices in physical space,
+    #                            either (dim x dim) for all or (L x dim x dim)
+    #                            for per-landmark patch orientations. Patch
+    #                            axes are aligned with image axes otherwise
+    # \param      interpolator   Interpolator, i.e. NearestNeighbor, Linear or
+    #                            BSpline
+    # \param      padding        Padding value for samples outside the image
+    #
+    def __init__(self,
+                 image,
+                 landmarks_nda,
+                 size,
+                 spacing=None,
+                 rotations=None,
+                 interpolator="Linear",
+                 padding=0,
+                 ):
+
+        if interpolator not in INTERPOLATOR_ORDERS:
+            raise ValueError(
+                "Interpolator not known. Allowed options are: %s" % (
+                    ", ".join(INTERPOLATOR_ORDERS.keys())))
+
+        self._image = image
+        self._landmarks_nda = np.atleast_2d(landmarks_nda)
+        self._size = size
+        self._spacing = spacing
+        self._rotations = rotations
+        self._interpolator = interpolator
+        self._padding = padding
+
+        self._patches_nda = None
+        self._patch_directions = None
+        self._patch_origins = None
+        self._patch_spacing = None
+
+    ##
+    # Gets the extracted patches.
+    # \date       2026-10-19 10:05:12+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Patches as (L x [D x] H x W) numpy array, i.e. each patch
+    #             meets the ITK<->Numpy convention
+    #
+    def get_patches_nda(self):
+        if self._patches_nda is None:
+            raise RuntimeError("Execute 'run' first")
+        return np.array(self._patches_nda)
+
+    ##
+    # Gets the extracted patches including their physical image header
+    # \date       2026-10-19 10:06:40+0000
+    #
+    # \param      self  The object
+    #
+    # \return     List of L patches as sitk.Image objects
+    #
+    def get_patches_sitk(self):
+        if self._patches_nda is None:
+            raise RuntimeError("Execute 'run' first")
+
+        patches_sitk = []
+        for i in range(self._patches_nda.shape[0]):
+            patch_sitk = sitk.GetImageFromArray(self._patches_nda[i])
+            patch_sitk.SetSpacing(self._patch_spacing)
+            patch_sitk.SetOrigin(self._patch_origins[i])
+            patch_sitk.SetDirection(self._patch_directions[i].flatten())
+            patches_sitk.append(patch_sitk)
+        return patches_sitk
+
+    def run(self):
+
+        # Read image geometry (header only if path is given)
+        if isinstance(self._image, sitk.Image):
+            reader = None
+            origin = np.array(self._image.GetOrigin())
+            spacing = np.array(self._image.GetSpacing())
+            direction = np.array(self._image.GetDirection())
+            image_size = np.array(self._image.GetSize())
+        else:
+            reader = sitk.ImageFileReader()
+            reader.SetFileName(self._image)
+            reader.ReadImageInformation()
+            origin = np.array(reader.GetOrigin())
+            spacing = np.array(reader.GetSpacing())
+            direction = np.array(reader.GetDirection())
+            image_size = np.array(reader.GetSize())
+        dim = origin.size
+        direction = direction.reshape(dim, dim)
+
+        if self._landmarks_nda.shape[1] != dim:
+            raise IOError(
+                "Landmark dimension must match image dimension")
+
+        # Patch grid in voxel space
+        size = np.atleast_1d(self._size).astype(int)
+        if size.size == 1:
+            size = np.ones(dim, dtype=int) * size[0]
+        if self._spacing is None:
+            patch_spacing = spacing
+        else:
+            patch_spacing = np.atleast_1d(self._spacing).astype(np.float64)
+            if patch_spacing.size == 1:
+                patch_spacing = np.ones(dim) * patch_spacing[0]
+        rotations = self._get_rotations(dim)
+
+        # Offsets of patch voxels relative to patch center, (dim x N)
+        offsets = np.array(np.meshgrid(
+            *[np.arange(n) - (n - 1) / 2. for n in size],
+            indexing="ij")).reshape(dim, -1)
+        offsets *= patch_spacing[:, np.newaxis]
+
+        # Physical points of all patches as one tensor, (L x dim x N)
+        self._patch_directions = np.einsum(
+            "lij,jk->lik", rotations, direction)
+        points = np.einsum("lij,jn->lin", self._patch_directions, offsets)
+        points += self._landmarks_nda[:, :, np.newaxis]
+        self._patch_origins = points[:, :, 0]
+        self._patch_spacing = patch_spacing
+
+        # Continuous voxel indices in image space, (dim x L*N)
+        A_inv = np.linalg.inv(direction.dot(np.diag(spacing)))
+        indices = A_inv.dot(
+            np.transpose(points, (1, 0, 2)).reshape(dim, -1) -
+            origin[:, np.newaxis])
+
+        # Bounding region needed for interpolation (incl. spline support)
+        order = INTERPOLATOR_ORDERS[self._interpolator]
+        margin = 1 + order // 2
+        finite = np.all(np.isfinite(indices), axis=0)
+        if np.any(finite):
+            index_min = np.floor(indices[:, finite].min(axis=1)) - margin
+            index_max = np.ceil(indices[:, finite].max(axis=1)) + margin + 1
+        else:
+            index_min = np.zeros(dim)
+            index_max = np.zeros(dim)
+        index_min = np.clip(index_min, 0, image_size).astype(int)
+        index_max = np.clip(index_max, 0, image_size).astype(int)
+        region_size = index_max - index_min
+
+        if np.any(region_size == 0):
+            nda = np.ones(size[::-1], dtype=np.float64) * self._padding
+            self._patches_nda = np.tile(
+                nda, (self._landmarks_nda.shape[0],) + (1,) * dim)
+            return
+
+        # Read bounding region only
+        if reader is not None:
+            reader.SetExtractIndex([int(i) for i in index_min])
+            reader.SetExtractSize([int(i) for i in region_size])
+            region_sitk = reader.Execute()
+        else:
+            region_sitk = sitk.RegionOfInterest(
+                self._image,
+                [int(i) for i in region_size],
+                [int(i) for i in index_min])
+        region_nda = sitk.GetArrayViewFromImage(region_sitk)
+
+        # Interpolate all patches at once; coordinates in [z,] y, x order.
+        # Data type is only preserved for nearest neighbour interpolation
+        indices -= index_min[:, np.newaxis]
+        patches_nda = scipy.ndimage.map_coordinates(
+            region_nda,
+            indices[::-1],
+            output=region_nda.dtype if order == 0 else np.float64,
+            order=order,
+            mode="constant",
+            cval=self._padding,
+        )
+
+        # (L x N) with N in x, y[, z] order to (L x [z x] y x x)
+        shape = (self._landmarks_nda.shape[0],) + tuple(size)
+        patches_nda = patches_nda.reshape(shape)
+        self._patches_nda = np.transpose(
+            patches_nda, [0] + list(range(dim, 0, -1)))
+
+    def _get_rotations(self, dim):
+        n_landmarks = self._landmarks_nda.shape[0]
+        if self._rotations is None:
+            return np.tile(np.eye(dim), (n_landmarks, 1, 1))
+
+        rotations = np.array(self._rotations, dtype=np.float64)
+        if rotations.shape == (dim, dim):
+            return np.tile(rotations, (n_landmarks, 1, 1))
+        if rotations.shape != (n_landmarks, dim, dim):
+            raise IOError(
+                "Rotations must be of shape (dim x dim) or (L x dim x dim)")
+        return rotations
@@ -0,0 +1,363 @@
+##
+# \file registration_cache.py
+# \brief      Content-addressed on-disk cache for registration results
+#
+# Each entry is a directory named by the hash of the voxel data and geometry
+# of the fixed and moving images and masks, the options of the registration
+# method and the version of its backend (SimpleITK or the executable of the
+# command line tool). Entries are written to a temporary directory first and
+# renamed atomically, i.e. concurrent writers (threads or processes) never
+# produce partial entries. Least recently used entries are evicted once the
+# cache exceeds its size budget.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import datetime
+import tempfile
+import threading
+import numpy as np
+import SimpleITK as sitk
+
+from simplereg.__about__ import __version__
+
+# Prefix of directories not (or no longer) holding a complete entry
+TMP_PREFIX = ".tmp_"
+
+# File holding computational time and metadata of an entry
+INFO_FILE = "info.json"
+
+# File holding the time of last use of an entry in nanoseconds
+LAST_USED_FILE = "last_used"
+
+# Temporary directories left behind, e.g. by killed writers, are deleted
+# after this time in seconds
+STALE_TIME = 3600
+
+# Last time of use handed out by this process, see _get_time_used
+_time_used = 0
+_time_used_lock = threading.Lock()
+
+
+##
+# On-disk cache of registration results shared by all registration methods
+# derived from SimpleItkRegistrationBase.
+# \date       2026-10-19 22:20:12+0000
+#
+class RegistrationCache(object):
+
+    ##
+    # Store cache settings
+    # \date       2026-10-19 22:20:40+0000
+    #
+    # \param      self       The object
+    # \param      directory  Directory of the cache; created if not existing
+    # \param      max_bytes  Size budget in bytes. Least recently used
+    #                        entries are evicted if budget is exceeded
+    #
+    def __init__(self, directory, max_bytes=2**32):
+        self._directory = directory
+        self._max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+
+    def get_directory(self):
+        return self._directory
+
+    ##
+    # Gets the key of the result of a registration. It requires the images
+    # to be set.
+    # \date       2026-10-19 22:22:31+0000
+    #
+    # \param      self          The object
+    # \param      registration  SimpleItkRegistrationBase object
+    #
+    # \return     Key as hexadecimal string
+    #
+    def get_key(self, registration):
+        description = {
+            "method": type(registration).__name__,
+            "simplereg": __version__,
+            "options": registration._get_cache_options(),
+            "fixed": get_image_digest(registration.get_fixed_sitk()),
+            "moving": get_image_digest(registration.get_moving_sitk()),
+            "fixed_mask": get_image_digest(
+                registration.get_fixed_sitk_mask()),
+            "moving_mask": get_image_digest(
+                registration.get_moving_sitk_mask()),
+        }
+        return hashlib.sha256(json.dumps(
+            description, sort_keys=True, default=_to_json).encode()
+        ).hexdigest()
+
+    ##
+    # Sets the result of a registration from the cache if available.
+    # \date       2026-10-19 22:24:12+0000
+    #
+    # \param      self          The object
+    # \param      key           Key as returned by get_key
+    # \param      registration  SimpleItkRegistrationBase object
+    #
+    # \return     Computational time of the cached registration as
+    #             datetime.timedelta; None if result is not cached
+    #
+    def read(self, key, registration):
+        path_to_entry = os.path.join(self._directory, key)
+        try:
+            with open(os.path.join(path_to_entry, INFO_FILE)) as fileobj:
+                info = json.load(fileobj)
+            registration._read_cache_entry(path_to_entry)
+
+        # Entry does not exist or got evicted while reading
+        except (IOError, OSError, ValueError, KeyError, RuntimeError):
+            with self._lock:
+                self._misses += 1
+            return None
+
+        # Mark entry as recently used unless evicted meanwhile
+        try:
+            self._write_time_used(path_to_entry)
+        except OSError:
+            pass
+
+        with self._lock:
+            self._hits += 1
+        return datetime.timedelta(seconds=info["computational_time"])
+
+    ##
+    # Writes the result of a registration to the cache and evicts least
+    # recently used entries if the size budget is exceeded.
+    # \date       2026-10-19 22:26:40+0000
+    #
+    # \param      self          The object
+    # \param      key           Key as returned by get_key
+    # \param      registration  SimpleItkRegistrationBase object which has
+    #                           been run
+    #
+    def write(self, key, registration):
+        path_to_entry = os.path.join(self._directory, key)
+        if os.path.isdir(path_to_entry):
+            return
+
+        os.makedirs(self._directory, exist_ok=True)
+        path_to_tmp = tempfile.mkdtemp(prefix=TMP_PREFIX, dir=self._directory)
+        try:
+            registration._write_cache_entry(path_to_tmp)
+            info = {
+                "method": type(registration).__name__,
+                "computational_time":
+                    registration.get_computational_time().total_seconds(),
+            }
+            with open(os.path.join(path_to_tmp, INFO_FILE), "w") as fileobj:
+                json.dump(info, fileobj)
+            self._write_time_used(path_to_tmp)
+
+            # Fails if a concurrent writer created the entry meanwhile
+            os.rename(path_to_tmp, path_to_entry)
+        except OSError:
+            shutil.rmtree(path_to_tmp, ignore_errors=True)
+            if not os.path.isdir(path_to_entry):
+                raise
+            return
+        except BaseException:
+            shutil.rmtree(path_to_tmp, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self._writes += 1
+        self._evict()
+
+    ##
+    # Deletes all entries.
+    # \date       2026-10-19 22:28:02+0000
+    #
+    # \param      self  The object
+    #
+    def clear(self):
+        for name in self._get_names():
+            self._delete(name)
+
+    ##
+    # Gets the cache statistics of this object together with the number and
+    # size of entries on disk.
+    # \date       2026-10-19 22:28:45+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Dictionary with number of hits, misses, writes, evictions,
+    #             entries and bytes in use
+    #
+    def get_statistics(self):
+        entries = self._get_entries()
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "writes": self._writes,
+                "evictions": self._evictions,
+                "entries": len(entries),
+                "bytes": sum(e[2] for e in entries),
+                "max_bytes": self._max_bytes,
+            }
+
+    ##
+    # Evicts least recently used entries until the size budget is met.
+    # \date       2026-10-19 22:30:10+0000
+    #
+    # \param      self  The object
+    #
+    def _evict(self):
+
+        # Ties of the time of last use are broken by name
+        entries = sorted(self._get_entries(), key=lambda e: (e[1], e[0]))
+        n_bytes = sum(e[2] for e in entries)
+        for name, _, size in entries:
+            if n_bytes <= self._max_bytes:
+                break
+            if self._delete(name):
+                with self._lock:
+                    self._evictions += 1
+            n_bytes -= size
+
+        # Clean up after writers which did not finish
+        time_stale = time.time() - STALE_TIME
+        for name in self._get_names(prefix=TMP_PREFIX):
+            path = os.path.join(self._directory, name)
+            try:
+                if os.path.getmtime(path) < time_stale:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+    ##
+    # Deletes an entry. It is renamed first so that readers never see a
+    # partially deleted entry and concurrent deletions do not interfere.
+    # \date       2026-10-19 22:31:33+0000
+    #
+    # \param      self  The object
+    # \param      name  Name of entry, i.e. its key
+    #
+    # \return     True if deleted by this call, False otherwise
+    #
+    def _delete(self, name):
+        path_to_trash = os.path.join(
+            self._directory, "%sdeleted_%s_%d_%d" % (
+                TMP_PREFIX, name, os.getpid(), threading.get_ident()))
+        try:
+            os.rename(os.path.join(self._directory, name), path_to_trash)
+        except OSError:
+            return False
+        shutil.rmtree(path_to_trash, ignore_errors=True)
+        return True
+
+    ##
+    # Gets the entries on disk.
+    # \date       2026-10-19 22:32:40+0000
+    #
+    # \param      self  The object
+    #
+    # \return     List of (name, time of last use, size in bytes) tuples
+    #
+    def _get_entries(self):
+        entries = []
+        for name in self._get_names():
+            path_to_entry = os.path.join(self._directory, name)
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(path_to_entry))
+                with open(os.path.join(path_to_entry, LAST_USED_FILE)) as \
+                        fileobj:
+                    time_used = int(fileobj.read())
+            except OSError:
+                continue
+
+            # Corrupt entries are evicted first
+            except ValueError:
+                time_used = 0
+            entries.append((name, time_used, size))
+        return entries
+
+    ##
+    # Writes the time of last use into an entry. The file is replaced
+    # atomically, i.e. concurrent readers never see a partial time.
+    # \date       2026-10-19 22:33:21+0000
+    #
+    # \param      path_to_entry  Path to entry directory
+    #
+    @staticmethod
+    def _write_time_used(path_to_entry):
+        path_to_file = os.path.join(path_to_entry, LAST_USED_FILE)
+        path_to_tmp = "%s%s_%d_%d" % (
+            path_to_file, TMP_PREFIX, os.getpid(), threading.get_ident())
+        with open(path_to_tmp, "w") as fileobj:
+            fileobj.write(str(_get_time_used()))
+        os.replace(path_to_tmp, path_to_file)
+
+    def _get_names(self, prefix=None):
+        if not os.path.isdir(self._directory):
+            return []
+        names = os.listdir(self._directory)
+        if prefix is None:
+            return [n for n in names if not n.startswith(TMP_PREFIX)]
+        return [n for n in names if n.startswith(prefix)]
+
+
+##
+# Gets a digest of the voxel data and geometry of an image.
+# \date       2026-10-19 22:34:12+0000
+#
+# \param      image_sitk  Image as sitk.Image object or None
+#
+# \return     Digest as hexadecimal string; None if image is None
+#
+def get_image_digest(image_sitk):
+    if image_sitk is None:
+        return None
+
+    sha = hashlib.sha256()
+    sha.update(json.dumps([
+        image_sitk.GetPixelIDValue(),
+        image_sitk.GetNumberOfComponentsPerPixel(),
+        image_sitk.GetSize(),
+        image_sitk.GetSpacing(),
+        image_sitk.GetOrigin(),
+        image_sitk.GetDirection(),
+    ]).encode())
+    nda = np.ascontiguousarray(sitk.GetArrayViewFromImage(image_sitk))
+    sha.update(memoryview(nda).cast("B"))
+    return sha.hexdigest()
+
+
+##
+# Gets the current time in nanoseconds. Times handed out by this process are
+# strictly increasing, i.e. unique even if the clock resolution is coarse.
+# \date       2026-10-19 22:35:02+0000
+#
+# \return     Time in nanoseconds since the epoch
+#
+def _get_time_used():
+    global _time_used
+    with _time_used_lock:
+        _time_used = max(time.time_ns(), _time_used + 1)
+        return _time_used
+
+
+def _to_json(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, sitk.Transform):
+        return [obj.GetName(), obj.GetParameters(), obj.GetFixedParameters()]
+    raise ValueError(
+        "Option of type '%s' cannot be used as cache key" %
+        type(obj).__name__)
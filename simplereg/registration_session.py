@@ -0,0 +1,319 @@
+##
+# \file registration_session.py
+# \brief      Registration of many moving images to one fixed image with
+#             wrapped registration tools
+#
+# The fixed image and its mask are written to a session directory once and
+# passed as-is to each registration, i.e. per moving image only the moving
+# image (and its mask) is staged. Resampled versions of the fixed image, e.g.
+# for coarse initial registrations, are staged once per spacing as well.
+# Shared files are reference counted by the registrations in flight and
+# deleted once the session is closed and the last registration finished.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import shutil
+import tempfile
+import threading
+import concurrent.futures
+import numpy as np
+import SimpleITK as sitk
+
+import pysitk.simple_itk_helper as sitkh
+
+from simplereg.definitions import DIR_TMP
+
+
+##
+# Session of registrations sharing a fixed image and mask
+# \date       2026-10-19 23:25:10+0000
+#
+class RegistrationSession(object):
+
+    ##
+    # Store fixed image and mask. Files are staged on first use.
+    # \date       2026-10-19 23:25:51+0000
+    #
+    # \param      self                 The object
+    # \param      create_registration  Function creating a registration
+    #                                  method (WrapperRegistration object),
+    #                                  e.g. lambda: RegAladin(omp=4)
+    # \param      fixed_sitk           Fixed image as sitk.Image object
+    # \param      fixed_sitk_mask      Fixed image mask as sitk.Image object
+    # \param      dir_tmp              Root directory of the session
+    #                                  directory, e.g. a tmpfs mount
+    #
+    def __init__(self,
+                 create_registration,
+                 fixed_sitk,
+                 fixed_sitk_mask=None,
+                 dir_tmp=DIR_TMP,
+                 ):
+        if not isinstance(fixed_sitk, sitk.Image):
+            raise ValueError("Fixed image must be of type SimpleITK.Image")
+        if fixed_sitk_mask is not None and \
+                not isinstance(fixed_sitk_mask, sitk.Image):
+            raise ValueError(
+                "Fixed image mask must be of type SimpleITK.Image")
+
+        self._create_registration = create_registration
+        self._fixed_sitk = fixed_sitk
+        self._fixed_sitk_mask = fixed_sitk_mask
+        self._dir_root = dir_tmp
+
+        self._lock = threading.Lock()
+        self._directory = None
+        self._n_references = 0
+        self._closed = False
+
+        # Futures of staged fixed images and masks by spacing (None for
+        # original grid)
+        self._staged = {}
+        self._n_resampled = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_directory(self):
+        return self._directory
+
+    def get_number_of_references(self):
+        with self._lock:
+            return self._n_references
+
+    def is_closed(self):
+        return self._closed
+
+    ##
+    # Gets the staged fixed image and mask. They are resampled to the given
+    # spacing and written to the session directory once. Concurrent callers
+    # wait for the first one staging them; the lock is not held meanwhile.
+    # \date       2026-10-19 23:28:12+0000
+    #
+    # \param      self     The object
+    # \param      spacing  Spacing of resampled fixed image; original grid if
+    #                      None
+    #
+    # \return     Tuple of fixed image, path to its file, mask and path to
+    #             its file; mask and its path are None if not given
+    #
+    def get_fixed(self, spacing=None):
+        if spacing is not None:
+            spacing = tuple(float(s) for s in spacing)
+            if len(spacing) != self._fixed_sitk.GetDimension():
+                raise ValueError(
+                    "Spacing must be of dimension %d" %
+                    self._fixed_sitk.GetDimension())
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Registration session is closed")
+            future = self._staged.get(spacing)
+            is_staging = future is None
+            if is_staging:
+                if self._directory is None:
+                    os.makedirs(self._dir_root, exist_ok=True)
+                    self._directory = tempfile.mkdtemp(
+                        prefix="session_", dir=self._dir_root)
+                directory = self._directory
+                suffix = ""
+                if spacing is not None:
+                    suffix = "_%d" % self._n_resampled
+                    self._n_resampled += 1
+                future = concurrent.futures.Future()
+                self._staged[spacing] = future
+
+        if is_staging:
+            try:
+                future.set_result(self._stage(directory, spacing, suffix))
+            except BaseException as e:
+                # Allow later calls to stage again
+                with self._lock:
+                    if self._staged.get(spacing) is future:
+                        del self._staged[spacing]
+                future.set_exception(e)
+                raise
+
+        return future.result()
+
+    ##
+    # Register a moving image to the fixed image.
+    # \date       2026-10-19 23:30:02+0000
+    #
+    # \param      self              The object
+    # \param      moving_sitk       Moving image as sitk.Image object
+    # \param      moving_sitk_mask  Moving image mask as sitk.Image object
+    # \param      spacing           Spacing of the resampled fixed image to
+    #                               register to; original grid if None
+    #
+    # \return     Registration method (WrapperRegistration object) which has
+    #             been run
+    #
+    def register(self, moving_sitk, moving_sitk_mask=None, spacing=None):
+        registration = self._get_registration(
+            moving_sitk, moving_sitk_mask, spacing)
+        try:
+            registration.run()
+        finally:
+            self._release()
+        return registration
+
+    ##
+    # Register a moving image to the fixed image as coroutine, see
+    # WrapperRegistration.run_async.
+    # \date       2026-10-19 23:31:40+0000
+    #
+    # \param      self              The object
+    # \param      moving_sitk       Moving image as sitk.Image object
+    # \param      moving_sitk_mask  Moving image mask as sitk.Image object
+    # \param      spacing           Spacing of the resampled fixed image to
+    #                               register to; original grid if None
+    # \param      semaphore         Optional asyncio.Semaphore limiting the
+    #                               number of registrations running
+    #                               concurrently
+    #
+    # \return     Registration method (WrapperRegistration object) which has
+    #             been run
+    #
+    async def register_async(self,
+                             moving_sitk,
+                             moving_sitk_mask=None,
+                             spacing=None,
+                             semaphore=None,
+                             ):
+        registration = self._get_registration(
+            moving_sitk, moving_sitk_mask, spacing)
+        try:
+            await registration.run_async(semaphore=semaphore)
+        finally:
+            self._release()
+        return registration
+
+    ##
+    # Close the session. Shared files are deleted as soon as all
+    # registrations in flight finished.
+    # \date       2026-10-19 23:33:12+0000
+    #
+    # \param      self  The object
+    #
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._n_references == 0:
+                self._delete()
+
+    ##
+    # Creates a registration method using the staged fixed image and mask.
+    # The returned registration holds a reference to the shared files which
+    # must be released after running it.
+    # \date       2026-10-19 23:34:40+0000
+    #
+    # \param      self              The object
+    # \param      moving_sitk       Moving image as sitk.Image object
+    # \param      moving_sitk_mask  Moving image mask as sitk.Image object
+    # \param      spacing           Spacing of the resampled fixed image
+    #
+    # \return     WrapperRegistration object
+    #
+    def _get_registration(self, moving_sitk, moving_sitk_mask, spacing):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Registration session is closed")
+            self._n_references += 1
+
+        try:
+            fixed_sitk, path_to_fixed, fixed_sitk_mask, path_to_fixed_mask = \
+                self.get_fixed(spacing)
+            registration = self._create_registration()
+            registration.set_fixed_sitk(
+                fixed_sitk, path_to_file=path_to_fixed)
+            registration.set_fixed_sitk_mask(
+                fixed_sitk_mask, path_to_file=path_to_fixed_mask)
+            registration.set_moving_sitk(moving_sitk)
+            registration.set_moving_sitk_mask(moving_sitk_mask)
+        except BaseException:
+            self._release()
+            raise
+
+        return registration
+
+    def _release(self):
+        with self._lock:
+            self._n_references -= 1
+            if self._closed and self._n_references == 0:
+                self._delete()
+
+    ##
+    # Writes the (resampled) fixed image and mask to the session directory.
+    # \date       2026-10-19 23:36:31+0000
+    #
+    # \param      self       The object
+    # \param      directory  Session directory
+    # \param      spacing    Spacing of resampled fixed image; original grid
+    #                        if None
+    # \param      suffix     Suffix of the filenames
+    #
+    # \return     Tuple as returned by get_fixed
+    #
+    def _stage(self, directory, spacing, suffix):
+        fixed_sitk = self._fixed_sitk
+        fixed_sitk_mask = self._fixed_sitk_mask
+        if spacing is not None:
+            fixed_sitk = self._get_resampled_sitk(
+                fixed_sitk, spacing, sitk.sitkLinear)
+            if fixed_sitk_mask is not None:
+                fixed_sitk_mask = sitk.Resample(
+                    fixed_sitk_mask, fixed_sitk, sitk.Transform(),
+                    sitk.sitkNearestNeighbor, 0,
+                    fixed_sitk_mask.GetPixelIDValue())
+
+        # Uncompressed NIfTI avoids costly gzip round-trips
+        path_to_fixed = os.path.join(directory, "fixed%s.nii" % suffix)
+        sitkh.write_nifti_image_sitk(fixed_sitk, path_to_fixed)
+
+        path_to_fixed_mask = None
+        if fixed_sitk_mask is not None:
+            path_to_fixed_mask = os.path.join(
+                directory, "fixed_mask%s.nii" % suffix)
+            sitkh.write_nifti_image_sitk(fixed_sitk_mask, path_to_fixed_mask)
+
+        return fixed_sitk, path_to_fixed, fixed_sitk_mask, path_to_fixed_mask
+
+    ##
+    # Gets an image resampled to a new spacing covering the same physical
+    # extent, i.e. the first voxel corners of both grids coincide.
+    # \date       2026-10-19 23:38:02+0000
+    #
+    # \param      image_sitk    Image as sitk.Image object
+    # \param      spacing       New spacing
+    # \param      interpolator  sitk interpolator
+    #
+    # \return     Resampled image as sitk.Image object
+    #
+    @staticmethod
+    def _get_resampled_sitk(image_sitk, spacing, interpolator):
+        size = [max(1, int(round(n * s0 / s))) for n, s0, s in zip(
+            image_sitk.GetSize(), image_sitk.GetSpacing(), spacing)]
+        dimension = image_sitk.GetDimension()
+        direction = np.array(image_sitk.GetDirection()).reshape(
+            dimension, dimension)
+        origin = np.array(image_sitk.GetOrigin()) + direction.dot(
+            np.array(spacing) - image_sitk.GetSpacing()) / 2.
+        return sitk.Resample(
+            image_sitk, size, sitk.Transform(), interpolator,
+            origin.tolist(), spacing, image_sitk.GetDirection(), 0,
+            image_sitk.GetPixelIDValue())
+
+    # Must be called with the lock held
+    def _delete(self):
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+        self._directory = None
+        self._staged = {}
+        self._n_resampled = 0
@@ -18,6 +18,7 @@ import pysitk.simple_itk_helper as sitkh
 import simplereg.data_reader as dr
 import simplereg.data_writer as dw
 import simplereg.utilities as utils
+from simplereg.memmap_image import MemmapImage
 from simplereg.niftyreg_to_simpleitk_converter import \
     NiftyRegToSimpleItkConverter as nreg2sitk
 
@@ -26,6 +27,24 @@ from simplereg.definitions import ALLOWED_INTERPOLATORS
 
 class Resampler(object):
 
+    ##
+    # Store resampling settings
+    # \date       2026-10-19 11:08:53+0000
+    #
+    # \param      self               The object
+    # \param      path_to_fixed      Path to fixed image defining the space
+    # \param      path_to_moving     Path to moving image
+    # \param      path_to_transform  Path to transform (or displacement field)
+    #                                or ordered list of paths. A list
+    #                                [T_1, ..., T_n] is equivalent to
+    #                                resampling with T_1, ..., T_n one after
+    #                                another but only interpolates once.
+    # \param      path_to_mask       Optional path to mask. If given, the
+    #                                output grid is cropped to its bounding box
+    # \param      roi                Optional region of interest given by two
+    #                                physical points to crop the output grid
+    # \param      margin             Margin in mm around mask/ROI bounding box
+    #
     def __init__(self,
                  path_to_fixed,
                  path_to_moving,
@@ -34,6 +53,9 @@ class Resampler(object):
                  spacing=None,
                  padding=0,
                  add_to_grid=0,
+                 path_to_mask=None,
+                 roi=None,
+                 margin=0,
                  verbose=0,
                  ):
 
@@ -44,6 +66,9 @@ class Resampler(object):
         self._spacing = spacing
         self._padding = padding
         self._add_to_grid = add_to_grid
+        self._path_to_mask = path_to_mask
+        self._roi = roi
+        self._margin = margin
         self._verbose = verbose
 
         self._warped_moving_sitk = None
@@ -82,7 +107,10 @@ class Resampler(object):
             image_sitk=fixed_itk,
             spacing=self._spacing,
             add_to_grid=self._add_to_grid,
-            add_to_grid_unit="mm")
+            add_to_grid_unit="mm",
+            mask_sitk=self._read_mask_sitk(),
+            roi=self._roi,
+            margin=self._margin)
 
         if self._path_to_transform is not None:
             transform_itk = dr.DataReader.read_transform(
@@ -116,8 +144,8 @@ class Resampler(object):
         self._warped_moving_itk.DisconnectPipeline()
 
     def _run_sitk(self):
-        # read input
-        fixed_sitk = dr.DataReader.read_image(self._path_to_fixed)
+        # read input; only geometry of fixed image is required
+        fixed_sitk = self._read_image_geometry(self._path_to_fixed)
         moving_sitk = dr.DataReader.read_image(self._path_to_moving)
 
         # get image resampling information
@@ -125,11 +153,13 @@ class Resampler(object):
             image_sitk=fixed_sitk,
             spacing=self._spacing,
             add_to_grid=self._add_to_grid,
-            add_to_grid_unit="mm")
+            add_to_grid_unit="mm",
+            mask_sitk=self._read_mask_sitk(),
+            roi=self._roi,
+            margin=self._margin)
 
         if self._path_to_transform is not None:
-            transform_sitk = dr.DataReader.read_transform(
-                self._path_to_transform)
+            transform_sitk = self.read_transform_sitk(self._path_to_transform)
         else:
             transform_sitk = getattr(
                 sitk, "Euler%dDTransform" % fixed_sitk.GetDimension())()
@@ -147,6 +177,38 @@ class Resampler(object):
             fixed_sitk.GetPixelIDValue(),
         )
 
+    def _read_mask_sitk(self):
+        if self._path_to_mask is None:
+            return None
+        return self._read_image_geometry(self._path_to_mask)
+
+    # Memory-map uncompressed images so that only accessed voxels are read
+    @staticmethod
+    def _read_image_geometry(path_to_image):
+        if ph.strip_filename_extension(path_to_image)[1] == "nii":
+            try:
+                return dr.DataReader.read_image_memmap(path_to_image)
+            except IOError:
+                pass
+        return dr.DataReader.read_image(path_to_image)
+
+    ##
+    # Reads a transform or an ordered chain of transforms as a single
+    # (composite) transform with adjacent affine stages collapsed.
+    # \date       2026-10-19 11:12:30+0000
+    #
+    # \param      path_to_transform  Path to transform or list of paths
+    #
+    # \return     sitk.Transform object
+    #
+    @staticmethod
+    def read_transform_sitk(path_to_transform):
+        if isinstance(path_to_transform, (list, tuple)):
+            transforms_sitk = [
+                dr.DataReader.read_transform(p) for p in path_to_transform]
+            return utils.get_composite_transform(transforms_sitk)
+        return dr.DataReader.read_transform(path_to_transform)
+
     @staticmethod
     def _convert_interpolator_sitk(interpolator):
         if interpolator.isdigit():
@@ -263,7 +325,8 @@ class Resampler(object):
     # spacing/grid adjustment desires.
     # \date       2018-05-03 13:04:05-0600
     #
-    # \param      image_sitk        Image as sitk.Image or itk.Image object
+    # \param      image_sitk        Image as sitk.Image, itk.Image or
+    #                               MemmapImage object
     # \param      spacing           Spacing for resampling space. If scalar,
     #                               isotropic resampling grid is assumed
     # \param      add_to_grid       Additional grid extension/reduction in each
@@ -271,6 +334,15 @@ class Resampler(object):
     #                               are applied uniformly to grid
     # \param      add_to_grid_unit  Changes to grid size to be understood in
     #                               either millimeter ("mm") or voxel units
+    # \param      mask_sitk         Optional mask as sitk.Image or MemmapImage
+    #                               object (in any space). If given, the grid is cropped to
+    #                               the bounding box of its non-zero voxels
+    # \param      roi               Optional region of interest given by two
+    #                               physical points (lower and upper corner).
+    #                               If given, the grid is cropped to the ROI
+    # \param      margin            Margin in millimeter added to each side of
+    #                               the mask/ROI bounding box. If scalar, the
+    #                               margin is applied uniformly to all axes
     #
     # \return     The space resampling properties: size_out, origin_out,
     #             spacing_out, direction_out
@@ -281,15 +353,20 @@ class Resampler(object):
         spacing=None,
         add_to_grid=None,
         add_to_grid_unit="mm",
+        mask_sitk=None,
+        roi=None,
+        margin=0,
     ):
 
-        if not isinstance(image_sitk, (sitk.Image, itk.Image.D3, itk.Image.SS3)):
-            raise IOError("Image must be of type sitk.Image or itk.Image")
+        if not isinstance(image_sitk, (
+                sitk.Image, MemmapImage, itk.Image.D3, itk.Image.SS3)):
+            raise IOError(
+                "Image must be of type sitk.Image, MemmapImage or itk.Image")
 
         # Read input image information:
         spacing_in = np.array(image_sitk.GetSpacing())
         origin_out = np.array(image_sitk.GetOrigin())
-        if isinstance(image_sitk, sitk.Image):
+        if isinstance(image_sitk, (sitk.Image, MemmapImage)):
             size_in = np.array(image_sitk.GetSize()).astype(int)
             direction_out = np.array(image_sitk.GetDirection())
         else:
@@ -298,6 +375,16 @@ class Resampler(object):
                 sitkh.get_sitk_from_itk_direction(image_sitk.GetDirection()))
         dim = len(origin_out)
 
+        # Crop grid to bounding box of mask and/or ROI (in full voxels of the
+        # image grid so that the cropped grid is aligned with the input grid)
+        if mask_sitk is not None or roi is not None:
+            index_lower, index_upper = Resampler._get_crop_region(
+                size_in, origin_out, spacing_in, direction_out,
+                mask_sitk=mask_sitk, roi=roi, margin=margin)
+            A = direction_out.reshape(dim, dim).dot(np.diag(spacing_in))
+            origin_out = origin_out + A.dot(index_lower)
+            size_in = index_upper - index_lower + 1
+
         # Check given spacing information for grid resampling
         if spacing is not None:
             spacing_out = np.atleast_1d(spacing).astype(np.float64)
@@ -328,15 +415,10 @@ class Resampler(object):
                 scale = add_to_grid / spacing_out
                 add_to_grid_vox = add_to_grid
 
-            # Offset origin to account for change in grid size
-            offset = np.eye(dim)
-            for i in range(dim):
-                # For Python3: Get standard integers; otherwise error
-                index = [int(j) for j in offset[:, i]]
-                offset[:, i] = image_sitk.TransformIndexToPhysicalPoint(index)
-                offset[:, i] -= origin_out
-                offset[:, i] /= np.linalg.norm(offset[:, i])
-            origin_out -= np.sum(offset, axis=1) * scale
+            # Offset origin to account for change in grid size, i.e. along
+            # the (unit) image axes given by the columns of the direction
+            offset = direction_out.reshape(dim, dim)
+            origin_out = origin_out - np.sum(offset, axis=1) * scale
         else:
             add_to_grid_vox = 0
 
@@ -348,6 +430,107 @@ class Resampler(object):
 
         return size_out, origin_out, spacing_out, direction_out
 
+    ##
+    # Gets the region of the image grid covered by the bounding box of a mask
+    # and/or physical region of interest.
+    # \date       2026-10-19 11:40:26+0000
+    #
+    # \param      size       Image size
+    # \param      origin     Image origin
+    # \param      spacing    Image spacing
+    # \param      direction  Image direction
+    # \param      mask_sitk  Optional mask as sitk.Image or MemmapImage object
+    # \param      roi        Optional ROI as lower and upper physical corner
+    # \param      margin     Margin in millimeter
+    #
+    # \return     Lower and upper (inclusive) voxel index of region as numpy
+    #             arrays
+    #
+    @staticmethod
+    def _get_crop_region(
+            size, origin, spacing, direction,
+            mask_sitk=None, roi=None, margin=0):
+
+        dim = len(origin)
+        A_inv = np.linalg.inv(
+            np.array(direction).reshape(dim, dim).dot(np.diag(spacing)))
+
+        # Physical corner points of bounding boxes, (dim x N)
+        points = []
+        if mask_sitk is not None:
+            if mask_sitk.GetDimension() != dim:
+                raise IOError("Mask dimension must match image dimension")
+            nda = utils.get_array_view(mask_sitk) != 0
+            bounds = []
+            for axis in range(dim):
+                axes = tuple(i for i in range(dim) if i != dim - 1 - axis)
+                indices = np.flatnonzero(np.any(nda, axis=axes))
+                if indices.size == 0:
+                    raise ValueError("Mask does not contain any voxels")
+                # voxel extent, i.e. +/- half a voxel around voxel centers
+                bounds.append((indices[0] - 0.5, indices[-1] + 0.5))
+            points.append(Resampler._get_box_corners(
+                bounds,
+                origin=mask_sitk.GetOrigin(),
+                spacing=mask_sitk.GetSpacing(),
+                direction=mask_sitk.GetDirection()))
+        if roi is not None:
+            roi = np.array(roi, dtype=np.float64).reshape(2, dim)
+            bounds = list(zip(roi.min(axis=0), roi.max(axis=0)))
+            points.append(Resampler._get_box_corners(bounds))
+        points = np.concatenate(points, axis=1)
+
+        # Bounding box in continuous image voxel space
+        indices = A_inv.dot(points - np.array(origin)[:, np.newaxis])
+        margin = np.atleast_1d(margin).astype(np.float64)
+        if margin.size == 1:
+            margin = np.ones(dim) * margin[0]
+        margin = margin / np.array(spacing)
+
+        # Voxels whose centers are covered by the bounding box
+        index_lower = np.ceil(indices.min(axis=1) - margin - 0.5 + 1e-6)
+        index_upper = np.floor(indices.max(axis=1) + margin + 0.5 - 1e-6)
+        if np.any(index_upper < index_lower) or np.any(index_upper < 0) or \
+                np.any(index_lower > np.array(size) - 1):
+            raise ValueError("Region of interest does not overlap with image")
+        index_lower = np.clip(index_lower, 0, np.array(size) - 1).astype(int)
+        index_upper = np.clip(index_upper, 0, np.array(size) - 1).astype(int)
+
+        return index_lower, index_upper
+
+    @staticmethod
+    def _get_box_corners(bounds, origin=None, spacing=None, direction=None):
+        dim = len(bounds)
+        corners = np.array(np.meshgrid(
+            *bounds, indexing="ij")).reshape(dim, -1)
+        if origin is None:
+            return corners
+        A = np.array(direction).reshape(dim, dim).dot(np.diag(spacing))
+        return A.dot(corners) + np.array(origin)[:, np.newaxis]
+
+    ##
+    # Paste a (cropped) resampled image back into the full space of a
+    # reference image, e.g. the fixed image. Voxels outside the cropped image
+    # are set to the padding value.
+    # \date       2026-10-19 11:52:13+0000
+    #
+    # \param      image_sitk      Cropped image as sitk.Image object
+    # \param      reference_sitk  Reference image defining the full space
+    # \param      padding         Padding value
+    #
+    # \return     Image in reference space as sitk.Image object
+    #
+    @staticmethod
+    def paste_resampled_image_sitk(image_sitk, reference_sitk, padding=0):
+        return sitk.Resample(
+            image_sitk,
+            reference_sitk,
+            getattr(sitk, "Euler%dDTransform" % image_sitk.GetDimension())(),
+            sitk.sitkNearestNeighbor,
+            padding,
+            image_sitk.GetPixelIDValue(),
+        )
+
     ##
     # Gets the resampled image sitk.
     # \date       2018-05-03 13:09:27-0600
@@ -248,6 +248,23 @@ class SimpleItkRegistration(SimpleItkRegistrationBase):
 
         self._registration_transform_sitk = registration_transform_sitk
 
+    def _get_cache_options(self):
+        return {
+            "simpleitk": sitk.Version.VersionString(),
+            "registration_type": self._registration_type,
+            "metric": self._metric,
+            "metric_params": self._metric_params,
+            "interpolator": self._interpolator,
+            "optimizer": self._optimizer,
+            "optimizer_params": self._optimizer_params,
+            "optimizer_scales": self._optimizer_scales,
+            "initializer_type": self._initializer_type,
+            "use_multiresolution_framework":
+                self._use_multiresolution_framework,
+            "shrink_factors": self._shrink_factors,
+            "smoothing_sigmas": self._smoothing_sigmas,
+        }
+
     def _get_transformed_fixed_sitk(self):
         return sitkh.get_transformed_sitk_image(
             self._fixed_sitk, self.get_registration_transform_sitk())
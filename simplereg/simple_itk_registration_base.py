@@ -5,6 +5,7 @@
 # \date       Aug 2017
 
 # Import libraries
+import os
 import SimpleITK as sitk
 
 import pysitk.python_helper as ph
@@ -12,6 +13,8 @@ import pysitk.simple_itk_helper as sitkh
 
 from abc import ABCMeta, abstractmethod
 
+from simplereg.transform_store import TransformStore
+
 
 ##
 # Abstract class for registration methods
@@ -47,6 +50,9 @@ class SimpleItkRegistrationBase(object):
         self._registration_transform_sitk = None
         self._computational_time = ph.get_zero_time()
 
+        # Optional RegistrationCache object
+        self._cache = None
+
     ##
     # Sets the fixed image
     # \date       2017-08-08 16:45:45+0100
@@ -215,6 +221,21 @@ class SimpleItkRegistrationBase(object):
     def get_computational_time(self):
         return self._computational_time
 
+    ##
+    # Sets an on-disk cache of registration results. Registrations of the
+    # same images, masks and options are then read from the cache instead of
+    # being computed again.
+    # \date       2026-10-19 22:36:02+0000
+    #
+    # \param      self   The object
+    # \param      cache  RegistrationCache object; None to disable caching
+    #
+    def set_cache(self, cache):
+        self._cache = cache
+
+    def get_cache(self):
+        return self._cache
+
     ##
     # Run the registration method
     # \date       2017-08-08 17:01:01+0100
@@ -223,6 +244,65 @@ class SimpleItkRegistrationBase(object):
     #
     def run(self):
 
+        key, time_start = self._start_run()
+        if time_start is None:
+            return
+
+        # Execute registration method
+        self._run()
+
+        self._finish_run(key, time_start)
+
+    ##
+    # Start a run. Images are checked and the result is read from the cache
+    # if available.
+    # \date       2026-10-19 22:38:40+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Tuple of cache key (None without cache) and start time of
+    #             the run; start time is None if the result was read from the
+    #             cache
+    #
+    def _start_run(self):
+
+        self._check_images()
+
+        key = None
+        if self._cache is not None:
+            key = self._cache.get_key(self)
+            computational_time = self._cache.read(key, self)
+            if computational_time is not None:
+                self._computational_time = computational_time
+                return key, None
+
+        return key, ph.start_timing()
+
+    ##
+    # Finish a run, i.e. get its computational time and write the result to
+    # the cache.
+    # \date       2026-10-19 22:39:31+0000
+    #
+    # \param      self        The object
+    # \param      key         Cache key as returned by _start_run
+    # \param      time_start  Start time as returned by _start_run
+    #
+    def _finish_run(self, key, time_start):
+
+        # Get computational time
+        self._computational_time = ph.stop_timing(time_start)
+
+        if self._cache is not None:
+            self._cache.write(key, self)
+
+    ##
+    # Check that the images to register are set
+    # \date       2026-10-19 21:58:12+0000
+    #
+    # \param      self  The object
+    #
+    def _check_images(self):
+
         if not isinstance(self._fixed_sitk, sitk.Image):
             raise ValueError("Fixed image must be of type SimpleITK.Image")
 
@@ -239,13 +319,43 @@ class SimpleItkRegistrationBase(object):
             raise ValueError(
                 "Moving image mask must be of type SimpleITK.Image")
 
-        time_start = ph.start_timing()
+    ##
+    # Gets the options which, together with the images, determine the result
+    # of the registration. Used as part of the key of cached results.
+    # \date       2026-10-19 22:38:10+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Dictionary of JSON-serializable options, numpy arrays and
+    #             sitk.Transform objects
+    #
+    def _get_cache_options(self):
+        raise ValueError(
+            "Caching is not supported for %s" % type(self).__name__)
 
-        # Execute registration method
-        self._run()
+    ##
+    # Writes the obtained registration result to the directory of a cache
+    # entry.
+    # \date       2026-10-19 22:39:31+0000
+    #
+    # \param      self       The object
+    # \param      directory  Directory of cache entry
+    #
+    def _write_cache_entry(self, directory):
+        TransformStore.write(
+            {"transform": self._registration_transform_sitk},
+            os.path.join(directory, "transform.npz"))
 
-        # Get computational time
-        self._computational_time = ph.stop_timing(time_start)
+    ##
+    # Reads the registration result from the directory of a cache entry.
+    # \date       2026-10-19 22:40:02+0000
+    #
+    # \param      self       The object
+    # \param      directory  Directory of cache entry
+    #
+    def _read_cache_entry(self, directory):
+        self._registration_transform_sitk = TransformStore(
+            os.path.join(directory, "transform.npz")).get("transform")
 
     ##
     # Execute registration method
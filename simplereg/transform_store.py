@@ -0,0 +1,405 @@
+##
+# \file transform_store.py
+# \brief      Bulk storage of large numbers of named (parametric) transforms
+#
+# A transform store is a single .npz file holding the transform type,
+# dimension, parameters and fixed parameters of named transforms in flat
+# arrays. Concurrent writers append to separate shard files in the directory
+# '<store>.shards' next to the store, i.e. no locking is required. Shards are
+# read together with the store (later entries replace earlier ones with the
+# same key) and can be merged into the store via TransformStore.consolidate.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import glob
+import time
+import tempfile
+import threading
+import numpy as np
+import SimpleITK as sitk
+
+import pysitk.python_helper as ph
+
+# Extension of shard directory next to store
+SHARD_EXTENSION = ".shards"
+
+# Transform types whose constructor requires the dimension
+DIMENSION_TYPES = ["AffineTransform", "TranslationTransform", "ScaleTransform"]
+
+
+##
+# Read-only access to the transforms of a store and its shards.
+# \date       2026-10-19 17:45:10+0000
+#
+class TransformStore(object):
+
+    ##
+    # Read store (and shards)
+    # \date       2026-10-19 17:45:52+0000
+    #
+    # \param      self          The object
+    # \param      path_to_file  Path to store (.npz)
+    #
+    def __init__(self, path_to_file):
+        self._path_to_file = path_to_file
+
+        paths = TransformStore._get_paths_to_shards(path_to_file)
+        if os.path.isfile(path_to_file):
+            paths.insert(0, path_to_file)
+        if len(paths) == 0:
+            raise IOError("Transform store '%s' not found" % path_to_file)
+
+        data = _concatenate([_read_arrays(path) for path in paths])
+
+        # Keep last occurrence of each key
+        keys = data["keys"]
+        _, index_reversed = np.unique(keys[::-1], return_index=True)
+        indices = np.sort(len(keys) - 1 - index_reversed)
+        self._data = _select(data, indices)
+        self._indices = {key: i for i, key in enumerate(self._data["keys"])}
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __contains__(self, key):
+        return key in self._indices
+
+    def keys(self):
+        return list(self._data["keys"])
+
+    ##
+    # Gets a transform by key.
+    # \date       2026-10-19 17:48:30+0000
+    #
+    # \param      self  The object
+    # \param      key   The key
+    #
+    # \return     Transform as sitk.Transform object
+    #
+    def get(self, key):
+        if key not in self._indices:
+            raise KeyError("Transform '%s' not in store" % key)
+        i = self._indices[key]
+        data = self._data
+        name = str(data["types"][i])
+        dim = int(data["dimensions"][i])
+
+        if name in DIMENSION_TYPES:
+            transform_sitk = getattr(sitk, name)(dim)
+        else:
+            transform_sitk = getattr(sitk, name)()
+        transform_sitk.SetFixedParameters(_get_row(
+            data["fixed_parameters"], data["fixed_offsets"], i))
+        transform_sitk.SetParameters(_get_row(
+            data["parameters"], data["offsets"], i))
+        return transform_sitk
+
+    ##
+    # Gets the parameters of transforms without creating transform objects.
+    # \date       2026-10-19 17:50:02+0000
+    #
+    # \param      self  The object
+    # \param      keys  List of keys; all transforms if None
+    #
+    # \return     List of (type, parameters, fixed parameters) tuples
+    #
+    def get_parameters(self, keys=None):
+        data = self._data
+        return [(str(data["types"][i]),
+                 _get_row(data["parameters"], data["offsets"], i),
+                 _get_row(data["fixed_parameters"], data["fixed_offsets"], i))
+                for i in self._get_indices(keys)]
+
+    ##
+    # Gets the homogeneous matrices of (affine) transforms. Matrices of
+    # translation, Euler and affine transforms are computed jointly for all
+    # transforms of a type; other types are converted individually.
+    # \date       2026-10-19 17:52:41+0000
+    #
+    # \param      self  The object
+    # \param      keys  List of keys; all transforms if None
+    #
+    # \return     Numpy array of shape (N x dim+1 x dim+1)
+    #
+    def get_affine_matrices(self, keys=None):
+        indices = self._get_indices(keys)
+        data = self._data
+        dimensions = data["dimensions"][indices]
+        if len(np.unique(dimensions)) > 1:
+            raise ValueError("Transforms must be of same dimension")
+        dim = int(dimensions[0]) if len(indices) > 0 else 3
+
+        matrices = np.zeros((len(indices), dim + 1, dim + 1))
+        matrices[:, dim, dim] = 1
+        types = data["types"][indices]
+        for name in np.unique(types):
+            group = np.flatnonzero(types == name)
+            parameters = _get_rows(
+                data["parameters"], data["offsets"], indices[group])
+            fixed = _get_rows(
+                data["fixed_parameters"], data["fixed_offsets"],
+                indices[group])
+            matrix, translation, center = _get_affine_components(
+                str(name), dim, parameters, fixed)
+            if matrix is None:
+                for j, i in zip(group, indices[group]):
+                    transform_sitk = self.get(data["keys"][i])
+                    matrix_j = np.array(transform_sitk.GetMatrix()).reshape(
+                        dim, dim)
+                    matrices[j, 0:dim, 0:dim] = matrix_j
+                    matrices[j, 0:dim, dim] = \
+                        np.array(transform_sitk.GetTranslation()) + \
+                        transform_sitk.GetCenter() - \
+                        matrix_j.dot(transform_sitk.GetCenter())
+                continue
+
+            # x maps_to A(x - c) + c + t
+            matrices[group, 0:dim, 0:dim] = matrix
+            matrices[group, 0:dim, dim] = translation + center - \
+                np.einsum("nij,nj->ni", matrix, center)
+        return matrices
+
+    ##
+    # Writes transforms to a store (atomically replacing an existing one).
+    # \date       2026-10-19 17:56:20+0000
+    #
+    # \param      transforms    Dictionary of keys and sitk.Transform objects
+    # \param      path_to_file  Path to store (.npz)
+    #
+    @staticmethod
+    def write(transforms, path_to_file):
+        _write_arrays(_get_arrays(transforms), path_to_file)
+
+    ##
+    # Merge shards into store and remove merged shards. Must not be called
+    # while other processes consolidate the same store.
+    # \date       2026-10-19 17:58:02+0000
+    #
+    # \param      path_to_file  Path to store (.npz)
+    #
+    @staticmethod
+    def consolidate(path_to_file):
+        paths_to_shards = TransformStore._get_paths_to_shards(path_to_file)
+        if len(paths_to_shards) == 0:
+            return
+        store = TransformStore(path_to_file)
+        _write_arrays(store._data, path_to_file)
+        for path in paths_to_shards:
+            os.remove(path)
+
+    def _get_indices(self, keys):
+        if keys is None:
+            return np.arange(len(self._indices))
+        return np.array([self._indices[key] for key in keys], dtype=int)
+
+    @staticmethod
+    def _get_paths_to_shards(path_to_file):
+        return sorted(glob.glob(os.path.join(
+            path_to_file + SHARD_EXTENSION, "*.npz")))
+
+
+##
+# Appends transforms to a store via a shard file of its own. Transforms are
+# buffered in memory and written to a new shard file on flush, i.e. each
+# writer (process or thread) can use its own TransformStoreWriter object.
+# \date       2026-10-19 18:01:44+0000
+#
+class TransformStoreWriter(object):
+
+    ##
+    # Create writer
+    # \date       2026-10-19 18:02:20+0000
+    #
+    # \param      self          The object
+    # \param      path_to_file  Path to store (.npz)
+    # \param      worker        Name of writer used in shard file names;
+    #                           process and thread id if None
+    # \param      flush_size    Number of buffered transforms written at once
+    #
+    def __init__(self, path_to_file, worker=None, flush_size=10000):
+        if worker is None:
+            worker = "%d-%d" % (os.getpid(), threading.get_ident())
+        self._path_to_file = path_to_file
+        self._worker = worker
+        self._flush_size = flush_size
+        self._transforms = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, key, transform_sitk):
+        # Serialize right away so that transform can be modified afterwards
+        self._transforms[key] = _get_arrays({key: transform_sitk})
+        if len(self._transforms) >= self._flush_size:
+            self.flush()
+
+    def flush(self):
+        if len(self._transforms) == 0:
+            return
+
+        # Shard names sort chronologically
+        path_to_shard = os.path.join(
+            self._path_to_file + SHARD_EXTENSION,
+            "%020d_%s.npz" % (time.time_ns(), self._worker))
+        _write_arrays(
+            _concatenate(list(self._transforms.values())), path_to_shard)
+        self._transforms = {}
+
+    def close(self):
+        self.flush()
+
+
+def _get_arrays(transforms):
+    keys = list(transforms.keys())
+    types = []
+    dimensions = []
+    parameters = []
+    fixed_parameters = []
+    for key in keys:
+        transform_sitk = transforms[key]
+        name = transform_sitk.GetName()
+        if not hasattr(sitk, name) or name in [
+                "DisplacementFieldTransform", "BSplineTransform",
+                "CompositeTransform", "Transform"]:
+            raise ValueError(
+                "Transform '%s' of type %s cannot be stored" % (key, name))
+        types.append(name)
+        dimensions.append(transform_sitk.GetDimension())
+        parameters.append(transform_sitk.GetParameters())
+        fixed_parameters.append(transform_sitk.GetFixedParameters())
+
+    return {
+        "keys": np.array(keys, dtype=str),
+        "types": np.array(types, dtype=str),
+        "dimensions": np.array(dimensions, dtype=np.int8),
+        "parameters": np.concatenate(
+            [np.zeros(0)] + [np.array(p, dtype=np.float64)
+                             for p in parameters]),
+        "offsets": _get_offsets(parameters),
+        "fixed_parameters": np.concatenate(
+            [np.zeros(0)] + [np.array(p, dtype=np.float64)
+                             for p in fixed_parameters]),
+        "fixed_offsets": _get_offsets(fixed_parameters),
+    }
+
+
+def _get_offsets(rows):
+    return np.concatenate([[0], np.cumsum([len(r) for r in rows])]).astype(
+        np.int64)
+
+
+def _get_row(nda, offsets, i):
+    return tuple(nda[offsets[i]:offsets[i + 1]])
+
+
+def _get_rows(nda, offsets, indices):
+    # Rows of a transform type share the same length
+    lengths = offsets[indices + 1] - offsets[indices]
+    if len(indices) == 0 or np.any(lengths != lengths[0]):
+        return None
+    return nda[offsets[indices][:, np.newaxis] + np.arange(lengths[0])]
+
+
+def _concatenate(arrays):
+    data = {}
+    for name in ["keys", "types", "dimensions", "parameters",
+                 "fixed_parameters"]:
+        data[name] = np.concatenate([a[name] for a in arrays])
+    for name, name_rows in [("offsets", "parameters"),
+                            ("fixed_offsets", "fixed_parameters")]:
+        shifts = np.cumsum([0] + [len(a[name_rows]) for a in arrays[:-1]])
+        data[name] = np.concatenate(
+            [[0]] + [a[name][1:] + s for a, s in zip(arrays, shifts)]).astype(
+            np.int64)
+    return data
+
+
+def _select(data, indices):
+    selected = {name: data[name][indices]
+                for name in ["keys", "types", "dimensions"]}
+    for name, name_offsets in [("parameters", "offsets"),
+                               ("fixed_parameters", "fixed_offsets")]:
+        offsets = data[name_offsets]
+        rows = [data[name][offsets[i]:offsets[i + 1]] for i in indices]
+        selected[name] = np.concatenate([np.zeros(0)] + rows)
+        selected[name_offsets] = _get_offsets(rows)
+    return selected
+
+
+def _read_arrays(path_to_file):
+    with np.load(path_to_file) as data:
+        return {name: data[name] for name in data.files}
+
+
+def _write_arrays(data, path_to_file):
+    directory = os.path.dirname(os.path.abspath(path_to_file))
+    ph.create_directory(directory)
+
+    # Atomic replacement so that readers never see partially written files.
+    # Temporary files must not match the shard pattern of readers (*.npz)
+    fd, path_to_tmp = tempfile.mkstemp(suffix=".npz.tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fileobj:
+            np.savez(fileobj, **data)
+        os.replace(path_to_tmp, path_to_file)
+    except BaseException:
+        os.remove(path_to_tmp)
+        raise
+
+
+##
+# Gets matrices, translations and centers of transforms of one type from
+# their stacked parameters.
+# \date       2026-10-19 18:08:12+0000
+#
+# \param      name        Transform type, e.g. "Euler3DTransform"
+# \param      dim         Dimension
+# \param      parameters  Parameters as (N x P) array
+# \param      fixed       Fixed parameters as (N x F) array
+#
+# \return     Tuple of (N x dim x dim), (N x dim) and (N x dim) arrays; None
+#             for matrix if not supported for type
+#
+def _get_affine_components(name, dim, parameters, fixed):
+    if parameters is None or fixed is None:
+        return None, None, None
+    n = parameters.shape[0]
+
+    if name == "TranslationTransform":
+        return np.tile(np.eye(dim), (n, 1, 1)), parameters, np.zeros((n, dim))
+
+    if name == "AffineTransform":
+        return parameters[:, 0:dim * dim].reshape(n, dim, dim), \
+            parameters[:, dim * dim:], fixed[:, 0:dim]
+
+    if name == "Euler2DTransform":
+        cos, sin = np.cos(parameters[:, 0]), np.sin(parameters[:, 0])
+        matrix = np.stack([cos, -sin, sin, cos], axis=1).reshape(n, 2, 2)
+        return matrix, parameters[:, 1:3], fixed[:, 0:2]
+
+    if name == "Euler3DTransform":
+        cx, cy, cz = [np.cos(parameters[:, i]) for i in range(3)]
+        sx, sy, sz = [np.sin(parameters[:, i]) for i in range(3)]
+        zeros, ones = np.zeros(n), np.ones(n)
+        rx = np.stack([ones, zeros, zeros, zeros, cx, -sx, zeros, sx, cx],
+                      axis=1).reshape(n, 3, 3)
+        ry = np.stack([cy, zeros, sy, zeros, ones, zeros, -sy, zeros, cy],
+                      axis=1).reshape(n, 3, 3)
+        rz = np.stack([cz, -sz, zeros, sz, cz, zeros, zeros, zeros, ones],
+                      axis=1).reshape(n, 3, 3)
+
+        # Rotation order depends on ComputeZYX flag (4th fixed parameter)
+        is_zyx = fixed[:, 3] != 0 if fixed.shape[1] > 3 else np.zeros(n, bool)
+        matrix = np.where(
+            is_zyx[:, np.newaxis, np.newaxis],
+            np.matmul(rz, np.matmul(ry, rx)),
+            np.matmul(rz, np.matmul(rx, ry)))
+        return matrix, parameters[:, 3:6], fixed[:, 0:3]
+
+    return None, None, None
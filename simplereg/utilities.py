@@ -8,6 +8,7 @@
 import os
 import numpy as np
 import scipy.linalg
+import scipy.ndimage
 import nibabel as nib
 import SimpleITK as sitk
 import scipy.ndimage.morphology
@@ -15,8 +16,12 @@ import scipy.ndimage.morphology
 import pysitk.python_helper as ph
 import pysitk.simple_itk_helper as sitkh
 
+import simplereg.data_reader as dr
 import simplereg.data_writer as dw
 from simplereg.definitions import DIR_TMP
+from simplereg.memmap_image import MemmapImage
+import simplereg.chunked_image as chk
+from simplereg.chunked_image import ChunkedImage
 
 
 ##
@@ -70,31 +75,68 @@ def update_image_header(image_sitk, transform_sitk):
     return transformed_image_sitk
 
 
+##
+# Gets the voxel data of an image as numpy array without copying.
+# \date       2026-10-19 13:02:15+0000
+#
+# \param      image_sitk  Image as sitk.Image or MemmapImage object
+#
+# \return     numpy view of shape [Nz x] Ny x Nx
+#
+def get_array_view(image_sitk):
+    if isinstance(image_sitk, MemmapImage):
+        return image_sitk.GetArrayView()
+    return sitk.GetArrayViewFromImage(image_sitk)
+
+
+##
+# Read image unless already given as image object. Uncompressed NIfTI images
+# are memory-mapped.
+# \date       2026-10-19 13:04:40+0000
+#
+# \param      image  Path to image, sitk.Image or MemmapImage object
+#
+# \return     Image as sitk.Image or MemmapImage object
+#
+def _read_image(image):
+    if isinstance(image, (sitk.Image, MemmapImage)):
+        return image
+    if ph.strip_filename_extension(image)[1] == "nii":
+        try:
+            return MemmapImage(image)
+        except IOError:
+            pass
+    return sitk.ReadImage(image)
+
+
 ##
 # Split multi-label mask into 4D (or 5D) image where each time point
 # corresponds to an independent mask label
 # \date       2018-06-09 13:51:34-0600
 #
-# \param      path_to_labels  Path to multi-label mask
+# \param      path_to_labels  Path to multi-label mask or mask as sitk.Image
+#                             or MemmapImage object
 # \param      dimension       Dimension of output mask. Either 4 or 5.
 # \param      path_to_output  Path to 4D/5D output multi-label mask
 #
 def split_labels(path_to_labels, dimension, path_to_output):
     if dimension == 4:
+        if isinstance(path_to_labels, MemmapImage):
+            path_to_labels = path_to_labels.GetPathToFile()
+        if isinstance(path_to_labels, sitk.Image):
+            raise IOError("4D output requires a path to the labels")
         labels_nib = nib.load(path_to_labels)
-        nda = labels_nib.get_data().astype(np.uint8)
+        nda = np.asanyarray(labels_nib.dataobj)
     else:
-        labels_sitk = sitk.ReadImage(path_to_labels)
-        nda = sitk.GetArrayFromImage(labels_sitk).astype(np.uint8)
+        labels_sitk = _read_image(path_to_labels)
+        nda = get_array_view(labels_sitk)
 
     # split labels into separate components
-    n_labels = nda.max()
+    n_labels = int(nda.max())
     shape = nda.shape + (n_labels, )
     nda_4d = np.zeros((shape), dtype=np.uint8)
     for label in range(n_labels):
-        indices = np.where(nda == label + 1)
-        indices += (label * np.ones(len(indices[0]), dtype=np.uint8),)
-        nda_4d[indices] = 1
+        nda_4d[..., label] = nda == label + 1
 
     if dimension == 4:
         labels_4d_nib = nib.Nifti1Image(
@@ -114,13 +156,14 @@ def split_labels(path_to_labels, dimension, path_to_output):
 # Convert a label to its boundaries using binary erosion
 # \date       2018-07-02 15:42:01-0600
 #
-# \param      path_to_labels  Path to multi-label mask
+# \param      path_to_labels  Path to multi-label mask or mask as sitk.Image
+#                             or MemmapImage object
 # \param      path_to_output  Path to output multi-label boundary mask
 # \param      iterations      Number of binary erosion operations
 #
 def convert_label_to_boundary(path_to_labels, path_to_output, iterations=1):
-    labels_sitk = sitk.ReadImage(path_to_labels)
-    nda_labels = sitk.GetArrayFromImage(labels_sitk)
+    labels_sitk = _read_image(path_to_labels)
+    nda_labels = get_array_view(labels_sitk)
 
     if nda_labels.dtype != 'uint8' and nda_labels.dtype != 'uint16':
         raise ValueError(
@@ -129,11 +172,11 @@ def convert_label_to_boundary(path_to_labels, path_to_output, iterations=1):
             "you can convert the data type using "
             "simplereg_transform -d path-to-label uint8 path-to-label_out")
 
-    nda_labels_boundary = np.zeros_like(nda_labels)
+    nda_labels_boundary = np.zeros(nda_labels.shape, dtype=nda_labels.dtype)
 
     for i in range(nda_labels.max()):
         label = i + 1
-        nda_mask = np.zeros_like(nda_labels)
+        nda_mask = np.zeros(nda_labels.shape, dtype=nda_labels.dtype)
         nda_mask[np.where(nda_labels == label)] = 1
         nda_mask_boundary = nda_mask - \
             scipy.ndimage.morphology.binary_erosion(
@@ -141,7 +184,9 @@ def convert_label_to_boundary(path_to_labels, path_to_output, iterations=1):
         nda_labels_boundary += label * nda_mask_boundary
 
     labels_boundary_sitk = sitk.GetImageFromArray(nda_labels_boundary)
-    labels_boundary_sitk.CopyInformation(labels_sitk)
+    labels_boundary_sitk.SetOrigin(labels_sitk.GetOrigin())
+    labels_boundary_sitk.SetSpacing(labels_sitk.GetSpacing())
+    labels_boundary_sitk.SetDirection(labels_sitk.GetDirection())
 
     dw.DataWriter.write_image(labels_boundary_sitk, path_to_output)
 
@@ -157,24 +202,22 @@ def compose_transforms(transform_outer, transform_inner):
         raise IOError("Inner transform must be of type sitk.Transform or "
                       "sitk.DisplacementFieldTransform")
 
-    # Compose affine transforms
-    if isinstance(transform_outer, sitk.Transform) \
-            and isinstance(transform_inner, sitk.Transform):
+    # Compose affine transforms. Note, sitk.DisplacementFieldTransform is a
+    # sitk.Transform too so the transform type needs to be checked explicitly
+    if is_affine_transform(transform_outer) \
+            and is_affine_transform(transform_inner):
         transform = compose_affine_transforms(transform_outer, transform_inner)
 
     # Compose displacement fields if at least one transform is a disp field.
     else:
-        # Convert sitk.Transform to displacement field if necessary
-        if isinstance(transform_outer, sitk.Transform):
-            displacement_sitk = sitk.TransformToDisplacementField(
-                transform_outer)
-            transform_outer = sitk.DisplacementFieldTransform(
-                sitk.Image(displacement_sitk))
-        if isinstance(transform_inner, sitk.Transform):
-            displacement_sitk = sitk.TransformToDisplacementField(
-                transform_inner)
-            transform_inner = sitk.DisplacementFieldTransform(
-                sitk.Image(displacement_sitk))
+        # Convert sitk.Transform to displacement field on the grid of the
+        # other displacement field if necessary
+        if not isinstance(transform_outer, sitk.DisplacementFieldTransform):
+            transform_outer = _convert_to_displacement_field_transform(
+                transform_outer, transform_inner)
+        if not isinstance(transform_inner, sitk.DisplacementFieldTransform):
+            transform_inner = _convert_to_displacement_field_transform(
+                transform_inner, transform_outer)
 
         transform = compose_displacement_field_transforms(
             transform_outer, transform_inner)
@@ -182,17 +225,119 @@ def compose_transforms(transform_outer, transform_inner):
     return transform
 
 
+def _convert_to_displacement_field_transform(transform, transform_ref):
+    if not isinstance(transform_ref, sitk.DisplacementFieldTransform):
+        raise IOError("At least one transform must be of type "
+                      "sitk.DisplacementFieldTransform")
+    field_ref_sitk = transform_ref.GetDisplacementField()
+    displacement_sitk = sitk.TransformToDisplacementField(
+        transform,
+        sitk.sitkVectorFloat64,
+        field_ref_sitk.GetSize(),
+        field_ref_sitk.GetOrigin(),
+        field_ref_sitk.GetSpacing(),
+        field_ref_sitk.GetDirection())
+    return sitk.DisplacementFieldTransform(displacement_sitk)
+
+
 def compose_displacement_field_transforms(transform_outer, transform_inner):
     if not isinstance(transform_outer, sitk.DisplacementFieldTransform) \
             or not isinstance(transform_inner, sitk.DisplacementFieldTransform):
         raise IOError("Transforms must be of type "
                       "sitk.TransDisplacementFieldTransformform")
 
-    raise RuntimeError(
-        "Composition of displacement fields not implemented yet")
+    # sitk.DisplacementFieldTransform requires float64 fields
+    displacement_sitk = compose_displacement_fields(
+        transform_outer.GetDisplacementField(),
+        transform_inner.GetDisplacementField(),
+        dtype=np.float64)
+    return sitk.DisplacementFieldTransform(displacement_sitk)
 
-    # Throws error
-    # transform_outer.AddTransform(transform_inner)
+
+##
+# Compose two displacement fields, i.e. compute the displacement field
+# d(x) = d_inner(x) + d_outer(x + d_inner(x)) on the grid of the inner field.
+# In line with ITK, the outer field is linearly interpolated and considered
+# zero outside its domain. The field is computed in slabs and in the
+# requested precision, i.e. float32 fields are never converted to float64.
+# \date       2026-10-19 17:25:44+0000
+#
+# \param      displacement_outer_sitk  Outer displacement field as sitk.Image
+# \param      displacement_inner_sitk  Inner displacement field as sitk.Image
+# \param      dtype                    Data type of computation and output,
+#                                      e.g. np.float32
+# \param      slab_size                Number of voxels processed at a time
+#
+# \return     Composed displacement field as sitk.Image object
+#
+def compose_displacement_fields(displacement_outer_sitk,
+                                displacement_inner_sitk,
+                                dtype=np.float32,
+                                slab_size=2**22,
+                                ):
+    dim = displacement_inner_sitk.GetDimension()
+    if displacement_outer_sitk.GetDimension() != dim or \
+            displacement_outer_sitk.GetNumberOfComponentsPerPixel() != dim or \
+            displacement_inner_sitk.GetNumberOfComponentsPerPixel() != dim:
+        raise ValueError("Displacement fields must be of same dimension")
+
+    nda_inner = sitk.GetArrayViewFromImage(displacement_inner_sitk)
+    nda_outer = sitk.GetArrayViewFromImage(displacement_outer_sitk)
+    components_outer = [
+        np.ascontiguousarray(nda_outer[..., i], dtype=dtype)
+        for i in range(dim)]
+
+    # Index to physical space of inner and physical to index space of outer
+    # field
+    A_inner = _get_index_to_physical_matrix(displacement_inner_sitk)
+    origin_inner = np.array(displacement_inner_sitk.GetOrigin())
+    A_outer_inv = np.linalg.inv(
+        _get_index_to_physical_matrix(displacement_outer_sitk))
+    origin_outer = np.array(displacement_outer_sitk.GetOrigin())
+    size_outer = np.array(displacement_outer_sitk.GetSize())[:, np.newaxis]
+
+    # Indices of a slab in physical space are obtained via an affine map
+    A = A_outer_inv.dot(A_inner).astype(dtype)
+    b = A_outer_inv.dot(origin_inner - origin_outer)
+
+    shape = nda_inner.shape[0:-1]
+    n_rows = max(1, slab_size // int(np.prod(shape[1:])))
+    nda = np.empty(nda_inner.shape, dtype=dtype)
+    for start in range(0, shape[0], n_rows):
+        stop = min(shape[0], start + n_rows)
+
+        # [z,] y, x indices to dim x N continuous x, y[, z] indices
+        indices = np.indices((stop - start,) + shape[1:], dtype=dtype)
+        indices[0] += start
+        indices = indices[::-1].reshape(dim, -1)
+
+        disp_inner = nda_inner[start:stop].reshape(-1, dim).T.astype(dtype)
+        indices_outer = A.dot(indices)
+        indices_outer += A_outer_inv.astype(dtype).dot(disp_inner)
+        indices_outer += b[:, np.newaxis].astype(dtype)
+
+        is_inside = np.all(
+            (indices_outer >= -0.5) & (indices_outer <= size_outer - 0.5),
+            axis=0)
+        np.clip(indices_outer, 0, size_outer - 1, out=indices_outer)
+
+        disp = disp_inner
+        for i in range(dim):
+            disp_outer = scipy.ndimage.map_coordinates(
+                components_outer[i], indices_outer[::-1],
+                order=1, output=dtype, mode="nearest")
+            disp[i] += np.where(is_inside, disp_outer, 0)
+        nda[start:stop] = disp.T.reshape(nda[start:stop].shape)
+
+    displacement_sitk = sitk.GetImageFromArray(nda, isVector=True)
+    displacement_sitk.CopyInformation(displacement_inner_sitk)
+    return displacement_sitk
+
+
+def _get_index_to_physical_matrix(image_sitk):
+    dim = image_sitk.GetDimension()
+    return np.array(image_sitk.GetDirection()).reshape(dim, dim).dot(
+        np.diag(image_sitk.GetSpacing()))
 
 
 def compose_affine_transforms(transform_outer, transform_inner):
@@ -232,6 +377,63 @@ def compose_affine_transforms(transform_outer, transform_inner):
     return transform
 
 
+##
+# Get a single transform representing an ordered chain of transforms.
+#
+# The chain [T_1, ..., T_n] is understood in the same order as resampling an
+# image repeatedly with T_1, ..., T_n, i.e. it represents the composition
+# x maps_to T_1(...(T_n(x))). Adjacent affine stages are collapsed
+# algebraically while non-linear stages, such as displacement fields, are kept
+# in an sitk.CompositeTransform. Hence, sitk.Resample can evaluate the entire
+# chain for each output voxel within a single interpolation pass.
+# \date       2026-10-19 11:02:18+0000
+#
+# \param      transforms_sitk  Ordered list of sitk.Transform objects
+#
+# \return     sitk.Transform if the chain collapses to a single transform;
+#             sitk.CompositeTransform otherwise
+#
+def get_composite_transform(transforms_sitk):
+
+    if len(transforms_sitk) == 0:
+        raise IOError("At least one transform must be provided")
+
+    stages = []
+    for transform_sitk in transforms_sitk:
+        if not isinstance(transform_sitk, sitk.Transform):
+            raise IOError("Transforms must be of type sitk.Transform")
+
+        if len(stages) > 0 and is_affine_transform(stages[-1]) \
+                and is_affine_transform(transform_sitk):
+            stages[-1] = compose_affine_transforms(stages[-1], transform_sitk)
+        else:
+            stages.append(transform_sitk)
+
+    if len(stages) == 1:
+        return stages[0]
+
+    return sitk.CompositeTransform(stages)
+
+
+##
+# Check whether transform is a linear (matrix-offset) transform, e.g. an
+# Euler or affine transformation
+# \date       2026-10-19 11:04:41+0000
+#
+# \param      transform_sitk  sitk.Transform object
+#
+# \return     True if transform is affine, False otherwise
+#
+def is_affine_transform(transform_sitk):
+    if isinstance(transform_sitk, (
+            sitk.DisplacementFieldTransform,
+            sitk.BSplineTransform,
+            sitk.CompositeTransform)):
+        return False
+    return hasattr(transform_sitk, "GetMatrix") and \
+        hasattr(transform_sitk, "GetCenter")
+
+
 ##
 # Approximate an affine transform by a rigid one. Be aware that currently only
 # rotation + positive scaling transformations have been tested! See
@@ -326,7 +528,8 @@ def extract_rigid_from_affine(affine_sitk, compute_ZYX=0):
 # Gets the voxel displacements in millimetre.
 # \date       2018-11-14 15:54:10+0000
 #
-# \param      image_sitk      image as sitk.Image, (Nx, Ny, Nz) data array
+# \param      image_sitk      image as sitk.Image or MemmapImage object,
+#                             (Nx, Ny, Nz) data array
 # \param      transform_sitk  sitk.Transform object
 #
 # \return     The voxel displacement in millimetres as np.array
@@ -339,7 +542,13 @@ def get_voxel_displacements(image_sitk, transform_sitk):
 
     # Convert sitk.Transform to displacement field
     disp_field_filter = sitk.TransformToDisplacementFieldFilter()
-    disp_field_filter.SetReferenceImage(image_sitk)
+    if isinstance(image_sitk, MemmapImage):
+        disp_field_filter.SetSize(image_sitk.GetSize())
+        disp_field_filter.SetOutputOrigin(image_sitk.GetOrigin())
+        disp_field_filter.SetOutputSpacing(image_sitk.GetSpacing())
+        disp_field_filter.SetOutputDirection(image_sitk.GetDirection())
+    else:
+        disp_field_filter.SetReferenceImage(image_sitk)
     disp_field = disp_field_filter.Execute(transform_sitk)
 
     # Get displacement field array and compute voxel displacements
@@ -347,3 +556,141 @@ def get_voxel_displacements(image_sitk, transform_sitk):
     voxel_disp = np.sqrt(np.sum(np.square(disp), axis=-1))
 
     return voxel_disp
+
+
+##
+# Convert a NIfTI image to a chunked, multi-resolution image store. The image
+# is processed in slabs of chunk thickness, i.e. it is never held in memory
+# entirely.
+# \date       2026-10-19 16:25:12+0000
+#
+# \param      path_to_image      Path to NIfTI image (.nii or .nii.gz)
+# \param      path_to_output     Path to store directory (.zarr)
+# \param      chunk_size         Chunk size in voxels; scalar or (x, y, z)
+# \param      n_levels           Number of resolution levels
+# \param      is_label           If true, levels are downsampled by the
+#                                most frequent label of each block instead
+#                                of averaging
+# \param      compression_level  zlib compression level of chunks (0-9)
+#
+# \return     ChunkedImage object
+#
+def convert_nifti_to_chunked_image(path_to_image,
+                                   path_to_output,
+                                   chunk_size=chk.CHUNK_SIZE,
+                                   n_levels=1,
+                                   is_label=False,
+                                   compression_level=chk.COMPRESSION_LEVEL,
+                                   ):
+    header = dr.DataReader.read_image_header(path_to_image)
+    shape = header.get_data_shape()
+    dim = min(3, len(shape))
+    size = list(shape[0:dim])
+    thickness = int((np.ones(dim, dtype=int) * chunk_size)[-1])
+
+    image = None
+    for z in range(0, size[-1], thickness):
+        index = [0] * dim
+        index[-1] = z
+        size_slab = list(size)
+        size_slab[-1] = min(thickness, size[-1] - z)
+        slab_sitk = dr.DataReader.read_image_region(
+            path_to_image, index, size_slab)
+        nda = sitk.GetArrayViewFromImage(slab_sitk)
+
+        if image is None:
+            image = ChunkedImage.create(
+                path_to_output,
+                size=size,
+                spacing=slab_sitk.GetSpacing(),
+                origin=slab_sitk.GetOrigin(),
+                direction=slab_sitk.GetDirection(),
+                dtype=nda.dtype,
+                components=slab_sitk.GetNumberOfComponentsPerPixel(),
+                chunk_size=chunk_size,
+                n_levels=n_levels,
+                compression_level=compression_level,
+            )
+        image.WriteRegion(nda, index)
+
+    image.UpdateLevels(is_label=is_label)
+    return image
+
+
+##
+# Convert a resolution level of a chunked image store to a NIfTI image. The
+# header is written once followed by slabs of chunk thickness, i.e. the level
+# is never held in memory entirely. Vector images are written as
+# (x, y, z, components) image as by DataWriter.write_vector_image.
+# \date       2026-10-19 16:28:40+0000
+#
+# \param      path_to_image   Path to store directory (.zarr)
+# \param      path_to_output  Path to NIfTI image (.nii or .nii.gz)
+# \param      level           Resolution level
+#
+def convert_chunked_image_to_nifti(path_to_image, path_to_output, level=0):
+    extension = ph.strip_filename_extension(path_to_output)[1]
+    if extension not in ["nii", "nii.gz"]:
+        raise IOError("Image file extension must be of type nii or nii.gz")
+
+    image = dr.DataReader.read_image_chunked(path_to_image)
+    dim = image.GetDimension()
+    size = np.array(image.GetSize(level))
+    n_components = image.GetNumberOfComponentsPerPixel()
+    dtype = np.dtype(image.GetDataType()).newbyteorder("=")
+
+    spacing = np.ones(3)
+    spacing[0:dim] = image.GetSpacing(level)
+    origin = np.zeros(3)
+    origin[0:dim] = image.GetOrigin(level)
+    direction = np.eye(3)
+    direction[0:dim, 0:dim] = np.array(
+        image.GetDirection()).reshape(dim, dim)
+
+    # Affine for orientation (x maps_to -x, and y maps_to -y)
+    R = np.diag([-1, -1, 1])
+    affine = np.eye(4)
+    affine[0:3, 0:3] = R.dot(direction).dot(np.diag(spacing))
+    affine[0:3, 3] = R.dot(origin)
+
+    shape = tuple(size)
+    zooms = tuple(spacing[0:dim])
+    if n_components > 1:
+        shape = tuple(size) + (1,) * (3 - dim) + (n_components,)
+        zooms = tuple(spacing) + (1.,)
+    header = nib.Nifti1Header()
+    header.set_data_shape(shape)
+    header.set_data_dtype(dtype)
+    header.set_xyzt_units("mm")
+    header.set_zooms(zooms)
+    header.set_qform(affine, code=1)
+    header.set_sform(affine, code=1)
+    header["vox_offset"] = 352
+
+    ph.create_directory(os.path.dirname(path_to_output))
+    if extension == "nii.gz":
+        fileobj = dw.DataWriter.open_gzip(path_to_output)
+    else:
+        fileobj = open(path_to_output, "wb")
+
+    try:
+        header.write_to(fileobj)
+        fileobj.write(
+            b"\x00" * (int(header.get_data_offset()) - fileobj.tell()))
+
+        # Slabs along the last (slowest varying) dimension as z, y, x array.
+        # In C-order this corresponds to the x-fastest NIfTI layout on disk.
+        # Components are the slowest varying dimension in NIfTI
+        thickness = image.GetChunkSize(level)[-1]
+        for c in range(n_components):
+            for z in range(0, size[-1], thickness):
+                index = np.zeros_like(size)
+                index[-1] = z
+                slab_size = size.copy()
+                slab_size[-1] = min(thickness, size[-1] - z)
+                nda = image.ReadRegionArray(index, slab_size, level)
+                if n_components > 1:
+                    nda = nda[..., c]
+                fileobj.write(np.ascontiguousarray(nda).tobytes())
+    finally:
+        fileobj.close()
@@ -0,0 +1,305 @@
+##
+# \file wrapper_benchmark.py
+# \brief      Benchmark of the overhead of the wrapped registration tools
+#
+# Local stub executables replace reg_aladin, reg_f3d and flirt. They honour
+# the file contracts of the tools, i.e. read the given inputs and write
+# outputs on the reference grid, but perform no registration. Hence, the
+# time of each run is dominated by simplereg's own stages, e.g. staging of
+# inputs, reading and converting of outputs, which are timed separately.
+#
+# \author     Michael Ebner (michael.ebner.14@ucl.ac.uk)
+# \date       October 2026
+#
+
+import os
+import sys
+import time
+import shutil
+import platform
+import tempfile
+import numpy as np
+import SimpleITK as sitk
+
+import simplereg.flirt
+import simplereg.niftyreg
+from simplereg.__about__ import __version__
+
+METHODS = ["RegAladin", "RegF3D", "FLIRT"]
+
+# Edge lengths of the benchmarked cubic images in voxels
+SIZES = [32, 64, 128]
+
+# Environment variables pointing to the tools, see executable.find_executable
+ENV_DIRS = ["NIFTYREGDIR", "FSLDIR"]
+
+STUB_HEADER = """#!%s
+import sys
+import numpy as np
+import SimpleITK as sitk
+
+args = sys.argv[1:]
+options = dict((a, b) for a, b in zip(args[:-1], args[1:])
+               if a.startswith("-"))
+""" % sys.executable
+
+# Output on the reference grid and identity transform
+STUB_AFFINE = """
+reference_sitk = sitk.ReadImage(options["-ref"])
+sitk.ReadImage(options[FLOATING])
+sitk.WriteImage(reference_sitk, options[RESULT])
+np.savetxt(options[MATRIX], np.eye(4))
+"""
+
+# Identity control point grid with a spacing of 5 voxels
+STUB_CPP = """
+import nibabel as nib
+reference_sitk = sitk.ReadImage(options["-ref"])
+sitk.ReadImage(options["-flo"])
+sitk.WriteImage(reference_sitk, options["-res"])
+
+ratio = 5.
+size = np.array(reference_sitk.GetSize())
+grid_size = tuple(np.floor((size - 1) / ratio).astype(int) + 4)
+A = np.diag(reference_sitk.GetSpacing())
+origin = np.array(reference_sitk.GetOrigin())
+indices = np.moveaxis(np.indices(grid_size), 0, -1)
+positions = ((indices - 1) * ratio).dot(A.T) + origin
+affine = np.eye(4)
+affine[0:3, 0:3] = A * ratio
+affine[0:3, 3] = origin - A.dot(np.ones(3) * ratio)
+affine[0:2] *= -1
+positions[..., 0:2] *= -1
+cpp_nib = nib.Nifti1Image(positions.reshape(grid_size + (1, 3)), affine)
+cpp_nib.header.set_intent("vector", name="NREG_TRANS")
+cpp_nib.header["intent_p1"] = 5
+nib.save(cpp_nib, options["-cpp"])
+"""
+
+STUBS = {
+    "reg_aladin": 'FLOATING, RESULT, MATRIX = "-flo", "-res", "-aff"' +
+    STUB_AFFINE,
+    "reg_f3d": STUB_CPP,
+    "flirt": 'FLOATING, RESULT, MATRIX = "-in", "-out", "-omat"' +
+    STUB_AFFINE,
+}
+
+
+##
+# Writes the stub executables to a directory.
+# \date       2026-10-19 23:02:10+0000
+#
+# \param      directory  Directory; created if not existing
+#
+def write_stubs(directory):
+    os.makedirs(directory, exist_ok=True)
+    for name, code in STUBS.items():
+        path_to_stub = os.path.join(directory, name)
+        with open(path_to_stub, "w") as fileobj:
+            fileobj.write(STUB_HEADER + code)
+        os.chmod(path_to_stub, 0o755)
+
+
+##
+# Benchmark of the per-stage overhead of RegAladin, RegF3D and FLIRT runs
+# \date       2026-10-19 23:03:31+0000
+#
+class WrapperBenchmark(object):
+
+    ##
+    # Store benchmark settings
+    # \date       2026-10-19 23:04:02+0000
+    #
+    # \param      self         The object
+    # \param      methods      List of registration methods, see METHODS
+    # \param      sizes        List of edge lengths of cubic images in voxels
+    # \param      repetitions  Number of runs per method and size
+    # \param      dir_tmp      Directory in which stubs and working
+    #                          directories are created; system default if
+    #                          None
+    # \param      verbose      Turn on/off verbose output
+    #
+    def __init__(self,
+                 methods=METHODS,
+                 sizes=SIZES,
+                 repetitions=3,
+                 dir_tmp=None,
+                 verbose=0,
+                 ):
+        for method in methods:
+            if method not in METHODS:
+                raise ValueError("Method '%s' not known. Use one of %s" % (
+                    method, ", ".join(METHODS)))
+
+        self._methods = list(methods)
+        self._sizes = [int(s) for s in sizes]
+        self._repetitions = max(1, int(repetitions))
+        self._dir_tmp = dir_tmp
+        self._verbose = verbose
+
+    ##
+    # Run the benchmark. The stubs take precedence over installed tools
+    # while it runs, i.e. os.environ is modified temporarily.
+    # \date       2026-10-19 23:06:12+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Report as JSON-serializable dictionary
+    #
+    def run(self):
+        directory = tempfile.mkdtemp(
+            prefix="simplereg_benchmark_", dir=self._dir_tmp)
+        environ = {key: os.environ.get(key) for key in ENV_DIRS + ["PATH"]}
+        try:
+            dir_stubs = os.path.join(directory, "bin")
+            write_stubs(dir_stubs)
+            for key in ENV_DIRS:
+                os.environ[key] = dir_stubs
+            os.environ["PATH"] = os.pathsep.join(
+                [dir_stubs, environ["PATH"] or ""])
+
+            results = []
+            for size in self._sizes:
+                fixed_sitk = self._get_image(size, seed=0)
+                moving_sitk = self._get_image(size, seed=1)
+                for method in self._methods:
+                    for repetition in range(self._repetitions):
+                        result = self._run_method(
+                            method, fixed_sitk, moving_sitk, directory)
+                        result["size"] = size
+                        result["repetition"] = repetition
+                        results.append(result)
+                        if self._verbose:
+                            print("%s %d^3 [%d/%d]: overhead %.3f s" % (
+                                method, size, repetition + 1,
+                                self._repetitions, result["overhead"]))
+        finally:
+            for key, value in environ.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            shutil.rmtree(directory, ignore_errors=True)
+
+        return {
+            "simplereg": __version__,
+            "python": platform.python_version(),
+            "simpleitk": sitk.Version.VersionString(),
+            "platform": platform.platform(),
+            "results": results,
+            "summary": get_summary(results),
+        }
+
+    ##
+    # Run a registration method once and time its stages.
+    # \date       2026-10-19 23:08:40+0000
+    #
+    # \param      self         The object
+    # \param      method       Registration method, see METHODS
+    # \param      fixed_sitk   Fixed image as sitk.Image object
+    # \param      moving_sitk  Moving image as sitk.Image object
+    # \param      directory    Root directory of working directories
+    #
+    # \return     Dictionary of method, stage times, total time and
+    #             overhead in seconds
+    #
+    def _run_method(self, method, fixed_sitk, moving_sitk, directory):
+        if method == "FLIRT":
+            registration = simplereg.flirt.FLIRT(
+                fixed_sitk=fixed_sitk,
+                moving_sitk=moving_sitk,
+                dir_tmp=directory,
+            )
+        else:
+            registration = getattr(simplereg.niftyreg, method)(
+                fixed_sitk=fixed_sitk,
+                moving_sitk=moving_sitk,
+                omp=1,
+                dir_tmp=directory,
+            )
+
+        time_start = time.perf_counter()
+        registration.run()
+        stages = registration.get_stage_times()
+
+        # Evaluation of the control point grid is part of each RegF3D use
+        if method == "RegF3D":
+            stage_start = time.perf_counter()
+            registration.get_displacement_field_sitk()
+            stages["displacement"] = time.perf_counter() - stage_start
+        total = time.perf_counter() - time_start
+
+        return {
+            "method": method,
+            "stages": stages,
+            "total": total,
+            "overhead": total - stages["command"],
+        }
+
+    @staticmethod
+    def _get_image(size, seed):
+        nda = np.random.RandomState(seed).rand(
+            size, size, size).astype(np.float32)
+        image_sitk = sitk.GetImageFromArray(nda)
+        image_sitk.SetSpacing((1.1, 1.2, 1.3))
+        return image_sitk
+
+
+##
+# Gets the median time of each stage, the total time and the overhead per
+# method and size.
+# \date       2026-10-19 23:11:02+0000
+#
+# \param      results  List of results as in the report of
+#                      WrapperBenchmark.run
+#
+# \return     List of dictionaries of method, size and median times
+#
+def get_summary(results):
+    groups = {}
+    for result in results:
+        groups.setdefault(
+            (result["method"], result["size"]), []).append(result)
+
+    summary = []
+    for (method, size), group in groups.items():
+        entry = {"method": method, "size": size, "stages": {}}
+        for stage in group[0]["stages"].keys():
+            entry["stages"][stage] = float(np.median(
+                [r["stages"][stage] for r in group]))
+        for key in ["total", "overhead"]:
+            entry[key] = float(np.median([r[key] for r in group]))
+        summary.append(entry)
+    return summary
+
+
+##
+# Compare the overhead of a benchmark against a baseline, e.g. of a previous
+# release.
+# \date       2026-10-19 23:13:31+0000
+#
+# \param      report       Report as returned by WrapperBenchmark.run
+# \param      baseline     Report of the baseline
+# \param      tolerance    Factor by which the overhead may exceed the
+#                          baseline
+# \param      min_seconds  Absolute slack in seconds to ignore timing noise
+#                          of small images
+#
+# \return     List of regressions as strings; empty if there are none
+#
+def get_regressions(report, baseline, tolerance=1.5, min_seconds=0.02):
+    baseline_summary = {
+        (s["method"], s["size"]): s for s in baseline["summary"]}
+
+    regressions = []
+    for entry in report["summary"]:
+        reference = baseline_summary.get((entry["method"], entry["size"]))
+        if reference is None:
+            continue
+        limit = reference["overhead"] * tolerance + min_seconds
+        if entry["overhead"] > limit:
+            regressions.append(
+                "%s %d^3: overhead %.3f s exceeds %.3f s (baseline %.3f s)" %
+                (entry["method"], entry["size"], entry["overhead"], limit,
+                 reference["overhead"]))
+    return regressions
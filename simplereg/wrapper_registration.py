@@ -5,11 +5,24 @@
 # \date       Aug 2017
 
 # Import libraries
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import SimpleITK as sitk
 from abc import ABCMeta, abstractmethod
 
+import pysitk.python_helper as ph
+import pysitk.simple_itk_helper as sitkh
+
+from simplereg.definitions import DIR_TMP
 from simplereg.simple_itk_registration_base \
     import SimpleItkRegistrationBase
 
+# Input files of these formats are passed to the command line tools as-is
+INPUT_EXTENSIONS = (".nii", ".nii.gz")
+
 
 ##
 # Abstract class to wrap registration methods from SimpleITK objects
@@ -30,6 +43,15 @@ class WrapperRegistration(SimpleItkRegistrationBase):
     # \param      moving_sitk_mask  Moving image mask as sitk.Image object
     # \param      options           Options to add for command line tool;
     #                               string
+    # \param      verbose           Turn on/off verbose output
+    # \param      subfolder         Prefix of the working directory created
+    #                               for each run
+    # \param      dir_tmp           Root directory of working directories,
+    #                               e.g. a tmpfs mount
+    # \param      keep_files        Keep working directories after each run,
+    #                               e.g. for debugging
+    # \param      timeout           Timeout in seconds for each executed
+    #                               command; None for no timeout
     #
     def __init__(self,
                  fixed_sitk,
@@ -38,6 +60,10 @@ class WrapperRegistration(SimpleItkRegistrationBase):
                  moving_sitk_mask,
                  options,
                  verbose,
+                 subfolder="",
+                 dir_tmp=DIR_TMP,
+                 keep_files=False,
+                 timeout=None,
                  ):
 
         SimpleItkRegistrationBase.__init__(self,
@@ -49,6 +75,114 @@ class WrapperRegistration(SimpleItkRegistrationBase):
         self._options = options
         self._verbose = verbose
 
+        self._subfolder = subfolder
+        self._dir_root = dir_tmp
+        self._keep_files = keep_files
+        self._timeout = timeout
+
+        # Working directory of the most recent run
+        self._dir_tmp = None
+
+        # Time in seconds spent in each stage of the most recent run
+        self._stage_times = {}
+
+        # Files backing the input images
+        self._input_files = {
+            "fixed": None,
+            "moving": None,
+            "fixed_mask": None,
+            "moving_mask": None,
+        }
+
+    ##
+    # Sets the fixed image.
+    # \date       2026-10-19 20:31:02+0000
+    #
+    # \param      self          The object
+    # \param      fixed_sitk    The fixed image as sitk object; read from
+    #                           path_to_file on run if None
+    # \param      path_to_file  Optional path to the file the fixed image was
+    #                           read from. NIfTI files are passed to the tool
+    #                           as-is instead of writing the image again.
+    #
+    def set_fixed_sitk(self, fixed_sitk, path_to_file=None):
+        self._fixed_sitk = fixed_sitk
+        self._input_files["fixed"] = path_to_file
+
+    def set_moving_sitk(self, moving_sitk, path_to_file=None):
+        self._moving_sitk = moving_sitk
+        self._input_files["moving"] = path_to_file
+
+    def set_fixed_sitk_mask(self, fixed_sitk_mask, path_to_file=None):
+        self._fixed_sitk_mask = fixed_sitk_mask
+        self._input_files["fixed_mask"] = path_to_file
+
+    def set_moving_sitk_mask(self, moving_sitk_mask, path_to_file=None):
+        self._moving_sitk_mask = moving_sitk_mask
+        self._input_files["moving_mask"] = path_to_file
+
+    ##
+    # Run registration. Images only given by file are read beforehand.
+    # \date       2026-10-19 20:33:40+0000
+    #
+    # \param      self  The object
+    #
+    def run(self):
+        self._stage_times = {}
+        time_start = time.perf_counter()
+        self._read_input_files()
+        self._record_stage("read_inputs", time_start)
+        SimpleItkRegistrationBase.run(self)
+
+    ##
+    # Run registration as coroutine, e.g. on the event loop of a service.
+    # The command line tool runs as asyncio subprocess which is killed on
+    # timeout or cancellation; reading and writing of images happens in the
+    # default executor of the loop.
+    # \date       2026-10-19 22:01:40+0000
+    #
+    # \param      self          The object
+    # \param      semaphore     Optional asyncio.Semaphore limiting the
+    #                           number of registrations running concurrently
+    # \param      log_callback  Optional function called with each line of
+    #                           output of the command line tool
+    #
+    async def run_async(self, semaphore=None, log_callback=None):
+        if semaphore is not None:
+            async with semaphore:
+                await self.run_async(log_callback=log_callback)
+            return
+
+        self._stage_times = {}
+        stage_start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._read_input_files)
+        self._record_stage("read_inputs", stage_start)
+
+        key, time_start = await loop.run_in_executor(None, self._start_run)
+        if time_start is None:
+            return
+
+        stage_start = time.perf_counter()
+        self._dir_tmp = directory = self._create_working_directory()
+        try:
+            command = await loop.run_in_executor(None, self._prepare)
+            stage_start = self._record_stage("prepare", stage_start)
+            await command.run_async(
+                timeout=self._timeout,
+                path_to_log=self._get_log_file(command, directory),
+                verbose=self._verbose,
+                log_callback=log_callback,
+            )
+            stage_start = self._record_stage("command", stage_start)
+            await loop.run_in_executor(None, self._read_results)
+            stage_start = self._record_stage("read_results", stage_start)
+        finally:
+            self._delete_working_directory(directory)
+            self._record_stage("cleanup", stage_start)
+
+        await loop.run_in_executor(None, self._finish_run, key, time_start)
+
     ##
     # Sets the options of the registration method.
     # \date       2017-08-08 17:26:45+0100
@@ -90,3 +224,245 @@ class WrapperRegistration(SimpleItkRegistrationBase):
     #
     def get_verbose(self):
         return self._verbose
+
+    ##
+    # Sets whether working directories are kept after each run.
+    # \date       2026-10-19 19:02:11+0000
+    #
+    # \param      self        The object
+    # \param      keep_files  Turn on/off keeping of files. Boolean.
+    #
+    def set_keep_files(self, keep_files):
+        self._keep_files = keep_files
+
+    def get_keep_files(self):
+        return self._keep_files
+
+    def set_timeout(self, timeout):
+        self._timeout = timeout
+
+    def get_timeout(self):
+        return self._timeout
+
+    ##
+    # Gets the time spent in each stage of the most recent run, i.e.
+    # reading inputs given by file ("read_inputs"), writing inputs to the
+    # working directory ("prepare"), executing the command line tool
+    # ("command"), reading its outputs ("read_results") and deleting the
+    # working directory ("cleanup"). Stages are missing for cached results.
+    # \date       2026-10-19 22:53:40+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Dictionary of stage and time in seconds
+    #
+    def get_stage_times(self):
+        return dict(self._stage_times)
+
+    ##
+    # Gets the working directory of the most recent run. It only exists after
+    # the run if files are kept.
+    # \date       2026-10-19 19:03:40+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Path to directory as string or None if not run yet
+    #
+    def get_working_directory(self):
+        return self._dir_tmp
+
+    ##
+    # Creates a unique working directory so that concurrent runs, also across
+    # processes, do not interfere.
+    # \date       2026-10-19 19:05:02+0000
+    #
+    # \param      self  The object
+    #
+    # \return     Path to the created directory as string
+    #
+    def _create_working_directory(self):
+        # Concurrent runs may create the root directory at the same time
+        os.makedirs(self._dir_root, exist_ok=True)
+        prefix = "%s_" % self._subfolder if self._subfolder else "tmp_"
+        return tempfile.mkdtemp(prefix=prefix, dir=self._dir_root)
+
+    ##
+    # Deletes a working directory unless files are kept.
+    # \date       2026-10-19 19:06:31+0000
+    #
+    # \param      self       The object
+    # \param      directory  Path to directory
+    #
+    def _delete_working_directory(self, directory):
+        if self._keep_files:
+            if self._verbose:
+                ph.print_info("Files kept in '%s'" % directory)
+            return
+        shutil.rmtree(directory, ignore_errors=True)
+
+    ##
+    # Executes a command. Its output is logged within the working directory.
+    # \date       2026-10-19 20:08:14+0000
+    #
+    # \param      self       The object
+    # \param      command    Command as executable.Command object
+    # \param      directory  Working directory of the run
+    #
+    # \return     executable.CommandResult
+    #
+    def _execute(self, command, directory):
+        return command.run(
+            timeout=self._timeout,
+            path_to_log=self._get_log_file(command, directory),
+            verbose=self._verbose,
+        )
+
+    @staticmethod
+    def _get_log_file(command, directory):
+        return os.path.join(directory, "%s.log" % command.get_name())
+
+    ##
+    # Execute registration within a new working directory which is deleted
+    # afterwards unless files are kept.
+    # \date       2026-10-19 22:04:12+0000
+    #
+    # \param      self  The object
+    #
+    def _run(self):
+        stage_start = time.perf_counter()
+        self._dir_tmp = self._create_working_directory()
+        try:
+            command = self._prepare()
+            stage_start = self._record_stage("prepare", stage_start)
+            self._execute(command, self._dir_tmp)
+            stage_start = self._record_stage("command", stage_start)
+            self._read_results()
+            stage_start = self._record_stage("read_results", stage_start)
+        finally:
+            self._delete_working_directory(self._dir_tmp)
+            self._record_stage("cleanup", stage_start)
+
+    ##
+    # Records the time spent in a stage of the run.
+    # \date       2026-10-19 22:55:12+0000
+    #
+    # \param      self        The object
+    # \param      stage       Name of stage, e.g. "prepare"
+    # \param      time_start  Start of stage as returned by time.perf_counter
+    #
+    # \return     End of stage as returned by time.perf_counter
+    #
+    def _record_stage(self, stage, time_start):
+        time_end = time.perf_counter()
+        self._stage_times[stage] = time_end - time_start
+        return time_end
+
+    ##
+    # Write the input files to the working directory and get the command of
+    # the command line tool.
+    # \date       2026-10-19 22:05:30+0000
+    #
+    # \param      self  The object
+    #
+    # \return     executable.Command object
+    #
+    @abstractmethod
+    def _prepare(self):
+        pass
+
+    ##
+    # Read the results of the command line tool from the working directory.
+    # \date       2026-10-19 22:06:02+0000
+    #
+    # \param      self  The object
+    #
+    @abstractmethod
+    def _read_results(self):
+        pass
+
+    def _get_cache_options(self):
+        return {"options": self._options}
+
+    ##
+    # Writes the obtained transform and warped moving image to the directory
+    # of a cache entry.
+    # \date       2026-10-19 22:44:31+0000
+    #
+    # \param      self       The object
+    # \param      directory  Directory of cache entry
+    #
+    def _write_cache_entry(self, directory):
+        SimpleItkRegistrationBase._write_cache_entry(self, directory)
+        sitk.WriteImage(self._warped_moving_sitk,
+                        os.path.join(directory, "warped_moving.nii"))
+
+    def _read_cache_entry(self, directory):
+        SimpleItkRegistrationBase._read_cache_entry(self, directory)
+        self._warped_moving_sitk = sitk.ReadImage(
+            os.path.join(directory, "warped_moving.nii"))
+
+    ##
+    # Read images only given by file.
+    # \date       2026-10-19 22:07:10+0000
+    #
+    # \param      self  The object
+    #
+    def _read_input_files(self):
+        for key, attribute in [
+                ("fixed", "_fixed_sitk"),
+                ("moving", "_moving_sitk"),
+                ("fixed_mask", "_fixed_sitk_mask"),
+                ("moving_mask", "_moving_sitk_mask")]:
+            if getattr(self, attribute) is None and \
+                    self._input_files[key] is not None:
+                setattr(self, attribute,
+                        sitk.ReadImage(self._input_files[key]))
+
+    ##
+    # Gets the input file for the command line tool. The file backing the
+    # image is used if it is in NIfTI format; otherwise the image is written
+    # to the exchange file.
+    # \date       2026-10-19 20:36:12+0000
+    #
+    # \param      self                   The object
+    # \param      key                    Input, i.e. "fixed", "moving",
+    #                                    "fixed_mask" or "moving_mask"
+    # \param      image_sitk             Image as sitk.Image object
+    # \param      path_to_exchange_file  Path to exchange file within the
+    #                                    working directory
+    #
+    # \return     Path to the input file as string
+    #
+    def _get_input_file(self, key, image_sitk, path_to_exchange_file):
+        path_to_file = self._input_files[key]
+        if path_to_file is not None and \
+                path_to_file.endswith(INPUT_EXTENSIONS) and \
+                ph.file_exists(path_to_file):
+            return path_to_file
+
+        sitkh.write_nifti_image_sitk(image_sitk, path_to_exchange_file)
+        return path_to_exchange_file
+
+
+##
+# Run several registrations concurrently on the running event loop.
+# \date       2026-10-19 22:09:31+0000
+#
+# \param      registrations      List of WrapperRegistration objects
+# \param      max_concurrent     Maximum number of registrations running at
+#                                the same time; all if None
+# \param      return_exceptions  Return exceptions of failed registrations
+#                                instead of raising the first one
+#
+# \return     List of results as returned by asyncio.gather
+#
+async def run_registrations_async(registrations,
+                                  max_concurrent=None,
+                                  return_exceptions=False,
+                                  ):
+    semaphore = None
+    if max_concurrent is not None:
+        semaphore = asyncio.Semaphore(max_concurrent)
+    return await asyncio.gather(
+        *[r.run_async(semaphore=semaphore) for r in registrations],
+        return_exceptions=return_exceptions)
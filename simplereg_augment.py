@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+import sys
+
+from simplereg.application.augment import main
+
+if __name__ == "__main__":
+    sys.exit(main())
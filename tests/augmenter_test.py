@@ -0,0 +1,80 @@
+##
+# \file augmenter_test.py
+#  \brief  Class containing unit tests for augmenter class
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import numpy as np
+import SimpleITK as sitk
+import unittest
+
+import simplereg.augmenter as aug
+from simplereg.definitions import DIR_TMP, DIR_DATA
+
+
+class AugmenterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.precision = 7
+        self.path_to_image = os.path.join(
+            DIR_DATA, "3D_SheppLoganPhantom_64.nii.gz")
+        self.dir_output = os.path.join(DIR_TMP, "simplereg-augmenter")
+
+    def test_reproducible_samples(self):
+        kwargs = {
+            "path_to_image": self.path_to_image,
+            "n_samples": 4,
+            "seed": 13,
+            "rotation": 10,
+            "translation": 5,
+            "scaling": 0.1,
+            "displacement": 2,
+        }
+        augmenter = aug.Augmenter(n_jobs=2, **kwargs)
+        samples = list(augmenter.iterate_samples())
+        self.assertEqual([s[0] for s in samples], list(range(4)))
+
+        # Regenerate individual sample from a separate instance
+        augmenter_2 = aug.Augmenter(n_jobs=1, **kwargs)
+        warped_sitk, transform_sitk = augmenter_2.get_sample(2)
+        self.assertAlmostEqual(
+            np.linalg.norm(
+                np.array(transform_sitk.GetParameters()) -
+                np.array(samples[2][2].GetParameters())),
+            0, places=self.precision)
+        nda_diff = sitk.GetArrayFromImage(warped_sitk - samples[2][1])
+        self.assertAlmostEqual(
+            np.linalg.norm(nda_diff), 0, places=self.precision)
+
+        # Different samples differ
+        nda_diff = sitk.GetArrayFromImage(samples[0][1] - samples[1][1])
+        self.assertGreater(np.linalg.norm(nda_diff), 0)
+
+    def test_identity(self):
+        augmenter = aug.Augmenter(
+            path_to_image=self.path_to_image,
+            n_samples=1,
+            interpolator="NearestNeighbor",
+        )
+        warped_sitk, transform_sitk = augmenter.get_sample(0)
+        image_sitk = sitk.ReadImage(self.path_to_image)
+        nda_diff = sitk.GetArrayFromImage(warped_sitk - image_sitk)
+        self.assertEqual(np.sum(np.abs(nda_diff)), 0)
+
+    def test_write_samples(self):
+        augmenter = aug.Augmenter(
+            path_to_image=self.path_to_image,
+            n_samples=3,
+            rotation=5,
+            n_jobs=3,
+        )
+        augmenter.write_samples(self.dir_output, filename="phantom")
+        for i in range(3):
+            self.assertTrue(os.path.isfile(os.path.join(
+                self.dir_output, "phantom_%04d.nii.gz" % i)))
+            self.assertTrue(os.path.isfile(os.path.join(
+                self.dir_output, "phantom_%04d.txt" % i)))
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.dir_output, "phantom_settings.json")))
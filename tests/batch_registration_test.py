@@ -0,0 +1,143 @@
+##
+# \file batch_registration_test.py
+#  \brief  Unit tests for parallel registration of many image pairs
+#
+#  A local stub executable replaces reg_aladin. It records the number of
+#  threads and fails on the first attempt for moving images named fail*.
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import shutil
+import tempfile
+import unittest
+import SimpleITK as sitk
+
+import simplereg.niftyreg
+import simplereg.data_reader as dr
+import simplereg.batch_registration as br
+from tests.stub_executables import STUB_COPY, StubExecutables
+
+STUBS = {"reg_aladin": STUB_COPY + """
+path_in = options["-flo"]
+if os.path.basename(path_in).startswith("fail"):
+    path_marker = path_in + ".failed"
+    if not os.path.isfile(path_marker):
+        open(path_marker, "w").close()
+        sys.exit(1)
+matrix = np.eye(4)
+matrix[1, 3] = int(os.environ["OMP_NUM_THREADS"])
+copy(path_in, options["-res"], options["-aff"], matrix)
+"""}
+
+
+class BatchRegistrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_stubs = tempfile.mkdtemp()
+        self.dir_data = tempfile.mkdtemp()
+        self.stubs = StubExecutables(self.dir_stubs, STUBS)
+        self.stubs.start()
+
+    def tearDown(self):
+        self.stubs.stop()
+        shutil.rmtree(self.dir_stubs)
+        shutil.rmtree(self.dir_data)
+
+    def _write_image(self, filename, value, size=(8, 7, 6)):
+        image_sitk = sitk.Image(list(size), sitk.sitkFloat32) + value
+        path_to_file = os.path.join(self.dir_data, filename)
+        sitk.WriteImage(image_sitk, path_to_file)
+        return path_to_file
+
+    def _create_registration(self, n_threads):
+        return simplereg.niftyreg.RegAladin(
+            omp=n_threads, dir_tmp=self.dir_data)
+
+    def test_get_thread_split(self):
+        self.assertEqual(br.get_thread_split(16, 100), (4, 4))
+        self.assertEqual(br.get_thread_split(16, 100, 2), (8, 2))
+        self.assertEqual(br.get_thread_split(16, 2), (2, 8))
+        self.assertEqual(br.get_thread_split(16, 2, 2), (2, 2))
+        self.assertEqual(br.get_thread_split(3, 100), (1, 3))
+        self.assertEqual(br.get_thread_split(1, 100, 4), (1, 1))
+
+    def test_run(self):
+        path_to_fixed = self._write_image("fixed.nii.gz", 0)
+        jobs = []
+        for i in range(5):
+            jobs.append(br.RegistrationJob(
+                fixed=path_to_fixed,
+                moving=self._write_image(
+                    "moving%d.nii.gz" % i, i + 1, size=(8, 7, 2 + i)),
+                output_transform=os.path.join(
+                    self.dir_data, "transform%d.txt" % i),
+            ))
+
+        batch = br.BatchRegistration(
+            self._create_registration, jobs, n_cores=1, threads_per_job=2)
+        self.assertEqual(batch.get_number_of_concurrent_jobs(), 1)
+        self.assertEqual(batch.get_threads_per_job(), 1)
+
+        # Largest images first
+        results = list(batch.run())
+        self.assertEqual([r.index for r in results], [4, 3, 2, 1, 0])
+
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assertEqual(result.attempts, 1)
+            transform_sitk = dr.DataReader.read_transform(
+                result.job.output_transform)
+            translation = transform_sitk.GetParameters()[-3:]
+            self.assertAlmostEqual(abs(translation[0]), result.index + 1)
+            self.assertAlmostEqual(abs(translation[1]), 1)
+
+        # Concurrent jobs share the core budget
+        batch = br.BatchRegistration(
+            self._create_registration, jobs, n_cores=6, threads_per_job=3)
+        self.assertEqual(batch.get_number_of_concurrent_jobs(), 2)
+        for result in batch.run():
+            self.assertIsNone(result.error)
+            translation = result.registration.get_registration_transform_sitk(
+            ).GetParameters()[-3:]
+            self.assertAlmostEqual(abs(translation[1]), 3)
+
+    def test_retries(self):
+        jobs = [br.RegistrationJob(
+            fixed=self._write_image("fixed.nii.gz", 0),
+            moving=self._write_image("fail.nii.gz", 2),
+        )]
+
+        results = list(br.BatchRegistration(
+            self._create_registration, jobs, n_cores=2,
+            max_retries=0).run())
+        self.assertIsInstance(results[0].error, RuntimeError)
+        self.assertIsNone(results[0].registration)
+
+        os.remove(jobs[0].moving + ".failed")
+        results = list(br.BatchRegistration(
+            self._create_registration, jobs, n_cores=2,
+            max_retries=1).run())
+        self.assertIsNone(results[0].error)
+        self.assertEqual(results[0].attempts, 2)
+
+    def test_read_manifest(self):
+        path_to_manifest = os.path.join(self.dir_data, "manifest.csv")
+        with open(path_to_manifest, "w") as fileobj:
+            fileobj.write("fixed,moving,output_transform\n")
+            fileobj.write("a.nii.gz,b.nii.gz,\n")
+            fileobj.write("/abs/c.nii.gz,d.nii.gz,t.txt\n")
+
+        jobs = br.read_manifest(path_to_manifest)
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(
+            jobs[0].fixed, os.path.join(self.dir_data, "a.nii.gz"))
+        self.assertIsNone(jobs[0].output_transform)
+        self.assertEqual(jobs[1].fixed, "/abs/c.nii.gz")
+        self.assertEqual(
+            jobs[1].output_transform, os.path.join(self.dir_data, "t.txt"))
+
+        with open(path_to_manifest, "w") as fileobj:
+            fileobj.write("fixed,mask\na.nii.gz,b.nii.gz\n")
+        self.assertRaises(IOError, br.read_manifest, path_to_manifest)
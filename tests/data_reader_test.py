@@ -0,0 +1,401 @@
+##
+# \file data_reader_test.py
+#  \brief  Class containing unit tests for data reader class
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import time
+import shutil
+import numpy as np
+import nibabel as nib
+import SimpleITK as sitk
+import unittest
+
+import simplereg.data_reader as dr
+import simplereg.data_writer as dw
+import simplereg.gzip_index as gzi
+import simplereg.utilities as utils
+from simplereg.definitions import DIR_TMP, DIR_DATA, DIR_TEST
+
+
+class DataReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.precision = 7
+        self.path_to_image = os.path.join(
+            DIR_DATA, "3D_SheppLoganPhantom_64.nii.gz")
+        self.path_to_transform = os.path.join(
+            DIR_TEST, "3D_sitk_Target_Source.txt")
+        dr.DataReader.enable_cache()
+
+    def tearDown(self):
+        dr.DataReader.disable_cache()
+
+    def test_cache_hits(self):
+        for i in range(3):
+            image_sitk = dr.DataReader.read_image(self.path_to_image)
+            transform_sitk = dr.DataReader.read_transform(
+                self.path_to_transform)
+        dr.DataReader.read_transform(self.path_to_transform, inverse=1)
+
+        statistics = dr.DataReader.get_cache_statistics()
+        self.assertEqual(statistics["hits"], 4)
+        self.assertEqual(statistics["misses"], 3)
+        self.assertEqual(statistics["entries"], 3)
+
+        image_ref_sitk = sitk.ReadImage(self.path_to_image)
+        nda_diff = sitk.GetArrayFromImage(image_sitk - image_ref_sitk)
+        self.assertEqual(np.sum(np.abs(nda_diff)), 0)
+        self.assertIsInstance(transform_sitk, sitk.AffineTransform)
+
+    def test_cache_defensive_copies(self):
+        image_sitk = dr.DataReader.read_image(self.path_to_image)
+        image_sitk[0, 0, 0] = 1000
+        image_sitk.SetOrigin((1, 2, 3))
+        transform_sitk = dr.DataReader.read_transform(self.path_to_transform)
+        transform_sitk.SetTranslation((0, 0, 0))
+
+        image_cached_sitk = dr.DataReader.read_image(self.path_to_image)
+        self.assertNotEqual(image_cached_sitk[0, 0, 0], 1000)
+        self.assertNotEqual(image_cached_sitk.GetOrigin(), (1, 2, 3))
+        transform_cached_sitk = dr.DataReader.read_transform(
+            self.path_to_transform)
+        self.assertEqual(
+            transform_cached_sitk.GetTranslation(),
+            sitk.ReadTransform(self.path_to_transform).GetTranslation())
+        self.assertEqual(dr.DataReader.get_cache_statistics()["hits"], 2)
+
+    def test_cache_invalidation_and_eviction(self):
+        path_to_landmarks = os.path.join(DIR_TMP, "landmarks_cache.txt")
+        np.savetxt(path_to_landmarks, np.ones((4, 3)))
+        nda = dr.DataReader.read_landmarks(path_to_landmarks)
+
+        # Modified file is read again
+        time.sleep(0.01)
+        np.savetxt(path_to_landmarks, 2 * np.ones((5, 3)))
+        nda = dr.DataReader.read_landmarks(path_to_landmarks)
+        self.assertEqual(nda.shape, (5, 3))
+        self.assertAlmostEqual(np.sum(nda), 30, places=self.precision)
+        self.assertEqual(dr.DataReader.get_cache_statistics()["hits"], 0)
+
+        # Byte budget only allows for a single landmark array
+        dr.DataReader.enable_cache(max_bytes=200)
+        path_to_landmarks_2 = os.path.join(DIR_TMP, "landmarks_cache_2.txt")
+        shutil.copy(path_to_landmarks, path_to_landmarks_2)
+        dr.DataReader.read_landmarks(path_to_landmarks)
+        dr.DataReader.read_landmarks(path_to_landmarks_2)
+        statistics = dr.DataReader.get_cache_statistics()
+        self.assertEqual(statistics["entries"], 1)
+        self.assertEqual(statistics["evictions"], 1)
+        self.assertEqual(statistics["bytes"], nda.nbytes)
+
+    def test_read_image_memmap(self):
+        for dim in [2, 3]:
+            path_to_image = os.path.join(
+                DIR_DATA, "%dD_Brain_Target.nii.gz" % dim)
+            path_to_image_nii = os.path.join(
+                DIR_TMP, "%dD_Brain_Target.nii" % dim)
+            image_sitk = sitk.ReadImage(path_to_image)
+            sitk.WriteImage(image_sitk, path_to_image_nii)
+
+            image_mmap = dr.DataReader.read_image_memmap(path_to_image_nii)
+            nda = image_mmap.GetArrayView()
+            self.assertIsInstance(nda.base, np.memmap)
+            self.assertFalse(nda.flags.writeable)
+            self.assertEqual(image_mmap.GetSize(), image_sitk.GetSize())
+            self.assertEqual(
+                image_mmap.GetPixelIDValue(), image_sitk.GetPixelIDValue())
+            for attribute in ["GetOrigin", "GetSpacing", "GetDirection"]:
+                self.assertAlmostEqual(
+                    np.linalg.norm(
+                        np.array(getattr(image_mmap, attribute)()) -
+                        getattr(image_sitk, attribute)()),
+                    0, places=self.precision)
+            self.assertEqual(np.sum(np.abs(
+                nda - sitk.GetArrayViewFromImage(image_sitk))), 0)
+
+        self.assertRaises(
+            IOError, dr.DataReader.read_image_memmap, path_to_image)
+
+    def test_read_image_region(self):
+        path_to_image_4d = os.path.join(DIR_TMP, "phantom_4d_index.nii.gz")
+        image_sitk = sitk.ReadImage(self.path_to_image, sitk.sitkFloat32)
+        images_sitk = [image_sitk * float(i + 1) for i in range(4)]
+        image_4d_sitk = sitk.JoinSeries(images_sitk)
+
+        # Indexed output (persistent seek points) and foreign gzip file
+        # (in-process seek points)
+        dw.DataWriter.set_compression(level=1, n_threads=2, index=True)
+        dw.DataWriter.write_image(image_4d_sitk, path_to_image_4d)
+        dw.DataWriter.set_compression()
+        self.assertTrue(gzi.GzipIndex.read_index(
+            path_to_image_4d).is_persistent())
+
+        for path in [path_to_image_4d, self.path_to_image]:
+            if path == self.path_to_image:
+                region_sitk = dr.DataReader.read_image_region(
+                    path, index=(10, 5, 20), size=(30, 40, 15))
+                reference_sitk = sitk.ReadImage(path)[10:40, 5:45, 20:35]
+            else:
+                region_sitk = dr.DataReader.read_image_region(
+                    path, index=(10, 5, 20, 2), size=(30, 40, 15, 1))
+                reference_sitk = images_sitk[2][10:40, 5:45, 20:35]
+            nda_diff = sitk.GetArrayFromImage(region_sitk) - \
+                sitk.GetArrayFromImage(reference_sitk)
+            self.assertAlmostEqual(
+                np.linalg.norm(nda_diff), 0, places=self.precision)
+            self.assertAlmostEqual(
+                np.linalg.norm(np.array(region_sitk.GetOrigin()) -
+                               reference_sitk.GetOrigin()),
+                0, places=self.precision)
+
+        # Regions in several volumes are returned as vector image
+        region_sitk = dr.DataReader.read_image_region(
+            path_to_image_4d, index=(0, 0, 30, 1), size=(64, 64, 2, 3))
+        self.assertEqual(region_sitk.GetNumberOfComponentsPerPixel(), 3)
+        self.assertEqual(region_sitk.GetSize(), (64, 64, 2))
+
+        # Index is invalidated once file is overwritten
+        sitk.WriteImage(image_4d_sitk, path_to_image_4d)
+        self.assertIsNone(gzi.GzipIndex.read_index(path_to_image_4d))
+
+    def test_read_landmarks_binary(self):
+        landmarks_nda = np.random.RandomState(2).rand(100, 3) * 100
+        labels = np.arange(100) % 5
+        ids = np.arange(100) + 10**10
+
+        path_to_txt = os.path.join(DIR_TMP, "landmarks_binary.txt")
+        path_to_npy = os.path.join(DIR_TMP, "landmarks_binary.npy")
+        path_to_lmk = os.path.join(DIR_TMP, "landmarks_binary.lmk")
+        dw.DataWriter.write_landmarks(landmarks_nda, path_to_txt)
+        dw.DataWriter.write_landmarks(landmarks_nda, path_to_npy)
+        dw.DataWriter.write_landmarks(
+            landmarks_nda, path_to_lmk, labels=labels, ids=ids)
+
+        for path, precision in [
+                (path_to_txt, self.precision),
+                (path_to_npy, self.precision),
+                (path_to_lmk, 3)]:
+            nda = dr.DataReader.read_landmarks(path)
+            self.assertEqual(nda.shape, (100, 3))
+            self.assertAlmostEqual(
+                np.max(np.abs(nda - landmarks_nda)), 0, places=precision)
+
+        # Binary files are memory-mapped copy-on-write
+        nda = dr.DataReader.read_landmarks(path_to_lmk)
+        self.assertIsInstance(nda, np.memmap)
+        self.assertEqual(nda.dtype, np.float32)
+        nda[:, 0:2] *= -1
+        self.assertAlmostEqual(np.max(np.abs(
+            dr.DataReader.read_landmarks(path_to_lmk) - landmarks_nda)),
+            0, places=3)
+
+        labels_read, ids_read = dr.DataReader.read_landmark_attributes(
+            path_to_lmk)
+        self.assertEqual(np.sum(np.abs(labels_read - labels)), 0)
+        self.assertEqual(np.sum(np.abs(ids_read - ids)), 0)
+        self.assertEqual(
+            dr.DataReader.read_landmark_attributes(path_to_npy), (None, None))
+
+        with open(path_to_lmk, "r+b") as fileobj:
+            fileobj.truncate(100)
+        self.assertRaises(IOError, dr.DataReader.read_landmarks, path_to_lmk)
+
+    def test_read_image_chunked(self):
+        path_to_zarr = os.path.join(DIR_TMP, "phantom.zarr")
+        path_to_nii = os.path.join(DIR_TMP, "phantom_from_zarr.nii.gz")
+        image_sitk = sitk.ReadImage(self.path_to_image, sitk.sitkFloat32)
+        image_sitk.SetDirection(sitk.Euler3DTransform(
+            (0, 0, 0), 0.1, 0.2, 0.3).GetMatrix())
+
+        dw.DataWriter.write_image(image_sitk, os.path.join(
+            DIR_TMP, "phantom_rotated.nii.gz"))
+        image = utils.convert_nifti_to_chunked_image(
+            os.path.join(DIR_TMP, "phantom_rotated.nii.gz"), path_to_zarr,
+            chunk_size=(16, 32, 20), n_levels=3)
+        self.assertEqual(image.GetNumberOfLevels(), 3)
+        self.assertEqual(image.GetSize(2), (16, 16, 16))
+
+        # Regions only touch overlapping chunks
+        region_sitk = dr.DataReader.read_image_region(
+            path_to_zarr, index=(10, 5, 20), size=(30, 40, 15))
+        reference_sitk = image_sitk[10:40, 5:45, 20:35]
+        nda_diff = sitk.GetArrayFromImage(region_sitk) - \
+            sitk.GetArrayFromImage(reference_sitk)
+        self.assertAlmostEqual(
+            np.linalg.norm(nda_diff), 0, places=self.precision)
+        for attribute in ["GetOrigin", "GetSpacing", "GetDirection"]:
+            self.assertAlmostEqual(
+                np.linalg.norm(
+                    np.array(getattr(region_sitk, attribute)()) -
+                    getattr(reference_sitk, attribute)()),
+                0, places=5)
+
+        # Lower resolution levels match bin shrinking
+        level_sitk = dr.DataReader.read_image_chunked(
+            path_to_zarr).GetImageSitk(level=1)
+        reference_sitk = sitk.BinShrink(image_sitk, (2, 2, 2))
+        nda_diff = sitk.GetArrayFromImage(level_sitk) - \
+            sitk.GetArrayFromImage(reference_sitk)
+        self.assertAlmostEqual(np.linalg.norm(nda_diff), 0, places=4)
+        self.assertAlmostEqual(
+            np.linalg.norm(np.array(level_sitk.GetOrigin()) -
+                           reference_sitk.GetOrigin()),
+            0, places=5)
+
+        utils.convert_chunked_image_to_nifti(path_to_zarr, path_to_nii)
+        nda_diff = sitk.GetArrayFromImage(sitk.ReadImage(path_to_nii)) - \
+            sitk.GetArrayFromImage(image_sitk)
+        self.assertAlmostEqual(
+            np.linalg.norm(nda_diff), 0, places=self.precision)
+
+        # Levels are streamed with their geometry
+        utils.convert_chunked_image_to_nifti(
+            path_to_zarr, path_to_nii, level=1)
+        level_nii_sitk = sitk.ReadImage(path_to_nii)
+        nda_diff = sitk.GetArrayFromImage(level_nii_sitk) - \
+            sitk.GetArrayFromImage(level_sitk)
+        self.assertAlmostEqual(
+            np.linalg.norm(nda_diff), 0, places=self.precision)
+        for attribute in ["GetOrigin", "GetSpacing", "GetDirection"]:
+            self.assertAlmostEqual(
+                np.linalg.norm(
+                    np.array(getattr(level_nii_sitk, attribute)()) -
+                    getattr(level_sitk, attribute)()),
+                0, places=5)
+
+        # Vector images are stored with components as last array dimension
+        field_sitk = sitk.Compose(image_sitk, 2 * image_sitk)
+        dw.DataWriter.write_image(field_sitk, path_to_zarr)
+        image_read_sitk = dr.DataReader.read_image(path_to_zarr)
+        self.assertEqual(image_read_sitk.GetNumberOfComponentsPerPixel(), 2)
+        nda_diff = sitk.GetArrayFromImage(image_read_sitk) - \
+            sitk.GetArrayFromImage(field_sitk)
+        self.assertAlmostEqual(
+            np.linalg.norm(nda_diff), 0, places=self.precision)
+
+        # Vector images are converted to (x, y, z, components) images
+        utils.convert_chunked_image_to_nifti(path_to_zarr, path_to_nii)
+        nda_nii = np.asanyarray(nib.load(path_to_nii).dataobj)
+        self.assertEqual(nda_nii.shape, image_sitk.GetSize() + (2,))
+        nda_diff = nda_nii.transpose(2, 1, 0, 3) - \
+            sitk.GetArrayFromImage(field_sitk)
+        self.assertAlmostEqual(
+            np.linalg.norm(nda_diff), 0, places=self.precision)
+
+    def test_read_image_chunked_label(self):
+        path_to_zarr = os.path.join(DIR_TMP, "labels.zarr")
+
+        # Labels constant in blocks of 4 voxels except for their first voxel
+        nda = np.repeat(np.repeat(np.repeat(
+            np.arange(24, dtype=np.uint8).reshape(2, 3, 4),
+            4, axis=0), 4, axis=1), 4, axis=2)
+        nda[::4, ::4, ::4] = 100
+        label_sitk = sitk.GetImageFromArray(nda)
+        label_sitk.SetSpacing((0.5, 0.8, 1.2))
+        label_sitk.SetOrigin((10, -5, 3))
+        label_sitk.SetDirection(sitk.Euler3DTransform(
+            (0, 0, 0), 0.1, 0.2, 0.3).GetMatrix())
+
+        dw.DataWriter.write_image_chunked(
+            label_sitk, path_to_zarr, chunk_size=8, n_levels=3,
+            is_label=True)
+        image = dr.DataReader.read_image_chunked(path_to_zarr)
+
+        # Levels match nearest neighbour resampling on their grid, i.e.
+        # label values are consistent with the level geometry
+        for level in range(1, 3):
+            level_sitk = image.GetImageSitk(level)
+            reference_sitk = sitk.Resample(
+                label_sitk, level_sitk, sitk.Transform(),
+                sitk.sitkNearestNeighbor)
+            self.assertTrue(np.array_equal(
+                sitk.GetArrayFromImage(level_sitk),
+                sitk.GetArrayFromImage(reference_sitk)))
+
+    def test_read_displacement_field(self):
+        path_to_field = os.path.join(DIR_TMP, "displacement_float64.nii.gz")
+        path_to_output = os.path.join(DIR_TMP, "displacement_float32.nii.gz")
+        image_sitk = sitk.ReadImage(self.path_to_image)
+        sitk.WriteImage(sitk.TransformToDisplacementField(
+            sitk.Euler3DTransform((0, 0, 0), 0.1, 0.2, 0.3, (1, 2, 3)),
+            sitk.sitkVectorFloat64,
+            image_sitk.GetSize(),
+            image_sitk.GetOrigin(),
+            image_sitk.GetSpacing(),
+            image_sitk.GetDirection()), path_to_field)
+
+        field_sitk = dr.DataReader.read_displacement_field(path_to_field)
+        self.assertEqual(field_sitk.GetPixelIDValue(), sitk.sitkVectorFloat32)
+        field_64_sitk = dr.DataReader.read_displacement_field(
+            path_to_field, dtype=np.float64)
+        self.assertEqual(
+            field_64_sitk.GetPixelIDValue(), sitk.sitkVectorFloat64)
+
+        # Transforms are written in the requested precision
+        transform_sitk = dr.DataReader.read_transform(path_to_field)
+        dw.DataWriter.write_transform(
+            transform_sitk, path_to_output, dtype=np.float32)
+        written_sitk = sitk.ReadImage(path_to_output)
+        self.assertEqual(
+            written_sitk.GetPixelIDValue(), sitk.sitkVectorFloat32)
+        nda_diff = sitk.GetArrayFromImage(written_sitk) - \
+            sitk.GetArrayFromImage(field_sitk)
+        self.assertAlmostEqual(
+            np.linalg.norm(nda_diff), 0, places=self.precision)
+
+        self.assertRaises(
+            ValueError, dr.DataReader.read_displacement_field,
+            path_to_field, np.int16)
+
+    def test_read_dicom_series(self):
+        directory = os.path.join(DIR_TMP, "dicom_series")
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+
+        image_sitk = sitk.ReadImage(self.path_to_image, sitk.sitkInt16)
+        image_sitk.SetSpacing((1.1, 1.2, 1.5))
+        image_sitk.SetOrigin((10, -5, 3))
+        image_sitk.SetDirection(sitk.Euler3DTransform(
+            (0, 0, 0), 0.1, 0.2, 0.3).GetMatrix())
+
+        # Write slices in shuffled file name order
+        direction = image_sitk.GetDirection()
+        writer = sitk.ImageFileWriter()
+        writer.KeepOriginalImageUIDOn()
+        for i in range(image_sitk.GetDepth()):
+            slice_sitk = image_sitk[:, :, i]
+            slice_sitk.SetMetaData("0020|000e", "1.2.826.0.1.3680043.2.1125.1")
+            slice_sitk.SetMetaData("0020|0037", "\\".join(
+                str(direction[j]) for j in [0, 3, 6, 1, 4, 7]))
+            slice_sitk.SetMetaData("0020|0032", "\\".join(
+                str(x) for x in
+                image_sitk.TransformIndexToPhysicalPoint((0, 0, i))))
+            slice_sitk.SetMetaData("0020|0013", str(i))
+            writer.SetFileName(os.path.join(
+                directory, "%02d.dcm" % ((7 * i) % image_sitk.GetDepth())))
+            writer.Execute(slice_sitk)
+
+        # Geometry is available without decoding pixel data
+        series = dr.DataReader.read_dicom_series(directory, n_threads=3)
+        self.assertEqual(series.GetSize(), image_sitk.GetSize())
+        for attribute in ["GetOrigin", "GetSpacing", "GetDirection"]:
+            self.assertAlmostEqual(
+                np.linalg.norm(
+                    np.array(getattr(series, attribute)()) -
+                    getattr(image_sitk, attribute)()),
+                0, places=5)
+
+        for i in range(2):
+            series_sitk = dr.DataReader.read_image(directory)
+            nda_diff = sitk.GetArrayFromImage(series_sitk) - \
+                sitk.GetArrayFromImage(image_sitk)
+            self.assertEqual(np.sum(np.abs(nda_diff)), 0)
+            self.assertAlmostEqual(
+                np.linalg.norm(np.array(series_sitk.GetOrigin()) -
+                               image_sitk.GetOrigin()),
+                0, places=5)
+        self.assertEqual(dr.DataReader.get_cache_statistics()["hits"], 1)
@@ -0,0 +1,179 @@
+##
+# \file data_writer_test.py
+#  \brief  Class containing unit tests for data writer class
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import gzip
+import shutil
+import numpy as np
+import SimpleITK as sitk
+import unittest
+import unittest.mock
+
+import simplereg.data_reader as dr
+import simplereg.data_writer as dw
+import simplereg.parallel_gzip as pgz
+import simplereg.io_pipeline as iop
+import simplereg.transform_store as tst
+from simplereg.definitions import DIR_TMP, DIR_DATA
+
+
+class DataWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.precision = 7
+        self.path_to_image = os.path.join(
+            DIR_DATA, "3D_SheppLoganPhantom_64.nii.gz")
+
+    def tearDown(self):
+        dw.DataWriter.set_compression()
+
+    def test_parallel_gzip(self):
+        path_to_input = os.path.join(DIR_TMP, "parallel_gzip.bin")
+        path_to_output = os.path.join(DIR_TMP, "parallel_gzip.bin.gz")
+        data = np.random.RandomState(1).randint(
+            0, 20, size=500000).astype(np.int16).tobytes()
+        with open(path_to_input, "wb") as fileobj:
+            fileobj.write(data)
+
+        for level in [0, 1, 9]:
+            pgz.compress_file(
+                path_to_input, path_to_output,
+                level=level, n_threads=3, block_size=pgz.WINDOW_SIZE + 7)
+            with gzip.open(path_to_output, "rb") as fileobj:
+                self.assertEqual(fileobj.read(), data)
+
+    def test_write_image_compression(self):
+        image_sitk = sitk.ReadImage(self.path_to_image)
+        field_sitk = sitk.TransformToDisplacementField(
+            sitk.Euler3DTransform((0, 0, 0), 0.1, 0.2, 0.3, (1, 2, 3)),
+            sitk.sitkVectorFloat64,
+            image_sitk.GetSize(),
+            image_sitk.GetOrigin(),
+            image_sitk.GetSpacing(),
+            image_sitk.GetDirection())
+
+        dw.DataWriter.set_compression(level=1, n_threads=4)
+        path_to_image = os.path.join(DIR_TMP, "phantom_level1.nii.gz")
+        path_to_field = os.path.join(DIR_TMP, "phantom_field_level1.nii.gz")
+        dw.DataWriter.write_image(image_sitk, path_to_image)
+        dw.DataWriter.write_transform(field_sitk, path_to_field)
+
+        for path, reference_sitk in [
+                (path_to_image, image_sitk),
+                (path_to_field, field_sitk)]:
+            with open(path, "rb") as fileobj:
+                self.assertEqual(fileobj.read(4), b"\x1f\x8b\x08\x00")
+            written_sitk = sitk.ReadImage(path)
+            nda_diff = sitk.GetArrayFromImage(written_sitk) - \
+                sitk.GetArrayFromImage(reference_sitk)
+            self.assertAlmostEqual(
+                np.linalg.norm(nda_diff), 0, places=self.precision)
+            self.assertAlmostEqual(
+                np.linalg.norm(np.array(written_sitk.GetOrigin()) -
+                               reference_sitk.GetOrigin()),
+                0, places=self.precision)
+
+        # No temporary files are left behind
+        self.assertEqual(
+            [f for f in os.listdir(DIR_TMP) if f.startswith("tmp") and
+             f.endswith(".nii")], [])
+
+    def test_io_pipeline(self):
+        image_sitk = sitk.ReadImage(self.path_to_image)
+        paths_to_images = [
+            os.path.join(DIR_TMP, "io_pipeline_%d.nii.gz" % i)
+            for i in range(5)]
+        paths_to_read = paths_to_images[0:2] + ["missing.nii.gz"] + \
+            paths_to_images[2:]
+
+        # Failed writes are reported once all pending writes are finished
+        pipeline = iop.IOPipeline(n_threads=3, max_pending=2)
+        for i, path in enumerate(paths_to_images):
+            pipeline.write(image_sitk * i, path)
+        pipeline.write(image_sitk, os.path.join(DIR_TMP, "io_pipeline.txt"))
+        errors = pipeline.wait()
+        self.assertEqual(list(errors.keys()), [
+            os.path.join(DIR_TMP, "io_pipeline.txt")])
+        self.assertRaises(RuntimeError, pipeline.close)
+
+        # Read errors do not affect other items; order is preserved
+        with iop.IOPipeline(n_threads=3, max_pending=2) as pipeline:
+            results = list(pipeline.iterate(paths_to_read))
+        self.assertEqual([r.item for r in results], paths_to_read)
+        self.assertIsInstance(results[2].error, IOError)
+        for i, result in enumerate(results[0:2] + results[3:]):
+            self.assertIsNone(result.error)
+            nda_diff = sitk.GetArrayFromImage(result.data) - \
+                sitk.GetArrayFromImage(image_sitk * i)
+            self.assertEqual(np.sum(np.abs(nda_diff)), 0)
+
+    def test_transform_store(self):
+        path_to_store = os.path.join(DIR_TMP, "transform_store.npz")
+        if os.path.isdir(path_to_store + tst.SHARD_EXTENSION):
+            shutil.rmtree(path_to_store + tst.SHARD_EXTENSION)
+
+        random_state = np.random.RandomState(3)
+        transforms_sitk = {}
+        for i in range(60):
+            if i % 3 == 0:
+                transform_sitk = sitk.Euler3DTransform(
+                    (1, 2, 3), *random_state.rand(3))
+                transform_sitk.SetComputeZYX(bool(i % 2))
+            elif i % 3 == 1:
+                transform_sitk = sitk.AffineTransform(
+                    random_state.rand(9).tolist(), (1, 2, 3), (3, 2, 1))
+            else:
+                transform_sitk = sitk.Similarity3DTransform(
+                    1.1, (0, 0, 1), 0.1, (1, 2, 3), (0, 1, 0))
+            transforms_sitk["case_%02d" % i] = transform_sitk
+
+        # Store and shards of two writers with one overwritten key
+        keys = sorted(transforms_sitk.keys())
+        dw.DataWriter.write_transform_store(
+            {k: transforms_sitk[k] for k in keys[0:20]}, path_to_store)
+        with dw.DataWriter.open_transform_store(
+                path_to_store, worker="a") as writer_a, \
+                dw.DataWriter.open_transform_store(
+                    path_to_store, worker="b") as writer_b:
+            for i, key in enumerate(keys[20:]):
+                writer = writer_a if i % 2 else writer_b
+                writer.add(key, transforms_sitk[key])
+            writer_a.add(keys[0], transforms_sitk[keys[1]])
+        transforms_sitk[keys[0]] = transforms_sitk[keys[1]]
+
+        for consolidate in [0, 1]:
+            if consolidate:
+                tst.TransformStore.consolidate(path_to_store)
+                self.assertEqual(
+                    os.listdir(path_to_store + tst.SHARD_EXTENSION), [])
+            store = dr.DataReader.read_transform_store(path_to_store)
+            self.assertEqual(sorted(store.keys()), keys)
+            matrices = store.get_affine_matrices(keys)
+            point = np.array([3., -1, 2])
+            for key, matrix in zip(keys, matrices):
+                reference = transforms_sitk[key].TransformPoint(point)
+                self.assertAlmostEqual(np.linalg.norm(
+                    matrix.dot(np.append(point, 1))[0:3] - reference),
+                    0, places=self.precision)
+                self.assertAlmostEqual(np.linalg.norm(
+                    np.array(store.get(key).TransformPoint(point)) -
+                    reference), 0, places=self.precision)
+
+        # Shards being written by another worker are ignored by readers
+        def savez_and_read(fileobj, **data):
+            fileobj.write(b"PK\x03\x04")
+            fileobj.flush()
+            store = dr.DataReader.read_transform_store(path_to_store)
+            self.assertEqual(sorted(store.keys()), keys)
+            raise RuntimeError("Writer killed")
+
+        writer = dw.DataWriter.open_transform_store(path_to_store, worker="c")
+        writer.add("case_new", transforms_sitk[keys[0]])
+        with unittest.mock.patch("numpy.savez", side_effect=savez_and_read):
+            self.assertRaises(RuntimeError, writer.flush)
+        self.assertEqual(
+            os.listdir(path_to_store + tst.SHARD_EXTENSION), [])
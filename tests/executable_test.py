@@ -0,0 +1,101 @@
+##
+# \file executable_test.py
+#  \brief  Unit tests for building and executing external command lines
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from simplereg.executable import Command, find_executable
+
+STUB = """#!%s
+import sys
+import time
+args = sys.argv[1:]
+options = dict(zip(args[0::2], args[1::2]))
+print("stub called with " + " ".join(args))
+if "-fail" in options:
+    sys.stderr.write("something went wrong\\n")
+    sys.exit(int(options["-fail"]))
+if "-sleep" in options:
+    time.sleep(float(options["-sleep"]))
+if "-out" in options:
+    open(options["-out"], "w").close()
+""" % sys.executable
+
+
+class ExecutableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+        self.dir_bin = os.path.join(self.dir_tmp, "bin")
+        os.makedirs(self.dir_bin)
+        self.path_to_stub = os.path.join(self.dir_bin, "simplereg_stub")
+        with open(self.path_to_stub, "w") as fileobj:
+            fileobj.write(STUB)
+        os.chmod(self.path_to_stub, 0o755)
+
+        self.path_to_input = os.path.join(self.dir_tmp, "input with space")
+        open(self.path_to_input, "w").close()
+        self.path_to_output = os.path.join(self.dir_tmp, "output.txt")
+        self.path_to_log = os.path.join(self.dir_tmp, "stub.log")
+
+        os.environ["SIMPLEREG_STUB_DIR"] = self.dir_tmp
+
+    def tearDown(self):
+        del os.environ["SIMPLEREG_STUB_DIR"]
+        shutil.rmtree(self.dir_tmp)
+
+    def _get_command(self):
+        command = Command("simplereg_stub", env_dirs=("SIMPLEREG_STUB_DIR",))
+        command.add_input("-in", self.path_to_input)
+        return command
+
+    def test_find_executable(self):
+        self.assertEqual(
+            find_executable("simplereg_stub", ("SIMPLEREG_STUB_DIR",)),
+            self.path_to_stub)
+        self.assertRaises(IOError, find_executable, "simplereg_stub")
+
+    def test_run(self):
+        command = self._get_command()
+        command.add_output("-out", self.path_to_output)
+        command.add_value("-omp", 2)
+        command.add_options("-opt 'a b'")
+
+        result = command.run(path_to_log=self.path_to_log)
+        self.assertEqual(result.returncode, 0)
+        self.assertTrue(os.path.isfile(self.path_to_output))
+        self.assertIn("-in %s -out" % self.path_to_input, result.stdout)
+        self.assertIn("-opt a b", result.stdout)
+        with open(self.path_to_log) as fileobj:
+            self.assertIn(result.stdout, fileobj.read())
+
+    def test_validation(self):
+        command = self._get_command()
+        self.assertRaises(IOError, command.add_input, "-in", "void.nii.gz")
+        self.assertRaises(IOError, command.add_output, "-out",
+                          os.path.join(self.dir_tmp, "void", "out.nii.gz"))
+        self.assertRaises(ValueError, command.add_value, "-omp", "2")
+
+        # Declared outputs must be created
+        command.add_output("-res", self.path_to_output)
+        self.assertRaises(RuntimeError, command.run)
+
+    def test_failure(self):
+        command = self._get_command()
+        command.add_value("-fail", 3)
+        with self.assertRaises(RuntimeError) as context:
+            command.run(path_to_log=self.path_to_log)
+        self.assertIn("return code 3", str(context.exception))
+        self.assertIn("something went wrong", str(context.exception))
+        self.assertTrue(os.path.isfile(self.path_to_log))
+
+        command = self._get_command()
+        command.add_value("-sleep", 10)
+        self.assertRaises(RuntimeError, command.run, timeout=0.5)
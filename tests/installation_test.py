@@ -7,11 +7,11 @@
 
 
 # Import libraries
+import os
 import SimpleITK as sitk
 import unittest
 
-from nipype.testing import example_data
-
+from simplereg.definitions import DIR_DATA
 import simplereg.flirt
 import simplereg.niftyreg
 
@@ -22,8 +22,10 @@ class InstallationTest(unittest.TestCase):
 
         self.accuracy = 10
 
-        self.path_to_fixed = example_data("segmentation0.nii.gz")
-        self.path_to_moving = example_data("segmentation1.nii.gz")
+        self.path_to_fixed = os.path.join(
+            DIR_DATA, "3D_Brain_Target.nii.gz")
+        self.path_to_moving = os.path.join(
+            DIR_DATA, "3D_Brain_Source.nii.gz")
 
         self.fixed_sitk = sitk.ReadImage(self.path_to_fixed)
         self.moving_sitk = sitk.ReadImage(self.path_to_moving)
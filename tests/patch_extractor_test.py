@@ -0,0 +1,81 @@
+##
+# \file patch_extractor_test.py
+#  \brief  Class containing unit tests for patch extractor class
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import numpy as np
+import SimpleITK as sitk
+import unittest
+
+import simplereg.data_reader as dr
+import simplereg.patch_extractor as pe
+from simplereg.definitions import DIR_DATA, DIR_TEST
+
+
+class PatchExtractorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.precision = 5
+        self.path_to_image = os.path.join(DIR_DATA, "3D_Brain_Target.nii.gz")
+        self.path_to_landmarks = os.path.join(
+            DIR_TEST, "3D_Brain_Template_landmarks.txt")
+
+    def _get_reference_patches_nda(self, image_sitk, patches_sitk):
+        return np.array([
+            sitk.GetArrayFromImage(sitk.Resample(
+                image_sitk,
+                patch_sitk,
+                sitk.Euler3DTransform(),
+                sitk.sitkLinear,
+                0,
+                sitk.sitkFloat64))
+            for patch_sitk in patches_sitk])
+
+    def test_patches(self):
+        image_sitk = sitk.ReadImage(self.path_to_image, sitk.sitkFloat64)
+
+        # Landmarks well within the image
+        landmarks_nda = np.array([
+            image_sitk.TransformContinuousIndexToPhysicalPoint(p)
+            for p in [(40.3, 50.2, 60.7), (90, 100, 80), (120.5, 70, 45)]])
+
+        angles = [(0.1, -0.2, 0.3), (0, 0, 0), (-0.4, 0.1, 0.2)]
+        rotations = []
+        for angle in angles:
+            rotation_sitk = sitk.Euler3DTransform()
+            rotation_sitk.SetRotation(*angle)
+            rotations.append(
+                np.array(rotation_sitk.GetMatrix()).reshape(3, 3))
+
+        for image in [image_sitk, self.path_to_image]:
+            patch_extractor = pe.PatchExtractor(
+                image=image,
+                landmarks_nda=landmarks_nda,
+                size=(9, 7, 5),
+                spacing=0.7,
+                rotations=rotations,
+            )
+            patch_extractor.run()
+            patches_nda = patch_extractor.get_patches_nda()
+            self.assertEqual(patches_nda.shape, (3, 5, 7, 9))
+
+            reference_nda = self._get_reference_patches_nda(
+                image_sitk, patch_extractor.get_patches_sitk())
+            self.assertAlmostEqual(
+                np.linalg.norm(patches_nda - reference_nda), 0,
+                places=self.precision)
+
+    def test_patches_landmark_file(self):
+        landmarks_nda = dr.DataReader.read_landmarks(self.path_to_landmarks)
+        patch_extractor = pe.PatchExtractor(
+            image=self.path_to_image,
+            landmarks_nda=landmarks_nda,
+            size=5,
+            interpolator="NearestNeighbor",
+        )
+        patch_extractor.run()
+        patches_nda = patch_extractor.get_patches_nda()
+        self.assertEqual(patches_nda.shape, (landmarks_nda.shape[0], 5, 5, 5))
@@ -0,0 +1,208 @@
+##
+# \file registration_cache_test.py
+#  \brief  Unit tests for the on-disk cache of registration results
+#
+#  A local stub executable replaces reg_aladin. It counts its calls so that
+#  cache hits become visible.
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import shutil
+import asyncio
+import tempfile
+import unittest
+import unittest.mock
+import concurrent.futures
+import numpy as np
+import SimpleITK as sitk
+
+import simplereg.niftyreg
+import simplereg.simple_itk_registration as sitkreg
+from simplereg.registration_cache import RegistrationCache
+from tests.stub_executables import STUB_COPY, StubExecutables, get_image
+
+STUBS = {"reg_aladin": STUB_COPY + """
+record_call()
+copy(options["-flo"], options["-res"], options["-aff"])
+"""}
+
+
+class RegistrationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+        self.dir_cache = os.path.join(self.dir_tmp, "cache")
+        self.stubs = StubExecutables(
+            os.path.join(self.dir_tmp, "bin"), STUBS)
+        self.stubs.start()
+
+        self.fixed_sitk = get_image(0)
+
+    def tearDown(self):
+        self.stubs.stop()
+        shutil.rmtree(self.dir_tmp)
+
+    def _get_number_of_calls(self):
+        return len(self.stubs.get_calls())
+
+    def _run_reg_aladin(self, cache, moving_sitk, options=""):
+        registration = simplereg.niftyreg.RegAladin(
+            fixed_sitk=self.fixed_sitk,
+            moving_sitk=moving_sitk,
+            options=options,
+            omp=1,
+            dir_tmp=self.dir_tmp,
+        )
+        registration.set_cache(cache)
+        registration.run()
+        return registration
+
+    def test_reg_aladin(self):
+        cache = RegistrationCache(self.dir_cache)
+
+        registration = self._run_reg_aladin(cache, get_image(2))
+        self.assertEqual(self._get_number_of_calls(), 1)
+
+        # Identical registration is read from cache
+        registration_cached = self._run_reg_aladin(cache, get_image(2))
+        self.assertEqual(self._get_number_of_calls(), 1)
+        self.assertEqual(
+            registration_cached.get_registration_transform_sitk().GetName(),
+            "AffineTransform")
+        self.assertEqual(
+            registration_cached.get_registration_transform_sitk(
+            ).GetParameters(),
+            registration.get_registration_transform_sitk().GetParameters())
+        self.assertEqual(
+            registration_cached.get_computational_time(),
+            registration.get_computational_time())
+        nda = sitk.GetArrayFromImage(
+            registration_cached.get_warped_moving_sitk())
+        self.assertTrue(np.all(nda == 2))
+
+        # Changed voxels, geometry, masks or options are computed again
+        self._run_reg_aladin(cache, get_image(3))
+        moving_sitk = get_image(2)
+        moving_sitk.SetOrigin((1, 0, 0))
+        self._run_reg_aladin(cache, moving_sitk)
+        self._run_reg_aladin(cache, get_image(2), options="-rigOnly")
+        registration = simplereg.niftyreg.RegAladin(
+            fixed_sitk=self.fixed_sitk,
+            moving_sitk=get_image(2),
+            fixed_sitk_mask=sitk.Cast(self.fixed_sitk + 1, sitk.sitkUInt8),
+            omp=1,
+            dir_tmp=self.dir_tmp,
+        )
+        registration.set_cache(cache)
+        registration.run()
+        self.assertEqual(self._get_number_of_calls(), 5)
+
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics["hits"], 1)
+        self.assertEqual(statistics["misses"], 5)
+        self.assertEqual(statistics["entries"], 5)
+
+    # Clock too coarse to distinguish uses by time
+    @unittest.mock.patch("time.time_ns", return_value=0)
+    def test_eviction(self, time_ns):
+        cache = RegistrationCache(self.dir_cache)
+        self._run_reg_aladin(cache, get_image(1))
+        size = cache.get_statistics()["bytes"]
+
+        # Budget for two entries
+        cache = RegistrationCache(self.dir_cache, max_bytes=2.5 * size)
+        self._run_reg_aladin(cache, get_image(2))
+        self._run_reg_aladin(cache, get_image(1))
+        self._run_reg_aladin(cache, get_image(3))
+        self.assertEqual(self._get_number_of_calls(), 3)
+
+        # Least recently used entry got evicted
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics["evictions"], 1)
+        self.assertEqual(statistics["entries"], 2)
+        self._run_reg_aladin(cache, get_image(1))
+        self._run_reg_aladin(cache, get_image(3))
+        self.assertEqual(self._get_number_of_calls(), 3)
+        self._run_reg_aladin(cache, get_image(2))
+        self.assertEqual(self._get_number_of_calls(), 4)
+
+        cache.clear()
+        self.assertEqual(os.listdir(self.dir_cache), [])
+
+    def test_run_async(self):
+        cache = RegistrationCache(self.dir_cache)
+
+        async def run():
+            registrations = []
+            for i in range(2):
+                registration = simplereg.niftyreg.RegAladin(
+                    fixed_sitk=self.fixed_sitk,
+                    moving_sitk=get_image(2),
+                    omp=1,
+                    dir_tmp=self.dir_tmp,
+                )
+                registration.set_cache(cache)
+                await registration.run_async()
+                registrations.append(registration)
+            return registrations
+
+        registrations = asyncio.run(run())
+        self.assertEqual(self._get_number_of_calls(), 1)
+        self.assertEqual(
+            registrations[1].get_registration_transform_sitk(
+            ).GetParameters(),
+            registrations[0].get_registration_transform_sitk(
+            ).GetParameters())
+        self.assertEqual(
+            registrations[1].get_computational_time(),
+            registrations[0].get_computational_time())
+
+    def test_concurrent_writers(self):
+        cache = RegistrationCache(self.dir_cache)
+
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            registrations = list(pool.map(
+                lambda i: self._run_reg_aladin(cache, get_image(2)),
+                range(8)))
+
+        # Exactly one complete entry remains
+        self.assertEqual(len(os.listdir(self.dir_cache)), 1)
+        self.assertEqual(cache.get_statistics()["entries"], 1)
+        for registration in registrations:
+            self.assertAlmostEqual(abs(
+                registration.get_registration_transform_sitk(
+                ).GetParameters()[-3]), 2)
+
+    def test_simple_itk_registration(self):
+        cache = RegistrationCache(self.dir_cache)
+        fixed_sitk = sitk.GaussianSource(
+            sitk.sitkFloat32, [32, 32], sigma=[5, 5], mean=[16, 16])
+        moving_sitk = sitk.GaussianSource(
+            sitk.sitkFloat32, [32, 32], sigma=[5, 5], mean=[18, 15])
+
+        registrations = []
+        for i in range(2):
+            registration = sitkreg.SimpleItkRegistration(
+                fixed_sitk=fixed_sitk,
+                moving_sitk=moving_sitk,
+                verbose=0,
+            )
+            registration.set_cache(cache)
+            registration.run()
+            registrations.append(registration)
+
+        transforms_sitk = [
+            r.get_registration_transform_sitk() for r in registrations]
+        self.assertEqual(
+            transforms_sitk[1].GetName(), transforms_sitk[0].GetName())
+        self.assertEqual(
+            transforms_sitk[1].GetParameters(),
+            transforms_sitk[0].GetParameters())
+        self.assertEqual(
+            transforms_sitk[1].GetFixedParameters(),
+            transforms_sitk[0].GetFixedParameters())
+        statistics = cache.get_statistics()
+        self.assertEqual(statistics["hits"], 1)
+        self.assertEqual(statistics["writes"], 1)
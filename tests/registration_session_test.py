@@ -0,0 +1,171 @@
+##
+# \file registration_session_test.py
+#  \brief  Unit tests for registrations of many moving images to one fixed
+#  image sharing staged files
+#
+#  A local stub executable replaces reg_aladin. It records the reference
+#  image it has been called with.
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import shutil
+import asyncio
+import tempfile
+import unittest
+import unittest.mock
+import concurrent.futures
+import SimpleITK as sitk
+
+import simplereg.niftyreg
+from simplereg.registration_session import RegistrationSession
+from tests.stub_executables import STUB_COPY, StubExecutables, get_image
+
+STUBS = {"reg_aladin": STUB_COPY + """
+record_call(options["-ref"], options.get("-rmask"))
+copy(options["-flo"], options["-res"], options["-aff"])
+"""}
+
+
+class RegistrationSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+        self.dir_root = os.path.join(self.dir_tmp, "root")
+        self.stubs = StubExecutables(
+            os.path.join(self.dir_tmp, "bin"), STUBS)
+        self.stubs.start()
+
+        self.fixed_sitk = get_image(0)
+        self.fixed_sitk_mask = sitk.Cast(self.fixed_sitk + 1, sitk.sitkUInt8)
+
+    def tearDown(self):
+        self.stubs.stop()
+        shutil.rmtree(self.dir_tmp)
+
+    def _create_registration(self):
+        return simplereg.niftyreg.RegAladin(
+            omp=1, dir_tmp=self.dir_root, keep_files=True)
+
+    def test_register(self):
+        session = RegistrationSession(
+            self._create_registration,
+            self.fixed_sitk,
+            self.fixed_sitk_mask,
+            dir_tmp=self.dir_root)
+
+        with session:
+            with concurrent.futures.ThreadPoolExecutor(4) as pool:
+                registrations = list(pool.map(
+                    lambda i: session.register(get_image(i + 1)),
+                    range(8)))
+
+            # Fixed image and mask are staged once and shared
+            directory = session.get_directory()
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ["fixed.nii", "fixed_mask.nii"])
+            calls = self.stubs.get_calls()
+            self.assertEqual(len(calls), 8)
+            self.assertEqual(set(tuple(c) for c in calls), {(
+                os.path.join(directory, "fixed.nii"),
+                os.path.join(directory, "fixed_mask.nii"))})
+
+            # Per moving image only the moving image is written
+            for i, registration in enumerate(registrations):
+                self.assertEqual(
+                    sorted(os.listdir(registration.get_working_directory())),
+                    ["moving.nii", "reg_aladin.log",
+                     "registration_transform.txt", "warped_moving.nii"])
+                translation = registration.get_registration_transform_sitk(
+                ).GetParameters()[-3:]
+                self.assertAlmostEqual(abs(translation[0]), i + 1)
+            self.assertEqual(session.get_number_of_references(), 0)
+
+        self.assertFalse(os.path.isdir(directory))
+        self.assertRaises(
+            RuntimeError, session.register, get_image(1))
+
+    def test_resampled_fixed(self):
+        with RegistrationSession(
+                self._create_registration,
+                self.fixed_sitk,
+                self.fixed_sitk_mask,
+                dir_tmp=self.dir_root) as session:
+            for i in range(2):
+                registration = session.register(
+                    get_image(1), spacing=(2.2, 2.4, 2.6))
+            fixed_sitk = registration.get_fixed_sitk()
+            self.assertEqual(fixed_sitk.GetSize(), (4, 4, 3))
+
+            # Both grids cover the same physical extent
+            for origin, spacing in zip(
+                    fixed_sitk.GetOrigin(), (1.1, 1.2, 1.3)):
+                self.assertAlmostEqual(origin, spacing / 2.)
+            self.assertEqual(
+                registration.get_fixed_sitk_mask().GetSize(), (4, 4, 3))
+
+            # Resampled versions are staged once per spacing
+            session.register(get_image(1))
+            self.assertEqual(len(os.listdir(session.get_directory())), 4)
+            self.assertEqual(len(set(c[0] for c in self.stubs.get_calls())), 2)
+
+            self.assertRaises(
+                ValueError, session.get_fixed, spacing=(1, 1))
+
+    def test_stage_without_lock(self):
+        session = RegistrationSession(
+            self._create_registration,
+            self.fixed_sitk,
+            dir_tmp=self.dir_root)
+        stage = session._stage
+        is_acquired = []
+
+        # Blocks until timeout if the lock is held by the staging thread
+        def stage_and_check(*args):
+            is_acquired.append(session._lock.acquire(timeout=5))
+            if is_acquired[-1]:
+                session._lock.release()
+            return stage(*args)
+
+        with session:
+            with unittest.mock.patch.object(
+                    session, "_stage", side_effect=stage_and_check):
+                with concurrent.futures.ThreadPoolExecutor(4) as pool:
+                    list(pool.map(
+                        lambda i: session.register(
+                            get_image(i + 1), spacing=(2.2, 2.4, 2.6)),
+                        range(8)))
+
+        # Staged once without holding the lock
+        self.assertEqual(is_acquired, [True])
+
+    def test_close_while_running(self):
+        session = RegistrationSession(
+            self._create_registration,
+            self.fixed_sitk,
+            dir_tmp=self.dir_root)
+
+        async def register_and_close():
+            tasks = [asyncio.ensure_future(
+                session.register_async(get_image(i + 1)))
+                for i in range(4)]
+            await asyncio.sleep(0)
+            self.assertEqual(session.get_number_of_references(), 4)
+
+            # Shared files are kept until all registrations finished
+            session.close()
+            directory = session.get_directory()
+            self.assertTrue(os.path.isfile(
+                os.path.join(directory, "fixed.nii")))
+            registrations = await asyncio.gather(*tasks)
+            self.assertFalse(os.path.isdir(directory))
+            return registrations
+
+        registrations = asyncio.run(register_and_close())
+        for i, registration in enumerate(registrations):
+            translation = registration.get_registration_transform_sitk(
+            ).GetParameters()[-3:]
+            self.assertAlmostEqual(abs(translation[0]), i + 1)
+        self.assertEqual(session.get_number_of_references(), 0)
+        self.assertIsNone(session.get_directory())
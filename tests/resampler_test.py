@@ -13,8 +13,10 @@ import unittest
 
 import pysitk.simple_itk_helper as sitkh
 
+import simplereg.data_reader as dr
 import simplereg.utilities as utils
 import simplereg.resampler as res
+import simplereg.multi_component_resampler as mcres
 from simplereg.definitions import DIR_TMP, DIR_DATA, DIR_TEST
 
 
@@ -96,3 +98,212 @@ class ResamplerTest(unittest.TestCase):
             nda_diff = sitk.GetArrayFromImage(
                 image_sitk - resampled_image_sitk)
             self.assertEqual(np.sum(np.abs(nda_diff)), 0)
+
+    def test_multi_component_resampler(self):
+        path_to_fixed = os.path.join(
+            DIR_DATA, "3D_SheppLoganPhantom_64.nii.gz")
+        path_to_moving = os.path.join(DIR_TMP, "3D_SheppLoganPhantom_4D.nii")
+        path_to_output = os.path.join(
+            DIR_TMP, "3D_SheppLoganPhantom_4D_warped.nii.gz")
+        path_to_transform = os.path.join(DIR_TEST, "3D_sitk_Target_Source.txt")
+
+        fixed_sitk = sitk.ReadImage(path_to_fixed, sitk.sitkFloat32)
+        volumes_sitk = [fixed_sitk * float(i + 1) for i in range(3)]
+        sitk.WriteImage(sitk.JoinSeries(volumes_sitk), path_to_moving)
+        transform_sitk = sitk.ReadTransform(path_to_transform)
+
+        for paths_to_transforms in [
+                None,
+                [path_to_transform, None, path_to_transform]]:
+            resampler = mcres.MultiComponentResampler(
+                path_to_fixed=path_to_fixed,
+                path_to_moving=path_to_moving,
+                path_to_transform=None if paths_to_transforms
+                else path_to_transform,
+                paths_to_transforms=paths_to_transforms,
+                interpolator="Linear",
+            )
+            resampler.run(path_to_output)
+
+            warped_sitk = sitk.ReadImage(path_to_output)
+            self.assertEqual(warped_sitk.GetSize(), (64, 64, 64, 3))
+            for i in range(3):
+                if paths_to_transforms is not None and \
+                        paths_to_transforms[i] is None:
+                    reference_sitk = volumes_sitk[i]
+                else:
+                    reference_sitk = sitk.Resample(
+                        volumes_sitk[i], fixed_sitk, transform_sitk)
+                warped_i_sitk = warped_sitk[:, :, :, i]
+                nda_diff = sitk.GetArrayFromImage(warped_i_sitk) - \
+                    sitk.GetArrayFromImage(reference_sitk)
+                # Agreement up to float32 rounding of the coordinates
+                nda_reference = sitk.GetArrayFromImage(reference_sitk)
+                self.assertLess(
+                    np.max(np.abs(nda_diff)),
+                    1e-5 * np.max(np.abs(nda_reference)))
+                self.assertAlmostEqual(
+                    np.linalg.norm(np.array(warped_i_sitk.GetOrigin()) -
+                                   reference_sitk.GetOrigin()),
+                    0, places=self.precision)
+
+    def test_resample_transform_chain(self):
+        path_to_fixed = os.path.join(
+            DIR_DATA, "3D_SheppLoganPhantom_64.nii.gz")
+        path_to_output = os.path.join(
+            DIR_TMP, "3D_SheppLoganPhantom_64_chain.nii.gz")
+        fixed_sitk = sitk.ReadImage(path_to_fixed, sitk.sitkFloat32)
+
+        # Chain of affine, displacement field and two affine stages
+        transforms_sitk = []
+        paths_to_transforms = []
+        for i, angle in enumerate([0.1, None, -0.05, 0.2]):
+            if angle is None:
+                field_sitk = sitk.Image(
+                    fixed_sitk.GetSize(), sitk.sitkVectorFloat64)
+                field_sitk.CopyInformation(fixed_sitk)
+                nda = np.zeros(sitk.GetArrayFromImage(field_sitk).shape)
+                nda[..., 0] = 2.
+                nda[..., 2] = -1.5
+                field_sitk = sitk.GetImageFromArray(nda, isVector=True)
+                field_sitk.CopyInformation(fixed_sitk)
+                path = os.path.join(DIR_TMP, "chain_%d.nii.gz" % i)
+                sitk.WriteImage(field_sitk, path)
+                transform_sitk = sitk.DisplacementFieldTransform(
+                    sitk.Image(field_sitk))
+            else:
+                transform_sitk = sitk.Euler3DTransform(
+                    (1, -2, 3), angle, 0, -angle, (3, 1, -2 * angle))
+                path = os.path.join(DIR_TMP, "chain_%d.txt" % i)
+                sitk.WriteTransform(transform_sitk, path)
+            transforms_sitk.append(transform_sitk)
+            paths_to_transforms.append(path)
+
+        # Adjacent affine stages are collapsed
+        transform_sitk = res.Resampler.read_transform_sitk(
+            paths_to_transforms)
+        self.assertEqual(transform_sitk.GetNumberOfTransforms(), 3)
+
+        # Composition T_1(T_2(T_3(T_4(x))))
+        for point in [(0, 0, 0), (10, -20, 5), (-30, 12, 40)]:
+            point_ref = np.array(point, dtype=np.float64)
+            for t in transforms_sitk[::-1]:
+                point_ref = t.TransformPoint(point_ref)
+            self.assertAlmostEqual(
+                np.linalg.norm(np.array(
+                    transform_sitk.TransformPoint(point)) - point_ref),
+                0, places=self.precision)
+
+        resampler = res.Resampler(
+            path_to_fixed=path_to_fixed,
+            path_to_moving=path_to_fixed,
+            path_to_transform=paths_to_transforms,
+        )
+        resampler.run()
+        resampler.write_image(path_to_output)
+        warped_sitk = sitk.ReadImage(path_to_output)
+
+        reference_sitk = sitk.Resample(
+            fixed_sitk, sitk.CompositeTransform(transforms_sitk))
+        nda_diff = sitk.GetArrayFromImage(warped_sitk) - \
+            sitk.GetArrayFromImage(reference_sitk)
+        self.assertAlmostEqual(
+            np.max(np.abs(nda_diff)), 0, places=3)
+
+    def test_get_resampling_space_properties_cropped(self):
+        path_to_image = os.path.join(DIR_DATA, "3D_Brain_Target.nii.gz")
+        image_sitk = sitk.ReadImage(path_to_image)
+
+        # Mask region of voxels [20, 50] x [30, 40] x [10, 60]
+        mask_sitk = image_sitk * 0
+        mask_sitk[20:51, 30:41, 10:61] = 1
+        margin = np.array(image_sitk.GetSpacing()) * 2
+
+        size, origin, spacing, direction = \
+            res.Resampler.get_space_resampling_properties(
+                image_sitk, mask_sitk=mask_sitk, margin=margin)
+        self.assertEqual(size, [35, 15, 55])
+        self.assertAlmostEqual(
+            np.linalg.norm(
+                origin - image_sitk.TransformIndexToPhysicalPoint(
+                    (18, 28, 8))),
+            0, places=self.precision)
+
+        # Same region given by physical corner points
+        roi = np.array([
+            image_sitk.TransformIndexToPhysicalPoint((20, 30, 10)),
+            image_sitk.TransformIndexToPhysicalPoint((50, 40, 60)),
+        ])
+        size_roi, origin_roi = \
+            res.Resampler.get_space_resampling_properties(
+                image_sitk, roi=roi, margin=margin)[0:2]
+        self.assertEqual(size_roi, size)
+        self.assertAlmostEqual(
+            np.linalg.norm(origin_roi - origin), 0, places=self.precision)
+
+        # Cropped image pasted back equals full image within region
+        cropped_sitk = sitk.Resample(
+            image_sitk, size, sitk.Euler3DTransform(), sitk.sitkLinear,
+            origin, spacing, direction)
+        pasted_sitk = res.Resampler.paste_resampled_image_sitk(
+            cropped_sitk, image_sitk)
+        nda_diff = sitk.GetArrayFromImage(pasted_sitk) - \
+            sitk.GetArrayFromImage(image_sitk)
+        self.assertAlmostEqual(
+            np.linalg.norm(nda_diff[8:63, 28:43, 18:53]),
+            0, places=self.precision)
+        self.assertEqual(
+            np.sum(np.abs(sitk.GetArrayFromImage(pasted_sitk)[0:8])), 0)
+
+    def test_get_resampling_space_properties_cropped_outside(self):
+        image_sitk = sitk.Image([10] * 3, sitk.sitkFloat32)
+
+        # Regions of interest beyond either end of the image
+        for roi in [[100] * 3 + [120] * 3, [-50] * 3 + [-40] * 3]:
+            self.assertRaises(
+                ValueError, res.Resampler.get_space_resampling_properties,
+                image_sitk, roi=roi)
+
+        # Mask covering voxels outside the image only
+        mask_sitk = sitk.Image([10] * 3, sitk.sitkUInt8)
+        mask_sitk[2:5, 2:5, 2:5] = 1
+        mask_sitk.SetOrigin((20, 0, 0))
+        self.assertRaises(
+            ValueError, res.Resampler.get_space_resampling_properties,
+            image_sitk, mask_sitk=mask_sitk)
+
+    def test_resampler_memmap_image(self):
+        path_to_fixed = os.path.join(DIR_DATA, "3D_Brain_Target.nii.gz")
+        path_to_fixed_nii = os.path.join(DIR_TMP, "3D_Brain_Target.nii")
+        path_to_mask_nii = os.path.join(DIR_TMP, "3D_Brain_Target_mask.nii")
+        path_to_output = os.path.join(DIR_TMP, "3D_Brain_Target_mmap.nii.gz")
+        fixed_sitk = sitk.ReadImage(path_to_fixed)
+        sitk.WriteImage(fixed_sitk, path_to_fixed_nii)
+        mask_sitk = sitk.Cast(fixed_sitk * 0, sitk.sitkUInt8)
+        mask_sitk[40:80, 50:70, 30:90] = 1
+        sitk.WriteImage(mask_sitk, path_to_mask_nii)
+
+        fixed_mmap = dr.DataReader.read_image_memmap(path_to_fixed_nii)
+        mask_mmap = dr.DataReader.read_image_memmap(path_to_mask_nii)
+        properties = res.Resampler.get_space_resampling_properties(
+            fixed_mmap, spacing=2, mask_sitk=mask_mmap, margin=3)
+        properties_ref = res.Resampler.get_space_resampling_properties(
+            fixed_sitk, spacing=2, mask_sitk=mask_sitk, margin=3)
+        for value, value_ref in zip(properties, properties_ref):
+            self.assertAlmostEqual(
+                np.linalg.norm(np.array(value) - value_ref),
+                0, places=self.precision)
+
+        resampler = res.Resampler(
+            path_to_fixed=path_to_fixed_nii,
+            path_to_moving=path_to_fixed,
+            path_to_transform=None,
+            path_to_mask=path_to_mask_nii,
+        )
+        resampler.run()
+        resampler.write_image(path_to_output)
+        warped_sitk = sitk.ReadImage(path_to_output)
+        self.assertEqual(warped_sitk.GetSize(), (40, 20, 60))
+        nda_diff = sitk.GetArrayFromImage(warped_sitk) - \
+            sitk.GetArrayFromImage(fixed_sitk[40:80, 50:70, 30:90])
+        self.assertEqual(np.sum(np.abs(nda_diff)), 0)
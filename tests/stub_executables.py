@@ -0,0 +1,133 @@
+##
+# \file stub_executables.py
+#  \brief  Stub executables replacing NiftyReg and FSL FLIRT in unit tests
+#
+#  Stubs are Python scripts run by the interpreter of the tests. They parse
+#  '-flag value' pairs of their command line into 'options' and may record
+#  their calls via 'record_call' to make them visible to the tests.
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import sys
+import SimpleITK as sitk
+
+# Environment variables pointing to the tools, see executable.find_executable
+ENV_DIRS = ["NIFTYREGDIR", "FSLDIR"]
+
+# Environment variable holding the file to which stubs record their calls
+STUB_CALLS = "SIMPLEREG_STUB_CALLS"
+
+STUB_HEADER = """#!%s
+import os
+import sys
+import time
+import numpy as np
+import SimpleITK as sitk
+
+args = sys.argv[1:]
+options = dict((a, b) for a, b in zip(args[:-1], args[1:])
+               if a.startswith("-"))
+
+
+def record_call(*values):
+    with open(os.environ["%s"], "a") as fileobj:
+        fileobj.write(" ".join(str(v) for v in values) + "\\n")
+""" % (sys.executable, STUB_CALLS)
+
+# Copy of the floating image and its maximum intensity as translation along
+# the first axis, i.e. results of concurrent runs can be told apart
+STUB_COPY = """
+def copy(path_in, path_out, path_matrix, matrix=None):
+    image_sitk = sitk.ReadImage(path_in)
+    sitk.WriteImage(image_sitk, path_out)
+    if matrix is None:
+        matrix = np.eye(4)
+    matrix[0, 3] = sitk.GetArrayFromImage(image_sitk).max()
+    np.savetxt(path_matrix, matrix)
+"""
+
+
+##
+# Gets a constant image as registered by the stubs.
+# \date       2026-10-19 23:02:40+0000
+#
+# \param      value  Intensity
+# \param      size   Image size
+#
+# \return     Image as sitk.Image object of type float32
+#
+def get_image(value, size=(8, 7, 6)):
+    image_sitk = sitk.Image(list(size), sitk.sitkFloat32) + value
+    image_sitk.SetSpacing((1.1, 1.2, 1.3))
+    return image_sitk
+
+
+##
+# Stub executables which take precedence over installed tools between start
+# and stop, i.e. os.environ is modified temporarily.
+# \date       2026-10-19 23:02:55+0000
+#
+class StubExecutables(object):
+
+    ##
+    # Store stub settings
+    # \date       2026-10-19 23:02:58+0000
+    #
+    # \param      self       The object
+    # \param      directory  Directory of the stubs; created if not existing
+    # \param      stubs      Dictionary of executable names and Python code
+    #                        following STUB_HEADER
+    #
+    def __init__(self, directory, stubs):
+        self._directory = directory
+        self._stubs = stubs
+        self._environ = None
+
+    def get_directory(self):
+        return self._directory
+
+    def get_path_to_calls(self):
+        return os.path.join(self._directory, "calls.txt")
+
+    ##
+    # Gets the calls recorded by the stubs.
+    # \date       2026-10-19 23:03:05+0000
+    #
+    # \param      self  The object
+    #
+    # \return     List of calls, each one as list of recorded values
+    #
+    def get_calls(self):
+        if not os.path.isfile(self.get_path_to_calls()):
+            return []
+        with open(self.get_path_to_calls()) as fileobj:
+            return [line.split() for line in fileobj.readlines()]
+
+    def start(self):
+        os.makedirs(self._directory, exist_ok=True)
+        for name, code in self._stubs.items():
+            path_to_stub = os.path.join(self._directory, name)
+            with open(path_to_stub, "w") as fileobj:
+                fileobj.write(STUB_HEADER + code)
+            os.chmod(path_to_stub, 0o755)
+
+        self._environ = {
+            key: os.environ.get(key)
+            for key in ENV_DIRS + ["PATH", STUB_CALLS]}
+        for key in ENV_DIRS:
+            os.environ[key] = self._directory
+        os.environ["PATH"] = os.pathsep.join(
+            [self._directory, self._environ["PATH"] or ""])
+        os.environ[STUB_CALLS] = self.get_path_to_calls()
+
+    def stop(self):
+        if self._environ is None:
+            return
+        for key, value in self._environ.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self._environ = None
@@ -17,6 +17,7 @@ import pysitk.simple_itk_helper as sitkh
 
 import simplereg.utilities as utils
 from simplereg.definitions import DIR_TMP, DIR_DATA, DIR_TEST
+import simplereg.niftyreg_to_simpleitk_converter
 from simplereg.niftyreg_to_simpleitk_converter import \
     NiftyRegToSimpleItkConverter as nreg2sitk
 from simplereg.nibabel_to_simpleitk_converter import \
@@ -59,18 +60,23 @@ class UtilitiesTest(unittest.TestCase):
                 DIR_TEST, "%dD_regf3d_Target_Source_cpp_disp_sitk.nii.gz" % dim)
 
             transform_nreg_nib = nib.load(path_to_regf3d_transform)
-            transform_sitk_nib = nreg2sitk.convert_regf3d_to_sitk_displacement(
-                transform_nreg_nib)
-
             transform_reference_nib = nib.load(
                 path_to_sitk_reference_transform)
-
-            nda = transform_sitk_nib.get_data()
-            nda_reference = transform_reference_nib.get_data()
-
-            self.assertAlmostEqual(
-                np.sum(np.abs(nda - nda_reference)), 0,
-                places=self.precision)
+            nda_reference = np.asanyarray(transform_reference_nib.dataobj)
+
+            for dtype in [None, np.float32, np.float64]:
+                transform_sitk_nib = nreg2sitk.\
+                    convert_regf3d_to_sitk_displacement(
+                        transform_nreg_nib, dtype=dtype)
+                nda = np.asanyarray(transform_sitk_nib.dataobj)
+                if dtype is not None:
+                    self.assertEqual(nda.dtype, dtype)
+                    self.assertEqual(
+                        transform_sitk_nib.get_data_dtype(), dtype)
+
+                self.assertAlmostEqual(
+                    np.sum(np.abs(nda - nda_reference)), 0,
+                    places=self.precision)
 
     def test_convert_sitk_to_regaladin_transform(self):
         for dim in [2, 3]:
@@ -103,8 +109,8 @@ class UtilitiesTest(unittest.TestCase):
             transform_reference_nib = nib.load(
                 path_to_sitk_reference_transform)
 
-            nda = transform_nreg_nib.get_data()
-            nda_reference = transform_reference_nib.get_data()
+            nda = np.asanyarray(transform_nreg_nib.dataobj)
+            nda_reference = np.asanyarray(transform_reference_nib.dataobj)
 
             self.assertAlmostEqual(
                 np.sum(np.abs(nda - nda_reference)), 0,
@@ -130,9 +136,10 @@ class UtilitiesTest(unittest.TestCase):
             nda_reference = np.loadtxt(
                 path_to_reference_transform)
 
+            # Reference matrix is stored with 6 significant digits only
             self.assertAlmostEqual(
                 np.sum(np.abs(nda - nda_reference)), 0,
-                places=self.precision)
+                places=4)
 
     def test_convert_flirt_to_sitk_transform(self):
         for dim in [3]:
@@ -162,6 +169,41 @@ class UtilitiesTest(unittest.TestCase):
                 np.sum(np.abs(nda - nda_reference)), 0,
                 places=2)
 
+    def test_convert_sitk_flirt_sitk_transform(self):
+        path_to_fixed = os.path.join(DIR_DATA, "3D_Brain_Target.nii.gz")
+        path_to_moving = os.path.join(DIR_DATA, "3D_Brain_Source.nii.gz")
+        path_to_flirt = os.path.join(DIR_TMP, "3D_sitk2flirt_roundtrip.txt")
+        path_to_res = os.path.join(DIR_TMP, "3D_flirt2sitk_roundtrip.txt")
+
+        transform_sitk = sitk.Euler3DTransform(
+            (10.3, -5.2, 8.1), 0.1, -0.2, 0.3, (1.5, 2.5, -3.5))
+
+        matrix = flirt2sitk.get_flirt_matrix_from_sitk(
+            transform_sitk, path_to_fixed, sitk.ReadImage(path_to_moving))
+        transform_res_sitk = flirt2sitk.get_sitk_from_flirt_matrix(
+            matrix, sitk.ReadImage(path_to_fixed), path_to_moving)
+
+        points = np.random.rand(10, 3) * 100
+        for point in points:
+            self.assertAlmostEqual(np.linalg.norm(
+                np.array(transform_sitk.TransformPoint(point)) -
+                transform_res_sitk.TransformPoint(point)), 0, places=10)
+
+        # Files preserve full precision
+        path_to_sitk_transform = os.path.join(
+            DIR_TMP, "3D_sitk_roundtrip.txt")
+        sitk.WriteTransform(transform_sitk, path_to_sitk_transform)
+        flirt2sitk.convert_sitk_to_flirt_transform(
+            path_to_sitk_transform, path_to_fixed, path_to_moving,
+            path_to_flirt)
+        self.assertEqual(np.abs(np.loadtxt(path_to_flirt) - matrix).max(), 0)
+        flirt2sitk.convert_flirt_to_sitk_transform(
+            path_to_flirt, path_to_fixed, path_to_moving, path_to_res)
+        self.assertAlmostEqual(np.linalg.norm(
+            np.array(transform_res_sitk.GetParameters()) -
+            sitkh.read_transform_sitk(path_to_res).GetParameters()), 0,
+            places=12)
+
     def test_convert_sitk_to_nib_image_3D(self):
         path_to_image = os.path.join(
             DIR_DATA, "3D_SheppLoganPhantom_64.nii.gz")
@@ -233,6 +275,54 @@ class UtilitiesTest(unittest.TestCase):
                 sitk.AffineTransform(3), sitk.Euler3DTransform()),
             sitk.AffineTransform)
 
+    def test_compose_displacement_fields(self):
+        reference_sitk = sitk.Image(40, 30, 20, sitk.sitkFloat32)
+        reference_sitk.SetSpacing((1.2, 1, 1.5))
+        reference_sitk.SetOrigin((-20, -15, -10))
+        reference_sitk.SetDirection(sitk.Euler3DTransform(
+            (0, 0, 0), 0.1, 0.2, 0.3).GetMatrix())
+        transform_outer = sitk.Euler3DTransform(
+            (0, 0, 0), 0.05, -0.02, 0.03, (1, 2, -1))
+        transform_inner = sitk.Euler3DTransform(
+            (0, 0, 0), -0.03, 0.02, 0.01, (-2, 1, 0.5))
+
+        def get_displacement_field(transform_sitk, pixel_type):
+            return sitk.TransformToDisplacementField(
+                transform_sitk, pixel_type,
+                reference_sitk.GetSize(),
+                reference_sitk.GetOrigin(),
+                reference_sitk.GetSpacing(),
+                reference_sitk.GetDirection())
+
+        disp_ref = sitk.GetArrayFromImage(get_displacement_field(
+            utils.compose_affine_transforms(transform_outer, transform_inner),
+            sitk.sitkVectorFloat64))
+
+        # Composition in float32 without float64 copies
+        disp_sitk = utils.compose_displacement_fields(
+            get_displacement_field(transform_outer, sitk.sitkVectorFloat32),
+            get_displacement_field(transform_inner, sitk.sitkVectorFloat32),
+            dtype=np.float32, slab_size=1000)
+        self.assertEqual(
+            disp_sitk.GetPixelIDValue(), sitk.sitkVectorFloat32)
+        disp = sitk.GetArrayFromImage(disp_sitk)
+
+        # Points mapped outside of the outer field differ at the boundary
+        self.assertAlmostEqual(np.max(np.abs(
+            disp - disp_ref)[3:-3, 3:-3, 3:-3]), 0, places=4)
+
+        transform_sitk = utils.compose_transforms(
+            sitk.DisplacementFieldTransform(get_displacement_field(
+                transform_outer, sitk.sitkVectorFloat64)),
+            sitk.DisplacementFieldTransform(get_displacement_field(
+                transform_inner, sitk.sitkVectorFloat64)))
+        point = (3, 4, 5)
+        self.assertAlmostEqual(np.linalg.norm(
+            np.array(transform_sitk.TransformPoint(point)) -
+            transform_outer.TransformPoint(
+                transform_inner.TransformPoint(point))),
+            0, places=self.precision)
+
     # def test_compose_displacement_field_transforms(self):
     #     transform_outer = sitk.Euler3DTransform()
     #     transform_outer.SetRotation(0.3, -0.1, 1.3)
@@ -270,6 +360,107 @@ class UtilitiesTest(unittest.TestCase):
     #         0, places=self.precision
     #     )
 
+    def test_convert_regf3d_cpp_to_sitk_displacement(self):
+        reference_sitk = sitk.Image([10, 9, 8], sitk.sitkFloat32)
+        reference_sitk.SetSpacing((1.2, 0.8, 1.5))
+        reference_sitk.SetOrigin((-3.1, 7.2, 4.4))
+        reference_sitk.SetDirection(sitk.Euler3DTransform(
+            (0, 0, 0), 0.2, -0.1, 0.3).GetMatrix())
+        translation = np.array([0.3, -0.2, 0.1])
+
+        # Control point grid of 2.5 x 3 x 2 voxels spacing
+        ratio = np.array([2.5, 3, 2])
+        size = np.array(reference_sitk.GetSize())
+        grid_size = tuple(np.floor((size - 1) / ratio).astype(int) + 4)
+        A = np.array(reference_sitk.GetDirection()).reshape(3, 3).dot(
+            np.diag(reference_sitk.GetSpacing()))
+        origin = np.array(reference_sitk.GetOrigin())
+
+        # First control point is located one grid spacing before the origin
+        indices = np.moveaxis(np.indices(grid_size), 0, -1)
+        points = ((indices - 1) * ratio).dot(A.T) + origin
+        affine = np.eye(4)
+        affine[0:3, 0:3] = A.dot(np.diag(ratio))
+        affine[0:3, 3] = origin - A.dot(ratio)
+        affine[0:2] *= -1
+
+        def get_cpp_nib(positions, intent, n_steps=0):
+            positions = positions * np.array([-1, -1, 1])
+            cpp_nib = nib.Nifti1Image(
+                positions.reshape(grid_size + (1, 3)), affine)
+            cpp_nib.header.set_intent("vector", name="NREG_TRANS")
+            cpp_nib.header["intent_p1"] = intent
+            cpp_nib.header["intent_p2"] = n_steps
+            return cpp_nib
+
+        # Cubic B-splines reproduce linear functions
+        cpp_nib = get_cpp_nib(
+            points + translation,
+            simplereg.niftyreg_to_simpleitk_converter.CUB_SPLINE_GRID)
+        displacement_sitk = nreg2sitk.convert_regf3d_cpp_to_sitk_displacement(
+            cpp_nib, reference_sitk, dtype=np.float64, slab_size=100)
+        self.assertEqual(
+            displacement_sitk.GetPixelID(), sitk.sitkVectorFloat64)
+        self.assertEqual(
+            displacement_sitk.GetSize(), reference_sitk.GetSize())
+        self.assertEqual(
+            displacement_sitk.GetDirection(), reference_sitk.GetDirection())
+        nda = sitk.GetArrayFromImage(displacement_sitk)
+
+        # Grid spacing is stored in single precision in the NIfTI header
+        self.assertAlmostEqual(
+            np.abs(nda - translation).max(), 0, places=5)
+
+        # Compare with voxel-wise evaluation
+        positions = points + np.random.RandomState(0).randn(*points.shape)
+        cpp_nib = get_cpp_nib(
+            positions,
+            simplereg.niftyreg_to_simpleitk_converter.CUB_SPLINE_GRID)
+        displacement_sitk = nreg2sitk.convert_regf3d_cpp_to_sitk_displacement(
+            cpp_nib, reference_sitk)
+        self.assertEqual(
+            displacement_sitk.GetPixelID(), sitk.sitkVectorFloat32)
+        nda = sitk.GetArrayFromImage(displacement_sitk)
+
+        def get_basis(u):
+            return np.array([
+                (1 - u) ** 3, 3 * u ** 3 - 6 * u ** 2 + 4,
+                -3 * u ** 3 + 3 * u ** 2 + 3 * u + 1, u ** 3]) / 6.
+
+        for index in itertools.product(range(0, 10, 3), range(9), [0, 7]):
+            first = np.floor(np.array(index) / ratio).astype(int)
+            basis = [get_basis(u) for u in np.array(index) / ratio - first]
+            position = np.einsum(
+                "i,j,k,ijkc->c", basis[0], basis[1], basis[2],
+                positions[first[0]:first[0] + 4,
+                          first[1]:first[1] + 4,
+                          first[2]:first[2] + 4])
+            displacement = position - A.dot(index) - origin
+            self.assertAlmostEqual(np.abs(
+                nda[index[::-1]] - displacement).max(), 0, places=4)
+
+        # Velocity grids are exponentiated
+        cpp_nib = get_cpp_nib(
+            points + translation,
+            simplereg.niftyreg_to_simpleitk_converter.SPLINE_VEL_GRID,
+            n_steps=3)
+        displacement_sitk = nreg2sitk.convert_regf3d_cpp_to_sitk_displacement(
+            cpp_nib, reference_sitk, dtype=np.float64)
+        nda = sitk.GetArrayFromImage(displacement_sitk)
+        self.assertAlmostEqual(
+            np.abs(nda[2:-2, 2:-2, 2:-2] - translation).max(), 0, places=5)
+
+        # Backward velocity grids have a negative number of steps
+        cpp_nib = get_cpp_nib(
+            points + translation,
+            simplereg.niftyreg_to_simpleitk_converter.SPLINE_VEL_GRID,
+            n_steps=-3)
+        displacement_sitk = nreg2sitk.convert_regf3d_cpp_to_sitk_displacement(
+            cpp_nib, reference_sitk, dtype=np.float64)
+        nda = sitk.GetArrayFromImage(displacement_sitk)
+        self.assertAlmostEqual(
+            np.abs(nda[2:-2, 2:-2, 2:-2] + translation).max(), 0, places=5)
+
     def test_extract_rigid_from_affine(self):
 
         ##
@@ -0,0 +1,66 @@
+##
+# \file wrapper_benchmark_test.py
+#  \brief  Unit tests for the stub-backed benchmark of the wrapped
+#  registration tools
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import copy
+import json
+import shutil
+import tempfile
+import unittest
+
+import simplereg.wrapper_benchmark as wb
+
+
+class WrapperBenchmarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_tmp)
+
+    def test_run(self):
+        path = os.environ["PATH"]
+        benchmark = wb.WrapperBenchmark(
+            sizes=[8, 12], repetitions=2, dir_tmp=self.dir_tmp)
+        report = benchmark.run()
+
+        # Environment is restored and stubs are deleted
+        self.assertEqual(os.environ["PATH"], path)
+        self.assertEqual(os.listdir(self.dir_tmp), [])
+
+        # Report is machine-readable
+        report = json.loads(json.dumps(report))
+        self.assertEqual(len(report["results"]), 3 * 2 * 2)
+        self.assertEqual(len(report["summary"]), 3 * 2)
+        for entry in report["summary"]:
+            stages = entry["stages"]
+            for stage in ["read_inputs", "prepare", "command",
+                          "read_results", "cleanup"]:
+                self.assertGreaterEqual(stages[stage], 0)
+            self.assertEqual(
+                "displacement" in stages, entry["method"] == "RegF3D")
+            self.assertGreater(entry["overhead"], 0)
+            self.assertGreater(entry["total"], entry["overhead"])
+
+    def test_get_regressions(self):
+        baseline = {"summary": [
+            {"method": "RegAladin", "size": 64, "overhead": 0.2},
+            {"method": "FLIRT", "size": 64, "overhead": 0.2},
+        ]}
+        report = copy.deepcopy(baseline)
+        self.assertEqual(wb.get_regressions(report, baseline), [])
+
+        report["summary"][1]["overhead"] = 0.5
+        report["summary"].append(
+            {"method": "RegF3D", "size": 64, "overhead": 1.})
+        regressions = wb.get_regressions(report, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("FLIRT 64^3", regressions[0])
+
+        self.assertRaises(ValueError, wb.WrapperBenchmark, methods=["ANTs"])
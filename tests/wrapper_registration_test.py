@@ -0,0 +1,286 @@
+##
+# \file wrapper_registration_test.py
+#  \brief  Unit tests for concurrent runs of the wrapped registration tools
+#
+#  Local stub executables replace NiftyReg and FSL FLIRT. They copy the
+#  moving image and encode its intensity as translation so that interference
+#  between concurrent runs becomes visible.
+#
+#  \author Michael Ebner (michael.ebner.14@ucl.ac.uk)
+#  \date October 2026
+
+import os
+import shutil
+import asyncio
+import tempfile
+import unittest
+import concurrent.futures
+import numpy as np
+import SimpleITK as sitk
+
+import simplereg.flirt
+import simplereg.niftyreg
+from simplereg.wrapper_registration import run_registrations_async
+from tests.stub_executables import STUB_COPY, StubExecutables, get_image
+
+# Keep inputs around for a while and fail if they got deleted meanwhile
+STUB_RUN = STUB_COPY + """
+def run(path_in, path_ref, path_out, path_matrix):
+    time.sleep(0.05)
+    copy(path_in, path_out, path_matrix)
+    if not os.path.isfile(path_in) or not os.path.isfile(path_ref):
+        sys.exit(1)
+"""
+
+# Control point grid of identity plus translation along the first axis
+STUB_CPP = """
+import nibabel as nib
+reference_sitk = sitk.ReadImage(options["-ref"])
+image_sitk = sitk.ReadImage(options["-flo"])
+value = sitk.GetArrayFromImage(image_sitk).max()
+sitk.WriteImage(image_sitk, options["-res"])
+
+ratio = 2.
+size = np.array(reference_sitk.GetSize())
+grid_size = tuple(np.floor((size - 1) / ratio).astype(int) + 4)
+A = np.diag(reference_sitk.GetSpacing())
+origin = np.array(reference_sitk.GetOrigin())
+indices = np.moveaxis(np.indices(grid_size), 0, -1)
+positions = ((indices - 1) * ratio).dot(A.T) + origin
+positions[..., 0] += value
+affine = np.eye(4)
+affine[0:3, 0:3] = A * ratio
+affine[0:3, 3] = origin - A.dot(np.ones(3) * ratio)
+affine[0:2] *= -1
+positions[..., 0:2] *= -1
+cpp_nib = nib.Nifti1Image(positions.reshape(grid_size + (1, 3)), affine)
+cpp_nib.header.set_intent("vector", name="NREG_TRANS")
+cpp_nib.header["intent_p1"] = 5
+nib.save(cpp_nib, options["-cpp"])
+"""
+
+STUBS = {
+    "reg_aladin": STUB_RUN + """
+print("pid %d" % os.getpid(), flush=True)
+time.sleep(float(options.get("-sleep", 0)))
+run(options["-flo"], options["-ref"], options["-res"], options["-aff"])
+""",
+    "reg_f3d": STUB_CPP,
+    "flirt": STUB_RUN + """
+run(options["-in"], options["-ref"], options["-out"], options["-omat"])
+""",
+}
+
+
+class WrapperRegistrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.n_registrations = 12
+        self.n_threads = 6
+
+        self.dir_stubs = tempfile.mkdtemp()
+        self.dir_root = tempfile.mkdtemp()
+        self.stubs = StubExecutables(self.dir_stubs, STUBS)
+        self.stubs.start()
+
+        self.fixed_sitk = get_image(0)
+
+    def tearDown(self):
+        self.stubs.stop()
+        shutil.rmtree(self.dir_stubs)
+        shutil.rmtree(self.dir_root)
+
+    def _run_concurrently(self, create_registration):
+
+        def register(i):
+            registration = create_registration(get_image(i + 1))
+            registration.run()
+            return registration
+
+        with concurrent.futures.ThreadPoolExecutor(self.n_threads) as pool:
+            registrations = list(pool.map(
+                register, range(self.n_registrations)))
+
+        for i, registration in enumerate(registrations):
+            translation = registration.get_registration_transform_sitk(
+            ).GetParameters()[-3:]
+            self.assertAlmostEqual(abs(translation[0]), i + 1)
+            nda = sitk.GetArrayFromImage(registration.get_warped_moving_sitk())
+            self.assertTrue(np.all(nda == i + 1))
+
+        return registrations
+
+    def test_reg_aladin_concurrent(self):
+        self._run_concurrently(
+            lambda moving_sitk: simplereg.niftyreg.RegAladin(
+                fixed_sitk=self.fixed_sitk,
+                moving_sitk=moving_sitk,
+                omp=1,
+                dir_tmp=self.dir_root,
+            ))
+
+        # Working directories are deleted after each run
+        self.assertEqual(os.listdir(self.dir_root), [])
+
+    def test_flirt_concurrent(self):
+        registrations = self._run_concurrently(
+            lambda moving_sitk: simplereg.flirt.FLIRT(
+                fixed_sitk=self.fixed_sitk,
+                moving_sitk=moving_sitk,
+                dir_tmp=self.dir_root,
+                keep_files=True,
+            ))
+
+        # Each run used its own working directory which has been kept
+        directories = [r.get_working_directory() for r in registrations]
+        self.assertEqual(len(set(directories)), self.n_registrations)
+        self.assertEqual(
+            sorted(os.listdir(self.dir_root)),
+            sorted(os.path.basename(d) for d in directories))
+        for directory in directories:
+            self.assertTrue(os.path.isfile(
+                os.path.join(directory, "registration_transform.txt")))
+
+    def test_input_files(self):
+        path_to_fixed = os.path.join(self.dir_root, "fixed.nii.gz")
+        path_to_moving = os.path.join(self.dir_root, "moving.nii.gz")
+        sitk.WriteImage(self.fixed_sitk, path_to_fixed)
+        sitk.WriteImage(get_image(3), path_to_moving)
+
+        # NIfTI files backing the images are passed to the tool as-is
+        registration = simplereg.niftyreg.RegAladin(
+            omp=1, dir_tmp=self.dir_root, keep_files=True)
+        registration.set_fixed_sitk(None, path_to_file=path_to_fixed)
+        registration.set_moving_sitk(
+            sitk.ReadImage(path_to_moving), path_to_file=path_to_moving)
+        registration.run()
+
+        directory = registration.get_working_directory()
+        self.assertEqual(sorted(os.listdir(directory)), [
+            "reg_aladin.log",
+            "registration_transform.txt",
+            "warped_moving.nii",
+        ])
+        translation = registration.get_registration_transform_sitk(
+        ).GetParameters()[-3:]
+        self.assertAlmostEqual(abs(translation[0]), 3)
+        self.assertEqual(
+            registration.get_fixed_sitk().GetSize(), self.fixed_sitk.GetSize())
+
+        # Images in memory are exchanged as uncompressed NIfTI
+        registration = simplereg.flirt.FLIRT(
+            fixed_sitk=self.fixed_sitk,
+            moving_sitk=get_image(3),
+            dir_tmp=self.dir_root,
+            keep_files=True)
+        registration.run()
+        directory = registration.get_working_directory()
+        self.assertTrue(os.path.isfile(os.path.join(directory, "fixed.nii")))
+        self.assertTrue(os.path.isfile(os.path.join(directory, "moving.nii")))
+
+    def test_reg_f3d_displacement_field(self):
+        moving_sitk_mask = sitk.Cast(
+            get_image(0) + 1, sitk.sitkUInt8)
+        registration = simplereg.niftyreg.RegF3D(
+            fixed_sitk=self.fixed_sitk,
+            moving_sitk=get_image(2),
+            moving_sitk_mask=moving_sitk_mask,
+            omp=1,
+            dir_tmp=self.dir_root,
+        )
+        registration.run()
+
+        # Evaluated in-process and cached
+        displacement_sitk = registration.get_displacement_field_sitk()
+        self.assertIs(
+            displacement_sitk, registration.get_displacement_field_sitk())
+        self.assertEqual(
+            displacement_sitk.GetPixelID(), sitk.sitkVectorFloat32)
+        nda = sitk.GetArrayFromImage(displacement_sitk)
+        self.assertAlmostEqual(np.abs(nda[..., 0] - 2).max(), 0, places=5)
+        self.assertAlmostEqual(np.abs(nda[..., 1:]).max(), 0, places=5)
+
+        # Warps are resampled in memory, i.e. reg_resample is not available
+        warped_moving_sitk_mask = registration.get_warped_moving_sitk_mask()
+        nda = sitk.GetArrayFromImage(warped_moving_sitk_mask)
+        self.assertEqual(warped_moving_sitk_mask.GetPixelID(), sitk.sitkUInt8)
+        self.assertTrue(np.all(nda[:, :, 0:-2] == 1))
+        self.assertTrue(np.all(nda[:, :, -1] == 0))
+
+    def test_run_async(self):
+        lines = []
+        registrations = [
+            simplereg.niftyreg.RegAladin(
+                fixed_sitk=self.fixed_sitk,
+                moving_sitk=get_image(i + 1),
+                omp=1,
+                dir_tmp=self.dir_root,
+            ) for i in range(self.n_registrations)]
+
+        # Several registrations share one event loop
+        asyncio.run(run_registrations_async(registrations, max_concurrent=3))
+        for i, registration in enumerate(registrations):
+            translation = registration.get_registration_transform_sitk(
+            ).GetParameters()[-3:]
+            self.assertAlmostEqual(abs(translation[0]), i + 1)
+            self.assertIsNotNone(registration.get_computational_time())
+        self.assertEqual(os.listdir(self.dir_root), [])
+
+        # Output is streamed
+        registration = simplereg.flirt.FLIRT(
+            fixed_sitk=self.fixed_sitk,
+            moving_sitk=get_image(2),
+            dir_tmp=self.dir_root,
+        )
+        asyncio.run(registration.run_async(log_callback=lines.append))
+        self.assertEqual(lines, [])
+        registration = simplereg.niftyreg.RegAladin(
+            fixed_sitk=self.fixed_sitk,
+            moving_sitk=get_image(2),
+            omp=1,
+            dir_tmp=self.dir_root,
+            keep_files=True,
+        )
+        asyncio.run(registration.run_async(log_callback=lines.append))
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].startswith("pid"))
+        path_to_log = os.path.join(
+            registration.get_working_directory(), "reg_aladin.log")
+        with open(path_to_log) as fileobj:
+            self.assertIn(lines[0], fileobj.read())
+
+    def test_run_async_cancel(self):
+        lines = []
+        registration = simplereg.niftyreg.RegAladin(
+            fixed_sitk=self.fixed_sitk,
+            moving_sitk=get_image(2),
+            options="-sleep 30",
+            omp=1,
+            dir_tmp=self.dir_root,
+        )
+
+        async def run_and_cancel():
+            task = asyncio.ensure_future(
+                registration.run_async(log_callback=lines.append))
+            while len(lines) == 0:
+                await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return task
+
+        # Cancellation kills the tool and deletes the working directory
+        task = asyncio.run(run_and_cancel())
+        self.assertTrue(task.cancelled())
+        pid = int(lines[0].split()[1])
+        self.assertRaises(ProcessLookupError, os.kill, pid, 0)
+        self.assertEqual(os.listdir(self.dir_root), [])
+
+        # Same on timeout
+        del lines[:]
+        registration.set_timeout(0.5)
+        with self.assertRaises(RuntimeError) as context:
+            asyncio.run(registration.run_async(log_callback=lines.append))
+        self.assertIn("timed out", str(context.exception))
+        pid = int(lines[0].split()[1])
+        self.assertRaises(ProcessLookupError, os.kill, pid, 0)
+        self.assertEqual(os.listdir(self.dir_root), [])